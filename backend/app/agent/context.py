@@ -0,0 +1,176 @@
+"""Token-budgeted assembly of retrieved chunks into prompt context.
+
+Neighbouring chunks share ``CHUNK_OVERLAP_TOKENS`` of text, the same passage
+can be indexed twice (re-uploads, copied readings), and every context token
+adds LLM latency and cost. Retrieved chunks are therefore deduplicated,
+adjacent chunks of a document are merged with their overlap removed (located
+exactly by the chunks' character spans where they have them), and the best
+passages are packed into a token budget. Each passage keeps the
+citation of its best-ranked chunk, so ``[n]`` in the answer, passage ``n``
+in the prompt and ``sources[n - 1]`` always agree.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from app.services.chunking import Tokenizer, excerpt
+from app.services.retrieval import tokenize
+
+NEAR_DUPLICATE_JACCARD = 0.9  # Word-set overlap above which a chunk is dropped
+OVERLAP_PROBE_CHARS = 32  # Prefix of the next chunk searched for in the previous
+
+
+@dataclass
+class Passage:
+    """One or more adjacent retrieved chunks of a document."""
+
+    chunks: list[dict]  # Ordered by chunk_index
+    rank: int  # Best retrieval rank among the chunks
+    content: str
+    tokens: int = 0
+
+    @property
+    def best(self) -> dict:
+        """The chunk this passage is cited by."""
+        return min(self.chunks, key=lambda chunk: chunk["rank"])
+
+    def as_context(self) -> dict:
+        """Prompt fields of the passage (``format_context`` input)."""
+        first = self.chunks[0]
+        return {
+            "document_id": first["document_id"],
+            "filename": first["filename"],
+            "page_number": first.get("page_number"),
+            "chunk_index": self.best["chunk_index"],
+            "chunk_indexes": [chunk["chunk_index"] for chunk in self.chunks],
+            "content": self.content,
+        }
+
+    def citation(self) -> dict:
+        """``CitationSource`` fields for the passage.
+
+        The excerpt comes with the best chunk's page and character span, so
+        a client can show it in place in the source document.
+        """
+        best = self.best
+        return {
+            "document_id": best["document_id"],
+            "filename": best["filename"],
+            "chunk_index": best["chunk_index"],
+            "excerpt": excerpt(best["content"]),
+            "page_number": best.get("page_number"),
+            "char_start": best.get("char_start"),
+            "char_end": best.get("char_end"),
+        }
+
+
+@dataclass
+class Context:
+    """Packed passages with aligned citations and token accounting."""
+
+    passages: list[dict] = field(default_factory=list)
+    sources: list[dict] = field(default_factory=list)
+    tokens_in: int = 0  # Retrieved chunks as returned by search
+    tokens: int = 0  # Context actually sent
+
+    @property
+    def tokens_saved(self) -> int:
+        """Tokens kept out of the prompt by dedup, merging and the budget."""
+        return self.tokens_in - self.tokens
+
+
+def build_context(chunks: list[dict], budget: int, tokenizer: Tokenizer) -> Context:
+    """Deduplicate, merge and pack ``chunks`` (best first) into ``budget`` tokens.
+
+    Args:
+        chunks: Retrieved chunks (``RetrievedChunk`` fields) in rank order.
+        budget: Maximum context tokens; passages that do not fit are
+            replaced by their best chunk alone, or skipped.
+        tokenizer: Tokenizer used to count tokens.
+
+    Returns:
+        Passages in rank order, one citation per passage, and token counts.
+    """
+
+    def count(text: str) -> int:
+        return len(tokenizer.token_spans(text)[0])
+
+    ranked = [{**chunk, "rank": rank} for rank, chunk in enumerate(chunks)]
+    context = Context(tokens_in=sum(count(chunk["content"]) for chunk in ranked))
+
+    kept: list[dict] = []
+    terms: list[set[str]] = []
+    for chunk in ranked:
+        words = set(tokenize(chunk["content"]))
+        if not any(_jaccard(words, other) >= NEAR_DUPLICATE_JACCARD for other in terms):
+            kept.append(chunk)
+            terms.append(words)
+
+    remaining = budget
+    for passage in sorted(_merge_adjacent(kept), key=lambda p: p.rank):
+        passage.tokens = count(passage.content)
+        if passage.tokens > remaining and len(passage.chunks) > 1:
+            best = passage.best
+            passage = Passage([best], best["rank"], best["content"])
+            passage.tokens = count(passage.content)
+        if passage.tokens > remaining:
+            continue
+        remaining -= passage.tokens
+        context.tokens += passage.tokens
+        context.passages.append(passage.as_context())
+        context.sources.append(passage.citation())
+    return context
+
+
+def _merge_adjacent(chunks: list[dict]) -> list[Passage]:
+    passages: list[Passage] = []
+    ordered = sorted(chunks, key=lambda c: (c["document_id"], c["chunk_index"]))
+    for chunk in ordered:
+        last = passages[-1] if passages else None
+        if (
+            last is not None
+            and last.chunks[-1]["document_id"] == chunk["document_id"]
+            and last.chunks[-1]["chunk_index"] + 1 == chunk["chunk_index"]
+        ):
+            overlap = _span_overlap(last.chunks[-1], chunk)
+            if overlap is None:
+                last.content = join_overlapping(last.content, chunk["content"])
+            else:
+                last.content += chunk["content"][overlap:]
+            last.chunks.append(chunk)
+            last.rank = min(last.rank, chunk["rank"])
+        else:
+            passages.append(Passage([chunk], chunk["rank"], chunk["content"]))
+    return passages
+
+
+def _span_overlap(first: dict, second: dict) -> int | None:
+    """Characters ``second`` repeats from the end of ``first``, by their spans.
+
+    None when the spans are missing, relative to different pages, or not
+    overlapping, in which case the text itself is compared.
+    """
+    if (
+        first.get("char_end") is None
+        or second.get("char_start") is None
+        or first.get("page_number") != second.get("page_number")
+    ):
+        return None
+    overlap = first["char_end"] - second["char_start"]
+    return overlap if 0 <= overlap <= len(second["content"]) else None
+
+
+def join_overlapping(first: str, second: str) -> str:
+    """Concatenate consecutive chunks, writing their shared text once."""
+    probe = second[:OVERLAP_PROBE_CHARS]
+    start = first.find(probe, max(0, len(first) - len(second)))
+    while probe and start != -1:
+        if second.startswith(first[start:]):
+            return first + second[len(first) - start :]
+        start = first.find(probe, start + 1)
+    return f"{first}\n{second}"
+
+
+def _jaccard(a: set[str], b: set[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
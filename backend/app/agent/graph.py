@@ -2,78 +2,292 @@
 
 Defines the conditional agent that selects between KB Retrieval,
 Web Search, and Code Execution based on query intent.
-
-# TODO(#8): Implement full graph with nodes and conditional edges.
 """
 
 from __future__ import annotations
 
-from langgraph.graph import END, StateGraph
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict
+
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import StreamWriter
 
+from app.agent.context import build_context
+from app.agent.prompts import (
+    build_code_messages,
+    build_generation_messages,
+    extract_code,
+    format_code_result,
+)
+from app.agent.router import classify_with_llm, get_intent_router
 from app.agent.state import AgentState
+from app.core.config import settings
+from app.core.constants import VECTOR_SIMILARITY_THRESHOLD
+from app.services.chunking import get_tokenizer
+from app.services.llm import get_chat_model
+from app.services.retrieval import get_retrieval_service
+from app.services.sandbox import SandboxBusyError, get_sandbox_pool
+from app.services.web_search import get_web_search
+
+logger = logging.getLogger(__name__)
+
+Node = Callable[..., Awaitable[AgentState]]
 
-# ── Placeholder nodes ─────────────────────────────────────────────────────────
+# ── Nodes ─────────────────────────────────────────────────────────────────────
 
 
 def route_intent(state: AgentState) -> str:
-    """Conditional edge: decide which tool to run next.
+    """Conditional edge after retrieval: answer from the KB or search the web.
+
+    Returns: 'generate' or 'web_search'.
+    """
+    if state.get("retrieval_confidence", 0.0) >= VECTOR_SIMILARITY_THRESHOLD:
+        return "generate"
+    return "web_search"
+
+
+def route_tool(state: AgentState) -> str:
+    """Conditional edge after routing: the tool chosen by ``node_route``.
 
     Returns: one of 'retrieve', 'web_search', 'code_exec', 'generate'.
     """
-    # TODO(#8): Implement intent classification using LLM
-    return "retrieve"
+    return state.get("next_tool") or "retrieve"
+
+
+def fans_out(state: AgentState) -> bool:
+    """Whether a speculative graph runs KB retrieval and web search together.
+
+    Only for a search route the router is unsure of; a confident route runs
+    its tool alone, as in the sequential graph.
+    """
+    return (
+        route_tool(state) in ("retrieve", "web_search")
+        and state.get("route_confidence", 0.0)
+        < settings.AGENT_SPECULATIVE_MAX_CONFIDENCE
+    )
+
+
+def route_speculative(state: AgentState) -> list[str] | str:
+    """Conditional edge after routing in speculative mode."""
+    return ["retrieve", "web_search"] if fans_out(state) else route_tool(state)
+
+
+def route_after_retrieve(state: AgentState) -> str:
+    """Conditional edge after retrieval in speculative mode.
+
+    Returns: 'join' when both searches ran, else as ``route_intent``.
+    """
+    return "join" if fans_out(state) else route_intent(state)
+
+
+def route_after_web_search(state: AgentState) -> str:
+    """Conditional edge after web search in speculative mode.
+
+    Returns: 'join' when both searches ran, else 'generate'.
+    """
+    return "join" if fans_out(state) else "generate"
+
+
+async def node_route(state: AgentState) -> AgentState:
+    """Intent routing node — local rules; the LLM only decides close calls."""
+    decision = get_intent_router().route(state["query"])
+    if decision.confidence < settings.INTENT_ROUTER_MIN_CONFIDENCE:
+        decision = await classify_with_llm(get_chat_model(), state["query"], decision)
+    logger.debug(
+        "Routed to %s (%s, %.2f)", decision.intent, decision.source, decision.confidence
+    )
+    return {"next_tool": decision.intent, "route_confidence": decision.confidence}
+
 
+def _no_writer(_: object) -> None:
+    """Stream writer used when a node runs outside a streamed graph."""
 
-def node_retrieve(state: AgentState) -> AgentState:
+
+async def node_retrieve(
+    state: AgentState, writer: StreamWriter = _no_writer
+) -> AgentState:
     """KB retrieval node — hybrid BM25 + semantic search.
 
-    # TODO(#5): Implement retrieval service call.
+    Results are assembled into the token-budgeted prompt context here, and
+    citations set, rather than after generation so they can be sent to the
+    client before the first answer token.
     """
-    return {**state, "next_tool": "generate"}
+    writer({"status": "retrieving"})
+    result = await get_retrieval_service().search(state["user_id"], state["query"])
+    context = build_context(
+        [asdict(chunk) for chunk in result.chunks],
+        settings.CONTEXT_TOKEN_BUDGET,
+        get_tokenizer(settings.CHUNK_TOKENIZER),
+    )
+    return {
+        "retrieved_chunks": context.passages,
+        "retrieval_confidence": result.confidence,
+        "sources": context.sources,
+        "context_tokens": context.tokens,
+        "context_tokens_saved": context.tokens_saved,
+    }
+
+
+async def node_web_search(
+    state: AgentState, writer: StreamWriter = _no_writer
+) -> AgentState:
+    """Web search node — top results with the main text of their pages."""
+    writer({"status": "searching"})
+    return {"web_search_results": await get_web_search().search(state["query"])}
 
 
-def node_web_search(state: AgentState) -> AgentState:
-    """Web search fallback node.
+async def node_code_exec(
+    state: AgentState, writer: StreamWriter = _no_writer
+) -> AgentState:
+    """Code execution node — runs Python in the sandbox pool.
 
-    # TODO(#8): Implement web search tool integration.
+    Runs the query's own fenced code block if it has one, otherwise a
+    program the LLM writes for it. With no code, or no free sandbox worker,
+    the answer is generated without a result.
     """
-    return {**state, "next_tool": "generate"}
+    writer({"status": "executing"})
+    code = extract_code(state["query"])
+    if code is None:
+        response = await get_chat_model().ainvoke(build_code_messages(state))
+        code = extract_code(response.text)
+    if code is None:
+        return {"code_exec_result": None}
+    try:
+        result = await get_sandbox_pool().run(code)
+    except SandboxBusyError as exc:
+        logger.warning("Code not executed: %s", exc)
+        return {"code_exec_result": None}
+    logger.debug("Sandbox run: %s in %.3fs", result.status, result.seconds)
+    return {"code_exec_result": format_code_result(code, result)}
 
 
-def node_generate(state: AgentState) -> AgentState:
+def node_join(state: AgentState) -> AgentState:
+    """Join of the speculative branches: keep web results only if needed.
+
+    They are needed when the query was routed to web search, or when the
+    knowledge base has no confident answer.
+    """
+    if (
+        route_tool(state) != "web_search"
+        and state.get("retrieval_confidence", 0.0) >= VECTOR_SIMILARITY_THRESHOLD
+    ):
+        return {"web_search_results": []}
+    return {}
+
+
+async def node_generate(
+    state: AgentState, writer: StreamWriter = _no_writer
+) -> AgentState:
     """LLM generation node — produces grounded answer with citations.
 
-    # TODO(#5): Implement LLM call with retrieved context.
+    Uses ``ainvoke``; under ``stream_mode="messages"`` the tokens still reach
+    the stream one by one, and cancelling the run cancels the provider call.
     """
-    return {**state, "answer": "Not yet implemented.", "sources": []}
+    writer({"status": "generating"})
+    response = await get_chat_model().ainvoke(build_generation_messages(state))
+    return {"answer": response.text}
+
+
+def with_timeout(node: Node, seconds: float, fallback: AgentState) -> Node:
+    """Bound a branch's run time; on timeout it contributes ``fallback``."""
+
+    async def run(state: AgentState, writer: StreamWriter = _no_writer) -> AgentState:
+        try:
+            return await asyncio.wait_for(node(state, writer), seconds)
+        except TimeoutError:
+            logger.warning("%s timed out after %.1fs", node.__name__, seconds)
+            return fallback
+
+    return run
 
 
 # ── Build graph ───────────────────────────────────────────────────────────────
 
 
-def build_agent_graph() -> StateGraph:
+def build_agent_graph(
+    speculative: bool = False, branch_timeout: float | None = None
+) -> StateGraph:
     """Construct and compile the LangGraph agent workflow.
 
+    Nodes return only the keys they change, so parallel branches never
+    write the same state key in one step.
+
+    Args:
+        speculative: For queries routed to a search tool with less than
+            ``AGENT_SPECULATIVE_MAX_CONFIDENCE``, run KB retrieval and web
+            search as parallel branches joined before generation, instead
+            of searching the web only after retrieval came back with low
+            confidence. The fallback path then costs the slower branch
+            rather than both.
+        branch_timeout: Seconds each speculative branch may run before it
+            is dropped with empty results.
+
     Returns:
         Compiled StateGraph ready to invoke or stream.
     """
     graph = StateGraph(AgentState)
-
-    graph.add_node("retrieve", node_retrieve)
-    graph.add_node("web_search", node_web_search)
+    graph.add_node("route", node_route)
+    graph.add_node("code_exec", node_code_exec)
     graph.add_node("generate", node_generate)
+    graph.add_edge(START, "route")
+    graph.add_edge("code_exec", "generate")
+    graph.add_edge("generate", END)
 
-    graph.set_entry_point("retrieve")
+    if not speculative:
+        graph.add_node("retrieve", node_retrieve)
+        graph.add_node("web_search", node_web_search)
+        graph.add_conditional_edges(
+            "route",
+            route_tool,
+            {
+                "retrieve": "retrieve",
+                "web_search": "web_search",
+                "code_exec": "code_exec",
+                "generate": "generate",
+            },
+        )
+        graph.add_conditional_edges(
+            "retrieve",
+            route_intent,
+            {"generate": "generate", "web_search": "web_search"},
+        )
+        graph.add_edge("web_search", "generate")
+        return graph.compile()
 
-    graph.add_conditional_edges(
+    timeout = branch_timeout or settings.AGENT_BRANCH_TIMEOUT_SECONDS
+    graph.add_node(
         "retrieve",
-        route_intent,
-        {"generate": "generate", "web_search": "web_search"},
+        with_timeout(
+            node_retrieve,
+            timeout,
+            {
+                "retrieved_chunks": [],
+                "retrieval_confidence": 0.0,
+                "sources": [],
+                "context_tokens": 0,
+                "context_tokens_saved": 0,
+            },
+        ),
     )
-    graph.add_edge("web_search", "generate")
-    graph.add_edge("generate", END)
-
+    graph.add_node(
+        "web_search",
+        with_timeout(node_web_search, timeout, {"web_search_results": []}),
+    )
+    graph.add_node("join", node_join)
+    graph.add_conditional_edges(
+        "route", route_speculative, ["retrieve", "web_search", "code_exec", "generate"]
+    )
+    # Both branches of a fan-out finish in the same step, so join runs once.
+    graph.add_conditional_edges(
+        "retrieve", route_after_retrieve, ["join", "generate", "web_search"]
+    )
+    graph.add_conditional_edges(
+        "web_search", route_after_web_search, ["join", "generate"]
+    )
+    graph.add_edge("join", "generate")
     return graph.compile()
 
 
-agent_graph = build_agent_graph()
+agent_graph = build_agent_graph(settings.AGENT_SPECULATIVE_SEARCH)
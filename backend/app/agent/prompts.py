@@ -0,0 +1,96 @@
+"""Prompt construction for the generation and code execution nodes."""
+
+from __future__ import annotations
+
+import re
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+from app.agent.state import AgentState
+from app.services.sandbox import SandboxResult
+
+SYSTEM_PROMPT = (
+    "You are DocMind, a research assistant for computer-science students. "
+    "Answer from the numbered context passages when they are relevant and cite "
+    "them inline as [1], [2], ... If the context does not cover the question, "
+    "say so before answering from general knowledge."
+)
+
+CODE_PROMPT = (
+    "Write a short, self-contained Python 3 program that computes what the "
+    "user asks and prints the result. Use only the standard library and numpy; "
+    "there is no network or file access. Reply with one ```python code block "
+    "and nothing else."
+)
+CODE_LANGUAGES = ("", "python", "python3", "py")
+_FENCED_BLOCK = re.compile(r"```[ \t]*([\w+-]*)[^\n]*\n(.*?)```", re.DOTALL)
+
+
+def format_context(chunks: list[dict]) -> str:
+    """Number retrieved chunks in citation order for the prompt."""
+    passages = []
+    for number, chunk in enumerate(chunks, start=1):
+        page = f", page {chunk['page_number']}" if chunk.get("page_number") else ""
+        passages.append(f"[{number}] {chunk['filename']}{page}\n{chunk['content']}")
+    return "\n\n".join(passages)
+
+
+def format_web_results(results: list[dict]) -> str:
+    """Label web search results [W1], [W2], ... for the prompt."""
+    return "\n\n".join(
+        f"[W{number}] {result.get('title', '')} ({result['url']})\n{result['content']}"
+        for number, result in enumerate(results, start=1)
+    )
+
+
+def build_generation_messages(state: AgentState) -> list[BaseMessage]:
+    """System prompt (summary, context, tool results), recent turns, then query."""
+    system = SYSTEM_PROMPT
+    summary = state.get("history_summary")
+    if summary:
+        system = f"{system}\n\nEarlier in this conversation:\n{summary}"
+    context = format_context(state.get("retrieved_chunks", []))
+    if context:
+        system = f"{system}\n\nContext:\n{context}"
+    web = format_web_results(state.get("web_search_results", []))
+    if web:
+        system = f"{system}\n\nWeb results (cite as [W1], [W2], ...):\n{web}"
+    code_result = state.get("code_exec_result")
+    if code_result:
+        system = f"{system}\n\nCode execution:\n{code_result}"
+    return [
+        SystemMessage(system),
+        *state.get("messages", []),
+        HumanMessage(state["query"]),
+    ]
+
+
+def build_code_messages(state: AgentState) -> list[BaseMessage]:
+    """Ask the model for a program that answers the query."""
+    return [
+        SystemMessage(CODE_PROMPT),
+        *state.get("messages", []),
+        HumanMessage(state["query"]),
+    ]
+
+
+def extract_code(text: str) -> str | None:
+    """The first fenced Python (or unlabelled) code block in ``text``."""
+    for match in _FENCED_BLOCK.finditer(text):
+        if match.group(1).lower() in CODE_LANGUAGES and match.group(2).strip():
+            return match.group(2)
+    return None
+
+
+def format_code_result(code: str, result: SandboxResult) -> str:
+    """Describe a sandbox run for the generation prompt."""
+    parts = [
+        f"```python\n{code.rstrip()}\n```",
+        f"Status: {result.status} ({result.seconds:.2f}s)",
+    ]
+    if result.output:
+        truncated = "\n[output truncated]" if result.truncated else ""
+        parts.append(f"Output:\n{result.output.rstrip()}{truncated}")
+    if result.error:
+        parts.append(f"Error:\n{result.error}")
+    return "\n".join(parts)
@@ -0,0 +1,173 @@
+"""Local intent routing.
+
+Asking the LLM which tool to use would add a full round trip before every
+answer. Instead, weighted regular-expression rules score each intent in a
+few microseconds; the LLM is only consulted when the two best intents are
+close. Misroutes to ``retrieve`` are cheap because low-confidence retrieval
+still falls back to web search, so ``retrieve`` carries a prior and wins
+when no rule fires.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import HumanMessage, SystemMessage
+
+logger = logging.getLogger(__name__)
+
+INTENTS = ("retrieve", "web_search", "code_exec", "generate")
+RETRIEVE_PRIOR = 0.3
+
+# (pattern, weight) per intent; patterns are matched case-insensitively.
+INTENT_RULES: dict[str, list[tuple[str, float]]] = {
+    "retrieve": [
+        (
+            r"\b(my|our|the|these|this) (notes?|documents?|docs|files?|pdfs?|"
+            r"slides|lectures?|readings?|textbook|uploads?|course|syllabus|"
+            r"assignments?|homework|chapters?|papers?)\b",
+            1.2,
+        ),
+        (r"\b(according to|based on|from|in) (the|my|our)\b", 0.5),
+        (r"\b(page|section|chapter|lecture|week) \d+", 0.6),
+        (
+            r"\b(summari[sz]e|explain|define|definition of|what (is|are)|"
+            r"how (does|do|is)|why (does|do|is)|compare|difference between)\b",
+            0.4,
+        ),
+    ],
+    "web_search": [
+        (
+            r"\b(latest|newest|recent(ly)?|current(ly)?|today|tonight|yesterday|"
+            r"this (week|month|year)|right now|breaking|upcoming|what'?s new)\b",
+            1.0,
+        ),
+        (
+            r"\b(news|weather|stocks?|share price|prices?|release date|"
+            r"election|scores?|standings|release notes|roadmap)\b",
+            0.7,
+        ),
+        (
+            r"\b(search|google|look up|browse)\b.{0,20}\b(web|internet|online)\b",
+            1.5,
+        ),
+        (r"^\W*(google|search for|look up)\b", 1.2),
+        (r"\b(on|from) the (web|internet)\b|\bonline\b", 0.8),
+        (r"\b20[2-9]\d\b", 0.4),
+        (r"https?://", 0.6),
+    ],
+    "code_exec": [
+        (r"```", 0.6),
+        (
+            r"\b(run|execute|evaluate|test)\b.{0,40}\b(code|script|snippet|"
+            r"program|function|this)\b",
+            1.2,
+        ),
+        (r"\bwhat (is|does|would) .{0,40}\b(output|print|return)s?\b", 0.8),
+        (r"\b(compute|calculate|evaluate|simulat(e|ion))\b", 0.6),
+        (r"\bdef \w+\(|\bimport \w+|\bprint\(|\bfor \w+ in \b|\bconsole\.log\(", 0.8),
+        (r"\d+(\.\d+)?\s*[-+*/^%]\s*\d+", 0.4),
+    ],
+    "generate": [
+        (
+            r"^\W*(hi|hello|hey|thanks|thank you|thx|ok(ay)?|cool|great|"
+            r"good (morning|afternoon|evening)|bye)\b[\s\w]{0,12}\W*$",
+            1.5,
+        ),
+        (
+            r"\b(rewrite|rephrase|paraphrase|translate|proofread|shorten|"
+            r"make (this|it) (shorter|longer|clearer|more formal))\b",
+            1.0,
+        ),
+        (r"\b(who are you|what can you do|how do i use)\b", 1.0),
+        (
+            r"\b(write|draft|compose) (me )?(a |an )?(poem|story|email|letter|"
+            r"joke|haiku)\b",
+            1.0,
+        ),
+    ],
+}
+
+LLM_ROUTER_PROMPT = (
+    "Classify the user's message for a study assistant. Reply with exactly "
+    "one word: retrieve (answer from the student's uploaded documents), "
+    "web_search (needs current or external information), code_exec (needs "
+    "code to be run or something computed) or generate (no tool needed)."
+)
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    """Chosen intent, its confidence in [0.5, 1] and who decided."""
+
+    intent: str
+    confidence: float
+    source: str = "rules"  # rules | llm
+
+
+class IntentRouter:
+    """Weighted regex rules compiled once per process."""
+
+    def __init__(
+        self,
+        rules: dict[str, list[tuple[str, float]]] = INTENT_RULES,
+        retrieve_prior: float = RETRIEVE_PRIOR,
+    ) -> None:
+        self._rules = [
+            (intent, re.compile(pattern, re.IGNORECASE), weight)
+            for intent, patterns in rules.items()
+            for pattern, weight in patterns
+        ]
+        self._prior = retrieve_prior
+
+    def scores(self, query: str) -> dict[str, float]:
+        """Summed weight of the matching rules per intent."""
+        scores = dict.fromkeys(INTENTS, 0.0)
+        scores["retrieve"] = self._prior
+        for intent, pattern, weight in self._rules:
+            if pattern.search(query):
+                scores[intent] += weight
+        return scores
+
+    def route(self, query: str) -> RouteDecision:
+        """Pick the best-scoring intent.
+
+        Confidence is the best score's share of the two best scores, so 0.5
+        is a tie and 1.0 means no other intent had any evidence.
+        """
+        best, second = sorted(
+            self.scores(query).items(), key=lambda item: item[1], reverse=True
+        )[:2]
+        return RouteDecision(best[0], best[1] / (best[1] + second[1]))
+
+
+async def classify_with_llm(
+    model: BaseChatModel, query: str, fallback: RouteDecision
+) -> RouteDecision:
+    """Ask the LLM for the intent; keep ``fallback`` if it fails or is unusable.
+
+    The rules can always route a query, so a provider error or timeout here
+    must not fail the request.
+    """
+    try:
+        response = await model.ainvoke(
+            [SystemMessage(LLM_ROUTER_PROMPT), HumanMessage(query)]
+        )
+    except Exception as exc:
+        logger.warning("LLM routing failed, using the rules: %r", exc)
+        return fallback
+    reply = response.text.strip().lower().strip(".` ")
+    if reply not in INTENTS:
+        logger.warning("Unrecognised LLM routing reply: %r", reply[:40])
+        return fallback
+    return RouteDecision(reply, 1.0, source="llm")
+
+
+@lru_cache(maxsize=1)
+def get_intent_router() -> IntentRouter:
+    """Return the process-wide intent router."""
+    return IntentRouter()
@@ -16,15 +16,18 @@ class AgentState(TypedDict, total=False):
     # Conversation
     conversation_id: str
     user_id: str
-    messages: list[BaseMessage]
+    messages: list[BaseMessage]  # Recent turns only
+    history_summary: str  # Summary of the turns before ``messages``
 
     # Query
     query: str
     image_base64: str | None
 
     # Retrieved context
-    retrieved_chunks: list[dict]
+    retrieved_chunks: list[dict]  # Context passages, in citation order
     retrieval_confidence: float
+    context_tokens: int
+    context_tokens_saved: int  # By dedup, merging and the token budget
 
     # Tool results
     web_search_results: list[dict]
@@ -36,4 +39,5 @@ class AgentState(TypedDict, total=False):
 
     # Control flow
     next_tool: str | None  # "retrieve" | "web_search" | "code_exec" | "generate"
+    route_confidence: float  # The router's confidence in ``next_tool``
     error: str | None
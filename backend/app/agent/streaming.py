@@ -0,0 +1,303 @@
+"""Server-Sent Events streaming of agent runs.
+
+The graph runs under ``astream`` with three stream modes at once: ``custom``
+carries the progress statuses nodes write (retrieving, searching,
+executing, generating), ``updates`` carries node state deltas (citations
+are sent as soon as retrieval finishes) and ``messages`` carries LLM tokens
+as the provider produces them. Every request records time-to-first-token and
+decode throughput. ``cached_stream`` puts the semantic answer cache in
+front of the graph.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections.abc import AsyncGenerator, AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, TypeVar
+
+from langgraph.graph.state import CompiledStateGraph
+
+from app.agent.state import AgentState
+from app.core.config import settings
+from app.core.metrics import Counters, RedisCounters, ratio
+from app.core.redis_client import get_redis
+from app.schemas.metrics import ChatStreamMetrics
+from app.services.answer_cache import AnswerCache, CachedAnswer
+from app.services.chunking import get_tokenizer
+from app.services.embedding import EmbeddingError, EmbeddingService
+
+logger = logging.getLogger(__name__)
+
+DISCONNECT_POLL_SECONDS = 0.5
+GENERATION_NODE = "generate"
+
+T = TypeVar("T")
+
+
+@dataclass
+class GenerationStats:
+    """Timing of one streamed answer (``perf_counter`` seconds)."""
+
+    started: float = field(default_factory=time.perf_counter)
+    first_token_at: float | None = None
+    finished_at: float | None = None
+    tokens: int = 0
+    outcome: str = "cancelled"  # completed | cached | cancelled | failed
+    context_tokens: int | None = None  # Set when retrieval ran
+    context_tokens_saved: int = 0
+    route: str | None = None  # Tool the router chose
+    web_results: int = 0  # Web results the answer was generated from
+    code_result: bool = False  # Whether a code run's output was used
+
+    @property
+    def from_knowledge_base(self) -> bool:
+        """Whether the answer rests on KB retrieval alone.
+
+        Only such answers are tied to the knowledge-base version an answer
+        cache bucket tracks; web pages and code output are not.
+        """
+        return (
+            self.route == "retrieve" and not self.web_results and not self.code_result
+        )
+
+    @property
+    def ttft_ms(self) -> float | None:
+        """Milliseconds from request start to the first answer token."""
+        if self.first_token_at is None:
+            return None
+        return (self.first_token_at - self.started) * 1000
+
+    @property
+    def elapsed_ms(self) -> float:
+        """Milliseconds from request start until now or the last token."""
+        return ((self.finished_at or time.perf_counter()) - self.started) * 1000
+
+    @property
+    def generation_ms(self) -> float:
+        """Milliseconds from the first answer token to the last."""
+        if self.first_token_at is None or self.finished_at is None:
+            return 0.0
+        return (self.finished_at - self.first_token_at) * 1000
+
+    @property
+    def tokens_per_second(self) -> float:
+        """Decode throughput after the first token."""
+        return ratio(self.tokens, self.generation_ms) * 1000
+
+    def summary(self) -> dict[str, Any]:
+        """Payload of the final ``done`` event."""
+        ttft = self.ttft_ms
+        return {
+            "ttft_ms": round(ttft, 1) if ttft is not None else None,
+            "tokens": self.tokens,
+            "tokens_per_second": round(self.tokens_per_second, 1),
+            "context_tokens": self.context_tokens,
+            "context_tokens_saved": self.context_tokens_saved,
+        }
+
+
+class StreamMetrics:
+    """Aggregates per-request generation stats into shared counters."""
+
+    def __init__(self, counters: Counters) -> None:
+        self._counters = counters
+
+    def record(self, stats: GenerationStats) -> None:
+        """Count one finished, abandoned or failed request."""
+        self._counters.incr("requests")
+        self._counters.incr(stats.outcome)
+        if stats.ttft_ms is not None:
+            self._counters.incr("first_tokens")
+            self._counters.incr("ttft_ms", round(stats.ttft_ms))
+            self._counters.incr("tokens", stats.tokens)
+            self._counters.incr("generation_ms", round(stats.generation_ms))
+        if stats.context_tokens is not None:
+            self._counters.incr("contexts")
+            self._counters.incr("context_tokens", stats.context_tokens)
+            self._counters.incr("context_tokens_saved", stats.context_tokens_saved)
+
+    def stats(self) -> ChatStreamMetrics:
+        """Return request outcomes, latency, throughput and context sizes."""
+        counts = self._counters.snapshot()
+        contexts = counts.get("contexts", 0)
+        return ChatStreamMetrics(
+            requests=counts.get("requests", 0),
+            completed=counts.get("completed", 0),
+            cached=counts.get("cached", 0),
+            cancelled=counts.get("cancelled", 0),
+            failed=counts.get("failed", 0),
+            mean_ttft_ms=ratio(counts.get("ttft_ms", 0), counts.get("first_tokens", 0)),
+            tokens_per_second=ratio(
+                counts.get("tokens", 0) * 1000, counts.get("generation_ms", 0)
+            ),
+            mean_context_tokens=ratio(counts.get("context_tokens", 0), contexts),
+            mean_context_tokens_saved=ratio(
+                counts.get("context_tokens_saved", 0), contexts
+            ),
+        )
+
+
+@lru_cache(maxsize=1)
+def get_stream_metrics() -> StreamMetrics:
+    """Return the Redis-backed chat stream metrics (shared by API processes)."""
+    return StreamMetrics(RedisCounters(get_redis(), "chat"))
+
+
+async def stream_agent(
+    graph: CompiledStateGraph, state: AgentState, stats: GenerationStats
+) -> AsyncGenerator[tuple[str, dict[str, Any]], None]:
+    """Run ``graph`` and yield ``(event, data)`` pairs as they are produced.
+
+    Events are ``status``, ``sources``, ``token``, then ``done`` with the
+    generation stats, or ``error`` if the run fails. Closing the iterator
+    early cancels the run, including an in-flight LLM request.
+    """
+    sources: list[dict] | None = None
+    answer = ""
+    reported_tokens = 0
+    try:
+        async for mode, payload in graph.astream(
+            state, stream_mode=["custom", "updates", "messages"]
+        ):
+            if mode == "custom":
+                yield "status", payload
+            elif mode == "updates":
+                for update in payload.values():
+                    if update and stats.route is None and "next_tool" in update:
+                        stats.route = update["next_tool"] or "retrieve"
+                    if update and "web_search_results" in update:
+                        stats.web_results = len(update["web_search_results"])
+                    if update and "code_exec_result" in update:
+                        stats.code_result = update["code_exec_result"] is not None
+                    if update and "context_tokens" in update:
+                        stats.context_tokens = update["context_tokens"]
+                        stats.context_tokens_saved = update["context_tokens_saved"]
+                    if update and update.get("sources", sources) != sources:
+                        sources = update["sources"]
+                        yield "sources", {"sources": sources}
+            else:
+                chunk, metadata = payload
+                if metadata.get("langgraph_node") != GENERATION_NODE:
+                    continue
+                usage = getattr(chunk, "usage_metadata", None)
+                if usage:
+                    reported_tokens += usage.get("output_tokens", 0)
+                if not chunk.text:
+                    continue
+                if stats.first_token_at is None:
+                    stats.first_token_at = time.perf_counter()
+                answer += chunk.text
+                yield "token", {"text": chunk.text}
+    except Exception:
+        logger.exception("Agent run failed")
+        stats.outcome = "failed"
+        yield "error", {"detail": "The agent failed to answer this query."}
+        return
+
+    stats.finished_at = time.perf_counter()
+    stats.tokens = reported_tokens or count_tokens(answer)
+    stats.outcome = "completed"
+    yield "done", {"conversation_id": state.get("conversation_id"), **stats.summary()}
+
+
+async def cached_stream(
+    graph: CompiledStateGraph,
+    state: AgentState,
+    stats: GenerationStats,
+    cache: AnswerCache,
+    embeddings: EmbeddingService,
+) -> AsyncGenerator[tuple[str, dict[str, Any]], None]:
+    """``stream_agent`` behind the semantic answer cache.
+
+    A hit replays the cached citations and answer without running retrieval
+    or the LLM. A completed miss answered from the knowledge base alone (no
+    web results or code output) is stored, before its ``done`` event, under
+    the versions it was looked up at. The query embedding is
+    reused from the embedding cache when retrieval runs.
+    """
+    try:
+        query = await embeddings.embed_query(state["query"])
+    except EmbeddingError:
+        logger.warning("Answer cache skipped: query embedding failed", exc_info=True)
+        async for item in stream_agent(graph, state, stats):
+            yield item
+        return
+
+    cached, version = await cache.lookup(state["user_id"], query)
+    if cached is not None:
+        stats.outcome = "cached"
+        yield "status", {"status": "cached"}
+        yield "sources", {"sources": cached.sources}
+        yield "token", {"text": cached.answer}
+        saved_ms = cached.latency_ms - stats.elapsed_ms
+        cache.record_saved(saved_ms)
+        yield "done", {
+            "conversation_id": state.get("conversation_id"),
+            "cached": True,
+            "latency_saved_ms": round(saved_ms, 1),
+        }
+        return
+
+    sources: list[dict] = []
+    answer = ""
+    async for event, data in stream_agent(graph, state, stats):
+        if event == "sources":
+            sources = data["sources"]
+        elif event == "token":
+            answer += data["text"]
+        elif event == "done" and version is not None and stats.from_knowledge_base:
+            await cache.store(
+                state["user_id"],
+                version,
+                query,
+                CachedAnswer(answer, sources, round(stats.elapsed_ms, 1)),
+            )
+        yield event, data
+
+
+def count_tokens(text: str) -> int:
+    """Estimate tokens with the chunking tokenizer when the provider reports none."""
+    return len(get_tokenizer(settings.CHUNK_TOKENIZER).token_spans(text)[0])
+
+
+async def until_disconnected(
+    events: AsyncGenerator[T, None],
+    is_disconnected: Callable[[], Awaitable[bool]],
+    poll_seconds: float = DISCONNECT_POLL_SECONDS,
+) -> AsyncIterator[T]:
+    """Relay ``events`` until they end or the client goes away.
+
+    The connection is polled while waiting for the next event, so a client
+    that disconnects while the LLM is still thinking cancels the upstream
+    call immediately rather than when the next token fails to send. The next
+    event is only requested once the previous one has been written, so a
+    slow reader holds back the relay instead of growing a send buffer.
+    """
+    pending: asyncio.Future[T] | None = None
+    try:
+        while True:
+            pending = asyncio.ensure_future(anext(events))
+            while not (await asyncio.wait({pending}, timeout=poll_seconds))[0]:
+                if await is_disconnected():
+                    return
+            try:
+                item = pending.result()
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        if pending is not None and not pending.done():
+            # Cancelling the pending step unwinds (and closes) the generator.
+            pending.cancel()
+        else:
+            await events.aclose()
+
+
+def format_sse(event: str, data: dict[str, Any]) -> str:
+    """Encode one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
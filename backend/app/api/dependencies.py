@@ -2,36 +2,31 @@
 
 from __future__ import annotations
 
-from functools import lru_cache
 from typing import Annotated
 
 from fastapi import Depends, Security
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from supabase import Client, create_client
+from supabase import Client
 
-from app.core.config import settings
-from app.core.security import get_current_user
+from app.core.security import TokenVerifier, get_current_user, get_token_verifier
+from app.core.supabase_client import get_supabase_client
+from app.services.database import SupabaseDatabase, get_database
+from app.services.storage import ObjectStorage, get_storage
 
 bearer_scheme = HTTPBearer()
 
 
-@lru_cache(maxsize=1)
-def get_supabase_client() -> Client:
-    """Return a cached Supabase client using the service role key.
-
-    The service role key bypasses RLS — only use on the backend.
-    """
-    return create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
-
-
 async def get_authenticated_user(
     credentials: Annotated[HTTPAuthorizationCredentials, Security(bearer_scheme)],
     supabase: Annotated[Client, Depends(get_supabase_client)],
+    verifier: Annotated[TokenVerifier, Depends(get_token_verifier)],
 ) -> dict:
     """Dependency that validates the JWT and returns the current user."""
-    return await get_current_user(credentials, supabase)
+    return await get_current_user(credentials, supabase, verifier)
 
 
 # Type aliases for route signatures
 CurrentUser = Annotated[dict, Depends(get_authenticated_user)]
 SupabaseClient = Annotated[Client, Depends(get_supabase_client)]
+Database = Annotated[SupabaseDatabase, Depends(get_database)]
+Storage = Annotated[ObjectStorage, Depends(get_storage)]
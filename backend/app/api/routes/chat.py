@@ -2,13 +2,38 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import uuid
+from collections.abc import AsyncIterator
+from typing import Annotated
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, Request
 from fastapi.responses import StreamingResponse
+from redis import RedisError
+from starlette.background import BackgroundTask
 
+from app.agent.graph import agent_graph
+from app.agent.state import AgentState
+from app.agent.streaming import (
+    GenerationStats,
+    StreamMetrics,
+    cached_stream,
+    format_sse,
+    get_stream_metrics,
+    stream_agent,
+    until_disconnected,
+)
 from app.api.dependencies import CurrentUser, SupabaseClient
 from app.schemas.chat import ChatRequest
+from app.services.answer_cache import AnswerCache, get_answer_cache
+from app.services.conversation import (
+    Conversation,
+    ConversationHistory,
+    Turn,
+    get_conversation_history,
+)
+from app.services.embedding import EmbeddingService, get_embedding_service
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -21,15 +46,90 @@ router = APIRouter()
 )
 async def chat(
     request: ChatRequest,
+    http_request: Request,
     current_user: CurrentUser,
     supabase: SupabaseClient,
+    metrics: Annotated[StreamMetrics, Depends(get_stream_metrics)],
+    cache: Annotated[AnswerCache | None, Depends(get_answer_cache)],
+    embeddings: Annotated[EmbeddingService, Depends(get_embedding_service)],
+    history: Annotated[ConversationHistory, Depends(get_conversation_history)],
 ) -> StreamingResponse:
     """Accept a text (+ optional image) query, run the LangGraph agent,
     and stream the response as Server-Sent Events.
 
-    # TODO(#5): Wire up LangGraph agent and SSE streaming (Issue #5, #7, #8).
+    Events, in order: ``status`` (retrieving, searching, executing,
+    generating), ``sources`` once retrieval finishes, one ``token`` per LLM
+    chunk, then ``done`` with time-to-first-token and tokens/sec (or
+    ``error``). A client disconnect cancels the agent run and its LLM call.
+    Text queries similar to one already answered over the same documents
+    are replayed from the answer cache (``status`` cached, and ``done``
+    with ``cached: true``).
+
+    With a ``conversation_id``, the conversation's recent turns and the
+    summary of older ones are sent to the LLM; follow-up questions depend
+    on them, so they bypass the answer cache. The finished turn is recorded
+    after the response has been sent.
     """
-    raise HTTPException(
-        status_code=status.HTTP_501_NOT_IMPLEMENTED,
-        detail="Chat agent not yet implemented (Issues #5, #8).",
+    user_id = current_user["id"]
+    conversation = Conversation()
+    if request.conversation_id:
+        conversation = await history.load(user_id, request.conversation_id)
+    state: AgentState = {
+        "conversation_id": request.conversation_id or str(uuid.uuid4()),
+        "user_id": user_id,
+        "messages": conversation.messages(),
+        "history_summary": conversation.summary,
+        "query": request.message,
+        "image_base64": request.image_base64,
+    }
+    stats = GenerationStats()
+    answer: list[str] = []
+
+    async def events() -> AsyncIterator[str]:
+        if cache is None or request.image_base64 or conversation.turns:
+            upstream = stream_agent(agent_graph, state, stats)
+        else:
+            upstream = cached_stream(agent_graph, state, stats, cache, embeddings)
+        try:
+            async for event, data in until_disconnected(
+                upstream, http_request.is_disconnected
+            ):
+                if event == "token":
+                    answer.append(data["text"])
+                yield format_sse(event, data)
+        finally:
+            # Not awaited: this also runs when the response task is cancelled.
+            asyncio.get_running_loop().run_in_executor(
+                None, _record, metrics, state["conversation_id"], stats
+            )
+
+    async def remember() -> None:
+        if stats.outcome in ("completed", "cached"):
+            turn = Turn(request.message, "".join(answer))
+            await history.record(user_id, state["conversation_id"], turn)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(remember),
+    )
+
+
+def _record(
+    metrics: StreamMetrics, conversation_id: str, stats: GenerationStats
+) -> None:
+    logger.info(
+        "Chat %s %s: ttft=%s tokens=%d (%.1f tok/s) context=%s (saved %d)",
+        conversation_id,
+        stats.outcome,
+        f"{stats.ttft_ms:.0f}ms" if stats.ttft_ms is not None else "-",
+        stats.tokens,
+        stats.tokens_per_second,
+        stats.context_tokens if stats.context_tokens is not None else "-",
+        stats.context_tokens_saved,
     )
+    try:
+        metrics.record(stats)
+    except RedisError:
+        logger.warning("Failed to record chat stream metrics", exc_info=True)
@@ -1,27 +1,42 @@
 """Document management API routes.
 
-Handles file upload, listing, and deletion.
+Handles file upload, listing, deletion, and status events.
 Processing is delegated to Celery tasks.
 """
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import uuid
+from collections.abc import AsyncIterator
+from pathlib import PurePosixPath
 from typing import Annotated
 
-from fastapi import APIRouter, File, HTTPException, UploadFile, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 
-from app.api.dependencies import CurrentUser, SupabaseClient
+from app.agent.streaming import format_sse, until_disconnected
+from app.api.dependencies import CurrentUser, Database, Storage
+from app.api.uploads import MAX_FORM_OVERHEAD_BYTES, MultipartUpload, UploadFormatError
 from app.core.config import settings
 from app.core.constants import (
     ALLOWED_MIME_TYPES,
 )
+from app.core.redis_client import get_redis
 from app.schemas.document import (
     DeleteDocumentResponse,
+    DocumentEvent,
     DocumentListResponse,
     DocumentResponse,
+    DocumentStatus,
 )
+from app.services.database import DatabaseError, SupabaseDatabase
+from app.services.document_events import DocumentEventHub, get_document_event_hub
+from app.services.retrieval import bump_kb_version, remove_from_vector_index
+from app.services.storage import FileTooLargeError, StorageError, store_upload
+from app.workers.tasks import enqueue_document
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -32,27 +47,73 @@ router = APIRouter()
     response_model=DocumentResponse,
     status_code=status.HTTP_202_ACCEPTED,
     summary="Upload a document for processing",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": ["file"],
+                        "properties": {
+                            "file": {
+                                "type": "string",
+                                "format": "binary",
+                                "description": "PDF, Markdown, or TXT file (max 50MB)",
+                            }
+                        },
+                    }
+                }
+            },
+        }
+    },
 )
 async def upload_document(
-    file: Annotated[
-        UploadFile, File(description="PDF, Markdown, or TXT file (max 50MB)")
-    ],
+    request: Request,
     current_user: CurrentUser,
-    supabase: SupabaseClient,
+    db: Database,
+    storage: Storage,
 ) -> DocumentResponse:
-    """Accept a file upload, store it in Supabase Storage, and queue processing.
+    """Stream a file upload into storage, record it, and queue processing.
+
+    The multipart body is parsed from the request stream as it arrives (see
+    ``MultipartUpload``) rather than through ``UploadFile``, which Starlette
+    only provides once the whole body has been received and spooled. The
+    file is forwarded to storage in fixed-size chunks, so memory per request
+    stays bounded, and an oversized file is rejected with 413 as soon as it
+    crosses the limit: before any of the body is read when Content-Length
+    already exceeds it, otherwise mid-stream.
 
     Args:
-        file: The uploaded file.
+        request: The incoming request carrying the ``file`` form field.
         current_user: Authenticated user from JWT.
-        supabase: Supabase client.
+        db: Async database client.
+        storage: Document storage backend.
 
     Returns:
         DocumentResponse with status=PENDING.
 
     Raises:
-        HTTPException: 415 for unsupported type; 413 for oversized file.
+        HTTPException: 422 for a body without a file; 415 for unsupported
+            type; 413 for oversized file; 502 if the storage backend fails.
     """
+    max_bytes = settings.MAX_FILE_SIZE_MB * 1024 * 1024
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File exceeds {settings.MAX_FILE_SIZE_MB}MB limit.",
+    )
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > max_bytes + MAX_FORM_OVERHEAD_BYTES:
+        raise too_large
+
+    file = MultipartUpload(request)
+    try:
+        await file.open()
+    except UploadFormatError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)
+        ) from exc
+
     # Validate MIME type
     if file.content_type not in ALLOWED_MIME_TYPES:
         raise HTTPException(
@@ -60,31 +121,81 @@ async def upload_document(
             detail=f"Unsupported file type: {file.content_type}. Allowed: PDF, Markdown, TXT.",
         )
 
-    # Validate file size
-    contents = await file.read()
-    size_mb = len(contents) / (1024 * 1024)
-    if size_mb > settings.MAX_FILE_SIZE_MB:
-        raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"File exceeds {settings.MAX_FILE_SIZE_MB}MB limit.",
-        )
-
     document_id = str(uuid.uuid4())
+    filename = _sanitize_filename(file.filename)
+    storage_path = f"{current_user['id']}/{document_id}/{filename}"
+
+    try:
+        stored = await store_upload(
+            storage,
+            file,
+            storage_path,
+            max_bytes=max_bytes,
+        )
+    except FileTooLargeError as exc:
+        raise too_large from exc
+    except UploadFormatError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)
+        ) from exc
+    except StorageError as exc:
+        logger.error("Storage upload failed: doc_id=%s | %s", document_id, exc)
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="Could not store the uploaded file.",
+        ) from exc
 
-    # TODO(#3): Store file in Supabase Storage and dispatch Celery task
-    # For now, return a stub PENDING response so the API layer is wired.
-    # We would use a storage path like {current_user['id']}/{document_id}/{file.filename}
     logger.info(
-        "Document upload received: user=%s doc_id=%s file=%s",
+        "Document upload received: user=%s doc_id=%s file=%s bytes=%d",
         current_user["id"],
         document_id,
-        file.filename,
+        filename,
+        stored.size_bytes,
     )
 
-    raise HTTPException(
-        status_code=status.HTTP_501_NOT_IMPLEMENTED,
-        detail="Document processing pipeline not yet implemented (Issue #3).",
+    try:
+        row = await db.insert_document(
+            {
+                "id": document_id,
+                "user_id": current_user["id"],
+                "filename": filename,
+                "storage_path": stored.path,
+                "content_hash": stored.sha256,
+                "size_bytes": stored.size_bytes,
+                "mime_type": file.content_type,
+                "status": DocumentStatus.PENDING,
+            }
+        )
+    except DatabaseError as exc:
+        logger.error("Document insert failed: doc_id=%s | %s", document_id, exc)
+        try:
+            await storage.delete(stored.path)
+        except StorageError as cleanup_exc:
+            logger.warning(
+                "Storage cleanup failed: doc_id=%s | %s", document_id, cleanup_exc
+            )
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="Could not record the uploaded document.",
+        ) from exc
+
+    await run_in_threadpool(
+        enqueue_document,
+        document_id,
+        current_user["id"],
+        stored.path,
+        stored.sha256,
+        file.content_type,
+        stored.size_bytes,
     )
+    return DocumentResponse.model_validate(row)
+
+
+def _sanitize_filename(filename: str | None) -> str:
+    """Strip directory components and control characters from a client filename."""
+    name = PurePosixPath((filename or "").replace("\\", "/")).name
+    name = "".join(ch for ch in name if ch.isprintable()).strip()
+    return name or "upload"
 
 
 @router.get(
@@ -94,7 +205,7 @@ async def upload_document(
 )
 async def list_documents(
     current_user: CurrentUser,
-    supabase: SupabaseClient,
+    db: Database,
 ) -> DocumentListResponse:
     """Return all documents owned by the authenticated user.
 
@@ -106,6 +217,80 @@ async def list_documents(
     )
 
 
+@router.get(
+    "/events",
+    summary="Stream status and progress of the user's documents",
+    response_description="Server-Sent Events stream of document events",
+)
+async def document_events(
+    http_request: Request,
+    current_user: CurrentUser,
+    db: Database,
+    hub: Annotated[DocumentEventHub, Depends(get_document_event_hub)],
+) -> StreamingResponse:
+    """Push document status changes to the client instead of having it poll.
+
+    Events: ``status`` on every transition of one of the user's documents
+    (with ``error_message`` when it FAILED), and ``progress`` with the
+    pages extracted and chunks embedded so far while it is PROCESSING. On
+    connect, and whenever events may have been missed, the current status
+    of every document of the user is sent as ``status`` events. A comment
+    line is sent every ``DOCUMENT_EVENTS_KEEPALIVE_SECONDS`` while idle.
+    """
+    user_id = current_user["id"]
+
+    async def events() -> AsyncIterator[str]:
+        async with hub.subscribe(user_id) as queue:
+            async for message in until_disconnected(
+                _relay(queue, db, user_id), http_request.is_disconnected
+            ):
+                yield message
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _relay(
+    queue: asyncio.Queue[DocumentEvent | None], db: SupabaseDatabase, user_id: str
+) -> AsyncIterator[str]:
+    """Format queued events as SSE; ``None`` sends every current status."""
+    while True:
+        try:
+            event = await asyncio.wait_for(
+                queue.get(), settings.DOCUMENT_EVENTS_KEEPALIVE_SECONDS
+            )
+        except TimeoutError:
+            yield ": keepalive\n\n"
+            continue
+        if event is not None:
+            yield _format_event(event)
+            continue
+        try:
+            rows = await db.document_statuses(user_id)
+        except DatabaseError as exc:
+            logger.warning("Status snapshot failed: user=%s | %s", user_id, exc)
+            continue
+        for row in rows:
+            yield _format_event(
+                DocumentEvent(
+                    document_id=row["id"],
+                    user_id=user_id,
+                    status=row["status"],
+                    error_message=row.get("error_message"),
+                )
+            )
+
+
+def _format_event(event: DocumentEvent) -> str:
+    return format_sse(
+        event.event,
+        event.model_dump(mode="json", exclude={"event", "user_id"}, exclude_none=True),
+    )
+
+
 @router.delete(
     "/{document_id}",
     response_model=DeleteDocumentResponse,
@@ -114,13 +299,48 @@ async def list_documents(
 async def delete_document(
     document_id: str,
     current_user: CurrentUser,
-    supabase: SupabaseClient,
+    db: Database,
+    storage: Storage,
 ) -> DeleteDocumentResponse:
     """Delete a document from Storage, DB, and vector store.
 
-    # TODO(#6): Implement deletion across Supabase Storage, documents table, and vectors.
+    Args:
+        document_id: UUID of the document to delete.
+        current_user: Authenticated user from JWT.
+        db: Async database client.
+        storage: Document storage backend.
+
+    Returns:
+        DeleteDocumentResponse echoing the deleted ID.
+
+    Raises:
+        HTTPException: 404 if the user owns no such document; 502 if the
+            database is unavailable.
     """
-    raise HTTPException(
-        status_code=status.HTTP_501_NOT_IMPLEMENTED,
-        detail="Document deletion not yet implemented (Issue #6).",
-    )
+    user_id = current_user["id"]
+    try:
+        document = await db.get_document(document_id, user_id, "id,storage_path")
+        if document is not None:
+            # Chunks and row go together: no searchable chunks are orphaned.
+            await db.delete_documents(user_id, [document_id])
+    except DatabaseError as exc:
+        logger.error("Document delete failed: doc_id=%s | %s", document_id, exc)
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="Could not delete the document.",
+        ) from exc
+    if document is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Document not found."
+        )
+
+    try:
+        await storage.delete(document["storage_path"])
+    except StorageError as exc:
+        # The rows are gone; an orphaned object only costs storage space.
+        logger.warning("Storage delete failed: doc_id=%s | %s", document_id, exc)
+
+    await run_in_threadpool(remove_from_vector_index, user_id, document_id)
+    await run_in_threadpool(bump_kb_version, get_redis(), user_id)
+    logger.info("Document deleted: user=%s doc_id=%s", user_id, document_id)
+    return DeleteDocumentResponse(id=document_id)
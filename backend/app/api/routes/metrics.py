@@ -0,0 +1,44 @@
+"""Operational metrics endpoint (cache hit rates, pipeline savings)."""
+
+from __future__ import annotations
+
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
+
+from app.agent.streaming import StreamMetrics, get_stream_metrics
+from app.api.dependencies import CurrentUser
+from app.schemas.metrics import MetricsResponse
+from app.services.answer_cache import AnswerCache, get_answer_cache
+from app.services.dedup import DedupService, get_dedup_service
+from app.services.embedding import EmbeddingService, get_embedding_service
+from app.services.index_versions import IndexVersions, get_index_versions
+from app.workers.scheduling import IngestScheduler, get_ingest_scheduler
+
+router = APIRouter()
+
+
+@router.get("", response_model=MetricsResponse, summary="Backend metrics snapshot")
+async def get_metrics(
+    current_user: CurrentUser,
+    dedup: Annotated[DedupService, Depends(get_dedup_service)],
+    embeddings: Annotated[EmbeddingService, Depends(get_embedding_service)],
+    chat: Annotated[StreamMetrics, Depends(get_stream_metrics)],
+    answers: Annotated[AnswerCache | None, Depends(get_answer_cache)],
+    ingest: Annotated[IngestScheduler, Depends(get_ingest_scheduler)],
+    index: Annotated[IndexVersions, Depends(get_index_versions)],
+) -> MetricsResponse:
+    """Return current cache, ingestion queue, index and chat streaming metrics.
+
+    Embedding and answer cache counters are per API process; dedup, queue
+    and chat counters are shared.
+    """
+    return MetricsResponse(
+        dedup=await run_in_threadpool(dedup.stats),
+        embedding_cache=embeddings.cache.stats() if embeddings.cache else None,
+        chat=await run_in_threadpool(chat.stats),
+        answer_cache=answers.stats() if answers else None,
+        ingest=await run_in_threadpool(ingest.stats),
+        index=await run_in_threadpool(index.stats),
+    )
@@ -0,0 +1,148 @@
+"""Streaming reader for multipart document uploads.
+
+FastAPI hands an ``UploadFile`` to an endpoint only after Starlette has
+received the whole multipart body and spooled it to a temporary file, so a
+size limit checked in the endpoint rejects an oversized upload only once it
+has been received in full. ``MultipartUpload`` parses the request stream
+itself instead: the file field is read as its bytes arrive from the client,
+and the endpoint can stop reading (and answer 413) as soon as the limit is
+crossed.
+"""
+
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+
+from fastapi import Request
+from python_multipart.exceptions import ParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+MAX_FORM_OVERHEAD_BYTES = 64 * 1024  # Boundaries, part headers, other fields
+
+
+class UploadFormatError(Exception):
+    """Raised when the body is not multipart or has no file in the field."""
+
+
+class MultipartUpload:
+    """The file in one field of a ``multipart/form-data`` request body.
+
+    Call ``open`` to read up to the file's part headers (``filename`` and
+    ``content_type`` are then set), then ``read`` it like ``UploadFile``.
+    Only bytes already received and not yet read are held in memory; the
+    rest of the body after the file is never read.
+
+    Args:
+        request: The incoming request; its body must not have been read.
+        field: Name of the form field holding the file.
+    """
+
+    def __init__(self, request: Request, field: str = "file") -> None:
+        self.filename: str | None = None
+        self.content_type: str | None = None
+        self.size: int | None = None  # Unknown until fully read
+        self._request = request
+        self._field = field.encode()
+        self._chunks: AsyncIterator[bytes] | None = None
+        self._parser: MultipartParser | None = None
+        self._buffer = bytearray()
+        self._headers: dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._in_file = False
+        self._found = False
+        self._file_done = False
+        self._ended = False
+
+    async def open(self) -> None:
+        """Read the body up to the start of the file's content.
+
+        Raises:
+            UploadFormatError: If the body is not multipart form data or
+                ends without a file in the field.
+        """
+        media_type, options = parse_options_header(
+            self._request.headers.get("content-type", "")
+        )
+        boundary = options.get(b"boundary")
+        if media_type != b"multipart/form-data" or not boundary:
+            raise UploadFormatError("Expected a multipart/form-data body.")
+        self._parser = MultipartParser(
+            boundary,
+            {
+                "on_part_begin": self._on_part_begin,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+                "on_end": self._on_end,
+            },
+        )
+        self._chunks = aiter(self._request.stream())
+        while not self._found:
+            if not await self._feed():
+                raise UploadFormatError(
+                    f"No file in the '{self._field.decode()}' field."
+                )
+
+    async def read(self, size: int = -1) -> bytes:
+        """Return up to ``size`` bytes of the file (all if negative); b"" at end."""
+        while (size < 0 or len(self._buffer) < size) and not self._file_done:
+            if not await self._feed():
+                raise UploadFormatError("The upload ended before the file did.")
+        end = len(self._buffer) if size < 0 else min(size, len(self._buffer))
+        data = bytes(self._buffer[:end])
+        del self._buffer[:end]
+        return data
+
+    async def _feed(self) -> bool:
+        """Parse the next received chunk; False once the body is exhausted."""
+        if self._ended:
+            return False
+        chunk = await anext(self._chunks, b"")
+        if not chunk:
+            return False
+        try:
+            self._parser.write(chunk)
+        except ParseError as exc:
+            raise UploadFormatError(f"Malformed multipart body: {exc}") from exc
+        return True
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition"))
+        if self._found or options.get(b"name") != self._field:
+            return
+        filename = options.get(b"filename")
+        if filename is None:  # A plain form value, not a file
+            return
+        self._in_file = self._found = True
+        self.filename = filename.decode("utf-8", "replace")
+        content_type = self._headers.get(b"content-type", b"").decode("latin-1")
+        self.content_type = content_type.strip() or None
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self._buffer += data[start:end]
+
+    def _on_part_end(self) -> None:
+        if self._in_file:
+            self._in_file = False
+            self._file_done = True
+
+    def _on_end(self) -> None:
+        self._ended = True
@@ -31,6 +31,21 @@ class Settings(BaseSettings):
     SUPABASE_URL: str
     SUPABASE_ANON_KEY: str
     SUPABASE_SERVICE_KEY: str  # Never expose to frontend
+    SUPABASE_JWT_SECRET: str = ""  # Legacy HS256 secret; "" = JWKS keys only
+    SUPABASE_JWT_AUDIENCE: str = "authenticated"
+    AUTH_JWKS_TTL_SECONDS: int = 600
+    AUTH_TOKEN_CACHE_TTL_SECONDS: int = 60  # Verified tokens reused per process
+    AUTH_TOKEN_CACHE_SIZE: int = 10_000
+    SUPABASE_HTTP_MAX_CONNECTIONS: int = 10  # Per API (PostgREST, Storage) per process
+    SUPABASE_HTTP_MAX_KEEPALIVE: int = 10  # Idle connections kept; below max churns
+    SUPABASE_HTTP_KEEPALIVE_SECONDS: float = 30.0
+    DATABASE_TIMEOUT_SECONDS: float = 10.0
+    DATABASE_BULK_ROWS: int = 500  # Rows per PostgREST bulk insert request
+
+    # ── Storage ──────────────────────────────────────────────────────────────
+    STORAGE_BACKEND: str = "supabase"  # supabase | local
+    LOCAL_STORAGE_DIR: str = "/tmp/docmind-storage"  # Used when backend=local
+    STORAGE_TIMEOUT_SECONDS: float = 60.0
 
     # ── Redis ─────────────────────────────────────────────────────────────────
     REDIS_URL: str = "redis://localhost:6379/0"
@@ -46,22 +61,91 @@ class Settings(BaseSettings):
     # ── AI Provider ───────────────────────────────────────────────────────────
     LLM_PROVIDER: str = "gemini"  # gemini | openai | qwen
     LLM_MODEL: str = "gemini-2.5-flash"
-    EMBEDDING_PROVIDER: str = "gemini"  # gemini | openai | qwen
+    EMBEDDING_PROVIDER: str = "gemini"  # gemini | openai | qwen | fake
     EMBEDDING_MODEL: str = "gemini-embedding-001"
+    EMBEDDING_MAX_CONCURRENCY: int = 4  # Upper bound; shrinks on HTTP 429
+    EMBEDDING_MAX_RETRIES: int = 6
+    EMBEDDING_CACHE_MAX_MB: int = 64  # In-process LRU tier; 0 disables caching
+    EMBEDDING_CACHE_TTL_SECONDS: int = 7 * 24 * 3600  # Redis tier
 
     GOOGLE_API_KEY: str = ""
     OPENAI_API_KEY: str = ""
     QWEN_API_KEY: str = ""
+    QWEN_BASE_URL: str = "https://dashscope-intl.aliyuncs.com/compatible-mode/v1"
 
     # ── Document Processing ───────────────────────────────────────────────────
     MAX_FILE_SIZE_MB: int = 50
     CHUNK_SIZE_TOKENS: int = 512
     CHUNK_OVERLAP_TOKENS: int = 64
+    CHUNK_TOKENIZER: str = "regex"  # regex, or a tiktoken encoding (cl100k_base)
+    INGEST_BATCH_CHUNKS: int = 64  # Chunks embedded and inserted per step
     TOP_K_RETRIEVAL: int = 10
+    CONTEXT_TOKEN_BUDGET: int = 3000  # Retrieved text per prompt (CHUNK_TOKENIZER)
+    RETRIEVAL_INDEX_CACHE_USERS: int = 32  # In-memory KB indexes per API process
+    RETRIEVAL_VECTOR_INDEX: str = "exact"  # exact | shard | ivf
+    VECTOR_SHARD_DIR: str = "/var/lib/docmind/vector-shards"  # Shared by API + worker
+    VECTOR_SHARD_DTYPE: str = "float32"  # float32 | float16 | int8 | pq
+    VECTOR_SHARD_RERANK: int = 0  # Candidates re-scored in float32; 0 = none kept
+    ANN_NPROBE: int = 64  # IVF lists scanned per query (recall vs latency)
+    ANSWER_CACHE_MAX_ENTRIES: int = 256  # Per user and KB version; 0 disables
+    ANSWER_CACHE_THRESHOLD: float = 0.95  # Query cosine similarity to reuse
+    ANSWER_CACHE_TTL_SECONDS: int = 24 * 3600
+
+    # ── Agent ────────────────────────────────────────────────────────────────
+    INTENT_ROUTER_MIN_CONFIDENCE: float = 0.6  # Below this the LLM routes
+    AGENT_SPECULATIVE_SEARCH: bool = False  # Web search in parallel with KB
+    AGENT_SPECULATIVE_MAX_CONFIDENCE: float = 0.8  # Fan out below this route confidence
+    AGENT_BRANCH_TIMEOUT_SECONDS: float = 8.0  # Per speculative branch
+    CONVERSATION_WINDOW_TURNS: int = 6  # Recent turns replayed verbatim
+    CONVERSATION_SUMMARY_BATCH: int = 4  # Overflowing turns per summary update
+    CONVERSATION_TTL_SECONDS: int = 7 * 24 * 3600
+
+    # ── Web Search ────────────────────────────────────────────────────────────
+    WEB_SEARCH_PROVIDER: str = "stub"  # brave | stub (no results)
+    WEB_SEARCH_API_KEY: str = ""
+    WEB_SEARCH_RESULTS: int = 5  # Hits per query; each page is fetched
+    WEB_SEARCH_TIMEOUT_SECONDS: float = 3.0  # Search API call
+    WEB_FETCH_TIMEOUT_SECONDS: float = 4.0  # Per page, host queueing included
+    WEB_FETCH_PER_HOST: int = 2  # Concurrent page fetches per host
+    WEB_FETCH_MAX_CONNECTIONS: int = 32  # Pooled connections per API process
+    WEB_FETCH_MAX_BYTES: int = 2 * 1024 * 1024  # Downloaded per page
+    WEB_PAGE_MAX_CHARS: int = 4000  # Extracted text per page in the prompt
+    WEB_SEARCH_CACHE_TTL_SECONDS: int = 3600  # Hits per normalized query
+    WEB_PAGE_CACHE_TTL_SECONDS: int = 24 * 3600  # Extracted text per URL
+
+    # ── Code Sandbox ──────────────────────────────────────────────────────────
+    SANDBOX_POOL_SIZE: int = 2  # Warm worker processes per API process
+    SANDBOX_MAX_RUNS: int = 100  # Runs before a worker is replaced
+    SANDBOX_PREWARM: bool = True  # Start the workers with the API
+    SANDBOX_TIMEOUT_SECONDS: float = 5.0  # Wall clock per run
+    SANDBOX_QUEUE_TIMEOUT_SECONDS: float = 10.0  # Wait for a free worker
+    SANDBOX_CPU_SECONDS: int = 3
+    SANDBOX_MEMORY_MB: int = 512  # Address space per run
+    SANDBOX_FILE_BYTES: int = 1024 * 1024  # Largest file a run may write
+    SANDBOX_MAX_OUTPUT_BYTES: int = 16 * 1024  # stdout/stderr kept per run
 
     # ── Celery Task Retry ─────────────────────────────────────────────────────
     CELERY_TASK_MAX_RETRIES: int = 3
     CELERY_TASK_RETRY_DELAY_SECONDS: int = 60
 
+    # ── Ingestion Scheduling ──────────────────────────────────────────────────
+    INGEST_SMALL_FILE_MB: float = 1.0  # Text/Markdown up to this use small queue
+    INGEST_MAX_PER_USER: int = 3  # Documents of one user processed at once
+    INGEST_DEFER_SECONDS: int = 5  # Requeue delay for a user at the cap
+    INGEST_SLOT_LEASE_SECONDS: int = 1800  # Frees slots of crashed workers
+    INGEST_SHARD_PAGES: int = 50  # Pages per parallel range task; 0 disables
+    INGEST_SHARD_MIN_MB: float = 2.0  # Smaller PDFs are never split
+
+    # ── Re-embedding ──────────────────────────────────────────────────────────
+    REINDEX_AUTO_START: bool = True  # Workers start a migration on config change
+    REINDEX_RATE_LIMIT: str = "30/m"  # Documents re-embedded per worker process
+    REINDEX_SWEEP_SECONDS: int = 60  # Between progress checks of a migration
+    REINDEX_CLAIM_SECONDS: int = 3600  # Before a lost re-embed task is resent
+    REINDEX_RETIRE_DELAY_SECONDS: int = 600  # Old rows kept after a cut-over
+
+    # ── Document Events ───────────────────────────────────────────────────────
+    DOCUMENT_EVENTS_BUFFER: int = 256  # Events queued per SSE client before resync
+    DOCUMENT_EVENTS_KEEPALIVE_SECONDS: float = 15.0  # Comment lines keep proxies open
+
 
 settings = Settings()  # type: ignore[call-arg]
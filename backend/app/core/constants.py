@@ -24,7 +24,11 @@ ALLOWED_MIME_TYPES: frozenset[str] = frozenset(
 
 # ── Supabase Storage ──────────────────────────────────────────────────────────
 SUPABASE_DOCUMENTS_BUCKET = "documents"
+UPLOAD_CHUNK_SIZE_BYTES = 256 * 1024  # 256 KiB read/hash/stream granularity
 
 # ── Vector Search ─────────────────────────────────────────────────────────────
 EMBEDDING_DIMENSION = 768  # gemini-embedding-001 output dimension
 VECTOR_SIMILARITY_THRESHOLD = 0.7
+BM25_K1 = 1.2  # Term-frequency saturation
+BM25_B = 0.75  # Document-length normalization
+RRF_K = 60  # Reciprocal-rank fusion damping constant
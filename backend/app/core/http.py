@@ -0,0 +1,40 @@
+"""Pooled async HTTP clients for Supabase REST APIs.
+
+One client per service per process keeps connections alive between
+requests, so each call skips the TCP and TLS handshakes, and bounds how
+many requests a process has in flight against Supabase at once.
+"""
+
+from __future__ import annotations
+
+import httpx
+
+from app.core.config import settings
+
+
+def build_supabase_client(
+    base_url: str,
+    service_key: str,
+    timeout: float,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> httpx.AsyncClient:
+    """Create an authenticated, pooled client for one Supabase API.
+
+    Args:
+        base_url: API root, e.g. ``{SUPABASE_URL}/rest/v1``.
+        service_key: Service role key, sent as both bearer token and apikey.
+        timeout: Seconds allowed per request (connect, read, write, pool).
+        transport: Replaces the network transport (tests); pool limits
+            then do not apply.
+    """
+    return httpx.AsyncClient(
+        base_url=base_url,
+        headers={"Authorization": f"Bearer {service_key}", "apikey": service_key},
+        timeout=timeout,
+        limits=httpx.Limits(
+            max_connections=settings.SUPABASE_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SUPABASE_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.SUPABASE_HTTP_KEEPALIVE_SECONDS,
+        ),
+        transport=transport,
+    )
@@ -0,0 +1,60 @@
+"""Lightweight named counters for cache and pipeline metrics.
+
+Counters that must be visible across processes (e.g. incremented by Celery
+workers and read by the API) live in a Redis hash; ``InMemoryCounters`` has
+the same interface for tests and single-process use.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from typing import Protocol
+
+import redis
+
+METRICS_KEY_PREFIX = "docmind:metrics:"
+
+
+class Counters(Protocol):
+    """A namespace of monotonically increasing integer counters."""
+
+    def incr(self, field: str, amount: int = 1) -> None: ...
+
+    def snapshot(self) -> dict[str, int]: ...
+
+
+class InMemoryCounters:
+    """Process-local counters."""
+
+    def __init__(self) -> None:
+        self._counts: Counter[str] = Counter()
+
+    def incr(self, field: str, amount: int = 1) -> None:
+        self._counts[field] += amount
+
+    def snapshot(self) -> dict[str, int]:
+        return dict(self._counts)
+
+
+class RedisCounters:
+    """Counters stored as fields of one Redis hash, shared by all processes."""
+
+    def __init__(self, client: redis.Redis, namespace: str) -> None:
+        self._client = client
+        self._key = f"{METRICS_KEY_PREFIX}{namespace}"
+
+    def incr(self, field: str, amount: int = 1) -> None:
+        self._client.hincrby(self._key, field, amount)
+
+    def snapshot(self) -> dict[str, int]:
+        raw = self._client.hgetall(self._key)
+        return {_decode(k): int(v) for k, v in raw.items()}
+
+
+def ratio(numerator: int, denominator: int) -> float:
+    """Safe division for hit-rate style metrics (0.0 when nothing was counted)."""
+    return numerator / denominator if denominator else 0.0
+
+
+def _decode(value: bytes | str) -> str:
+    return value.decode() if isinstance(value, bytes) else value
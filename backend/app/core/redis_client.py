@@ -0,0 +1,50 @@
+"""Shared Redis client factories.
+
+One connection pool per process (per event loop for asyncio clients);
+callers should not create their own.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import weakref
+from functools import lru_cache
+
+import redis
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+
+
+@lru_cache(maxsize=1)
+def get_redis() -> redis.Redis:
+    """Return the process-wide synchronous Redis client (Celery workers)."""
+    return redis.Redis.from_url(settings.REDIS_URL)
+
+
+_async_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aioredis.Redis] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_async_redis() -> aioredis.Redis:
+    """Return the asyncio Redis client for the running event loop.
+
+    Connection pools are bound to the loop that created them, and Celery
+    tasks each run their own ``asyncio.run``, so clients are kept per loop;
+    call ``close_async_redis`` before the loop ends to release the
+    connections.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = aioredis.Redis.from_url(settings.REDIS_URL)
+        _async_clients[loop] = client
+    return client
+
+
+async def close_async_redis() -> None:
+    """Close the running loop's asyncio Redis client, if it has one."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
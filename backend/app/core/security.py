@@ -1,49 +1,230 @@
 """Supabase JWT validation utilities.
 
 All protected endpoints must pass through get_current_user().
+
+Access tokens are verified locally: their signature against the project's
+JWT secret (HS256) or its published signing keys (JWKS, fetched at most once
+per ``jwks_ttl_seconds`` or when a token names an unknown key), then their
+expiry, audience and issuer. Verified tokens are cached for a short TTL.
+Supabase Auth is only called, off the event loop, when a token cannot be
+verified locally (no secret configured, or the JWKS endpoint is down).
+
+Like any local JWT check, a signed-out session stays valid until its access
+token expires (one hour by default in Supabase).
 """
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import logging
+import time
+from collections import OrderedDict
+from functools import lru_cache
 
+import httpx
+import jwt
 from fastapi import HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from starlette.concurrency import run_in_threadpool
 from supabase import Client
 
+from app.core.config import settings
+
 logger = logging.getLogger(__name__)
 
 bearer_scheme = HTTPBearer()
 
+JWKS_PATH = "/auth/v1/.well-known/jwks.json"
+JWKS_MIN_REFRESH_SECONDS = 30  # Unknown key IDs cannot force more fetches
+ASYMMETRIC_ALGORITHMS = ("RS256", "ES256", "EdDSA")
+
+
+class TokenVerifier:
+    """Local verification of Supabase access tokens with a verified-token LRU.
+
+    Args:
+        jwt_secret: Legacy shared secret of HS256 tokens ("" to not accept).
+        issuer: Expected ``iss`` claim (the project's Auth URL).
+        jwks_url: Endpoint of the project's public signing keys.
+        audience: Expected ``aud`` claim.
+        jwks_ttl_seconds: How long fetched signing keys are trusted.
+        cache_ttl_seconds: How long a verified token is reused (never past
+            its expiry).
+        cache_size: Maximum number of verified tokens kept.
+    """
+
+    def __init__(
+        self,
+        jwt_secret: str,
+        issuer: str,
+        jwks_url: str,
+        audience: str = "authenticated",
+        jwks_ttl_seconds: float = 600,
+        cache_ttl_seconds: float = 60,
+        cache_size: int = 10_000,
+    ) -> None:
+        self._secret = jwt_secret
+        self._issuer = issuer
+        self._jwks_url = jwks_url
+        self._audience = audience
+        self._jwks_ttl = jwks_ttl_seconds
+        self._cache_ttl = cache_ttl_seconds
+        self._cache_size = cache_size
+        self._keys: dict[str, jwt.PyJWK] = {}
+        self._keys_fetched_at = float("-inf")
+        self._keys_lock = asyncio.Lock()
+        self._verified: OrderedDict[bytes, tuple[dict, float]] = OrderedDict()
+
+    async def verify(self, token: str) -> dict | None:
+        """Return the user of a valid ``token``.
+
+        Returns:
+            ``{"id", "email"}``, or None if the token cannot be checked
+            locally (the caller should ask Supabase Auth).
+
+        Raises:
+            jwt.InvalidTokenError: If the token is malformed, forged,
+                expired or issued for another audience or project.
+        """
+        key = hashlib.sha256(token.encode()).digest()
+        now = time.monotonic()
+        cached = self._verified.get(key)
+        if cached is not None and cached[1] > now:
+            self._verified.move_to_end(key)
+            return cached[0]
+
+        header = jwt.get_unverified_header(token)
+        algorithm = header.get("alg")
+        if algorithm == "HS256":
+            if not self._secret:
+                return None
+            signing_key: object = self._secret
+        elif algorithm in ASYMMETRIC_ALGORITHMS:
+            jwk = await self._signing_key(header.get("kid", ""))
+            if jwk is None:
+                return None
+            signing_key = jwk.key
+        else:
+            raise jwt.InvalidAlgorithmError(f"Unsupported algorithm: {algorithm}")
+
+        claims = jwt.decode(
+            token,
+            signing_key,
+            algorithms=[algorithm],
+            audience=self._audience,
+            issuer=self._issuer,
+            options={"require": ["exp", "sub"]},
+        )
+        user = {"id": claims["sub"], "email": claims.get("email")}
+        self.remember(token, user, claims["exp"] - time.time())
+        return user
+
+    def remember(self, token: str, user: dict, ttl_seconds: float) -> None:
+        """Cache a verified ``user`` for at most ``cache_ttl_seconds``."""
+        ttl = min(self._cache_ttl, ttl_seconds)
+        if ttl <= 0 or self._cache_size <= 0:
+            return
+        key = hashlib.sha256(token.encode()).digest()
+        self._verified[key] = (user, time.monotonic() + ttl)
+        self._verified.move_to_end(key)
+        while len(self._verified) > self._cache_size:
+            self._verified.popitem(last=False)
+
+    async def _signing_key(self, kid: str) -> jwt.PyJWK | None:
+        age = time.monotonic() - self._keys_fetched_at
+        if kid in self._keys and age < self._jwks_ttl:
+            return self._keys[kid]
+        async with self._keys_lock:
+            age = time.monotonic() - self._keys_fetched_at
+            if age >= self._jwks_ttl or (
+                kid not in self._keys and age >= JWKS_MIN_REFRESH_SECONDS
+            ):
+                await self._refresh_keys()
+        return self._keys.get(kid)
+
+    async def _refresh_keys(self) -> None:
+        try:
+            keys = jwt.PyJWKSet.from_dict(await self._fetch_jwks()).keys
+        except (httpx.HTTPError, jwt.PyJWTError, ValueError) as exc:
+            # Keep the previous keys; retry after JWKS_MIN_REFRESH_SECONDS.
+            logger.warning("JWKS refresh failed: %s", exc)
+            self._keys_fetched_at = (
+                time.monotonic() - self._jwks_ttl + JWKS_MIN_REFRESH_SECONDS
+            )
+            return
+        self._keys = {key.key_id: key for key in keys if key.key_id}
+        self._keys_fetched_at = time.monotonic()
+
+    async def _fetch_jwks(self) -> dict:
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            response = await client.get(self._jwks_url)
+            response.raise_for_status()
+        return response.json()
+
+
+@lru_cache(maxsize=1)
+def get_token_verifier() -> TokenVerifier:
+    """Return the process-wide verifier for the configured Supabase project."""
+    base_url = settings.SUPABASE_URL.rstrip("/")
+    return TokenVerifier(
+        settings.SUPABASE_JWT_SECRET,
+        issuer=f"{base_url}/auth/v1",
+        jwks_url=f"{base_url}{JWKS_PATH}",
+        audience=settings.SUPABASE_JWT_AUDIENCE,
+        jwks_ttl_seconds=settings.AUTH_JWKS_TTL_SECONDS,
+        cache_ttl_seconds=settings.AUTH_TOKEN_CACHE_TTL_SECONDS,
+        cache_size=settings.AUTH_TOKEN_CACHE_SIZE,
+    )
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials,
     supabase: Client,
+    verifier: TokenVerifier,
 ) -> dict:
     """Validate the Supabase JWT and return the authenticated user payload.
 
     Args:
         credentials: Bearer token from the Authorization header.
-        supabase: Supabase client instance.
+        supabase: Supabase client instance (fallback verification).
+        verifier: Local token verifier.
 
     Returns:
-        The authenticated user dict from Supabase.
+        The authenticated user dict (``id`` and ``email``).
 
     Raises:
         HTTPException: 401 if the token is invalid or expired.
     """
     token = credentials.credentials
     try:
-        response = supabase.auth.get_user(token)
+        user = await verifier.verify(token)
+    except jwt.InvalidTokenError as exc:
+        logger.warning("JWT validation failed: %s", exc)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials.",
+        ) from exc
+    if user is not None:
+        return user
+
+    try:
+        response = await run_in_threadpool(supabase.auth.get_user, token)
         if response.user is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid or expired token.",
             )
-        return {"id": response.user.id, "email": response.user.email}
+    except HTTPException:
+        raise
     except Exception as exc:
         logger.warning("JWT validation failed: %s", exc)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials.",
         ) from exc
+    user = {"id": response.user.id, "email": response.user.email}
+    expires_at = jwt.decode(token, options={"verify_signature": False}).get("exp")
+    if expires_at is not None:
+        verifier.remember(token, user, expires_at - time.time())
+    return user
@@ -0,0 +1,22 @@
+"""Shared Supabase client factory.
+
+Lives in ``app.core`` so services and Celery tasks can use the client
+without importing the API layer.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+
+from supabase import Client, create_client
+
+from app.core.config import settings
+
+
+@lru_cache(maxsize=1)
+def get_supabase_client() -> Client:
+    """Return a cached Supabase client using the service role key.
+
+    The service role key bypasses RLS — only use on the backend.
+    """
+    return create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
@@ -8,8 +8,11 @@ import logging.config
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api.routes import chat, documents, health
+from app.api.routes import chat, documents, health, metrics
 from app.core.config import settings
+from app.core.redis_client import close_async_redis
+from app.services.sandbox import close_sandbox_pool, get_sandbox_pool
+from app.services.web_search import close_web_search
 
 # ── Logging ───────────────────────────────────────────────────────────────────
 logging.basicConfig(
@@ -40,13 +43,19 @@ app.add_middleware(
 app.include_router(health.router)
 app.include_router(documents.router, prefix="/api/documents", tags=["documents"])
 app.include_router(chat.router, prefix="/api/chat", tags=["chat"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["metrics"])
 
 
 @app.on_event("startup")
 async def on_startup() -> None:
     logger.info("DocMind API starting up — version %s", settings.APP_VERSION)
+    if settings.SANDBOX_PREWARM:
+        await get_sandbox_pool().start()
 
 
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
     logger.info("DocMind API shutting down.")
+    await close_sandbox_pool()
+    await close_web_search()
+    await close_async_redis()
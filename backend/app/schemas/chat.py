@@ -26,6 +26,12 @@ class CitationSource(BaseModel):
     filename: str
     chunk_index: int
     excerpt: str
+    # Where the cited chunk is in its source: the span of the page's text
+    # (the end may run into the following pages). None for chunks indexed
+    # before spans were recorded.
+    page_number: int | None = None
+    char_start: int | None = None
+    char_end: int | None = None
 
 
 class ChatResponse(BaseModel):
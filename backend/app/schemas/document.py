@@ -4,6 +4,7 @@ from __future__ import annotations
 
 from datetime import datetime
 from enum import StrEnum
+from typing import Literal
 
 from pydantic import BaseModel
 
@@ -39,3 +40,20 @@ class DeleteDocumentResponse(BaseModel):
 
     id: str
     message: str = "Document deleted successfully."
+
+
+class DocumentEvent(BaseModel):
+    """Status change or processing progress of a document, pushed to its owner.
+
+    ``status`` events report a transition (PENDING → PROCESSING → READY |
+    FAILED); ``progress`` events report pages extracted and chunks embedded
+    so far while the document is PROCESSING.
+    """
+
+    event: Literal["status", "progress"] = "status"
+    document_id: str
+    user_id: str
+    status: DocumentStatus
+    pages: int | None = None
+    chunks: int | None = None
+    error_message: str | None = None
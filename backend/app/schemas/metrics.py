@@ -0,0 +1,95 @@
+"""Pydantic schemas for operational metrics payloads."""
+
+from __future__ import annotations
+
+from pydantic import BaseModel
+
+
+class DedupMetrics(BaseModel):
+    """Content-hash deduplication effectiveness for document ingestion."""
+
+    hits: int
+    misses: int
+    hit_rate: float
+    embedding_calls_saved: int
+
+
+class EmbeddingCacheMetrics(BaseModel):
+    """Embedding cache effectiveness for the serving process."""
+
+    l1_hits: int
+    l2_hits: int
+    misses: int
+    hit_rate: float
+    l1_entries: int
+    l1_bytes: int
+
+
+class AnswerCacheMetrics(BaseModel):
+    """Semantic answer cache effectiveness for the serving process."""
+
+    hits: int
+    misses: int
+    hit_rate: float
+    latency_saved_ms: int
+    mean_latency_saved_ms: float
+
+
+class ChatStreamMetrics(BaseModel):
+    """Streamed chat answers: outcomes, latency, throughput and context size.
+
+    Context means are over requests that ran KB retrieval; tokens saved are
+    those removed by chunk dedup, merging and the context token budget.
+    """
+
+    requests: int
+    completed: int
+    cached: int
+    cancelled: int
+    failed: int
+    mean_ttft_ms: float
+    tokens_per_second: float
+    mean_context_tokens: float
+    mean_context_tokens_saved: float
+
+
+class IngestQueueMetrics(BaseModel):
+    """Document processing queue: backlog, throughput and waiting times.
+
+    Waits run from upload to a worker starting the document (including
+    requeues while the owner was at the per-user cap); time to done runs
+    to READY or FAILED. Percentiles cover the most recent documents.
+    """
+
+    queue: str
+    depth: int
+    started: int
+    deferred: int
+    finished: int
+    p50_wait_ms: float
+    p95_wait_ms: float
+    p95_time_to_done_ms: float
+
+
+class IndexVersionMetrics(BaseModel):
+    """Search index version in use and re-embedding migration progress.
+
+    ``remaining`` is the number of READY documents the migration's last
+    sweep found without rows for ``target`` (None before the first sweep).
+    """
+
+    active: str
+    target: str | None = None
+    migrated: int = 0
+    remaining: int | None = None
+
+
+class MetricsResponse(BaseModel):
+    """Snapshot of backend performance metrics."""
+
+    dedup: DedupMetrics
+    embedding_cache: EmbeddingCacheMetrics | None = None
+    chat: ChatStreamMetrics | None = None
+    answer_cache: AnswerCacheMetrics | None = None
+    ingest: list[IngestQueueMetrics] | None = None
+    index: IndexVersionMetrics | None = None
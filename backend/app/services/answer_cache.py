@@ -0,0 +1,173 @@
+"""Semantic cache of generated answers.
+
+Students in one course ask near-identical questions over the same readings.
+Answers are cached per user, active index version (so answers over the rows
+of one embedding model or chunking are never served once search has cut
+over to another) and knowledge-base version (bumped whenever a document
+becomes READY or is deleted, so adding or removing a document invalidates
+every cached answer), and a new query is served from the cache when its
+embedding is within a cosine threshold of a cached query.
+
+Each bucket is two Redis keys written in one transaction:
+a string of concatenated float16 query vectors (half the bytes each lookup
+reads; ample precision for a similarity threshold), appended to, and a list
+of JSON answers in the same order. A lookup fetches only the vectors,
+scores them in NumPy and then fetches the one matching answer.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+
+import numpy as np
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.constants import EMBEDDING_DIMENSION
+from app.core.metrics import InMemoryCounters, ratio
+from app.core.redis_client import get_async_redis
+from app.schemas.metrics import AnswerCacheMetrics
+from app.services.index_versions import ACTIVE_INDEX_KEY, INITIAL_INDEX_VERSION
+from app.services.retrieval import KB_VERSION_KEY_PREFIX
+from app.services.vector_index import normalize
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_KEY_PREFIX = "docmind:answers:"
+
+
+@dataclass(frozen=True)
+class CachedAnswer:
+    """A generated answer with its citations and original latency."""
+
+    answer: str
+    sources: list[dict]
+    latency_ms: float
+
+
+class AnswerCache:
+    """Embedding-keyed answers shared by API processes through Redis.
+
+    ``namespace`` names the chat model and the embedding model of the cached
+    query vectors, so changing either never serves answers produced by
+    another; the index the answers were retrieved from is part of each
+    bucket's version.
+
+    Redis failures are logged and treated as misses; the cache never turns
+    an answerable query into an error.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        dimension: int,
+        threshold: float,
+        max_entries: int,
+        ttl_seconds: int,
+        redis_factory: Callable[[], aioredis.Redis],
+    ) -> None:
+        self.dimension = dimension
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._prefix = f"{ANSWER_CACHE_KEY_PREFIX}{namespace}@{dimension}:"
+        self._ttl = ttl_seconds
+        self._redis_factory = redis_factory
+        self._counters = InMemoryCounters()
+
+    async def lookup(
+        self, user_id: str, query: np.ndarray
+    ) -> tuple[CachedAnswer | None, str | None]:
+        """Find an answer to a query similar to ``query``.
+
+        Returns:
+            The cached answer (or None) and the index and knowledge-base
+            versions it was looked up under, to pass to ``store``; the
+            version is None if Redis is unavailable.
+        """
+        try:
+            redis = self._redis_factory()
+            index_version, kb_version = await redis.mget(
+                ACTIVE_INDEX_KEY, KB_VERSION_KEY_PREFIX + user_id
+            )
+            active = index_version.decode() if index_version else INITIAL_INDEX_VERSION
+            version = f"{active}:{int(kb_version or 0)}"
+            vectors_key, entries_key = self._keys(user_id, version)
+            blob = await redis.get(vectors_key)
+            answer = None
+            if blob and len(blob) % (self.dimension * 2) == 0:
+                vectors = np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+                scores = vectors.reshape(-1, self.dimension) @ normalize(query)
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    raw = await redis.lindex(entries_key, best)
+                    answer = CachedAnswer(**json.loads(raw)) if raw else None
+        except RedisError as exc:
+            logger.warning("Answer cache read failed: %s", exc)
+            self._counters.incr("misses")
+            return None, None
+        self._counters.incr("hits" if answer else "misses")
+        return answer, version
+
+    async def store(
+        self, user_id: str, version: str, query: np.ndarray, answer: CachedAnswer
+    ) -> None:
+        """Cache ``answer`` for ``query`` under the version it was generated at.
+
+        Buckets stop growing at ``max_entries``; they expire ``ttl_seconds``
+        after their last write.
+        """
+        vectors_key, entries_key = self._keys(user_id, version)
+        vector = normalize(query).astype(np.float16)
+        try:
+            redis = self._redis_factory()
+            if await redis.llen(entries_key) >= self.max_entries:
+                return
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.append(vectors_key, vector.tobytes())
+                pipe.rpush(entries_key, json.dumps(asdict(answer)))
+                pipe.expire(vectors_key, self._ttl)
+                pipe.expire(entries_key, self._ttl)
+                await pipe.execute()
+        except RedisError as exc:
+            logger.warning("Answer cache write failed: %s", exc)
+
+    def record_saved(self, latency_ms: float) -> None:
+        """Count the latency a cache hit saved over generating the answer."""
+        self._counters.incr("latency_saved_ms", max(round(latency_ms), 0))
+
+    def stats(self) -> AnswerCacheMetrics:
+        """Hit/miss counters and latency saved for this process."""
+        counts = self._counters.snapshot()
+        hits, misses = counts.get("hits", 0), counts.get("misses", 0)
+        saved = counts.get("latency_saved_ms", 0)
+        return AnswerCacheMetrics(
+            hits=hits,
+            misses=misses,
+            hit_rate=ratio(hits, hits + misses),
+            latency_saved_ms=saved,
+            mean_latency_saved_ms=ratio(saved, hits),
+        )
+
+    def _keys(self, user_id: str, version: str) -> tuple[str, str]:
+        bucket = f"{self._prefix}{user_id}:{version}"
+        return f"{bucket}:vectors", f"{bucket}:entries"
+
+
+@lru_cache(maxsize=1)
+def get_answer_cache() -> AnswerCache | None:
+    """Return the process-wide answer cache, or None when it is disabled."""
+    if settings.ANSWER_CACHE_MAX_ENTRIES <= 0:
+        return None
+    return AnswerCache(
+        f"{settings.LLM_MODEL}/{settings.EMBEDDING_MODEL}",
+        EMBEDDING_DIMENSION,
+        threshold=settings.ANSWER_CACHE_THRESHOLD,
+        max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+        redis_factory=get_async_redis,
+    )
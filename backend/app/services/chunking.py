@@ -0,0 +1,294 @@
+"""Token-window chunking over a stream of page texts.
+
+Each page is tokenized exactly once into arrays of token start/end character
+offsets. Windows of ``chunk_size`` tokens are then cut by index arithmetic on
+those arrays, with each window's end pulled back (by at most a quarter of a
+window) to the nearest paragraph or sentence break, and consecutive windows
+share exactly ``overlap`` tokens. Text is only sliced once per emitted chunk.
+
+A chunk may run across a page break; it is attributed to the page its first
+token came from, and its character span is relative to the start of that
+page. Only the current window plus one page of tokens is held in memory.
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Protocol
+
+import numpy as np
+
+from app.services.extraction import PageText
+
+SNAP_FRACTION = 0.25  # Max share of a window given up to end on a break
+EXCERPT_MAX_CHARS = 300
+
+# Break strength after a token: 0 none, 1 sentence end, 2 paragraph/page end.
+_SENTENCE_BREAK = 1
+_PARAGRAPH_BREAK = 2
+
+_WORD_CHAR = re.compile(r"\w")
+_ASCII_WORD = np.array([_WORD_CHAR.match(chr(c)) is not None for c in range(128)])
+_ASCII_SPACE = np.array([chr(c).isspace() for c in range(128)])
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*(?=\s)")
+_BLANK_LINE = re.compile(r"\n[ \t]*\n")
+
+
+class Tokenizer(Protocol):
+    """Splits text into tokens, reported as character offsets."""
+
+    name: str
+
+    def token_spans(self, text: str) -> tuple[np.ndarray, np.ndarray]:
+        """Return int64 arrays of token start and end offsets into ``text``."""
+        ...
+
+
+class RegexTokenizer:
+    """Dependency-free tokenizer: words (``\\w+``) and single punctuation marks.
+
+    Counts land close to subword tokenizers for English prose and are exact
+    with respect to themselves, which is what the window arithmetic needs.
+    Characters are classified with NumPy instead of a Python-level regex
+    loop, so tokenizing costs a few vectorized passes over the page.
+    """
+
+    name = "regex"
+
+    def token_spans(self, text: str) -> tuple[np.ndarray, np.ndarray]:
+        codes = np.frombuffer(
+            text.encode("utf-32-le", "surrogatepass"), dtype=np.uint32
+        )
+        word, space = _classify(codes)
+        punct = ~(word | space)
+        prev_word = np.concatenate(([False], word[:-1]))
+        next_word = np.concatenate((word[1:], [False]))
+        starts = np.flatnonzero(punct | (word & ~prev_word))
+        ends = np.flatnonzero(punct | (word & ~next_word)) + 1
+        return starts.astype(np.int64), ends.astype(np.int64)
+
+
+def _classify(codes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Return ``\\w`` and ``\\s`` masks for an array of code points."""
+    is_ascii = codes < 128
+    word = np.zeros(len(codes), dtype=bool)
+    space = np.zeros(len(codes), dtype=bool)
+    word[is_ascii] = _ASCII_WORD[codes[is_ascii]]
+    space[is_ascii] = _ASCII_SPACE[codes[is_ascii]]
+    if not is_ascii.all():
+        other = ~is_ascii
+        unique, inverse = np.unique(codes[other], return_inverse=True)
+        chars = [chr(c) for c in unique.tolist()]
+        word[other] = np.array([_WORD_CHAR.match(c) is not None for c in chars])[
+            inverse
+        ]
+        space[other] = np.array([c.isspace() for c in chars])[inverse]
+    return word, space
+
+
+class TiktokenTokenizer:
+    """Byte-pair tokenizer from ``tiktoken`` (e.g. ``cl100k_base``).
+
+    Token byte lengths are looked up from a table built once per encoding,
+    and byte offsets are mapped to character offsets with one vectorized
+    pass, so no per-token decoding happens at chunking time.
+    """
+
+    def __init__(self, encoding: str) -> None:
+        import tiktoken
+
+        self.name = encoding
+        self._encoding = tiktoken.get_encoding(encoding)
+        self._lengths = _token_byte_lengths(encoding)
+
+    def token_spans(self, text: str) -> tuple[np.ndarray, np.ndarray]:
+        ids = np.asarray(self._encoding.encode_ordinary(text), dtype=np.int64)
+        byte_ends = np.cumsum(self._lengths[ids])
+        byte_starts = byte_ends - self._lengths[ids]
+        if text.isascii():
+            return byte_starts, byte_ends
+        raw = np.frombuffer(text.encode(), dtype=np.uint8)
+        lead = (raw & 0xC0) != 0x80
+        # Character index of every byte, plus a sentinel for the end of text.
+        char_of_byte = np.append(np.cumsum(lead) - 1, len(text))
+        # A token that ends mid-character owns that whole character.
+        mid_char = np.append(~lead, False)[byte_ends]
+        return char_of_byte[byte_starts], char_of_byte[byte_ends] + mid_char
+
+
+@lru_cache(maxsize=4)
+def _token_byte_lengths(encoding: str) -> np.ndarray:
+    import tiktoken
+
+    enc = tiktoken.get_encoding(encoding)
+    lengths = np.zeros(enc.n_vocab, dtype=np.int64)
+    for token in range(enc.n_vocab):
+        try:
+            lengths[token] = len(enc.decode_single_token_bytes(token))
+        except KeyError:
+            pass  # Unused ids between the regular and special tokens
+    return lengths
+
+
+def get_tokenizer(name: str) -> Tokenizer:
+    """Return the tokenizer selected by ``CHUNK_TOKENIZER``.
+
+    ``"regex"`` needs no extra packages; any other value is taken as a
+    ``tiktoken`` encoding name.
+    """
+    if name == "regex":
+        return RegexTokenizer()
+    return TiktokenTokenizer(name)
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """One chunk of document text ready for embedding.
+
+    ``char_start``/``char_end`` locate the chunk in the text of
+    ``page_number`` (the end may run past that page into the next ones).
+    """
+
+    index: int
+    page_number: int
+    text: str
+    token_count: int
+    char_start: int
+    char_end: int
+
+
+def iter_chunks(
+    pages: Iterable[PageText],
+    chunk_size: int,
+    overlap: int,
+    tokenizer: Tokenizer | None = None,
+) -> Iterator[Chunk]:
+    """Lazily split ``pages`` into overlapping token windows.
+
+    Args:
+        pages: Page texts in document order.
+        chunk_size: Maximum tokens per chunk.
+        overlap: Tokens repeated at the start of the next chunk.
+        tokenizer: Defaults to ``RegexTokenizer``.
+
+    Raises:
+        ValueError: If ``overlap`` is not smaller than ``chunk_size``.
+    """
+    if not 0 <= overlap < chunk_size:
+        raise ValueError("overlap must be in [0, chunk_size)")
+    tokenizer = tokenizer or RegexTokenizer()
+    buffer = _TokenBuffer()
+    slack = min(int(chunk_size * SNAP_FRACTION), chunk_size - overlap - 1)
+    index = 0
+
+    for page in pages:
+        buffer.append(page, tokenizer)
+        # Cut while the window cannot be the last one; the tail waits for
+        # more pages so it can still be snapped or extended.
+        start = 0
+        while len(buffer) - start > chunk_size:
+            end = _snap_end(buffer.breaks, start, start + chunk_size, slack)
+            yield buffer.chunk(index, start, end)
+            index += 1
+            start = end - overlap
+        buffer.drop(start)
+
+    if len(buffer):
+        yield buffer.chunk(index, 0, len(buffer))
+
+
+def split_text(
+    text: str, chunk_size: int, overlap: int, tokenizer: Tokenizer | None = None
+) -> list[Chunk]:
+    """Chunk a single in-memory text (treated as page 1)."""
+    return list(iter_chunks([PageText(1, text)], chunk_size, overlap, tokenizer))
+
+
+def excerpt(text: str, max_chars: int = EXCERPT_MAX_CHARS) -> str:
+    """Shorten chunk text for a citation, ending on a sentence if possible."""
+    if len(text) <= max_chars:
+        return text
+    head = text[:max_chars]
+    cut = max((m.end() for m in _SENTENCE_END.finditer(head)), default=0)
+    if cut < max_chars // 2:
+        cut = head.rfind(" ")
+    return head[: cut if cut > 0 else max_chars].rstrip() + " …"
+
+
+def _snap_end(breaks: np.ndarray, start: int, end: int, slack: int) -> int:
+    """Pull ``end`` back to just after the strongest, latest break in reach."""
+    lo = max(start + 1, end - slack)
+    window = breaks[lo - 1 : end]
+    strongest = window.max(initial=0)
+    if strongest == 0:
+        return end
+    last = len(window) - 1 - int(np.argmax(window[::-1] == strongest))
+    return lo + last
+
+
+class _TokenBuffer:
+    """Concatenated text and token offset arrays of not-yet-chunked pages."""
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.base = 0  # Document offset of text[0]
+        self.starts = np.empty(0, dtype=np.int64)
+        self.ends = np.empty(0, dtype=np.int64)
+        self.breaks = np.empty(0, dtype=np.int8)
+        self.pages = np.empty(0, dtype=np.int32)
+        self.page_offsets: dict[int, int] = {}  # Page number -> document offset
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def append(self, page: PageText, tokenizer: Tokenizer) -> None:
+        starts, ends = tokenizer.token_spans(page.text)
+        offset = len(self.text)
+        self.page_offsets.setdefault(page.page_number, self.base + offset)
+        breaks = np.zeros(len(starts), dtype=np.int8)
+        if len(starts):
+            sentences = [m.end() for m in _SENTENCE_END.finditer(page.text)]
+            owners = np.searchsorted(ends, sentences, side="left")
+            breaks[owners[owners < len(ends)]] = _SENTENCE_BREAK
+            # A blank line belongs to the last token that ends before it.
+            blanks = [m.start() for m in _BLANK_LINE.finditer(page.text)]
+            owners = np.searchsorted(ends, blanks, side="right") - 1
+            breaks[owners[owners >= 0]] = _PARAGRAPH_BREAK
+            breaks[-1] = _PARAGRAPH_BREAK  # Page ends are paragraph ends
+        self.text += page.text
+        self.starts = np.concatenate((self.starts, starts + offset))
+        self.ends = np.concatenate((self.ends, ends + offset))
+        self.breaks = np.concatenate((self.breaks, breaks))
+        self.pages = np.concatenate(
+            (self.pages, np.full(len(starts), page.page_number, dtype=np.int32))
+        )
+
+    def chunk(self, index: int, start: int, end: int) -> Chunk:
+        page = int(self.pages[start])
+        page_offset = self.page_offsets[page] - self.base
+        raw = self.text[self.starts[start] : self.ends[end - 1]]
+        return Chunk(
+            index=index,
+            page_number=page,
+            text=raw,
+            token_count=end - start,
+            char_start=int(self.starts[start]) - page_offset,
+            char_end=int(self.ends[end - 1]) - page_offset,
+        )
+
+    def drop(self, count: int) -> None:
+        """Forget the first ``count`` tokens and the text before the next one."""
+        if count == 0:
+            return
+        cut = int(self.starts[count]) if count < len(self) else len(self.text)
+        self.text = self.text[cut:]
+        self.base += cut
+        self.starts = self.starts[count:] - cut
+        self.ends = self.ends[count:] - cut
+        self.breaks = self.breaks[count:]
+        self.pages = self.pages[count:]
+        live = set(self.pages.tolist())
+        self.page_offsets = {p: o for p, o in self.page_offsets.items() if p in live}
@@ -0,0 +1,274 @@
+"""Conversation history for multi-turn chats.
+
+Replaying every prior turn to the LLM makes each answer slower and more
+expensive than the last. A conversation is instead stored as a rolling
+window of its most recent turns plus a summary of everything older. Once
+the window overflows by ``summary_batch`` turns, the oldest overflowing
+turns are folded into the summary by the LLM after the answer has been
+sent, so summarization never delays a response. Loading a conversation
+reads at most ``window_turns + summary_batch`` turns and one summary,
+however long the conversation is.
+
+In Redis a conversation is a list of JSON turns and a summary string,
+scoped by user so a conversation ID cannot be read by another user.
+``InMemoryConversationStore`` has the same interface for tests and
+single-process use.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache, partial
+from typing import Protocol
+
+import redis.asyncio as aioredis
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.redis_client import get_async_redis
+from app.services.llm import get_chat_model
+
+logger = logging.getLogger(__name__)
+
+CONVERSATION_KEY_PREFIX = "docmind:conversations:"
+FOLD_LOCK_SECONDS = 120  # Longest a summarization may hold a conversation
+TURN_MAX_CHARS = 4000  # Stored answers are truncated to bound the prompt
+SUMMARY_MAX_WORDS = 200
+
+SUMMARY_PROMPT = (
+    "You maintain the running summary of a conversation between a student "
+    "and a study assistant. Update the current summary with the new "
+    "exchanges. Keep the topics, definitions, documents, code and open "
+    "questions the student may refer back to; drop greetings and "
+    f"pleasantries. Reply with the updated summary only, in at most "
+    f"{SUMMARY_MAX_WORDS} words."
+)
+
+Summarizer = Callable[[str, list["Turn"]], Awaitable[str]]
+
+
+@dataclass(frozen=True)
+class Turn:
+    """One user query and the answer it received."""
+
+    query: str
+    answer: str
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, raw: bytes | str) -> Turn:
+        return cls(**json.loads(raw))
+
+
+@dataclass
+class Conversation:
+    """Summary of older turns and the recent turns, oldest first."""
+
+    summary: str = ""
+    turns: list[Turn] = field(default_factory=list)
+
+    def messages(self) -> list[BaseMessage]:
+        """Recent turns as chat messages for the generation prompt."""
+        messages: list[BaseMessage] = []
+        for turn in self.turns:
+            messages += [HumanMessage(turn.query), AIMessage(turn.answer)]
+        return messages
+
+
+class ConversationStore(Protocol):
+    """Persistence of conversation turns and summaries."""
+
+    async def load(
+        self, user_id: str, conversation_id: str, max_turns: int
+    ) -> Conversation: ...
+
+    async def append(self, user_id: str, conversation_id: str, turn: Turn) -> int:
+        """Add ``turn`` and return the number of unsummarized turns."""
+        ...
+
+    async def fold(
+        self, user_id: str, conversation_id: str, count: int, summarize: Summarizer
+    ) -> None:
+        """Replace the ``count`` oldest turns with an updated summary."""
+        ...
+
+
+class InMemoryConversationStore:
+    """Process-local conversations."""
+
+    def __init__(self) -> None:
+        self._conversations: dict[tuple[str, str], Conversation] = {}
+
+    async def load(
+        self, user_id: str, conversation_id: str, max_turns: int
+    ) -> Conversation:
+        stored = self._conversations.get((user_id, conversation_id), Conversation())
+        return Conversation(stored.summary, stored.turns[-max_turns:])
+
+    async def append(self, user_id: str, conversation_id: str, turn: Turn) -> int:
+        stored = self._conversations.setdefault(
+            (user_id, conversation_id), Conversation()
+        )
+        stored.turns.append(turn)
+        return len(stored.turns)
+
+    async def fold(
+        self, user_id: str, conversation_id: str, count: int, summarize: Summarizer
+    ) -> None:
+        stored = self._conversations[(user_id, conversation_id)]
+        folded = stored.turns[:count]
+        stored.summary = await summarize(stored.summary, folded)
+        del stored.turns[: len(folded)]
+
+
+class RedisConversationStore:
+    """Conversations shared by API processes through Redis.
+
+    Keys expire ``ttl_seconds`` after the last turn. Concurrent folds of one
+    conversation are prevented by a short-lived lock; the loser skips, and
+    its turns are folded on a later turn.
+    """
+
+    def __init__(
+        self, ttl_seconds: int, redis_factory: Callable[[], aioredis.Redis]
+    ) -> None:
+        self._ttl = ttl_seconds
+        self._redis_factory = redis_factory
+
+    async def load(
+        self, user_id: str, conversation_id: str, max_turns: int
+    ) -> Conversation:
+        summary_key, turns_key, _ = self._keys(user_id, conversation_id)
+        async with self._redis_factory().pipeline(transaction=False) as pipe:
+            pipe.get(summary_key)
+            pipe.lrange(turns_key, -max_turns, -1)
+            summary, raw = await pipe.execute()
+        return Conversation(_decode(summary), [Turn.from_json(r) for r in raw])
+
+    async def append(self, user_id: str, conversation_id: str, turn: Turn) -> int:
+        summary_key, turns_key, _ = self._keys(user_id, conversation_id)
+        async with self._redis_factory().pipeline(transaction=True) as pipe:
+            pipe.rpush(turns_key, turn.to_json())
+            pipe.expire(turns_key, self._ttl)
+            pipe.expire(summary_key, self._ttl)
+            length, *_ = await pipe.execute()
+        return length
+
+    async def fold(
+        self, user_id: str, conversation_id: str, count: int, summarize: Summarizer
+    ) -> None:
+        summary_key, turns_key, lock_key = self._keys(user_id, conversation_id)
+        redis = self._redis_factory()
+        if not await redis.set(lock_key, 1, nx=True, ex=FOLD_LOCK_SECONDS):
+            return
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.get(summary_key)
+                pipe.lrange(turns_key, 0, count - 1)
+                summary, raw = await pipe.execute()
+            summary = await summarize(
+                _decode(summary), [Turn.from_json(r) for r in raw]
+            )
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.set(summary_key, summary, ex=self._ttl)
+                pipe.ltrim(turns_key, len(raw), -1)
+                await pipe.execute()
+        finally:
+            await redis.delete(lock_key)
+
+    def _keys(self, user_id: str, conversation_id: str) -> tuple[str, str, str]:
+        base = f"{CONVERSATION_KEY_PREFIX}{user_id}:{conversation_id}"
+        return f"{base}:summary", f"{base}:turns", f"{base}:lock"
+
+
+class ConversationHistory:
+    """Rolling window of recent turns plus an incrementally updated summary.
+
+    Store and LLM failures are logged and never fail a chat request: a
+    conversation that cannot be loaded is answered without history, and
+    turns that cannot be summarized stay in the store until a later fold.
+    """
+
+    def __init__(
+        self,
+        store: ConversationStore,
+        window_turns: int,
+        summary_batch: int,
+        model_factory: Callable[[], BaseChatModel],
+    ) -> None:
+        self.window_turns = window_turns
+        self.summary_batch = max(summary_batch, 1)
+        self._store = store
+        self._model_factory = model_factory
+
+    @property
+    def max_turns(self) -> int:
+        """Most turns ever loaded into a prompt."""
+        return self.window_turns + self.summary_batch - 1
+
+    async def load(self, user_id: str, conversation_id: str) -> Conversation:
+        """Return the summary and recent turns of a conversation."""
+        try:
+            return await self._store.load(user_id, conversation_id, self.max_turns)
+        except RedisError as exc:
+            logger.warning("Conversation %s load failed: %s", conversation_id, exc)
+            return Conversation()
+
+    async def record(self, user_id: str, conversation_id: str, turn: Turn) -> None:
+        """Append a finished turn, folding overflowing turns into the summary."""
+        turn = Turn(turn.query, turn.answer[:TURN_MAX_CHARS])
+        try:
+            length = await self._store.append(user_id, conversation_id, turn)
+            if length < self.window_turns + self.summary_batch:
+                return
+            summarize = partial(summarize_turns, self._model_factory())
+            await self._store.fold(
+                user_id, conversation_id, length - self.window_turns, summarize
+            )
+        except Exception:
+            logger.warning(
+                "Conversation %s update failed", conversation_id, exc_info=True
+            )
+
+
+async def summarize_turns(model: BaseChatModel, summary: str, turns: list[Turn]) -> str:
+    """Ask the LLM to fold ``turns`` into the running ``summary``."""
+    transcript = "\n\n".join(
+        f"Student: {turn.query}\nAssistant: {turn.answer}" for turn in turns
+    )
+    response = await model.ainvoke(
+        [
+            SystemMessage(SUMMARY_PROMPT),
+            HumanMessage(
+                f"Current summary:\n{summary or '(none)'}\n\n"
+                f"New exchanges:\n{transcript}"
+            ),
+        ]
+    )
+    return response.text.strip()
+
+
+def _decode(value: bytes | str | None) -> str:
+    if value is None:
+        return ""
+    return value.decode() if isinstance(value, bytes) else value
+
+
+@lru_cache(maxsize=1)
+def get_conversation_history() -> ConversationHistory:
+    """Return the process-wide, Redis-backed conversation history."""
+    return ConversationHistory(
+        RedisConversationStore(
+            settings.CONVERSATION_TTL_SECONDS, redis_factory=get_async_redis
+        ),
+        window_turns=settings.CONVERSATION_WINDOW_TURNS,
+        summary_batch=settings.CONVERSATION_SUMMARY_BATCH,
+        model_factory=get_chat_model,
+    )
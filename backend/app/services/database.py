@@ -0,0 +1,285 @@
+"""Async data access to Supabase Postgres through PostgREST.
+
+supabase-py's client is synchronous: called from a route it blocks the
+event loop, and run in the threadpool it is capped by the pool's threads.
+``SupabaseDatabase`` calls the PostgREST API directly on a pooled,
+keep-alive ``httpx.AsyncClient`` so API requests wait on the network
+without holding a thread. Only the queries the application makes are
+exposed, including bulk variants that replace one request per row or per
+document with one request per batch.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Sequence
+from functools import lru_cache
+from typing import Any
+
+import httpx
+
+from app.core.config import settings
+from app.core.constants import DocumentStatus
+from app.core.http import build_supabase_client
+from app.services.index_versions import INITIAL_INDEX_VERSION
+
+DOCUMENTS_TABLE = "documents"
+CHUNKS_TABLE = "document_chunks"
+STAGING_TABLE = "document_chunks_staging"
+PUBLISH_CHUNKS_RPC = "publish_document_chunks"
+DELETE_DOCUMENTS_RPC = "delete_user_documents"
+BULK_INSERT_CONCURRENCY = 4  # Batch requests of one bulk insert in flight
+
+
+class DatabaseError(Exception):
+    """Raised when PostgREST rejects or fails a request."""
+
+
+class SupabaseDatabase:
+    """Documents and chunks over the PostgREST API.
+
+    Args:
+        base_url: Supabase project URL.
+        service_key: Service role key (bypasses RLS; queries filter by user).
+        timeout: Seconds allowed per request.
+        bulk_rows: Rows sent per request by bulk inserts.
+        transport: Replaces the network transport (tests).
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        service_key: str,
+        timeout: float = 10.0,
+        bulk_rows: int = 500,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.bulk_rows = bulk_rows
+        # Requests beyond the pool wait here rather than in httpx's pool queue,
+        # which rescans every queued request whenever a connection frees up.
+        self._slots = asyncio.Semaphore(settings.SUPABASE_HTTP_MAX_CONNECTIONS)
+        self._client = build_supabase_client(
+            f"{base_url.rstrip('/')}/rest/v1", service_key, timeout, transport
+        )
+
+    async def insert_document(self, row: dict[str, Any]) -> dict[str, Any]:
+        """Insert a document row and return it as stored (with defaults)."""
+        response = await self._request(
+            "POST",
+            DOCUMENTS_TABLE,
+            json=row,
+            headers={"Prefer": "return=representation"},
+        )
+        return response.json()[0]
+
+    async def get_document(
+        self, document_id: str, user_id: str, columns: str = "*"
+    ) -> dict[str, Any] | None:
+        """Return the user's document ``document_id``, or None."""
+        response = await self._request(
+            "GET",
+            DOCUMENTS_TABLE,
+            params={
+                "select": columns,
+                "id": f"eq.{document_id}",
+                "user_id": f"eq.{user_id}",
+            },
+        )
+        rows = response.json()
+        return rows[0] if rows else None
+
+    async def document_statuses(self, user_id: str) -> list[dict[str, Any]]:
+        """Return ``id``, ``status`` and ``error_message`` of the user's documents."""
+        response = await self._request(
+            "GET",
+            DOCUMENTS_TABLE,
+            params={"select": "id,status,error_message", "user_id": f"eq.{user_id}"},
+        )
+        return response.json()
+
+    async def ready_documents(
+        self, after: str | None = None, limit: int = 500
+    ) -> list[dict[str, Any]]:
+        """Return up to ``limit`` READY documents with ids after ``after``.
+
+        Pages by id (keyset), so documents added meanwhile never shift a page.
+        """
+        params = [
+            ("select", "id,user_id,storage_path,mime_type"),
+            ("status", f"eq.{DocumentStatus.READY}"),
+            ("order", "id"),
+            ("limit", str(limit)),
+        ]
+        if after is not None:
+            params.append(("id", f"gt.{after}"))
+        response = await self._request("GET", DOCUMENTS_TABLE, params=params)
+        return response.json()
+
+    async def update_document(self, document_id: str, fields: dict[str, Any]) -> None:
+        """Set ``fields`` on one document."""
+        await self._request(
+            "PATCH", DOCUMENTS_TABLE, params={"id": f"eq.{document_id}"}, json=fields
+        )
+
+    async def delete_documents(self, user_id: str, document_ids: Sequence[str]) -> int:
+        """Delete the user's documents with their chunks, atomically.
+
+        Returns:
+            Number of documents deleted.
+        """
+        if not document_ids:
+            return 0
+        deleted = await self.rpc(
+            DELETE_DOCUMENTS_RPC,
+            {"target_user_id": user_id, "target_document_ids": list(document_ids)},
+        )
+        return int(deleted or 0)
+
+    async def insert_chunks(
+        self, rows: Sequence[dict[str, Any]], table: str = CHUNKS_TABLE
+    ) -> int:
+        """Insert chunk rows, ``bulk_rows`` per request, a few batches at once.
+
+        Args:
+            rows: Chunk rows.
+            table: ``CHUNKS_TABLE``, or ``STAGING_TABLE`` for rows that
+                ``publish_chunks`` makes searchable later.
+
+        Returns:
+            Number of rows inserted.
+        """
+        limit = asyncio.Semaphore(BULK_INSERT_CONCURRENCY)
+
+        async def insert(batch: Sequence[dict[str, Any]]) -> None:
+            async with limit:
+                await self._request(
+                    "POST",
+                    table,
+                    json=list(batch),
+                    headers={"Prefer": "return=minimal"},
+                )
+
+        await asyncio.gather(
+            *(
+                insert(rows[start : start + self.bulk_rows])
+                for start in range(0, len(rows), self.bulk_rows)
+            )
+        )
+        return len(rows)
+
+    async def delete_chunks(self, document_ids: Sequence[str]) -> int:
+        """Delete every chunk of ``document_ids`` in one request; return how many."""
+        if not document_ids:
+            return 0
+        response = await self._request(
+            "DELETE",
+            CHUNKS_TABLE,
+            params={"document_id": _in(document_ids)},
+            headers={"Prefer": "count=exact"},
+        )
+        return _count(response)
+
+    async def delete_chunk_version(self, index_version: str, user_id: str) -> int:
+        """Delete a user's chunks of a retired index version; return how many."""
+        response = await self._request(
+            "DELETE",
+            CHUNKS_TABLE,
+            params={
+                "index_version": f"eq.{index_version}",
+                "user_id": f"eq.{user_id}",
+            },
+            headers={"Prefer": "count=exact"},
+        )
+        return _count(response)
+
+    async def discard_staged_chunks(
+        self,
+        document_id: str,
+        indexes: range | None = None,
+        index_version: str = INITIAL_INDEX_VERSION,
+    ) -> None:
+        """Drop rows staged for a document by an earlier, failed attempt.
+
+        Args:
+            document_id: Document whose staged rows to drop.
+            indexes: Only rows with these chunk indexes (one shard's).
+            index_version: Only rows staged for this index version.
+        """
+        params = [
+            ("document_id", f"eq.{document_id}"),
+            ("index_version", f"eq.{index_version}"),
+        ]
+        if indexes is not None:
+            params += [
+                ("chunk_index", f"gte.{indexes.start}"),
+                ("chunk_index", f"lt.{indexes.stop}"),
+            ]
+        await self._request("DELETE", STAGING_TABLE, params=params)
+
+    async def publish_chunks(
+        self,
+        document_id: str,
+        expected: int,
+        index_version: str = INITIAL_INDEX_VERSION,
+    ) -> int:
+        """Swap a document's staged rows in and mark it READY, atomically.
+
+        Only rows of ``index_version`` are replaced; other versions' rows of
+        the document stay searchable. Nothing is published (0 is returned)
+        if the document was deleted meanwhile.
+
+        Raises:
+            DatabaseError: If fewer or more than ``expected`` rows were
+                staged; nothing is changed.
+        """
+        published = await self.rpc(
+            PUBLISH_CHUNKS_RPC,
+            {
+                "target_document_id": document_id,
+                "expected_chunks": expected,
+                "target_index_version": index_version,
+            },
+        )
+        return int(published or 0)
+
+    async def rpc(self, function: str, params: dict[str, Any]) -> Any:
+        """Call a Postgres function and return its JSON result."""
+        response = await self._request("POST", f"rpc/{function}", json=params)
+        return response.json() if response.content else None
+
+    async def aclose(self) -> None:
+        """Close pooled connections."""
+        await self._client.aclose()
+
+    async def _request(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        try:
+            async with self._slots:
+                response = await self._client.request(method, f"/{path}", **kwargs)
+        except httpx.HTTPError as exc:
+            raise DatabaseError(f"{method} {path} failed: {exc}") from exc
+        if response.is_error:
+            raise DatabaseError(
+                f"{method} {path} failed ({response.status_code}): {response.text}"
+            )
+        return response
+
+
+def _in(values: Sequence[str]) -> str:
+    return f"in.({','.join(values)})"
+
+
+def _count(response: httpx.Response) -> int:
+    # Content-Range: "0-2/3", or "*/0" when nothing matched.
+    total = response.headers.get("Content-Range", "*/0").rsplit("/", 1)[-1]
+    return int(total) if total.isdigit() else 0
+
+
+@lru_cache(maxsize=1)
+def get_database() -> SupabaseDatabase:
+    """Return the process-wide database client (API event loop)."""
+    return SupabaseDatabase(
+        settings.SUPABASE_URL,
+        settings.SUPABASE_SERVICE_KEY,
+        timeout=settings.DATABASE_TIMEOUT_SECONDS,
+        bulk_rows=settings.DATABASE_BULK_ROWS,
+    )
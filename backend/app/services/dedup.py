@@ -0,0 +1,184 @@
+"""Content-addressed deduplication for document ingestion.
+
+Byte-identical uploads (same SHA-256) produce identical text, chunks and
+embeddings, so the first ingestion is registered as the canonical copy and
+later duplicates — from any user — are linked to it by cloning its chunk rows
+server-side instead of re-extracting and re-embedding.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Protocol
+
+import redis
+from supabase import Client
+
+from app.core.metrics import Counters, RedisCounters, ratio
+from app.core.redis_client import get_redis
+from app.core.supabase_client import get_supabase_client
+from app.schemas.metrics import DedupMetrics
+from app.services.index_versions import IndexSpec
+
+logger = logging.getLogger(__name__)
+
+DEDUP_KEY_PREFIX = "docmind:dedup:"
+CLONE_CHUNKS_RPC = "clone_document_chunks"
+
+
+@dataclass(frozen=True)
+class IngestedContent:
+    """Canonical ingestion of a piece of content."""
+
+    document_id: str
+    chunk_count: int
+
+
+class ContentRegistry(Protocol):
+    """Maps a content hash to the document whose chunks hold its vectors."""
+
+    def lookup(self, content_hash: str) -> IngestedContent | None: ...
+
+    def register(self, content_hash: str, content: IngestedContent) -> None: ...
+
+    def forget(self, content_hash: str) -> None: ...
+
+
+def index_signature() -> str:
+    """Identify the settings that determine chunk boundaries and vectors.
+
+    Content is only reusable when it was chunked and embedded the same way,
+    so registry keys are scoped by this signature.
+    """
+    return IndexSpec.from_settings().signature
+
+
+class InMemoryContentRegistry:
+    """Process-local registry for tests."""
+
+    def __init__(self) -> None:
+        self._entries: dict[str, IngestedContent] = {}
+
+    def lookup(self, content_hash: str) -> IngestedContent | None:
+        return self._entries.get(content_hash)
+
+    def register(self, content_hash: str, content: IngestedContent) -> None:
+        self._entries.setdefault(content_hash, content)
+
+    def forget(self, content_hash: str) -> None:
+        self._entries.pop(content_hash, None)
+
+
+class RedisContentRegistry:
+    """Registry shared by all workers, one small JSON value per content hash."""
+
+    def __init__(self, client: redis.Redis, signature: str) -> None:
+        self._client = client
+        self._prefix = f"{DEDUP_KEY_PREFIX}{signature}:"
+
+    def lookup(self, content_hash: str) -> IngestedContent | None:
+        raw = self._client.get(self._prefix + content_hash)
+        return IngestedContent(**json.loads(raw)) if raw else None
+
+    def register(self, content_hash: str, content: IngestedContent) -> None:
+        # NX keeps the first canonical copy if two duplicates finish together.
+        self._client.set(
+            self._prefix + content_hash, json.dumps(asdict(content)), nx=True
+        )
+
+    def forget(self, content_hash: str) -> None:
+        self._client.delete(self._prefix + content_hash)
+
+
+class DedupService:
+    """Links duplicate uploads to already-ingested content."""
+
+    def __init__(
+        self, registry: ContentRegistry, supabase: Client, counters: Counters
+    ) -> None:
+        self._registry = registry
+        self._supabase = supabase
+        self._counters = counters
+
+    def link_duplicate(
+        self, content_hash: str, document_id: str, user_id: str, index_version: str
+    ) -> int | None:
+        """Attach the canonical copy's chunks and vectors to ``document_id``.
+
+        Only the rows of ``index_version`` are cloned, so the count (and the
+        embedding calls it saved) is that of one ingestion; rows of a version
+        being migrated to are added by the re-embed sweep.
+
+        Args:
+            content_hash: SHA-256 hex digest of the uploaded bytes.
+            document_id: The new document to populate.
+            user_id: Owner of the new document.
+            index_version: The active index version, which fresh ingestion
+                would have written.
+
+        Returns:
+            Number of chunks linked, or None if the content must be ingested.
+        """
+        canonical = self._registry.lookup(content_hash)
+        if canonical is None or canonical.document_id == document_id:
+            self._counters.incr("misses")
+            return None
+
+        response = self._supabase.rpc(
+            CLONE_CHUNKS_RPC,
+            {
+                "source_document_id": canonical.document_id,
+                "target_document_id": document_id,
+                "target_user_id": user_id,
+                "source_index_version": index_version,
+            },
+        ).execute()
+        cloned = int(response.data or 0)
+        if cloned == 0:
+            # The canonical document was deleted; this upload becomes canonical.
+            logger.info("Stale dedup entry for hash=%s — re-ingesting", content_hash)
+            self._registry.forget(content_hash)
+            self._counters.incr("misses")
+            return None
+
+        self._counters.incr("hits")
+        self._counters.incr("embedding_calls_saved", cloned)
+        logger.info(
+            "Dedup hit: doc_id=%s linked to %s (%d chunks)",
+            document_id,
+            canonical.document_id,
+            cloned,
+        )
+        return cloned
+
+    def register(self, content_hash: str, document_id: str, chunk_count: int) -> None:
+        """Record a freshly ingested document as canonical for its content."""
+        self._registry.register(
+            content_hash,
+            IngestedContent(document_id=document_id, chunk_count=chunk_count),
+        )
+
+    def stats(self) -> DedupMetrics:
+        """Return hit/miss counts, hit rate and embedding calls saved."""
+        counts = self._counters.snapshot()
+        hits, misses = counts.get("hits", 0), counts.get("misses", 0)
+        return DedupMetrics(
+            hits=hits,
+            misses=misses,
+            hit_rate=ratio(hits, hits + misses),
+            embedding_calls_saved=counts.get("embedding_calls_saved", 0),
+        )
+
+
+@lru_cache(maxsize=1)
+def get_dedup_service() -> DedupService:
+    """Return the Redis-backed dedup service (one per process)."""
+    client = get_redis()
+    return DedupService(
+        RedisContentRegistry(client, index_signature()),
+        get_supabase_client(),
+        RedisCounters(client, "dedup"),
+    )
@@ -0,0 +1,227 @@
+"""Push-based document status and progress events.
+
+Workers publish a ``DocumentEvent`` on one Redis pub/sub channel whenever a
+document changes status or finishes another embedding batch. Each API
+process holds a single subscription to the channel, however many clients
+are connected, and ``DocumentEventHub`` fans events out to the per-client
+queues of the document's owner, which ``GET /api/documents/events`` streams
+as Server-Sent Events. Clients no longer poll the API (and the database)
+for status.
+
+Pub/sub does not store messages, so delivery is best effort: when the
+subscription is (re)established, or a client falls ``DOCUMENT_EVENTS_BUFFER``
+events behind, its queue receives ``None`` instead, meaning "events may
+have been missed, reload the current statuses".
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import defaultdict
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+import redis
+import redis.asyncio as aioredis
+from pydantic import ValidationError
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.redis_client import get_async_redis, get_redis
+from app.schemas.document import DocumentEvent, DocumentStatus
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_EVENTS_CHANNEL = "docmind:document-events"
+PROGRESS_KEY_PREFIX = "docmind:ingest:progress:"
+PROGRESS_TTL_SECONDS = 24 * 3600  # Outlives every retry of a document
+RESUBSCRIBE_SECONDS = 1.0
+
+
+class DocumentEvents:
+    """Publishes document events from workers.
+
+    Publishing never fails the caller: an event that cannot be sent is
+    logged and dropped, and clients recover the status on their next resync.
+    """
+
+    def __init__(self, client: redis.Redis) -> None:
+        self._client = client
+
+    def status(
+        self,
+        document_id: str,
+        user_id: str,
+        status: str,
+        error_message: str | None = None,
+    ) -> None:
+        """Publish a status transition."""
+        self._publish(
+            DocumentEvent(
+                document_id=document_id,
+                user_id=user_id,
+                status=status,
+                error_message=error_message,
+            )
+        )
+
+    def progress(self, document_id: str, user_id: str, pages: int, chunks: int) -> None:
+        """Publish the pages extracted and chunks embedded so far."""
+        self._publish(
+            DocumentEvent(
+                event="progress",
+                document_id=document_id,
+                user_id=user_id,
+                status=DocumentStatus.PROCESSING,
+                pages=pages,
+                chunks=chunks,
+            )
+        )
+
+    def add_progress(
+        self, document_id: str, user_id: str, pages: int, chunks: int
+    ) -> None:
+        """Add one page range's counts to the document's totals and publish them.
+
+        Used by the page-range tasks of a sharded document, which finish in
+        any order on different workers.
+        """
+        key = PROGRESS_KEY_PREFIX + document_id
+        try:
+            with self._client.pipeline(transaction=True) as pipe:
+                pipe.hincrby(key, "pages", pages)
+                pipe.hincrby(key, "chunks", chunks)
+                pipe.expire(key, PROGRESS_TTL_SECONDS)
+                total_pages, total_chunks, _ = pipe.execute()
+        except RedisError as exc:
+            logger.warning("Progress not recorded: doc_id=%s | %s", document_id, exc)
+            return
+        self.progress(document_id, user_id, total_pages, total_chunks)
+
+    def clear_progress(self, document_id: str) -> None:
+        """Forget a sharded document's totals once it is published or failed."""
+        try:
+            self._client.delete(PROGRESS_KEY_PREFIX + document_id)
+        except RedisError as exc:
+            logger.warning("Progress not cleared: doc_id=%s | %s", document_id, exc)
+
+    def _publish(self, event: DocumentEvent) -> None:
+        try:
+            self._client.publish(DOCUMENT_EVENTS_CHANNEL, event.model_dump_json())
+        except RedisError as exc:
+            logger.warning(
+                "Document event dropped: doc_id=%s | %s", event.document_id, exc
+            )
+
+
+class DocumentEventHub:
+    """Fans the process's one Redis subscription out to connected clients.
+
+    The subscription is opened with the first client and closed with the
+    last one; a dropped connection is re-established after
+    ``RESUBSCRIBE_SECONDS``.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], aioredis.Redis] = get_async_redis,
+        buffer: int | None = None,
+        resubscribe_seconds: float = RESUBSCRIBE_SECONDS,
+    ) -> None:
+        self._client_factory = client_factory
+        self._buffer = buffer or settings.DOCUMENT_EVENTS_BUFFER
+        self._resubscribe_seconds = resubscribe_seconds
+        self._queues: dict[str, set[asyncio.Queue[DocumentEvent | None]]] = defaultdict(
+            set
+        )
+        self._listener: asyncio.Task[None] | None = None
+        self._live = False
+
+    @property
+    def clients(self) -> int:
+        """Number of connected clients."""
+        return sum(len(queues) for queues in self._queues.values())
+
+    @asynccontextmanager
+    async def subscribe(
+        self, user_id: str
+    ) -> AsyncIterator[asyncio.Queue[DocumentEvent | None]]:
+        """Receive the events of ``user_id``'s documents while in the block.
+
+        The queue's first item is ``None`` once the subscription is live, so
+        statuses read after it cannot miss an event published meanwhile.
+        """
+        queue: asyncio.Queue[DocumentEvent | None] = asyncio.Queue(self._buffer)
+        self._queues[user_id].add(queue)
+        if self._live:
+            queue.put_nowait(None)
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+        try:
+            yield queue
+        finally:
+            self._queues[user_id].discard(queue)
+            if not self._queues[user_id]:
+                del self._queues[user_id]
+            if not self._queues and self._listener is not None:
+                self._listener.cancel()
+                self._listener = None
+
+    def dispatch(self, event: DocumentEvent) -> None:
+        """Queue ``event`` for every client of its owner."""
+        for queue in self._queues.get(event.user_id, ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A client this far behind reloads the statuses instead.
+                _resync(queue)
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = self._client_factory().pubsub()
+            try:
+                await pubsub.subscribe(DOCUMENT_EVENTS_CHANNEL)
+                self._live = True
+                for queues in self._queues.values():
+                    for queue in queues:
+                        _resync(queue)
+                while True:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=None
+                    )
+                    if message is not None:
+                        self._receive(message["data"])
+            except (RedisError, OSError) as exc:
+                logger.warning("Document event subscription lost | %s", exc)
+            finally:
+                self._live = False
+                await pubsub.aclose()
+            await asyncio.sleep(self._resubscribe_seconds)
+
+    def _receive(self, data: bytes | str) -> None:
+        try:
+            event = DocumentEvent.model_validate_json(data)
+        except ValidationError:
+            logger.warning("Ignoring malformed document event: %r", data)
+            return
+        self.dispatch(event)
+
+
+def _resync(queue: asyncio.Queue[DocumentEvent | None]) -> None:
+    while not queue.empty():
+        queue.get_nowait()
+    queue.put_nowait(None)
+
+
+@lru_cache(maxsize=1)
+def get_document_events() -> DocumentEvents:
+    """Return the Redis-backed publisher (one per process)."""
+    return DocumentEvents(get_redis())
+
+
+@lru_cache(maxsize=1)
+def get_document_event_hub() -> DocumentEventHub:
+    """Return the process's event hub (one Redis subscription per process)."""
+    return DocumentEventHub()
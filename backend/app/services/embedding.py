@@ -0,0 +1,404 @@
+"""Provider-agnostic embedding generation.
+
+Texts are packed into the largest batches each provider accepts, a bounded
+number of batches run concurrently, and the concurrency limit adapts to
+rate limiting (AIMD: halve on HTTP 429, grow back by one after a window of
+successes) with jittered exponential backoff between retries.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import random
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.core.config import settings
+from app.core.constants import EMBEDDING_DIMENSION
+from app.core.redis_client import get_async_redis
+from app.services.embedding_cache import EmbeddingCache
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4  # Conservative estimate used for batch token budgets
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30.0
+
+
+class EmbeddingError(Exception):
+    """Raised when an embedding provider call fails permanently."""
+
+
+class RateLimitError(EmbeddingError):
+    """Provider signalled HTTP 429 / quota exhaustion; safe to retry later."""
+
+    def __init__(self, message: str, retry_after: float | None = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class BatchLimits:
+    """Per-request limits published by an embedding provider."""
+
+    max_texts: int
+    max_tokens: int
+
+
+# Request-size limits per provider (texts per call, total input tokens per call).
+PROVIDER_BATCH_LIMITS: dict[str, BatchLimits] = {
+    "gemini": BatchLimits(max_texts=100, max_tokens=100 * 2048),
+    "openai": BatchLimits(max_texts=2048, max_tokens=300_000),
+    "qwen": BatchLimits(max_texts=10, max_tokens=10 * 8192),
+    "fake": BatchLimits(max_texts=256, max_tokens=1_000_000),
+}
+
+
+class EmbeddingProvider(ABC):
+    """One embedding backend; embeds a single, already size-limited batch."""
+
+    name: str
+    model: str
+    limits: BatchLimits
+
+    @abstractmethod
+    async def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        """Embed ``texts`` in one provider call.
+
+        Raises:
+            RateLimitError: If the provider rejected the call with a 429.
+            EmbeddingError: For any other provider failure.
+        """
+
+
+class LangChainEmbeddingProvider(EmbeddingProvider):
+    """Adapter over a LangChain ``Embeddings`` implementation."""
+
+    def __init__(self, name: str, model: str, embeddings: Embeddings) -> None:
+        self.name = name
+        self.model = model
+        self.limits = PROVIDER_BATCH_LIMITS[name]
+        self._embeddings = embeddings
+
+    async def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        try:
+            return await self._embeddings.aembed_documents(texts)
+        except Exception as exc:
+            if _is_rate_limit(exc):
+                raise RateLimitError(str(exc), _retry_after(exc)) from exc
+            raise EmbeddingError(f"{self.name} embedding failed: {exc}") from exc
+
+
+class FakeEmbeddingProvider(EmbeddingProvider):
+    """Deterministic offline provider for tests and benchmarks.
+
+    Vectors are seeded from the text hash, so equal texts embed equally. The
+    simulated server accepts at most ``capacity`` concurrent requests and
+    answers 429 beyond that, which exercises the adaptive limiter.
+    """
+
+    def __init__(
+        self,
+        model: str = "fake-embedding",
+        dimension: int = EMBEDDING_DIMENSION,
+        latency_s: float = 0.0,
+        per_text_latency_s: float = 0.0,
+        capacity: int | None = None,
+        limits: BatchLimits = PROVIDER_BATCH_LIMITS["fake"],
+    ) -> None:
+        self.name = "fake"
+        self.model = model
+        self.limits = limits
+        self.dimension = dimension
+        self.latency_s = latency_s
+        self.per_text_latency_s = per_text_latency_s
+        self.capacity = capacity
+        self.calls = 0
+        self.rate_limited = 0
+        self._in_flight = 0
+
+    async def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        if self.capacity is not None and self._in_flight >= self.capacity:
+            self.rate_limited += 1
+            raise RateLimitError("fake provider over capacity")
+        self._in_flight += 1
+        try:
+            await asyncio.sleep(self.latency_s + self.per_text_latency_s * len(texts))
+            self.calls += 1
+            return [self.vector(text).tolist() for text in texts]
+        finally:
+            self._in_flight -= 1
+
+    def vector(self, text: str) -> np.ndarray:
+        """Return the deterministic unit vector for ``text``."""
+        seed = int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest())
+        vec = np.random.default_rng(seed).standard_normal(self.dimension)
+        return (vec / np.linalg.norm(vec)).astype(np.float32)
+
+
+class _AdaptiveLimiter:
+    """Concurrency limit that shrinks on rate limiting and recovers gradually.
+
+    The learned limit survives across event loops (Celery tasks each run
+    their own ``asyncio.run``); the condition variable is rebound per loop.
+    """
+
+    def __init__(self, max_limit: int) -> None:
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self._in_flight = 0
+        self._successes = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._cond = asyncio.Condition()
+
+    def _condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._cond, self._in_flight = loop, asyncio.Condition(), 0
+        return self._cond
+
+    async def acquire(self) -> None:
+        async with self._condition():
+            await self._cond.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+
+    async def release(self, rate_limited: bool = False, failed: bool = False) -> None:
+        """Free a slot; only successful requests count toward growing the limit."""
+        async with self._condition():
+            self._in_flight -= 1
+            if rate_limited:
+                self.limit = max(1, self.limit // 2)
+                self._successes = 0
+            elif not failed:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.max_limit:
+                    self.limit += 1
+                    self._successes = 0
+            self._cond.notify_all()
+
+
+class EmbeddingService:
+    """Batched, concurrent, rate-limit-aware embedding of many texts."""
+
+    def __init__(
+        self,
+        provider: EmbeddingProvider,
+        max_concurrency: int = 4,
+        max_retries: int = 6,
+        cache: EmbeddingCache | None = None,
+    ) -> None:
+        self.provider = provider
+        self.max_retries = max_retries
+        self.cache = cache
+        self._limiter = _AdaptiveLimiter(max_concurrency)
+        self.rate_limited = 0
+
+    @property
+    def model(self) -> str:
+        """Name of the model producing the vectors."""
+        return self.provider.model
+
+    @property
+    def concurrency_limit(self) -> int:
+        """Current adaptive limit on concurrent provider requests."""
+        return self._limiter.limit
+
+    async def embed_documents(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed ``texts`` and return a float32 matrix in input order.
+
+        Cached vectors are reused, and repeated texts within the call are
+        sent to the provider once.
+
+        Args:
+            texts: Chunk texts to embed.
+
+        Returns:
+            Array of shape ``(len(texts), dimension)``.
+
+        Raises:
+            EmbeddingError: If a batch still fails after all retries.
+        """
+        if not texts:
+            return np.empty((0, EMBEDDING_DIMENSION), dtype=np.float32)
+        if self.cache is None:
+            return await self._embed_uncached(texts)
+
+        cached = await self.cache.get_many(texts)
+        missing: dict[str, list[int]] = {}
+        for i, vector in enumerate(cached):
+            if vector is None:
+                missing.setdefault(texts[i], []).append(i)
+        fresh_texts = list(missing)
+        fresh = await self._embed_uncached(fresh_texts)
+        if fresh_texts:
+            await self.cache.put_many(fresh_texts, fresh)
+
+        out = np.empty((len(texts), self.cache.dimension), dtype=np.float32)
+        for i, vector in enumerate(cached):
+            if vector is not None:
+                out[i] = vector
+        for row, indices in enumerate(missing.values()):
+            out[indices] = fresh[row]
+        return out
+
+    async def _embed_uncached(self, texts: Sequence[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, EMBEDDING_DIMENSION), dtype=np.float32)
+        batches = pack_batches(texts, self.provider.limits)
+        results = await asyncio.gather(
+            *(self._embed_with_retry([texts[i] for i in b]) for b in batches)
+        )
+        out = np.empty((len(texts), len(results[0][0])), dtype=np.float32)
+        for indices, vectors in zip(batches, results, strict=True):
+            out[indices] = vectors
+        return out
+
+    async def embed_query(self, text: str) -> np.ndarray:
+        """Embed a single query string."""
+        return (await self.embed_documents([text]))[0]
+
+    async def _embed_with_retry(self, texts: list[str]) -> list[list[float]]:
+        for attempt in range(self.max_retries + 1):
+            await self._limiter.acquire()
+            try:
+                vectors = await self.provider.embed_batch(texts)
+            except RateLimitError as exc:
+                await self._limiter.release(rate_limited=True)
+                self.rate_limited += 1
+                if attempt == self.max_retries:
+                    raise EmbeddingError(
+                        f"Rate limited after {attempt + 1} attempts"
+                    ) from exc
+                delay = exc.retry_after or _backoff_delay(attempt)
+                logger.debug(
+                    "Embedding rate limited (limit=%d); retrying in %.2fs",
+                    self._limiter.limit,
+                    delay,
+                )
+                await asyncio.sleep(delay)
+            except BaseException:
+                # Errors other than 429 say nothing about spare capacity.
+                await self._limiter.release(failed=True)
+                raise
+            else:
+                await self._limiter.release()
+                return vectors
+        raise AssertionError("unreachable")  # pragma: no cover
+
+
+def pack_batches(texts: Sequence[str], limits: BatchLimits) -> list[list[int]]:
+    """Greedily group text indices into batches within the provider limits."""
+    batches: list[list[int]] = []
+    current: list[int] = []
+    tokens = 0
+    for i, text in enumerate(texts):
+        cost = len(text) // CHARS_PER_TOKEN + 1
+        if current and (
+            len(current) >= limits.max_texts or tokens + cost > limits.max_tokens
+        ):
+            batches.append(current)
+            current, tokens = [], 0
+        current.append(i)
+        tokens += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff."""
+    cap = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2**attempt)
+    return random.uniform(0, cap)
+
+
+def _is_rate_limit(exc: Exception) -> bool:
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    if status == 429:
+        return True
+    message = str(exc)
+    return "429" in message or "RESOURCE_EXHAUSTED" in message
+
+
+def _retry_after(exc: Exception) -> float | None:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers["retry-after"])
+    except (KeyError, ValueError):
+        return None
+
+
+def build_provider(name: str, model: str) -> EmbeddingProvider:
+    """Instantiate the embedding provider selected by ``EMBEDDING_PROVIDER``.
+
+    Raises:
+        ValueError: If the provider name is unknown.
+    """
+    if name == "fake":
+        return FakeEmbeddingProvider(model=model)
+    if name == "gemini":
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        embeddings = GoogleGenerativeAIEmbeddings(
+            model=model,
+            google_api_key=settings.GOOGLE_API_KEY,
+            output_dimensionality=EMBEDDING_DIMENSION,
+        )
+    elif name in ("openai", "qwen"):
+        from langchain_openai import OpenAIEmbeddings
+
+        embeddings = OpenAIEmbeddings(
+            model=model,
+            dimensions=EMBEDDING_DIMENSION,
+            max_retries=0,  # Retries are handled by EmbeddingService
+            **(
+                {
+                    "api_key": settings.QWEN_API_KEY,
+                    "base_url": settings.QWEN_BASE_URL,
+                    "check_embedding_ctx_length": False,
+                }
+                if name == "qwen"
+                else {"api_key": settings.OPENAI_API_KEY}
+            ),
+        )
+    else:
+        raise ValueError(f"Unknown embedding provider: {name}")
+    return LangChainEmbeddingProvider(name, model, embeddings)
+
+
+@lru_cache(maxsize=1)
+def get_embedding_service() -> EmbeddingService:
+    """Return the cached embedding service for the configured provider and model."""
+    return get_embedding_service_for(
+        settings.EMBEDDING_PROVIDER, settings.EMBEDDING_MODEL
+    )
+
+
+@lru_cache(maxsize=2)
+def get_embedding_service_for(provider: str, model: str) -> EmbeddingService:
+    """Return the cached embedding service for one provider and model.
+
+    While an index version is rebuilt, queries still embed with the model of
+    the active version, so up to two services are alive.
+    """
+    cache = None
+    if settings.EMBEDDING_CACHE_MAX_MB > 0:
+        cache = EmbeddingCache(
+            model,
+            EMBEDDING_DIMENSION,
+            max_bytes=settings.EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+            ttl_seconds=settings.EMBEDDING_CACHE_TTL_SECONDS,
+            redis_factory=get_async_redis,
+        )
+    return EmbeddingService(
+        build_provider(provider, model),
+        max_concurrency=settings.EMBEDDING_MAX_CONCURRENCY,
+        max_retries=settings.EMBEDDING_MAX_RETRIES,
+        cache=cache,
+    )
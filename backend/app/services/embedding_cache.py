@@ -0,0 +1,147 @@
+"""Two-tier cache for text embeddings.
+
+Tier 1 is an in-process LRU bounded by bytes; tier 2 is Redis, shared by
+every API and worker process, holding raw float32 bytes with a TTL. Keys are
+the model (and output dimension) plus a hash of the normalized text, so a
+change of ``EMBEDDING_MODEL`` can never serve vectors from another model.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+import unicodedata
+from collections import OrderedDict
+from collections.abc import Callable, Sequence
+
+import numpy as np
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.core.metrics import InMemoryCounters, ratio
+from app.schemas.metrics import EmbeddingCacheMetrics
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_KEY_PREFIX = "docmind:emb:"
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys (NFC, collapsed whitespace)."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+class LRUVectorCache:
+    """In-process LRU of float32 vectors, bounded by total bytes."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries: OrderedDict[str, np.ndarray] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> np.ndarray | None:
+        vector = self._entries.get(key)
+        if vector is not None:
+            self._entries.move_to_end(key)
+        return vector
+
+    def put(self, key: str, vector: np.ndarray) -> None:
+        if vector.nbytes > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.nbytes -= previous.nbytes
+        self._entries[key] = vector
+        self.nbytes += vector.nbytes
+        while self.nbytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+
+class EmbeddingCache:
+    """LRU in front of Redis for one embedding model.
+
+    Redis failures are logged and treated as misses; the cache never turns a
+    successful embedding call into an error.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        dimension: int,
+        max_bytes: int,
+        ttl_seconds: int,
+        redis_factory: Callable[[], aioredis.Redis] | None = None,
+    ) -> None:
+        self.dimension = dimension
+        self._prefix = f"{EMBEDDING_CACHE_KEY_PREFIX}{model}@{dimension}:"
+        self._lru = LRUVectorCache(max_bytes)
+        self._ttl = ttl_seconds
+        self._redis_factory = redis_factory
+        self._counters = InMemoryCounters()
+
+    def key(self, text: str) -> str:
+        """Cache key for ``text`` under this cache's model."""
+        digest = hashlib.sha256(normalize_text(text).encode()).hexdigest()
+        return self._prefix + digest
+
+    async def get_many(self, texts: Sequence[str]) -> list[np.ndarray | None]:
+        """Look up ``texts``; entries are None where both tiers miss."""
+        keys = [self.key(t) for t in texts]
+        found: list[np.ndarray | None] = [self._lru.get(k) for k in keys]
+        pending = [i for i, v in enumerate(found) if v is None]
+        self._counters.incr("l1_hits", len(keys) - len(pending))
+
+        if pending and self._redis_factory is not None:
+            blobs = await self._redis_get([keys[i] for i in pending])
+            for i, blob in zip(pending, blobs, strict=True):
+                if blob is not None and len(blob) == self.dimension * 4:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    self._lru.put(keys[i], vector)
+                    found[i] = vector
+                    self._counters.incr("l2_hits")
+
+        self._counters.incr("misses", sum(v is None for v in found))
+        return found
+
+    async def put_many(self, texts: Sequence[str], vectors: np.ndarray) -> None:
+        """Store freshly computed vectors in both tiers."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        keys = [self.key(t) for t in texts]
+        for key, vector in zip(keys, vectors, strict=True):
+            self._lru.put(key, vector.copy())
+        if self._redis_factory is None:
+            return
+        try:
+            async with self._redis_factory().pipeline(transaction=False) as pipe:
+                for key, vector in zip(keys, vectors, strict=True):
+                    pipe.set(key, vector.tobytes(), ex=self._ttl)
+                await pipe.execute()
+        except RedisError as exc:
+            logger.warning("Embedding cache write failed: %s", exc)
+
+    async def _redis_get(self, keys: list[str]) -> list[bytes | None]:
+        try:
+            return await self._redis_factory().mget(keys)
+        except RedisError as exc:
+            logger.warning("Embedding cache read failed: %s", exc)
+            return [None] * len(keys)
+
+    def stats(self) -> EmbeddingCacheMetrics:
+        """Hit/miss counters for this process."""
+        counts = self._counters.snapshot()
+        l1, l2 = counts.get("l1_hits", 0), counts.get("l2_hits", 0)
+        misses = counts.get("misses", 0)
+        return EmbeddingCacheMetrics(
+            l1_hits=l1,
+            l2_hits=l2,
+            misses=misses,
+            hit_rate=ratio(l1 + l2, l1 + l2 + misses),
+            l1_entries=len(self._lru),
+            l1_bytes=self._lru.nbytes,
+        )
@@ -0,0 +1,99 @@
+"""Lazy text extraction from stored documents.
+
+Text is yielded one page at a time (PDF) or one block of lines at a time
+(Markdown / plain text), so only the current page is ever held in memory.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+import pymupdf
+
+PDF_MIME_TYPE = "application/pdf"
+TEXT_BLOCK_CHARS = 64 * 1024  # Plain-text files are yielded in ~64K-char blocks
+
+
+class ExtractionError(Exception):
+    """Raised when a document cannot be opened or yields no text."""
+
+
+@dataclass(frozen=True)
+class PageText:
+    """Text of one page (1-based); plain-text files are a single page."""
+
+    page_number: int
+    text: str
+
+
+def is_pdf(path: Path, mime_type: str | None) -> bool:
+    """Whether the document is a PDF (by declared type, else by suffix)."""
+    return mime_type == PDF_MIME_TYPE or (
+        mime_type is None and path.suffix.lower() == ".pdf"
+    )
+
+
+def iter_pages(
+    path: Path, mime_type: str | None = None, pages: range | None = None
+) -> Iterator[PageText]:
+    """Yield the text of ``path`` page by page.
+
+    Args:
+        path: Local copy of the document.
+        mime_type: Declared content type; falls back to the file suffix.
+        pages: 1-based page numbers to read from a PDF (default: all);
+            text files are a single page.
+
+    Raises:
+        ExtractionError: If a PDF cannot be opened.
+    """
+    if is_pdf(path, mime_type):
+        yield from _iter_pdf_pages(path, pages)
+    else:
+        yield from _iter_text_blocks(path)
+
+
+def page_count(path: Path, mime_type: str | None = None) -> int:
+    """Return the number of pages of a PDF (1 for text files).
+
+    Raises:
+        ExtractionError: If a PDF cannot be opened.
+    """
+    if not is_pdf(path, mime_type):
+        return 1
+    with _open_pdf(path) as document:
+        return document.page_count
+
+
+def _open_pdf(path: Path) -> pymupdf.Document:
+    try:
+        return pymupdf.open(path)
+    except (pymupdf.FileDataError, RuntimeError) as exc:
+        raise ExtractionError(f"Cannot open PDF: {exc}") from exc
+
+
+def _iter_pdf_pages(path: Path, pages: range | None) -> Iterator[PageText]:
+    with _open_pdf(path) as document:
+        if pages is None:
+            selected = document.pages()
+        else:
+            selected = document.pages(pages.start - 1, pages.stop - 1)
+        for page in selected:
+            yield PageText(page.number + 1, page.get_text())
+
+
+def _iter_text_blocks(path: Path) -> Iterator[PageText]:
+    # Blocks end on line boundaries so no token is split between two blocks.
+    with path.open(encoding="utf-8", errors="replace") as handle:
+        block: list[str] = []
+        size = 0
+        for line in handle:
+            block.append(line)
+            size += len(line)
+            if size >= TEXT_BLOCK_CHARS:
+                yield PageText(1, "".join(block))
+                block, size = [], 0
+        if block:
+            yield PageText(1, "".join(block))
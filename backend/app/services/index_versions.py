@@ -0,0 +1,232 @@
+"""Versioned search indexes for zero-downtime re-embedding.
+
+Every chunk row carries the ``index_version`` it was chunked and embedded
+for. An ``IndexSpec`` is what determines the rows of a version (embedding
+provider, model and dimension, chunk size, overlap and tokenizer); each
+distinct spec gets a version id (``v1``, ``v2``, ...). Queries and fresh
+ingestion use the *active* version. When the configured spec differs from
+the active one it becomes the *target*: a throttled background migration
+re-chunks and re-embeds every READY document into it while queries keep
+using the active version, then ``cut_over`` switches the active version
+atomically and the old rows are dropped.
+
+The registry lives in Redis so the API processes and every worker agree on
+the active version. Rows that predate versioning are ``v1``, which the
+registry assigns to the spec it first sees.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from pathlib import Path
+
+import redis
+
+from app.core.config import settings
+from app.core.constants import EMBEDDING_DIMENSION
+from app.core.redis_client import get_redis
+from app.schemas.metrics import IndexVersionMetrics
+
+INITIAL_INDEX_VERSION = "v1"  # Column default of rows from before versioning
+INDEX_KEY_PREFIX = "docmind:index:"
+ACTIVE_INDEX_KEY = f"{INDEX_KEY_PREFIX}active"  # Read by the answer cache
+_TARGET_KEY = f"{INDEX_KEY_PREFIX}target"
+_SPECS_KEY = f"{INDEX_KEY_PREFIX}specs"  # Version id -> spec JSON
+_IDS_KEY = f"{INDEX_KEY_PREFIX}ids"  # Spec signature -> version id
+_NEXT_KEY = f"{INDEX_KEY_PREFIX}next"
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """Settings that determine the chunks and vectors of an index version."""
+
+    embedding_provider: str
+    embedding_model: str
+    embedding_dimension: int
+    chunk_size: int
+    chunk_overlap: int
+    chunk_tokenizer: str
+
+    @classmethod
+    def from_settings(cls) -> IndexSpec:
+        """The spec the current configuration asks for."""
+        return cls(
+            embedding_provider=settings.EMBEDDING_PROVIDER,
+            embedding_model=settings.EMBEDDING_MODEL,
+            embedding_dimension=EMBEDDING_DIMENSION,
+            chunk_size=settings.CHUNK_SIZE_TOKENS,
+            chunk_overlap=settings.CHUNK_OVERLAP_TOKENS,
+            chunk_tokenizer=settings.CHUNK_TOKENIZER,
+        )
+
+    @property
+    def signature(self) -> str:
+        """Stable string identifying the spec."""
+        return ":".join(str(value) for value in asdict(self).values())
+
+
+@dataclass(frozen=True)
+class IndexVersion:
+    """A registered version id and the spec its rows were built with."""
+
+    id: str
+    spec: IndexSpec
+
+
+def shard_root(root: str | Path, version_id: str) -> Path:
+    """Directory under ``root`` of every user's shards for one index version."""
+    # Shards written before versioning stay where they are.
+    return (
+        Path(root) if version_id == INITIAL_INDEX_VERSION else Path(root) / version_id
+    )
+
+
+class IndexVersions:
+    """Redis registry of index versions and re-embedding progress."""
+
+    def __init__(self, client: redis.Redis) -> None:
+        self._client = client
+        self._specs: dict[str, IndexSpec] = {}  # Immutable once registered
+
+    def active(self) -> IndexVersion:
+        """The version queries and fresh ingestion use.
+
+        On first use the configured spec is registered as ``v1`` and made
+        active, which labels the rows written before versioning.
+        """
+        version_id = self._client.get(ACTIVE_INDEX_KEY)
+        if version_id is None:
+            version = self.register(IndexSpec.from_settings())
+            self._client.set(ACTIVE_INDEX_KEY, version.id, nx=True)
+            version_id = self._client.get(ACTIVE_INDEX_KEY)
+        return self.get(_text(version_id))
+
+    def target(self) -> IndexVersion | None:
+        """The version being built by a migration, if one is running."""
+        version_id = self._client.get(_TARGET_KEY)
+        return None if version_id is None else self.get(_text(version_id))
+
+    def register(self, spec: IndexSpec) -> IndexVersion:
+        """Return the version of ``spec``, assigning the next id if new."""
+        version_id = self._client.hget(_IDS_KEY, spec.signature)
+        if version_id is None:
+            candidate = f"v{self._client.incr(_NEXT_KEY)}"
+            with self._client.pipeline(transaction=True) as pipe:
+                pipe.hsetnx(_IDS_KEY, spec.signature, candidate)
+                pipe.hsetnx(_SPECS_KEY, candidate, json.dumps(asdict(spec)))
+                pipe.execute()
+            # Another process may have registered the spec first.
+            version_id = self._client.hget(_IDS_KEY, spec.signature)
+        return self.get(_text(version_id))
+
+    def begin(self, spec: IndexSpec) -> IndexVersion | None:
+        """Make ``spec`` the migration target unless it is already active.
+
+        Returns:
+            The target version, or None if ``spec`` is the active version
+            (any other target is then abandoned).
+        """
+        active = self.active()
+        if spec == active.spec:
+            self._client.delete(_TARGET_KEY)
+            return None
+        target = self.register(spec)
+        self._client.set(_TARGET_KEY, target.id)
+        return target
+
+    def claim(self, version_id: str, document_id: str, lease_seconds: int) -> bool:
+        """Claim a document for re-embedding; False if claimed recently."""
+        key = f"{INDEX_KEY_PREFIX}{version_id}:claim:{document_id}"
+        return bool(self._client.set(key, 1, nx=True, ex=lease_seconds))
+
+    def claim_sweep(self, version_id: str, lease_seconds: int) -> bool:
+        """Claim the next sweep of a migration; False if another ran recently.
+
+        A sweep that loses the claim ends its chain, so duplicate chains
+        (e.g. started by several workers) die out.
+        """
+        return self.claim(version_id, "sweep", lease_seconds)
+
+    def migrated(self, version_id: str, document_id: str, user_id: str) -> None:
+        """Record that a document's rows for ``version_id`` are published."""
+        with self._client.pipeline(transaction=True) as pipe:
+            pipe.sadd(f"{INDEX_KEY_PREFIX}{version_id}:done", document_id)
+            pipe.sadd(f"{INDEX_KEY_PREFIX}{version_id}:users", user_id)
+            pipe.execute()
+
+    def unmigrated(self, version_id: str, document_ids: list[str]) -> list[str]:
+        """The documents among ``document_ids`` without rows for ``version_id``."""
+        if not document_ids:
+            return []
+        done = self._client.smismember(
+            f"{INDEX_KEY_PREFIX}{version_id}:done", document_ids
+        )
+        return [doc for doc, is_done in zip(document_ids, done) if not is_done]
+
+    def record_remaining(self, version_id: str, remaining: int) -> None:
+        """Store how many documents the last sweep found left to migrate."""
+        self._client.set(f"{INDEX_KEY_PREFIX}{version_id}:remaining", remaining)
+
+    def progress(self, version_id: str) -> tuple[int, int | None]:
+        """(documents migrated, documents left at the last sweep or None)."""
+        with self._client.pipeline(transaction=False) as pipe:
+            pipe.scard(f"{INDEX_KEY_PREFIX}{version_id}:done")
+            pipe.get(f"{INDEX_KEY_PREFIX}{version_id}:remaining")
+            done, remaining = pipe.execute()
+        return int(done), None if remaining is None else int(remaining)
+
+    def stats(self) -> IndexVersionMetrics:
+        """Active version and the running migration's progress."""
+        active, target = self.active(), self.target()
+        if target is None:
+            return IndexVersionMetrics(active=active.id)
+        migrated, remaining = self.progress(target.id)
+        return IndexVersionMetrics(
+            active=active.id, target=target.id, migrated=migrated, remaining=remaining
+        )
+
+    def cut_over(self, version_id: str) -> tuple[IndexVersion, list[str]]:
+        """Atomically make ``version_id`` active and end its migration.
+
+        Returns:
+            The previously active version and the users with migrated
+            documents, whose cached indexes must be invalidated.
+        """
+        previous = self.active()
+        with self._client.pipeline(transaction=True) as pipe:
+            pipe.set(ACTIVE_INDEX_KEY, version_id)
+            pipe.delete(_TARGET_KEY)
+            pipe.smembers(f"{INDEX_KEY_PREFIX}{version_id}:users")
+            pipe.delete(
+                f"{INDEX_KEY_PREFIX}{version_id}:done",
+                f"{INDEX_KEY_PREFIX}{version_id}:users",
+                f"{INDEX_KEY_PREFIX}{version_id}:remaining",
+            )
+            users = pipe.execute()[2]
+        return previous, sorted(_text(user) for user in users)
+
+    def get(self, version_id: str) -> IndexVersion:
+        """Return a registered version by id.
+
+        Raises:
+            LookupError: If ``version_id`` was never registered.
+        """
+        spec = self._specs.get(version_id)
+        if spec is None:
+            raw = self._client.hget(_SPECS_KEY, version_id)
+            if raw is None:
+                raise LookupError(f"Unknown index version: {version_id}")
+            spec = self._specs[version_id] = IndexSpec(**json.loads(raw))
+        return IndexVersion(version_id, spec)
+
+
+def _text(value: bytes | str) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+@lru_cache(maxsize=1)
+def get_index_versions() -> IndexVersions:
+    """Return the Redis-backed registry (one per process)."""
+    return IndexVersions(get_redis())
@@ -0,0 +1,266 @@
+"""Bounded extract → chunk → embed → store pipeline.
+
+Extraction and chunking are lazy generators; chunks are pulled in batches of
+``batch_size``, each batch is embedded, and its rows are written while the
+next batch is extracted and embedded. At most two batches, plus rows the sink
+buffers for one bulk insert, are alive at any time, so peak memory depends on
+the batch and bulk sizes rather than the document.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import tempfile
+from collections.abc import Callable, Iterator, Sequence
+from itertools import islice
+from pathlib import Path, PurePosixPath
+from typing import Any, Protocol
+
+import numpy as np
+
+from app.services.chunking import Chunk, Tokenizer, iter_chunks
+from app.services.database import STAGING_TABLE, SupabaseDatabase
+from app.services.embedding import EmbeddingService
+from app.services.extraction import ExtractionError, iter_pages, page_count
+from app.services.index_versions import INITIAL_INDEX_VERSION
+from app.services.storage import ObjectStorage
+
+logger = logging.getLogger(__name__)
+
+VECTOR_WIRE_DECIMALS = 7
+SHARD_INDEX_STRIDE = 1_000_000  # Staged chunk_index = shard * stride + position
+
+
+class ChunkSink(Protocol):
+    """Destination for embedded chunks of one document."""
+
+    async def clear(self, document_id: str) -> None: ...
+
+    async def write(
+        self,
+        document_id: str,
+        user_id: str,
+        chunks: Sequence[Chunk],
+        vectors: np.ndarray,
+    ) -> None: ...
+
+    async def publish(self, document_id: str, count: int) -> None: ...
+
+
+class StagedChunkSink:
+    """Bulk-writes chunk rows to staging, then publishes them in one step.
+
+    Rows from successive embedding batches are buffered and inserted
+    ``database.bulk_rows`` per request into a staging table that search
+    never reads. ``publish`` moves them into ``document_chunks`` and marks the document
+    READY in one transaction, so a document is never searchable half-written
+    and a retried task cannot leave duplicate chunks behind.
+
+    With ``shard`` set the sink stages one page range of a sharded document:
+    chunk indexes are offset by ``shard * SHARD_INDEX_STRIDE``, ``clear``
+    only drops that shard's rows and ``publish`` only flushes, leaving the
+    publish of all shards to the finalizer.
+
+    Rows are written for ``index_version``; publishing replaces only that
+    version's rows of the document, so re-embedding into a new version
+    never touches the rows search is using.
+    """
+
+    def __init__(
+        self,
+        database: SupabaseDatabase,
+        shard: int | None = None,
+        index_version: str = INITIAL_INDEX_VERSION,
+    ) -> None:
+        self._database = database
+        self._shard = shard
+        self._index_version = index_version
+        self._pending: list[dict[str, Any]] = []
+
+    async def clear(self, document_id: str) -> None:
+        # Rows staged by a failed attempt would fail the publish count check.
+        self._pending.clear()
+        await self._database.discard_staged_chunks(
+            document_id, self._indexes, self._index_version
+        )
+
+    async def write(
+        self,
+        document_id: str,
+        user_id: str,
+        chunks: Sequence[Chunk],
+        vectors: np.ndarray,
+    ) -> None:
+        rows = chunk_rows(document_id, user_id, chunks, vectors)
+        for row in rows:
+            row["index_version"] = self._index_version
+            if self._indexes is not None:
+                row["chunk_index"] += self._indexes.start
+        self._pending.extend(rows)
+        full = len(self._pending) - len(self._pending) % self._database.bulk_rows
+        if full:
+            await self._flush(full)
+
+    async def publish(self, document_id: str, count: int) -> None:
+        await self._flush(len(self._pending))
+        if self._shard is None:
+            await self._database.publish_chunks(document_id, count, self._index_version)
+
+    @property
+    def _indexes(self) -> range | None:
+        if self._shard is None:
+            return None
+        start = self._shard * SHARD_INDEX_STRIDE
+        return range(start, start + SHARD_INDEX_STRIDE)
+
+    async def _flush(self, count: int) -> None:
+        rows, self._pending = self._pending[:count], self._pending[count:]
+        if rows:
+            await self._database.insert_chunks(rows, table=STAGING_TABLE)
+
+
+def chunk_rows(
+    document_id: str, user_id: str, chunks: Sequence[Chunk], vectors: np.ndarray
+) -> list[dict[str, Any]]:
+    """Build ``document_chunks`` rows for a batch of embedded chunks."""
+    # float32 values printed in full take ~17 digits each; rounding keeps the
+    # JSON payload about half the size at a cosine error near 1e-6.
+    embeddings = vectors.astype(np.float64).round(VECTOR_WIRE_DECIMALS).tolist()
+    return [
+        {
+            "document_id": document_id,
+            "user_id": user_id,
+            "chunk_index": chunk.index,
+            "page_number": chunk.page_number,
+            "char_start": chunk.char_start,
+            "char_end": chunk.char_end,
+            "content": chunk.text,
+            "embedding": embedding,
+        }
+        for chunk, embedding in zip(chunks, embeddings, strict=True)
+    ]
+
+
+def _batched(chunks: Iterator[Chunk], size: int) -> Iterator[list[Chunk]]:
+    while batch := list(islice(chunks, size)):
+        yield batch
+
+
+async def ingest_file(
+    path: Path,
+    mime_type: str | None,
+    document_id: str,
+    user_id: str,
+    embedder: EmbeddingService,
+    sink: ChunkSink,
+    chunk_size: int,
+    overlap: int,
+    batch_size: int,
+    tokenizer: Tokenizer | None = None,
+    pages: range | None = None,
+    progress: Callable[[int, int], None] | None = None,
+) -> int:
+    """Stream a local file through chunking and embedding into ``sink``.
+
+    The chunks are published once all of them are written; with
+    ``StagedChunkSink`` that also marks the document READY.
+
+    Args:
+        pages: Only these 1-based PDF pages (one shard); a shard without
+            text is not an error.
+        progress: Called with the pages extracted and chunks embedded so
+            far after each batch is embedded.
+
+    Returns:
+        Number of chunks written.
+
+    Raises:
+        ExtractionError: If the document contains no extractable text.
+        EmbeddingError: If embedding a batch fails permanently.
+        DatabaseError: If writing or publishing the chunks fails.
+    """
+    batches = _batched(
+        iter_chunks(iter_pages(path, mime_type, pages), chunk_size, overlap, tokenizer),
+        batch_size,
+    )
+    await sink.clear(document_id)
+
+    total = 0
+    writing: asyncio.Task[None] | None = None
+    try:
+        # Page extraction is blocking (PyMuPDF), so it runs off the loop and
+        # overlaps with the previous batch's insert.
+        while batch := await asyncio.to_thread(next, batches, None):
+            vectors = await embedder.embed_documents([c.text for c in batch])
+            if writing is not None:
+                await writing
+            writing = asyncio.create_task(
+                sink.write(document_id, user_id, batch, vectors)
+            )
+            total += len(batch)
+            if progress is not None:
+                progress(batch[-1].page_number, total)
+    finally:
+        if writing is not None:
+            await writing
+
+    if total == 0 and pages is None:
+        raise ExtractionError("Document contains no extractable text.")
+    await sink.publish(document_id, total)
+    return total
+
+
+async def ingest_document(
+    storage: ObjectStorage,
+    storage_path: str,
+    mime_type: str | None,
+    document_id: str,
+    user_id: str,
+    embedder: EmbeddingService,
+    sink: ChunkSink,
+    chunk_size: int,
+    overlap: int,
+    batch_size: int,
+    tokenizer: Tokenizer | None = None,
+    pages: range | None = None,
+    progress: Callable[[int, int], None] | None = None,
+) -> int:
+    """Download a stored document to a temp file and ingest it.
+
+    Args:
+        pages: Only these 1-based PDF pages (see ``ingest_file``).
+        progress: Per-batch progress callback (see ``ingest_file``).
+
+    Returns:
+        Number of chunks written.
+    """
+    with tempfile.TemporaryDirectory(prefix="docmind-") as tmp:
+        local = Path(tmp) / (PurePosixPath(storage_path).name or "document")
+        await storage.download_to(storage_path, local)
+        count = await ingest_file(
+            local,
+            mime_type,
+            document_id,
+            user_id,
+            embedder,
+            sink,
+            chunk_size=chunk_size,
+            overlap=overlap,
+            batch_size=batch_size,
+            tokenizer=tokenizer,
+            pages=pages,
+            progress=progress,
+        )
+    logger.info("Ingested doc_id=%s: %d chunks", document_id, count)
+    return count
+
+
+async def count_pages(
+    storage: ObjectStorage, storage_path: str, mime_type: str | None
+) -> int:
+    """Download a stored document and return its page count."""
+    with tempfile.TemporaryDirectory(prefix="docmind-") as tmp:
+        local = Path(tmp) / (PurePosixPath(storage_path).name or "document")
+        await storage.download_to(storage_path, local)
+        return await asyncio.to_thread(page_count, local, mime_type)
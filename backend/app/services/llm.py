@@ -0,0 +1,48 @@
+"""Chat model used for answer generation.
+
+Models are LangChain chat models so the agent graph can stream their tokens:
+when a node calls ``ainvoke`` inside a run streamed with the ``messages``
+mode, LangChain switches the provider call to its streaming API and
+LangGraph forwards every chunk as it arrives.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+
+from langchain_core.language_models import BaseChatModel
+
+from app.core.config import settings
+
+
+def build_chat_model(name: str, model: str) -> BaseChatModel:
+    """Instantiate the chat model selected by ``LLM_PROVIDER``.
+
+    Raises:
+        ValueError: If the provider name is unknown.
+    """
+    if name == "gemini":
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        return ChatGoogleGenerativeAI(
+            model=model, google_api_key=settings.GOOGLE_API_KEY
+        )
+    if name in ("openai", "qwen"):
+        from langchain_openai import ChatOpenAI
+
+        return ChatOpenAI(
+            model=model,
+            stream_usage=True,  # Report output token counts on the last chunk
+            **(
+                {"api_key": settings.QWEN_API_KEY, "base_url": settings.QWEN_BASE_URL}
+                if name == "qwen"
+                else {"api_key": settings.OPENAI_API_KEY}
+            ),
+        )
+    raise ValueError(f"Unknown LLM provider: {name}")
+
+
+@lru_cache(maxsize=1)
+def get_chat_model() -> BaseChatModel:
+    """Return the cached chat model for the configured provider and model."""
+    return build_chat_model(settings.LLM_PROVIDER, settings.LLM_MODEL)
@@ -0,0 +1,110 @@
+"""Scalar and product quantization of stored embeddings.
+
+A 768-dimensional float32 embedding costs 3 KiB. Scalar quantization keeps
+one int8 per dimension plus a per-row scale (4x smaller). Product
+quantization (PQ) splits a vector into ``m`` sub-vectors and stores, for
+each, the index of the nearest of 256 codewords learned per subspace by
+k-means: one byte per sub-vector, so 96 bytes for 768 dimensions (32x).
+
+Search is asymmetric (ADC): the float query is scored against the codes
+without decoding the corpus. For int8 that is a float matmul scaled per
+row; for PQ it is a per-query table of query·codeword for every subspace,
+gathered by the codes and summed.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+PQ_CODEWORDS = 256  # One uint8 code per sub-vector
+PQ_SUBVECTORS = 96  # 8 dimensions per sub-quantizer at 768d
+PQ_MIN_TRAIN_ROWS = 1024  # Fewer rows are kept unquantized until trained
+PQ_TRAIN_SAMPLE = 32 * PQ_CODEWORDS  # k-means points per subspace
+PQ_KMEANS_ITERATIONS = 10
+_ENCODE_BLOCK_ROWS = 8192
+
+
+def scalar_quantize(vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Per-row symmetric int8 quantization: (codes, scales)."""
+    scales = np.abs(vectors).max(axis=1) / 127
+    scales = np.maximum(scales, 1e-12).astype(np.float32)
+    codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales
+
+
+def train_codebooks(
+    vectors: np.ndarray, n_subvectors: int = PQ_SUBVECTORS, seed: int = 0
+) -> np.ndarray:
+    """Learn (m, k, d/m) PQ codewords by k-means in each subspace.
+
+    Raises:
+        ValueError: If the dimension is not divisible by ``n_subvectors``.
+    """
+    n, dimension = vectors.shape
+    if dimension % n_subvectors:
+        raise ValueError(
+            f"Dimension {dimension} is not divisible into {n_subvectors} subvectors"
+        )
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(n, min(n, PQ_TRAIN_SAMPLE), replace=False)]
+    sample = sample.reshape(len(sample), n_subvectors, -1)
+    k = min(PQ_CODEWORDS, len(sample))
+    codebooks = np.empty((n_subvectors, k, sample.shape[2]), dtype=np.float32)
+    for m in range(n_subvectors):
+        points = sample[:, m]
+        centroids = points[rng.choice(len(points), k, replace=False)].copy()
+        for _ in range(PQ_KMEANS_ITERATIONS):
+            labels = _nearest(points, centroids)
+            sums = np.stack(
+                [
+                    np.bincount(labels, weights=points[:, j], minlength=k)
+                    for j in range(points.shape[1])
+                ],
+                axis=1,
+            ).astype(np.float32)
+            counts = np.bincount(labels, minlength=k)
+            empty = counts == 0
+            # Re-seed empty codewords with random points so none goes unused.
+            sums[empty] = points[rng.choice(len(points), int(empty.sum()))]
+            counts[empty] = 1
+            centroids = sums / counts[:, None]
+        codebooks[m] = centroids
+    return codebooks
+
+
+def pq_encode(vectors: np.ndarray, codebooks: np.ndarray) -> np.ndarray:
+    """Nearest-codeword index of every sub-vector: (n, m) uint8."""
+    n_subvectors = len(codebooks)
+    codes = np.empty((len(vectors), n_subvectors), dtype=np.uint8)
+    for start in range(0, len(vectors), _ENCODE_BLOCK_ROWS):
+        block = vectors[start : start + _ENCODE_BLOCK_ROWS]
+        block = block.reshape(len(block), n_subvectors, -1)
+        for m in range(n_subvectors):
+            codes[start : start + len(block), m] = _nearest(block[:, m], codebooks[m])
+    return codes
+
+
+def pq_decode(codes: np.ndarray, codebooks: np.ndarray) -> np.ndarray:
+    """Reconstruct float32 vectors from PQ codes."""
+    parts = codebooks[np.arange(len(codebooks)), codes]  # (n, m, d/m)
+    return parts.reshape(len(codes), -1)
+
+
+def adc_table(codebooks: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Inner product of each query sub-vector with every codeword: (m, k)."""
+    return np.einsum("mkd,md->mk", codebooks, query.reshape(len(codebooks), -1)).astype(
+        np.float32
+    )
+
+
+def adc_scores(table: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """Approximate query·vector for PQ ``codes`` using an ``adc_table``."""
+    # Flat gather: code c of subspace m lives at m * k + c in the table.
+    offsets = np.arange(len(table), dtype=np.intp) * table.shape[1]
+    return np.take(table.ravel(), codes + offsets).sum(axis=1, dtype=np.float32)
+
+
+def _nearest(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    # argmin |x - c|^2 == argmax (x·c - |c|^2 / 2)
+    half_norms = 0.5 * np.einsum("kd,kd->k", centroids, centroids)
+    return np.argmax(points @ centroids.T - half_norms, axis=1)
@@ -0,0 +1,550 @@
+"""Hybrid BM25 + vector retrieval over a user's knowledge base.
+
+Each user's chunks are loaded once into an in-process ``KnowledgeBaseIndex``:
+a compressed-sparse-row inverted index for BM25 (one flat array of doc ids
+and term frequencies, sliced per term) and an L2-normalized float32 matrix
+for cosine similarity. A query scores both with vectorized NumPy, takes each
+list's top candidates with ``argpartition`` (O(n) instead of a full sort),
+and merges them with reciprocal-rank fusion.
+
+The vector side is pluggable (``RETRIEVAL_VECTOR_INDEX``): ``exact`` loads
+every embedding from Postgres into process memory; ``shard`` scans per-user
+vector shards memory-mapped from local disk, so API processes on a node
+share one page-cache copy; ``ivf`` probes the shards' IVF lists, so large
+knowledge bases are not scanned in full per query. The worker appends a
+document's vectors to the shards when it is ready; deletion tombstones them.
+
+Indexes are cached per user and rebuilt when the worker bumps the user's
+knowledge-base version in Redis after ingesting a document.
+
+Only chunks of the active index version (see ``app.services.index_versions``)
+are searched, and queries are embedded with that version's model, so a
+re-embedding migration running in the background is invisible until it
+cuts over; indexes are keyed by the version and rebuilt after a cut-over.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import re
+import shutil
+from collections import OrderedDict
+from collections.abc import Callable, Iterator, Sequence
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Protocol
+
+import numpy as np
+import redis
+from supabase import Client
+
+from app.core.config import settings
+from app.core.constants import (
+    BM25_B,
+    BM25_K1,
+    EMBEDDING_DIMENSION,
+    RRF_K,
+    VECTOR_SIMILARITY_THRESHOLD,
+)
+from app.core.redis_client import get_redis
+from app.core.supabase_client import get_supabase_client
+from app.services.embedding import (
+    EmbeddingService,
+    get_embedding_service,
+    get_embedding_service_for,
+)
+from app.services.index_versions import (
+    INITIAL_INDEX_VERSION,
+    IndexSpec,
+    IndexVersion,
+    IndexVersions,
+    get_index_versions,
+    shard_root,
+)
+from app.services.vector_index import (
+    ExactIndex,
+    ShardVectorIndex,
+    VectorIndex,
+    VectorShards,
+    VectorShardWriter,
+    top_k_indices,
+    user_shard_path,
+)
+
+logger = logging.getLogger(__name__)
+
+KB_VERSION_KEY_PREFIX = "docmind:kb-version:"
+CHUNKS_PAGE_SIZE = 1000  # PostgREST max rows per request
+CANDIDATES_PER_LIST = 4  # Each ranker contributes top_k * this to the fusion
+
+_TERM = re.compile(r"\w+")
+
+
+@dataclass(frozen=True)
+class ChunkRecord:
+    """Citation metadata for one indexed chunk."""
+
+    document_id: str
+    filename: str
+    chunk_index: int
+    page_number: int | None
+    content: str
+    char_start: int | None = None  # Span in the page text; None on old rows
+    char_end: int | None = None
+
+
+@dataclass(frozen=True)
+class RetrievedChunk:
+    """One fused retrieval result."""
+
+    document_id: str
+    filename: str
+    chunk_index: int
+    page_number: int | None
+    content: str
+    score: float  # Reciprocal-rank fusion score
+    similarity: float  # Cosine similarity to the query
+    char_start: int | None = None
+    char_end: int | None = None
+
+
+@dataclass(frozen=True)
+class RetrievalResult:
+    """Fused top-k chunks and the best cosine similarity among them."""
+
+    chunks: list[RetrievedChunk]
+    confidence: float
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased word terms used by BM25 for documents and queries."""
+    return _TERM.findall(text.lower())
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[np.ndarray], k: int = RRF_K
+) -> tuple[np.ndarray, np.ndarray]:
+    """Fuse ranked lists of doc ids into (ids, scores), best first."""
+    fused: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking.tolist()):
+            fused[doc] = fused.get(doc, 0.0) + 1.0 / (k + rank + 1)
+    ids = np.fromiter(fused, dtype=np.int64, count=len(fused))
+    scores = np.fromiter(fused.values(), dtype=np.float64, count=len(fused))
+    order = np.argsort(-scores, kind="stable")
+    return ids[order], scores[order]
+
+
+class BM25Index:
+    """Okapi BM25 over an array-backed inverted index.
+
+    Postings for term ``t`` are ``doc_ids[indptr[t]:indptr[t + 1]]`` with
+    matching ``term_freqs``; there are no per-term Python lists.
+    """
+
+    def __init__(
+        self, texts: Sequence[str], k1: float = BM25_K1, b: float = BM25_B
+    ) -> None:
+        n_docs = len(texts)
+        vocabulary: dict[str, int] = {}
+        term_ids: list[int] = []
+        lengths = np.zeros(n_docs, dtype=np.int64)
+        for doc, text in enumerate(texts):
+            terms = tokenize(text)
+            lengths[doc] = len(terms)
+            term_ids.extend(vocabulary.setdefault(t, len(vocabulary)) for t in terms)
+        doc_ids = np.repeat(np.arange(n_docs, dtype=np.int64), lengths)
+
+        # One sort of (term, doc) keys groups postings by term and counts tf.
+        stride = max(n_docs, 1)
+        keys, freqs = np.unique(
+            np.asarray(term_ids, dtype=np.int64) * stride + doc_ids,
+            return_counts=True,
+        )
+        self.vocabulary = vocabulary
+        self.doc_ids = (keys % stride).astype(np.int32)
+        self.term_freqs = freqs.astype(np.float32)
+        self.indptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(keys // stride, minlength=len(vocabulary)),
+            out=self.indptr[1:],
+        )
+
+        doc_freq = np.diff(self.indptr).astype(np.float32)
+        self.idf = np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+        avg_length = float(lengths.mean()) if n_docs else 0.0
+        self._length_norm = (k1 * (1 - b + b * lengths / max(avg_length, 1.0))).astype(
+            np.float32
+        )
+        self._k1 = k1
+        self.n_docs = n_docs
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every document for ``query`` (0 where no term hits)."""
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        term_ids = {self.vocabulary[t] for t in tokenize(query) if t in self.vocabulary}
+        for term in term_ids:
+            lo, hi = self.indptr[term], self.indptr[term + 1]
+            docs, tf = self.doc_ids[lo:hi], self.term_freqs[lo:hi]
+            scores[docs] += (
+                self.idf[term] * tf * (self._k1 + 1) / (tf + self._length_norm[docs])
+            )
+        return scores
+
+
+class KnowledgeBaseIndex:
+    """BM25 and vector indexes over one user's chunks.
+
+    ``vectors`` addresses chunks by their position in ``records``.
+    """
+
+    def __init__(self, records: Sequence[ChunkRecord], vectors: VectorIndex) -> None:
+        self.records = list(records)
+        self.bm25 = BM25Index([r.content for r in records])
+        self.vectors = vectors
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def search(
+        self,
+        query: str,
+        query_vector: np.ndarray,
+        top_k: int,
+        threshold: float = VECTOR_SIMILARITY_THRESHOLD,
+    ) -> RetrievalResult:
+        """Fuse BM25 and cosine rankings into the ``top_k`` best chunks.
+
+        Vector candidates below ``threshold`` are dropped; BM25 candidates
+        need at least one matching term.
+        """
+        if not self.records:
+            return RetrievalResult([], 0.0)
+        candidates = top_k * CANDIDATES_PER_LIST
+
+        norm = float(np.linalg.norm(query_vector)) or 1.0
+        query_vector = query_vector.astype(np.float32) / norm
+        semantic, similarity = self.vectors.search(query_vector, candidates)
+        semantic = semantic[similarity >= threshold]
+
+        bm25 = self.bm25.scores(query)
+        lexical = top_k_indices(bm25, candidates)
+        lexical = lexical[bm25[lexical] > 0]
+
+        ids, fused = reciprocal_rank_fusion([semantic, lexical])
+        ids, fused = ids[:top_k], fused[:top_k]
+        similarity = self.vectors.similarity(ids, query_vector)
+        chunks = [
+            RetrievedChunk(
+                **vars(self.records[doc]),
+                score=float(score),
+                similarity=float(sim),
+            )
+            for doc, score, sim in zip(
+                ids.tolist(), fused, similarity.tolist(), strict=True
+            )
+        ]
+        confidence = max((c.similarity for c in chunks), default=0.0)
+        return RetrievalResult(chunks, max(confidence, 0.0))
+
+
+class KnowledgeBaseStore(Protocol):
+    """Source of a user's indexed chunks and their change counter."""
+
+    def version(self, user_id: str) -> int: ...
+
+    def load(
+        self,
+        user_id: str,
+        with_embeddings: bool = True,
+        index_version: str | None = None,
+    ) -> tuple[list[ChunkRecord], np.ndarray | None]:
+        """Return the user's chunks and, if asked, their embedding matrix.
+
+        With ``index_version`` set, only that version's chunks.
+        """
+        ...
+
+    def document_vectors(
+        self, document_id: str, index_version: str | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Return (chunk_indexes, embeddings) of one document."""
+        ...
+
+
+class SupabaseKnowledgeBaseStore:
+    """Pages ``document_chunks`` out of Supabase; versions live in Redis."""
+
+    def __init__(self, supabase: Client, client: redis.Redis) -> None:
+        self._supabase = supabase
+        self._redis = client
+
+    def version(self, user_id: str) -> int:
+        return int(self._redis.get(KB_VERSION_KEY_PREFIX + user_id) or 0)
+
+    def load(
+        self,
+        user_id: str,
+        with_embeddings: bool = True,
+        index_version: str | None = None,
+    ) -> tuple[list[ChunkRecord], np.ndarray | None]:
+        columns = "document_id, chunk_index, page_number, char_start, char_end, "
+        columns += "content, "
+        if with_embeddings:
+            columns += "embedding, "
+        records: list[ChunkRecord] = []
+        vectors: list[np.ndarray] = []
+        for rows in self._pages(
+            columns + "documents(filename)", "user_id", user_id, index_version
+        ):
+            for row in rows:
+                records.append(
+                    ChunkRecord(
+                        document_id=row["document_id"],
+                        filename=(row.get("documents") or {}).get("filename", ""),
+                        chunk_index=row["chunk_index"],
+                        page_number=row.get("page_number"),
+                        content=row["content"],
+                        char_start=row.get("char_start"),
+                        char_end=row.get("char_end"),
+                    )
+                )
+                if with_embeddings:
+                    vectors.append(_parse_vector(row["embedding"]))
+        return records, _stack(vectors) if with_embeddings else None
+
+    def document_vectors(
+        self, document_id: str, index_version: str | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        chunk_indexes: list[int] = []
+        vectors: list[np.ndarray] = []
+        for rows in self._pages(
+            "chunk_index, embedding", "document_id", document_id, index_version
+        ):
+            for row in rows:
+                chunk_indexes.append(row["chunk_index"])
+                vectors.append(_parse_vector(row["embedding"]))
+        return np.asarray(chunk_indexes, dtype=np.int32), _stack(vectors)
+
+    def _pages(
+        self, columns: str, column: str, value: str, index_version: str | None
+    ) -> Iterator[list[dict]]:
+        start = 0
+        while True:
+            query = self._supabase.table("document_chunks").select(columns)
+            query = query.eq(column, value)
+            if index_version is not None:
+                query = query.eq("index_version", index_version)
+            rows = (
+                query.order("document_id")
+                .order("chunk_index")
+                .range(start, start + CHUNKS_PAGE_SIZE - 1)
+                .execute()
+                .data
+            )
+            yield rows
+            if len(rows) < CHUNKS_PAGE_SIZE:
+                return
+            start += CHUNKS_PAGE_SIZE
+
+
+def _stack(vectors: list[np.ndarray]) -> np.ndarray:
+    if not vectors:
+        return np.empty((0, EMBEDDING_DIMENSION), dtype=np.float32)
+    return np.vstack(vectors)
+
+
+def _parse_vector(value: str | list[float]) -> np.ndarray:
+    # PostgREST serializes pgvector columns as "[0.1,0.2,...]" strings.
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
+
+def bump_kb_version(client: redis.Redis, user_id: str) -> None:
+    """Mark a user's knowledge base as changed so API indexes reload."""
+    client.incr(KB_VERSION_KEY_PREFIX + user_id)
+
+
+def add_to_vector_index(
+    store: KnowledgeBaseStore,
+    user_id: str,
+    document_id: str,
+    index_version: str = INITIAL_INDEX_VERSION,
+) -> None:
+    """Append a ready document's vectors to the user's shards, if enabled."""
+    if settings.RETRIEVAL_VECTOR_INDEX == "exact":
+        return
+    chunk_indexes, vectors = store.document_vectors(document_id, index_version)
+    _shard_writer(user_id, index_version).add(document_id, chunk_indexes, vectors)
+
+
+def remove_from_vector_index(user_id: str, document_id: str) -> None:
+    """Tombstone a deleted document in the user's shards, if enabled.
+
+    Shards of a version still being built are updated too.
+    """
+    if settings.RETRIEVAL_VECTOR_INDEX == "exact":
+        return
+    versions = get_index_versions()
+    live = [versions.active(), versions.target()]
+    for version in filter(None, live):
+        _shard_writer(user_id, version.id).remove(document_id)
+
+
+def drop_vector_index(user_id: str, index_version: str) -> None:
+    """Delete the user's shards of a retired index version."""
+    path = user_shard_path(
+        shard_root(settings.VECTOR_SHARD_DIR, index_version), user_id
+    )
+    # Readers of the old version keep their memory maps of unlinked files.
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def _shard_writer(user_id: str, index_version: str) -> VectorShardWriter:
+    return VectorShardWriter(
+        user_shard_path(shard_root(settings.VECTOR_SHARD_DIR, index_version), user_id),
+        dtype=settings.VECTOR_SHARD_DTYPE,
+        keep_raw=settings.VECTOR_SHARD_RERANK > 0,
+    )
+
+
+class RetrievalService:
+    """Per-user hybrid search with an LRU of in-memory indexes.
+
+    With ``shard_dir`` set, vectors are memory-mapped from each user's shards
+    under that directory instead of being loaded from the store, and scanned
+    exhaustively (``nprobe=None``) or through their IVF lists, re-ranking
+    the best ``rerank`` candidates exactly if the shards keep float32 copies.
+
+    With ``versions`` set, only the active index version's chunks are
+    searched and queries are embedded by ``embedders(active.spec)``
+    (``embedder`` if None); cached indexes are keyed by the version.
+    """
+
+    def __init__(
+        self,
+        store: KnowledgeBaseStore,
+        embedder: EmbeddingService,
+        max_users: int = 32,
+        shard_dir: str | Path | None = None,
+        nprobe: int | None = None,
+        shard_dtype: str = "float32",
+        rerank: int = 0,
+        versions: IndexVersions | None = None,
+        embedders: Callable[[IndexSpec], EmbeddingService] | None = None,
+    ) -> None:
+        self._store = store
+        self._embedder = embedder
+        self._versions = versions
+        self._embedders = embedders
+        self._max_users = max_users
+        self._shard_dir = shard_dir
+        self._nprobe = nprobe
+        self._shard_dtype = shard_dtype
+        self._rerank = rerank
+        self._indexes: OrderedDict[
+            str, tuple[tuple[str | None, int], KnowledgeBaseIndex]
+        ] = OrderedDict()
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def search(
+        self, user_id: str, query: str, top_k: int | None = None
+    ) -> RetrievalResult:
+        """Return the fused ``top_k`` chunks of ``user_id``'s KB for ``query``."""
+        active: IndexVersion | None = None
+        embedder = self._embedder
+        if self._versions is not None:
+            active = await asyncio.to_thread(self._versions.active)
+            if self._embedders is not None:
+                embedder = self._embedders(active.spec)
+        index, query_vector = await asyncio.gather(
+            self._index(user_id, active and active.id), embedder.embed_query(query)
+        )
+        return index.search(query, query_vector, top_k or settings.TOP_K_RETRIEVAL)
+
+    async def _index(
+        self, user_id: str, index_version: str | None = None
+    ) -> KnowledgeBaseIndex:
+        kb_version = await asyncio.to_thread(self._store.version, user_id)
+        version = (index_version, kb_version)
+        cached = self._indexes.get(user_id)
+        if cached is not None and cached[0] == version:
+            self._indexes.move_to_end(user_id)
+            return cached[1]
+
+        async with self._locks.setdefault(user_id, asyncio.Lock()):
+            cached = self._indexes.get(user_id)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            index = await asyncio.to_thread(self._build, user_id, index_version)
+            self._indexes[user_id] = (version, index)
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self._max_users:
+                evicted, _ = self._indexes.popitem(last=False)
+                self._locks.pop(evicted, None)
+            logger.info("Built KB index: user=%s chunks=%d", user_id, len(index))
+            return index
+
+    def _build(self, user_id: str, index_version: str | None) -> KnowledgeBaseIndex:
+        if self._shard_dir is None:
+            records, embeddings = self._store.load(user_id, index_version=index_version)
+            return KnowledgeBaseIndex(records, ExactIndex(embeddings))
+
+        records, _ = self._store.load(
+            user_id, with_embeddings=False, index_version=index_version
+        )
+        if not records:
+            return KnowledgeBaseIndex([], ExactIndex(_stack([])))
+        root = shard_root(self._shard_dir, index_version or INITIAL_INDEX_VERSION)
+        path = user_shard_path(root, user_id)
+        keys = [(r.document_id, r.chunk_index) for r in records]
+        shards = VectorShards.open(path)
+        vectors = (
+            ShardVectorIndex(shards, keys, self._nprobe, self._rerank)
+            if shards is not None
+            else None
+        )
+        if vectors is None or vectors.covered < len(records):
+            # Missing or lagging behind Postgres (e.g. the mode was just
+            # switched on): rebuild them from the stored embeddings once.
+            logger.warning("Rebuilding vector shards: user=%s", user_id)
+            records, embeddings = self._store.load(user_id, index_version=index_version)
+            keys = [(r.document_id, r.chunk_index) for r in records]
+            VectorShardWriter(
+                path, dtype=self._shard_dtype, keep_raw=self._rerank > 0
+            ).rebuild(keys, embeddings)
+            vectors = ShardVectorIndex(
+                VectorShards.open(path), keys, self._nprobe, self._rerank
+            )
+        return KnowledgeBaseIndex(records, vectors)
+
+
+@lru_cache(maxsize=1)
+def get_retrieval_service() -> RetrievalService:
+    """Return the process-wide retrieval service."""
+    return RetrievalService(
+        SupabaseKnowledgeBaseStore(get_supabase_client(), get_redis()),
+        get_embedding_service(),
+        max_users=settings.RETRIEVAL_INDEX_CACHE_USERS,
+        shard_dtype=settings.VECTOR_SHARD_DTYPE,
+        rerank=settings.VECTOR_SHARD_RERANK,
+        versions=get_index_versions(),
+        embedders=lambda spec: get_embedding_service_for(
+            spec.embedding_provider, spec.embedding_model
+        ),
+        **_vector_mode(settings.RETRIEVAL_VECTOR_INDEX),
+    )
+
+
+def _vector_mode(mode: str) -> dict:
+    if mode == "exact":
+        return {}
+    if mode == "shard":
+        return {"shard_dir": settings.VECTOR_SHARD_DIR}
+    if mode == "ivf":
+        return {"shard_dir": settings.VECTOR_SHARD_DIR, "nprobe": settings.ANN_NPROBE}
+    raise ValueError(f"Unknown retrieval vector index: {mode}")
@@ -0,0 +1,256 @@
+"""Sandboxed Python execution for the agent's code execution tool.
+
+Starting an interpreter per snippet costs far more than most snippets take
+to run, so each API process keeps ``SANDBOX_POOL_SIZE`` worker processes
+(``sandbox_runner.py``) started and warmed up in advance. A worker forks a
+confined child per run (see the runner for the limits it applies) and is
+replaced after ``SANDBOX_MAX_RUNS`` runs, after any run that broke a limit,
+and whenever a reply does not arrive. Runs wait in turn for a free worker,
+for at most ``SANDBOX_QUEUE_TIMEOUT_SECONDS``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+import weakref
+from dataclasses import dataclass
+from pathlib import Path
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+RUNNER_PATH = Path(__file__).with_name("sandbox_runner.py")
+SPAWN_TIMEOUT_SECONDS = 30.0  # Start-up of a worker, imports included
+REPLY_GRACE_SECONDS = 2.0  # On top of the run timeout, enforced by the worker
+VIOLATIONS = frozenset({"timeout", "memory", "crashed"})
+
+
+@dataclass
+class SandboxResult:
+    """Outcome of one run.
+
+    ``status`` is ``ok``, ``error`` (the code raised; ``error`` holds the
+    traceback), ``timeout`` (CPU or wall-clock limit), ``memory`` or
+    ``crashed``.
+    """
+
+    status: str
+    output: str = ""
+    truncated: bool = False  # Output beyond SANDBOX_MAX_OUTPUT_BYTES dropped
+    error: str | None = None
+    seconds: float = 0.0
+
+    @property
+    def violation(self) -> bool:
+        """Whether the run broke a limit, so its worker is replaced."""
+        return self.status in VIOLATIONS
+
+
+class SandboxBusyError(Exception):
+    """No worker became free within the queue timeout."""
+
+
+class _Worker:
+    def __init__(self, process: asyncio.subprocess.Process) -> None:
+        self.process = process
+        self.runs = 0
+
+    async def run(self, code: str, timeout: float) -> SandboxResult:
+        self.runs += 1
+        request = json.dumps({"code": code, "timeout": timeout}) + "\n"
+        try:
+            self.process.stdin.write(request.encode())
+            await self.process.stdin.drain()
+            line = await asyncio.wait_for(
+                self.process.stdout.readline(), timeout + REPLY_GRACE_SECONDS
+            )
+        except TimeoutError:
+            return SandboxResult("timeout", error="Sandbox worker did not reply")
+        except (ConnectionError, ValueError) as exc:  # Exited, or reply too long
+            return SandboxResult("crashed", error=f"Sandbox worker failed: {exc}")
+        if not line:
+            return SandboxResult("crashed", error="Sandbox worker exited")
+        return SandboxResult(**json.loads(line))
+
+    def kill(self) -> None:
+        # The worker leads its own session, so this takes a running child too.
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+class SandboxPool:
+    """Pre-started sandbox workers shared by the runs of one event loop.
+
+    Args:
+        size: Worker processes kept started.
+        max_runs: Runs before a worker is replaced.
+        timeout: Default wall-clock seconds per run.
+        queue_timeout: Seconds a run waits for a free worker.
+        cpu_seconds, memory_mb, file_bytes, max_output_bytes: Limits of
+            each run.
+        python: Interpreter the workers run on.
+    """
+
+    def __init__(
+        self,
+        size: int | None = None,
+        max_runs: int | None = None,
+        timeout: float | None = None,
+        queue_timeout: float | None = None,
+        cpu_seconds: int | None = None,
+        memory_mb: int | None = None,
+        file_bytes: int | None = None,
+        max_output_bytes: int | None = None,
+        python: str = sys.executable,
+    ) -> None:
+        self.size = size or settings.SANDBOX_POOL_SIZE
+        self.max_runs = max_runs or settings.SANDBOX_MAX_RUNS
+        self.timeout = timeout or settings.SANDBOX_TIMEOUT_SECONDS
+        self.queue_timeout = queue_timeout or settings.SANDBOX_QUEUE_TIMEOUT_SECONDS
+        self.limits = {
+            "cpu_seconds": cpu_seconds or settings.SANDBOX_CPU_SECONDS,
+            "memory_mb": memory_mb or settings.SANDBOX_MEMORY_MB,
+            "file_bytes": file_bytes or settings.SANDBOX_FILE_BYTES,
+            "max_output_bytes": max_output_bytes or settings.SANDBOX_MAX_OUTPUT_BYTES,
+        }
+        self.spawned = 0
+        self._python = python
+        self._workers: set[_Worker] = set()
+        self._idle: asyncio.Queue[_Worker] = asyncio.Queue()
+        self._replacements: set[asyncio.Task[None]] = set()
+        self._start_lock = asyncio.Lock()
+        self._started = False
+
+    async def start(self) -> None:
+        """Start the workers; runs do this on first use if it was not done."""
+        async with self._start_lock:
+            if self._started:
+                return
+            missing = self.size - len(self._workers)  # After a failed start
+            await asyncio.gather(*(self._spawn() for _ in range(missing)))
+            self._started = True
+            logger.info("Sandbox pool started: %d workers", self.size)
+
+    async def run(self, code: str, timeout: float | None = None) -> SandboxResult:
+        """Run ``code`` in a free worker and return what it printed.
+
+        Raises:
+            SandboxBusyError: No worker was free within the queue timeout.
+        """
+        await self.start()
+        try:
+            worker = await asyncio.wait_for(self._idle.get(), self.queue_timeout)
+        except TimeoutError:
+            raise SandboxBusyError(
+                f"No sandbox worker free after {self.queue_timeout:.0f}s"
+            ) from None
+        result = None
+        try:
+            result = await worker.run(code, timeout or self.timeout)
+        finally:
+            self._release(worker, result)
+        return result
+
+    async def close(self) -> None:
+        """Stop every worker, including those running code."""
+        self._started = False
+        for task in self._replacements:
+            task.cancel()
+        workers, self._workers = self._workers, set()
+        for worker in workers:
+            worker.kill()
+        await asyncio.gather(*(worker.process.wait() for worker in workers))
+        self._idle = asyncio.Queue()
+
+    async def _spawn(self) -> None:
+        process = await asyncio.create_subprocess_exec(
+            self._python,
+            "-I",
+            str(RUNNER_PATH),
+            json.dumps(self.limits),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            env={
+                "PATH": os.environ.get("PATH", os.defpath),
+                "LANG": "C.UTF-8",
+                "OPENBLAS_NUM_THREADS": "1",  # Thread stacks count against memory
+                "OMP_NUM_THREADS": "1",
+            },
+            start_new_session=True,
+            # A reply holds the output JSON-escaped plus a capped traceback.
+            limit=16 * self.limits["max_output_bytes"] + (1 << 16),
+        )
+        worker = _Worker(process)
+        try:
+            ready = await asyncio.wait_for(
+                process.stdout.readline(), SPAWN_TIMEOUT_SECONDS
+            )
+        except BaseException:
+            worker.kill()
+            raise
+        if not ready:
+            raise RuntimeError("Sandbox worker exited during start-up")
+        self.spawned += 1
+        self._workers.add(worker)
+        self._idle.put_nowait(worker)
+
+    def _release(self, worker: _Worker, result: SandboxResult | None) -> None:
+        if worker not in self._workers:  # Closed meanwhile
+            return
+        if (
+            result is None  # Cancelled mid-run: the reply may still arrive
+            or result.violation
+            or worker.runs >= self.max_runs
+            or worker.process.returncode is not None
+        ):
+            self._workers.discard(worker)
+            worker.kill()
+            task = asyncio.create_task(self._replace(worker))
+            self._replacements.add(task)
+            task.add_done_callback(self._replacements.discard)
+        else:
+            self._idle.put_nowait(worker)
+
+    async def _replace(self, worker: _Worker) -> None:
+        await worker.process.wait()
+        if not self._started:
+            return
+        try:
+            await self._spawn()
+        except Exception:
+            logger.exception("Sandbox worker could not be replaced")
+
+
+_pools: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, SandboxPool] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_sandbox_pool() -> SandboxPool:
+    """Return the sandbox pool of the running event loop.
+
+    Worker pipes are bound to the loop that started them, so pools are kept
+    per loop like the asyncio Redis clients.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = SandboxPool()
+        _pools[loop] = pool
+    return pool
+
+
+async def close_sandbox_pool() -> None:
+    """Stop the running event loop's pool, if one was created."""
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.close()
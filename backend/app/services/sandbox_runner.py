@@ -0,0 +1,294 @@
+"""Sandbox worker process for the code execution tool.
+
+Started by ``SandboxPool`` as ``python -I sandbox_runner.py '<limits JSON>'``
+and imports only the standard library (it never imports ``app``). At start
+it imports the modules snippets commonly use, then serves one request at a
+time: a JSON line ``{"code": ..., "timeout": seconds}`` on stdin is answered
+by one JSON line on stdout.
+
+Every snippet runs in a child forked from this warm process, so it starts
+without interpreter start-up or import cost, and nothing it changes (globals,
+builtins, imported modules) outlives it. The child, before running the code:
+
+* moves into a fresh temporary directory that is deleted afterwards;
+* points stdin/stdout/stderr at /dev/null (output is captured in memory,
+  up to ``max_output_bytes``) and closes every other descriptor;
+* sets rlimits: CPU seconds, address space, file size, open files, no
+  child processes and no core dumps;
+* leaves the network namespace where the kernel allows it, and installs an
+  audit hook that refuses sockets, subprocesses, ``exec``/``fork``,
+  signals to other processes and ``ctypes`` in any case;
+* has the same hook refuse file access outside its directory, except
+  read-only access to the Python library directories (for imports). The
+  child shares the service's user, so without this it could read
+  ``/proc/<ppid>/environ`` (the service's secrets) or any of its files.
+
+The wall-clock ``timeout`` is enforced here by killing the child.
+"""
+
+from __future__ import annotations
+
+import builtins
+import contextlib
+import io
+import json
+import os
+import resource
+import select
+import shutil
+import signal
+import sys
+import sysconfig
+import tempfile
+import time
+import traceback
+
+PRELOAD = (
+    "bisect",
+    "collections",
+    "ctypes",  # Used by every child to leave the network namespace
+    "datetime",
+    "decimal",
+    "fractions",
+    "functools",
+    "heapq",
+    "itertools",
+    "math",
+    "random",
+    "re",
+    "statistics",
+    "string",
+    "numpy",
+)
+DENIED_EVENTS = (
+    "ctypes.",
+    "os.exec",
+    "os.fork",
+    "os.forkpty",
+    "os.kill",
+    "os.killpg",
+    "os.posix_spawn",
+    "os.spawn",
+    "os.system",
+    "pty.",
+    "socket.",
+    "subprocess.",
+)
+FILE_EVENTS = {  # Audit event: how many leading arguments are paths
+    "open": 1,
+    "os.chdir": 1,
+    "os.chmod": 1,
+    "os.chown": 1,
+    "os.link": 2,
+    "os.listdir": 1,
+    "os.mkdir": 1,
+    "os.remove": 1,
+    "os.rename": 2,
+    "os.rmdir": 1,
+    "os.scandir": 1,
+    "os.symlink": 2,
+    "os.truncate": 1,
+    "os.utime": 1,
+}
+LIBRARY_PATHS = ("stdlib", "platstdlib", "purelib", "platlib")
+CLONE_NEWNET = 0x40000000
+SOURCE_NAME = "<sandbox>"
+
+
+class _CappedOutput(io.StringIO):
+    """stdout/stderr replacement that keeps the first ``limit`` bytes."""
+
+    def __init__(self, limit: int) -> None:
+        super().__init__()
+        self.remaining = limit
+        self.truncated = False
+
+    def write(self, text: str) -> int:
+        data = text.encode("utf-8", "replace")
+        if len(data) > self.remaining:
+            self.truncated = True
+            text = data[: self.remaining].decode("utf-8", "ignore")
+        self.remaining -= len(text.encode("utf-8"))
+        super().write(text)
+        return len(data)
+
+
+_writable: tuple[str, ...] = ()  # The child's directory, set by _confine
+_readable: tuple[str, ...] = ()  # Python library directories
+
+
+def _deny(event: str, args: tuple) -> None:
+    if event.startswith(DENIED_EVENTS):
+        raise PermissionError(f"{event} is not allowed in the sandbox")
+    paths = FILE_EVENTS.get(event)
+    if paths is None:
+        return
+    roots = _writable + _readable if _read_only(event, args) else _writable
+    for path in args[:paths]:
+        if not _inside(path, roots):
+            raise PermissionError(
+                f"{event} outside the sandbox directory is not allowed: {path!r}"
+            )
+
+
+def _read_only(event: str, args: tuple) -> bool:
+    if event == "open":
+        flags = args[2]
+        return (flags & os.O_ACCMODE) == os.O_RDONLY and not flags & (
+            os.O_CREAT | os.O_TRUNC
+        )
+    return event in ("os.listdir", "os.scandir")
+
+
+def _inside(path: object, roots: tuple[str, ...]) -> bool:
+    if path is None or isinstance(path, int):
+        return True  # The working directory, or an already open descriptor
+    real = os.path.realpath(os.fsdecode(path))
+    return any(real == root or real.startswith(root + os.sep) for root in roots)
+
+
+def _isolate_network() -> None:
+    # Needs CAP_SYS_ADMIN or unprivileged user namespaces; the audit hook
+    # blocks sockets either way.
+    with contextlib.suppress(Exception):
+        import ctypes
+
+        ctypes.CDLL(None, use_errno=True).unshare(CLONE_NEWNET)
+
+
+def _limit(kind: int, soft: int, hard: int | None = None) -> None:
+    with contextlib.suppress(ValueError, OSError):
+        resource.setrlimit(kind, (soft, soft if hard is None else hard))
+
+
+def _confine(limits: dict, reply_fd: int, workdir: str) -> None:
+    """Restrict the forked child before it runs untrusted code."""
+    global _writable, _readable
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    os.closerange(3, reply_fd)
+    os.closerange(reply_fd + 1, 1 << 16)
+    _isolate_network()
+    # SIGXCPU at the soft limit; SIGKILL only if that is ignored.
+    _limit(resource.RLIMIT_CPU, limits["cpu_seconds"], limits["cpu_seconds"] + 1)
+    _limit(resource.RLIMIT_AS, limits["memory_mb"] << 20)
+    _limit(resource.RLIMIT_FSIZE, limits["file_bytes"])
+    _limit(resource.RLIMIT_NOFILE, 64)
+    _limit(resource.RLIMIT_NPROC, 0)
+    _limit(resource.RLIMIT_CORE, 0)
+    _writable = (os.path.realpath(workdir),)
+    paths = sysconfig.get_paths()
+    _readable = tuple({os.path.realpath(paths[name]) for name in LIBRARY_PATHS})
+    sys.addaudithook(_deny)
+
+
+def _execute(code: str, limits: dict) -> dict:
+    """Run ``code`` as ``__main__`` and describe the outcome."""
+    output = _CappedOutput(limits["max_output_bytes"])
+    status, error = "ok", None
+    try:
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            exec(
+                compile(code, SOURCE_NAME, "exec"),
+                {"__name__": "__main__", "__builtins__": builtins},
+            )
+    except MemoryError:
+        status, error = "memory", "MemoryError: memory limit exceeded"
+    except SystemExit as exc:
+        if exc.code not in (None, 0):
+            status, error = "error", f"SystemExit: {exc.code}"
+    except BaseException as exc:
+        status, error = "error", _user_traceback(exc)
+    if error is not None:
+        error = error[-limits["max_output_bytes"] :]  # The end says what failed
+    return {
+        "status": status,
+        "output": output.getvalue(),
+        "truncated": output.truncated,
+        "error": error,
+    }
+
+
+def _user_traceback(exc: BaseException) -> str:
+    """The traceback of ``exc`` without the runner's own frames."""
+    report = traceback.TracebackException.from_exception(exc)
+    report.stack = traceback.StackSummary.from_list(
+        [frame for frame in report.stack if frame.filename == SOURCE_NAME]
+    )
+    return "".join(report.format()).strip()
+
+
+def _read_reply(fd: int, deadline: float) -> bytes | None:
+    """Read the child's reply until EOF; None if ``deadline`` passes first."""
+    chunks = []
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+            return None
+        chunk = os.read(fd, 1 << 16)
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+
+
+def _serve(request: dict, limits: dict) -> dict:
+    started = time.monotonic()
+    workdir = tempfile.mkdtemp(prefix="docmind-sandbox-")
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # Child: never returns.
+        os.close(read_fd)
+        try:
+            os.chdir(workdir)
+            os.environ.update(HOME=workdir, TMPDIR=workdir)
+            _confine(limits, write_fd, workdir)
+            reply = _execute(request["code"], limits)
+            os.write(write_fd, json.dumps(reply).encode())
+        finally:
+            os._exit(0)
+
+    os.close(write_fd)
+    try:
+        raw = _read_reply(read_fd, started + request["timeout"])
+        if raw is None:
+            os.kill(pid, signal.SIGKILL)
+        _, wait_status = os.waitpid(pid, 0)
+    finally:
+        os.close(read_fd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if raw is None:
+        reply = {"status": "timeout", "error": "Wall-clock time limit exceeded"}
+    elif os.WIFSIGNALED(wait_status):
+        sig = os.WTERMSIG(wait_status)
+        reply = (
+            {"status": "timeout", "error": "CPU time limit exceeded"}
+            if sig == signal.SIGXCPU
+            else {"status": "crashed", "error": f"Killed by signal {sig}"}
+        )
+    else:
+        try:
+            reply = json.loads(raw)
+        except ValueError:
+            reply = {"status": "crashed", "error": "Exited without a result"}
+    reply.setdefault("output", "")
+    reply["seconds"] = time.monotonic() - started
+    return reply
+
+
+def main() -> None:
+    limits = json.loads(sys.argv[1])
+    for module in PRELOAD:
+        with contextlib.suppress(ImportError):
+            __import__(module)
+    out = sys.stdout
+    out.write('{"ready": true}\n')
+    out.flush()
+    for line in sys.stdin:
+        out.write(json.dumps(_serve(json.loads(line), limits)) + "\n")
+        out.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""Object storage for uploaded documents.
+
+Uploads are streamed chunk by chunk: the size limit is enforced and the
+SHA-256 digest computed while the bytes flow to storage, so a request never
+holds the whole file in memory and an oversized file is rejected as soon as
+it crosses the limit. Downloads for processing are streamed to a local file
+the same way.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Protocol
+from urllib.parse import quote
+
+import httpx
+
+from app.core.config import settings
+from app.core.constants import SUPABASE_DOCUMENTS_BUCKET, UPLOAD_CHUNK_SIZE_BYTES
+from app.core.http import build_supabase_client
+
+logger = logging.getLogger(__name__)
+
+
+class StorageError(Exception):
+    """Raised when the storage backend rejects or fails an operation."""
+
+
+class FileTooLargeError(StorageError):
+    """Raised mid-stream once an upload exceeds the configured size limit."""
+
+    def __init__(self, max_bytes: int) -> None:
+        super().__init__(f"Upload exceeds the {max_bytes}-byte limit.")
+        self.max_bytes = max_bytes
+
+
+@dataclass(frozen=True)
+class StoredObject:
+    """Result of a completed streaming upload."""
+
+    path: str
+    size_bytes: int
+    sha256: str
+
+
+class UploadSource(Protocol):
+    """An incoming file read in chunks (``UploadFile`` or a streamed upload)."""
+
+    content_type: str | None
+    size: int | None  # When known up front
+
+    async def read(self, size: int = -1) -> bytes: ...
+
+
+class ObjectStorage(ABC):
+    """Backend-agnostic document storage."""
+
+    @abstractmethod
+    async def upload_stream(
+        self, path: str, chunks: AsyncIterator[bytes], content_type: str
+    ) -> None:
+        """Write ``chunks`` to ``path``; nothing is left behind if they raise."""
+
+    @abstractmethod
+    async def download_to(self, path: str, dest: Path) -> None:
+        """Stream the object at ``path`` into the local file ``dest``."""
+
+    @abstractmethod
+    async def delete(self, path: str) -> None:
+        """Remove the object at ``path`` (no-op if it does not exist)."""
+
+    async def aclose(self) -> None:
+        """Release network resources held by the backend."""
+
+
+class SupabaseStorage(ObjectStorage):
+    """Supabase Storage over its REST API with a chunked request body.
+
+    supabase-py only accepts bytes or a file path, so the object endpoint is
+    called directly with httpx to keep the body streaming.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        service_key: str,
+        bucket: str = SUPABASE_DOCUMENTS_BUCKET,
+        timeout: float = 60.0,
+    ) -> None:
+        self._bucket = bucket
+        self._client = build_supabase_client(
+            f"{base_url.rstrip('/')}/storage/v1", service_key, timeout
+        )
+
+    def _object_url(self, path: str) -> str:
+        return f"/object/{self._bucket}/{quote(path)}"
+
+    async def upload_stream(
+        self, path: str, chunks: AsyncIterator[bytes], content_type: str
+    ) -> None:
+        response = await self._client.post(
+            self._object_url(path),
+            content=chunks,
+            headers={"Content-Type": content_type, "x-upsert": "false"},
+        )
+        if response.is_error:
+            raise StorageError(
+                f"Storage upload failed ({response.status_code}): {response.text}"
+            )
+
+    async def download_to(self, path: str, dest: Path) -> None:
+        async with self._client.stream("GET", self._object_url(path)) as response:
+            if response.is_error:
+                await response.aread()
+                raise StorageError(
+                    f"Storage download failed ({response.status_code}): "
+                    f"{response.text}"
+                )
+            with dest.open("wb") as handle:
+                async for chunk in response.aiter_bytes(UPLOAD_CHUNK_SIZE_BYTES):
+                    await asyncio.to_thread(handle.write, chunk)
+
+    async def delete(self, path: str) -> None:
+        response = await self._client.delete(self._object_url(path))
+        if response.is_error and response.status_code != httpx.codes.NOT_FOUND:
+            raise StorageError(
+                f"Storage delete failed ({response.status_code}): {response.text}"
+            )
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+class LocalStorage(ObjectStorage):
+    """Filesystem stand-in for development, tests, and benchmarks.
+
+    Chunks are written to a ``.part`` file and renamed into place on success,
+    so readers never observe a half-written object.
+    """
+
+    def __init__(self, root: str | Path) -> None:
+        self._root = Path(root)
+
+    def _resolve(self, path: str) -> Path:
+        target = (self._root / path).resolve()
+        if not target.is_relative_to(self._root.resolve()):
+            raise StorageError(f"Path escapes storage root: {path}")
+        return target
+
+    async def upload_stream(
+        self, path: str, chunks: AsyncIterator[bytes], content_type: str
+    ) -> None:
+        target = self._resolve(path)
+        partial = target.with_name(target.name + ".part")
+        await asyncio.to_thread(target.parent.mkdir, parents=True, exist_ok=True)
+        handle = await asyncio.to_thread(open, partial, "wb")
+        try:
+            async for chunk in chunks:
+                await asyncio.to_thread(handle.write, chunk)
+        except BaseException:
+            handle.close()
+            partial.unlink(missing_ok=True)
+            raise
+        handle.close()
+        await asyncio.to_thread(os.replace, partial, target)
+
+    async def download_to(self, path: str, dest: Path) -> None:
+        try:
+            await asyncio.to_thread(shutil.copyfile, self._resolve(path), dest)
+        except FileNotFoundError as exc:
+            raise StorageError(f"Object not found: {path}") from exc
+
+    async def delete(self, path: str) -> None:
+        await asyncio.to_thread(self._resolve(path).unlink, missing_ok=True)
+
+
+class _UploadReader:
+    """Async iterator over an upload that hashes and size-checks each chunk."""
+
+    def __init__(self, file: UploadSource, max_bytes: int, chunk_size: int) -> None:
+        self._file = file
+        self._max_bytes = max_bytes
+        self._chunk_size = chunk_size
+        self.digest = hashlib.sha256()
+        self.total = 0
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        while chunk := await self._file.read(self._chunk_size):
+            self.total += len(chunk)
+            if self.total > self._max_bytes:
+                raise FileTooLargeError(self._max_bytes)
+            self.digest.update(chunk)
+            yield chunk
+
+
+async def store_upload(
+    storage: ObjectStorage,
+    file: UploadSource,
+    path: str,
+    max_bytes: int,
+    chunk_size: int = UPLOAD_CHUNK_SIZE_BYTES,
+) -> StoredObject:
+    """Stream an uploaded file into storage with bounded memory.
+
+    Args:
+        storage: Destination backend.
+        file: The incoming upload; read ``chunk_size`` bytes at a time.
+        path: Object path within the documents bucket.
+        max_bytes: Hard size limit, enforced incrementally.
+        chunk_size: Bytes read, hashed and forwarded per step.
+
+    Returns:
+        The stored object's path, size and SHA-256 hex digest.
+
+    Raises:
+        FileTooLargeError: As soon as more than ``max_bytes`` have been read.
+        StorageError: If the backend rejects the upload.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise FileTooLargeError(max_bytes)
+
+    reader = _UploadReader(file, max_bytes, chunk_size)
+    await storage.upload_stream(
+        path, aiter(reader), file.content_type or "application/octet-stream"
+    )
+    logger.debug("Stored upload: path=%s bytes=%d", path, reader.total)
+    return StoredObject(
+        path=path, size_bytes=reader.total, sha256=reader.digest.hexdigest()
+    )
+
+
+@lru_cache(maxsize=1)
+def get_storage() -> ObjectStorage:
+    """Return the configured storage backend (one instance per process)."""
+    return build_storage()
+
+
+def build_storage() -> ObjectStorage:
+    """Create a new storage backend instance.
+
+    Celery tasks use a fresh instance per ``asyncio.run`` because the HTTP
+    connection pool is bound to the event loop that created it.
+    """
+    if settings.STORAGE_BACKEND == "local":
+        return LocalStorage(settings.LOCAL_STORAGE_DIR)
+    return SupabaseStorage(
+        settings.SUPABASE_URL,
+        settings.SUPABASE_SERVICE_KEY,
+        timeout=settings.STORAGE_TIMEOUT_SECONDS,
+    )
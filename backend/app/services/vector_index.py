@@ -0,0 +1,652 @@
+"""Vector indexes behind hybrid retrieval: in-memory or memory-mapped shards.
+
+``ExactIndex`` scores an in-memory matrix. ``VectorShards`` are a user's
+vectors on local disk, opened with ``numpy.memmap`` so every API process on
+a node shares one copy in the page cache instead of loading its own from
+pgvector. ``ShardVectorIndex`` searches them either exhaustively or as an
+inverted-file (IVF) index: spherical k-means centroids partition the rows
+into lists, and a query scans only the ``nprobe`` lists closest to it.
+
+A user's shards live in one directory as immutable segments (a float32,
+float16, int8 or product-quantized code matrix with its chunk-id sidecars,
+rows grouped by list so each probed list is one contiguous slice) plus a
+JSON manifest. Quantized codes are scored against the float query directly
+(see ``app.services.quantization``), optionally re-ranking the best
+candidates against float32 copies kept on disk.
+Readers never lock; writers (the worker after ingestion, the API on
+deletion) serialize on a file lock, write new files under temporary names,
+and atomically replace the manifest. Inserts append a segment; deletions
+tombstone a document; segments are merged (and the centroids retrained once
+the shards have grown enough) when they pile up.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import logging
+import os
+import re
+import shutil
+import uuid
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Protocol
+
+import numpy as np
+
+from app.services.quantization import (
+    PQ_MIN_TRAIN_ROWS,
+    PQ_SUBVECTORS,
+    adc_scores,
+    adc_table,
+    pq_decode,
+    pq_encode,
+    scalar_quantize,
+    train_codebooks,
+)
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+MAX_SEGMENTS = 8  # Merge segments beyond this many
+RETRAIN_GROWTH = 4  # Retrain centroids when rows grow by this factor
+OPEN_ATTEMPTS = 5  # Manifest re-reads when a commit removes files mid-open
+SCORE_BLOCK_ROWS = 4096  # Rows decoded per step of an exhaustive scan (fits cache)
+STORAGE_DTYPES = ("float32", "float16", "int8", "pq")
+_SAFE_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+KMEANS_ITERATIONS = 12
+KMEANS_SAMPLE_PER_LIST = 64  # Training points per centroid
+MAX_LISTS = 4096
+
+
+class VectorIndex(Protocol):
+    """Cosine-similarity search over chunk positions ``0..n-1``."""
+
+    def __len__(self) -> int: ...
+
+    def search(self, query: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Return (positions, similarities) of the best ``k``, best first.
+
+        ``query`` must be L2-normalized.
+        """
+        ...
+
+    def similarity(self, positions: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Cosine similarity of ``query`` to the given positions."""
+        ...
+
+
+def user_shard_path(root: str | Path, user_id: str) -> Path:
+    """Directory holding ``user_id``'s vector shards under ``root``."""
+    if not _SAFE_NAME.match(user_id):
+        raise ValueError(f"Invalid user id for index path: {user_id!r}")
+    return Path(root) / user_id
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` largest scores, best first, via partial sort."""
+    if k <= 0 or not len(scores):
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(scores, -k)[-k:]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Row-wise L2 normalization to float32."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class ExactIndex:
+    """Brute-force cosine similarity over an in-memory matrix."""
+
+    def __init__(self, vectors: np.ndarray) -> None:
+        self.matrix = normalize(vectors)
+
+    def __len__(self) -> int:
+        return len(self.matrix)
+
+    def search(self, query: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        similarity = self.matrix @ query
+        best = top_k_indices(similarity, k)
+        return best, similarity[best]
+
+    def similarity(self, positions: np.ndarray, query: np.ndarray) -> np.ndarray:
+        return self.matrix[positions] @ query
+
+
+# ── Shards on disk ────────────────────────────────────────────────────────────
+
+
+def encode(
+    vectors: np.ndarray, dtype: str, codebooks: np.ndarray | None = None
+) -> tuple[np.ndarray, np.ndarray | None]:
+    """Encode normalized float32 rows as (codes, per-row scales or None).
+
+    ``pq`` rows stay float32 until the shards have ``codebooks``.
+    """
+    if dtype == "float32" or (dtype == "pq" and codebooks is None):
+        return vectors, None
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    if dtype == "int8":
+        return scalar_quantize(vectors)
+    if dtype == "pq":
+        return pq_encode(vectors, codebooks), None
+    raise ValueError(f"Unknown vector storage dtype: {dtype}")
+
+
+@dataclass(frozen=True)
+class Segment:
+    """Immutable rows of a user's shards, grouped by IVF list."""
+
+    codes: np.ndarray  # (n, d) float32 | float16 | int8, or (n, m) PQ codes
+    scales: np.ndarray | None  # (n,) int8 dequantization factors
+    codebooks: np.ndarray | None  # (m, k, d/m) PQ codewords
+    raw: np.ndarray | None  # (n, d) float32 copies for exact re-ranking
+    offsets: np.ndarray  # (n_lists + 1,) list boundaries into the rows
+    doc_ords: np.ndarray  # (n,) index into the manifest's document list
+    chunk_indexes: np.ndarray  # (n,)
+
+    def __len__(self) -> int:
+        return len(self.doc_ords)
+
+    def rows(self, lists: np.ndarray) -> np.ndarray:
+        """Row numbers of the given lists."""
+        ranges = [
+            np.arange(self.offsets[i], self.offsets[i + 1]) for i in lists.tolist()
+        ]
+        return np.concatenate(ranges) if ranges else np.empty(0, dtype=np.int64)
+
+    def decode(self, rows: np.ndarray | slice = slice(None)) -> np.ndarray:
+        """Float32 vectors of ``rows`` (exact if raw copies are kept)."""
+        if self.raw is not None:
+            return np.array(self.raw[rows])
+        if self.codebooks is not None:
+            return pq_decode(self.codes[rows], self.codebooks)
+        vectors = np.array(self.codes[rows], dtype=np.float32)
+        if self.scales is not None:
+            vectors *= self.scales[rows][:, None]
+        return vectors
+
+    def scores(self, query: np.ndarray, rows: np.ndarray | None = None) -> np.ndarray:
+        """Approximate similarity of ``query`` to ``rows``, or to every row.
+
+        The float query is compared with the stored codes directly (ADC);
+        every row is scanned in cache-sized blocks.
+        """
+        table = None if self.codebooks is None else adc_table(self.codebooks, query)
+        if rows is not None:
+            return self._score(query, rows, table)
+        return np.concatenate(
+            [
+                self._score(query, slice(start, start + SCORE_BLOCK_ROWS), table)
+                for start in range(0, len(self), SCORE_BLOCK_ROWS)
+            ]
+            or [np.empty(0, dtype=np.float32)]
+        )
+
+    def exact_scores(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Similarity from the raw copies if kept, else as ``scores``."""
+        if self.raw is None:
+            return self.scores(query, rows)
+        return self.raw[rows] @ query
+
+    def _score(
+        self, query: np.ndarray, rows: np.ndarray | slice, table: np.ndarray | None
+    ) -> np.ndarray:
+        if table is not None:
+            return adc_scores(table, self.codes[rows])
+        scores = np.asarray(self.codes[rows], dtype=np.float32) @ query
+        if self.scales is not None:
+            scores *= self.scales[rows]
+        return scores
+
+
+@dataclass(frozen=True)
+class VectorShards:
+    """Read-only, memory-mapped view of one user's vector shards."""
+
+    centroids: np.ndarray  # (n_lists, d) float32
+    segments: list[Segment]
+    documents: list[str]  # Ordinal -> document id
+    deleted: frozenset[int]  # Tombstoned document ordinals
+    dtype: str
+
+    @classmethod
+    def open(cls, path: Path) -> VectorShards | None:
+        """Open the shards at ``path``; None if none have been written.
+
+        A writer committing between the manifest read and the loads may
+        garbage-collect files the manifest names; the open is then retried
+        with the new manifest, whose files are all in place.
+        """
+        for attempt in range(OPEN_ATTEMPTS):
+            try:
+                manifest = json.loads((path / MANIFEST).read_text())
+            except FileNotFoundError:
+                return None
+            try:
+                return cls.from_manifest(path, manifest)
+            except FileNotFoundError:
+                if attempt == OPEN_ATTEMPTS - 1:
+                    raise
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    @classmethod
+    def from_manifest(cls, path: Path, manifest: dict) -> VectorShards:
+        """Open the shards described by ``manifest``."""
+        codebooks = manifest.get("codebooks")
+        if codebooks is not None:
+            codebooks = np.load(path / codebooks)
+        return cls(
+            centroids=np.load(path / manifest["centroids"], mmap_mode="r"),
+            segments=[
+                _load_segment(path / name, codebooks) for name in manifest["segments"]
+            ],
+            documents=manifest["documents"],
+            deleted=frozenset(manifest["deleted"]),
+            dtype=manifest["dtype"],
+        )
+
+    def __len__(self) -> int:
+        return sum(len(s) for s in self.segments)
+
+    def live_keys(self) -> Iterator[tuple[str, int]]:
+        """(document_id, chunk_index) of every non-tombstoned row."""
+        for segment in self.segments:
+            for ordinal, chunk in zip(
+                segment.doc_ords.tolist(), segment.chunk_indexes.tolist(), strict=True
+            ):
+                if ordinal not in self.deleted:
+                    yield self.documents[ordinal], chunk
+
+
+class ShardVectorIndex:
+    """``VectorIndex`` adapter mapping shard rows to knowledge-base positions.
+
+    With ``nprobe`` set, only the IVF lists of the ``nprobe`` nearest
+    centroids are scored; with None every row is. With ``rerank`` set, that
+    many best candidates by (quantized) score are re-scored against the raw
+    float32 copies, if the shards keep them. Rows whose (document, chunk)
+    key is not among ``keys`` — tombstoned or deleted since — are never
+    returned.
+    """
+
+    def __init__(
+        self,
+        shards: VectorShards,
+        keys: Sequence[tuple[str, int]],
+        nprobe: int | None = None,
+        rerank: int = 0,
+    ) -> None:
+        self._shards = shards
+        self._nprobe = nprobe
+        self._rerank = rerank
+        position = {key: i for i, key in enumerate(keys)}
+        self._positions: list[np.ndarray] = []
+        self._segment_of = np.full(len(keys), -1, dtype=np.int32)
+        self._row_of = np.full(len(keys), -1, dtype=np.int64)
+        for s, segment in enumerate(shards.segments):
+            positions = np.fromiter(
+                (
+                    (
+                        -1
+                        if ordinal in shards.deleted
+                        else position.get((shards.documents[ordinal], chunk), -1)
+                    )
+                    for ordinal, chunk in zip(
+                        segment.doc_ords.tolist(), segment.chunk_indexes.tolist()
+                    )
+                ),
+                dtype=np.int64,
+                count=len(segment.doc_ords),
+            )
+            found = positions >= 0
+            self._segment_of[positions[found]] = s
+            self._row_of[positions[found]] = np.flatnonzero(found)
+            self._positions.append(positions)
+        self.covered = int((self._segment_of >= 0).sum())
+
+    def __len__(self) -> int:
+        return self.covered
+
+    def search(self, query: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        if not self._rerank:
+            return self._candidates(query, k)
+        positions, _ = self._candidates(query, max(k, self._rerank))
+        scores = self.similarity(positions, query)
+        best = top_k_indices(scores, k)
+        return positions[best], scores[best]
+
+    def similarity(self, positions: np.ndarray, query: np.ndarray) -> np.ndarray:
+        out = np.zeros(len(positions), dtype=np.float32)
+        segments = self._segment_of[positions]
+        for s, segment in enumerate(self._shards.segments):
+            mask = segments == s
+            if mask.any():
+                out[mask] = segment.exact_scores(query, self._row_of[positions[mask]])
+        return out
+
+    def _candidates(self, query: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        lists = (
+            None
+            if self._nprobe is None
+            else top_k_indices(self._shards.centroids @ query, self._nprobe)
+        )
+        found_positions = [np.empty(0, dtype=np.int64)]
+        found_scores = [np.empty(0, dtype=np.float32)]
+        for segment, positions in zip(
+            self._shards.segments, self._positions, strict=True
+        ):
+            if lists is None:
+                scores = segment.scores(query)
+                live = positions >= 0
+                found_positions.append(positions[live])
+                found_scores.append(scores[live])
+            else:
+                rows = segment.rows(lists)
+                rows = rows[positions[rows] >= 0]
+                found_positions.append(positions[rows])
+                found_scores.append(segment.scores(query, rows))
+        positions = np.concatenate(found_positions)
+        scores = np.concatenate(found_scores)
+        best = top_k_indices(scores, k)
+        return positions[best], scores[best]
+
+
+class VectorShardWriter:
+    """Serialized, atomic mutations of one user's vector shards.
+
+    ``dtype`` and ``keep_raw`` (store float32 copies next to quantized
+    codes, for re-ranking) apply when the shards are created or rebuilt;
+    later inserts keep what the manifest records. PQ codebooks are trained
+    once the shards hold ``PQ_MIN_TRAIN_ROWS``; rows before that stay float32
+    until the next compaction.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        n_lists: int | None = None,
+        dtype: str = "float32",
+        keep_raw: bool = False,
+        pq_subvectors: int = PQ_SUBVECTORS,
+    ) -> None:
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError(f"Unknown vector storage dtype: {dtype}")
+        self.path = path
+        self._n_lists = n_lists
+        self._dtype = dtype
+        self._keep_raw = keep_raw
+        self._pq_subvectors = pq_subvectors
+
+    def add(
+        self, document_id: str, chunk_indexes: np.ndarray, vectors: np.ndarray
+    ) -> None:
+        """Insert a document's vectors, replacing any earlier copy of it."""
+        if not len(vectors):
+            return
+        vectors = normalize(vectors)
+        with self._locked() as manifest:
+            if manifest is None:
+                manifest = self._create(vectors)
+                manifest["rows"] = 0
+            _tombstone(manifest, document_id)
+            manifest["documents"].append(document_id)
+            ordinal = len(manifest["documents"]) - 1
+            manifest["segments"].append(
+                self._write_segment(
+                    manifest,
+                    vectors,
+                    np.full(len(vectors), ordinal, dtype=np.int32),
+                    np.asarray(chunk_indexes, dtype=np.int32),
+                )
+            )
+            manifest["rows"] += len(vectors)
+            if (
+                len(manifest["segments"]) > MAX_SEGMENTS
+                or manifest["rows"] >= RETRAIN_GROWTH * manifest["trained_rows"]
+                or _needs_codebooks(manifest)
+            ):
+                self._compact(manifest)
+            self._commit(manifest)
+
+    def remove(self, document_id: str) -> None:
+        """Tombstone every row of ``document_id``."""
+        with self._locked() as manifest:
+            if manifest is not None and _tombstone(manifest, document_id):
+                self._commit(manifest)
+
+    def rebuild(
+        self,
+        keys: Sequence[tuple[str, int]],
+        vectors: np.ndarray,
+    ) -> None:
+        """Replace all shards with ``vectors`` keyed by (doc, chunk)."""
+        vectors = normalize(vectors)
+        with self._locked():
+            manifest = self._create(vectors)
+            ordinals: dict[str, int] = {}
+            for document_id, _ in keys:
+                ordinals.setdefault(document_id, len(ordinals))
+            manifest["documents"] = list(ordinals)
+            if len(vectors):
+                manifest["segments"].append(
+                    self._write_segment(
+                        manifest,
+                        vectors,
+                        np.array([ordinals[d] for d, _ in keys], dtype=np.int32),
+                        np.array([c for _, c in keys], dtype=np.int32),
+                    )
+                )
+            self._commit(manifest)
+
+    # ── internals ────────────────────────────────────────────────────────────
+
+    @contextmanager
+    def _locked(self) -> Iterator[dict | None]:
+        self.path.mkdir(parents=True, exist_ok=True)
+        with (self.path / ".lock").open("w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                manifest_path = self.path / MANIFEST
+                yield (
+                    json.loads(manifest_path.read_text())
+                    if manifest_path.exists()
+                    else None
+                )
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _create(self, vectors: np.ndarray) -> dict:
+        n_lists = self._n_lists or default_n_lists(len(vectors))
+        centroids = train_centroids(vectors, n_lists)
+        manifest = {
+            "centroids": self._save_array(centroids, "centroids"),
+            "trained_rows": len(vectors),
+            "rows": len(vectors),  # Including tombstoned rows
+            "dtype": self._dtype,
+            "raw": self._keep_raw,
+            "codebooks": None,
+            "segments": [],
+            "documents": [],
+            "deleted": [],
+        }
+        self._train_codebooks(manifest, vectors)
+        return manifest
+
+    def _train_codebooks(self, manifest: dict, vectors: np.ndarray) -> None:
+        manifest["rows"] = len(vectors)
+        if _needs_codebooks(manifest):
+            manifest["codebooks"] = self._save_array(
+                train_codebooks(vectors, self._pq_subvectors), "codebooks"
+            )
+
+    def _compact(self, manifest: dict) -> None:
+        shards = VectorShards.from_manifest(self.path, manifest)
+        live = [
+            (s, np.flatnonzero(~np.isin(s.doc_ords, list(shards.deleted))))
+            for s in shards.segments
+        ]
+        # Decoding and re-encoding is lossless: int8 codes, PQ codes and
+        # float16 values all map back to themselves.
+        vectors = np.concatenate([s.decode(rows) for s, rows in live])
+        old_ordinals = np.concatenate([s.doc_ords[rows] for s, rows in live])
+        chunks = np.concatenate([s.chunk_indexes[rows] for s, rows in live])
+        kept, doc_ords = np.unique(old_ordinals, return_inverse=True)
+
+        if len(vectors) >= RETRAIN_GROWTH * manifest["trained_rows"]:
+            manifest["centroids"] = self._save_array(
+                train_centroids(
+                    vectors, self._n_lists or default_n_lists(len(vectors))
+                ),
+                "centroids",
+            )
+            manifest["trained_rows"] = len(vectors)
+        manifest["documents"] = [shards.documents[o] for o in kept.tolist()]
+        manifest["deleted"] = []
+        self._train_codebooks(manifest, vectors)
+        manifest["segments"] = (
+            [
+                self._write_segment(
+                    manifest,
+                    vectors,
+                    doc_ords.astype(np.int32),
+                    chunks,
+                )
+            ]
+            if len(vectors)
+            else []
+        )
+        logger.info("Compacted vector shards %s: %d rows", self.path, len(vectors))
+
+    def _write_segment(
+        self,
+        manifest: dict,
+        vectors: np.ndarray,
+        doc_ords: np.ndarray,
+        chunk_indexes: np.ndarray,
+    ) -> str:
+        centroids = np.load(self.path / manifest["centroids"])
+        lists = assign(vectors, centroids)
+        order = np.argsort(lists, kind="stable")
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(lists, minlength=len(centroids)), out=offsets[1:])
+
+        name = f"seg-{uuid.uuid4().hex}"
+        staging = self.path / f".{name}.tmp"
+        staging.mkdir()
+        codebooks = manifest.get("codebooks")
+        codes, scales = encode(
+            vectors[order],
+            manifest["dtype"],
+            None if codebooks is None else np.load(self.path / codebooks),
+        )
+        np.save(staging / "codes.npy", np.ascontiguousarray(codes))
+        if scales is not None:
+            np.save(staging / "scales.npy", scales)
+        if manifest.get("raw") and codes.dtype != np.float32:  # Else exact already
+            np.save(staging / "raw.npy", np.ascontiguousarray(vectors[order]))
+        np.save(staging / "offsets.npy", offsets)
+        np.save(staging / "doc_ords.npy", doc_ords[order])
+        np.save(staging / "chunk_indexes.npy", chunk_indexes[order])
+        staging.rename(self.path / name)
+        return name
+
+    def _save_array(self, array: np.ndarray, prefix: str) -> str:
+        name = f"{prefix}-{uuid.uuid4().hex}.npy"
+        staging = self.path / f".{name}.tmp"
+        with staging.open("wb") as handle:
+            np.save(handle, array)
+        staging.rename(self.path / name)
+        return name
+
+    def _commit(self, manifest: dict) -> None:
+        staging = self.path / f".{MANIFEST}.tmp"
+        staging.write_text(json.dumps(manifest))
+        os.replace(staging, self.path / MANIFEST)
+        self._collect_garbage(manifest)
+
+    def _collect_garbage(self, manifest: dict) -> None:
+        # Open readers keep unlinked files alive through their mappings.
+        referenced = {
+            manifest["centroids"],
+            manifest.get("codebooks"),
+            *manifest["segments"],
+            MANIFEST,
+            ".lock",
+        }
+        for entry in self.path.iterdir():
+            if entry.name not in referenced and not entry.name.startswith("."):
+                if entry.is_dir():
+                    shutil.rmtree(entry, ignore_errors=True)
+                else:
+                    entry.unlink(missing_ok=True)
+
+
+def _tombstone(manifest: dict, document_id: str) -> bool:
+    deleted = set(manifest["deleted"])
+    ordinals = {
+        i for i, d in enumerate(manifest["documents"]) if d == document_id
+    } - deleted
+    manifest["deleted"] = sorted(deleted | ordinals)
+    return bool(ordinals)
+
+
+def _needs_codebooks(manifest: dict) -> bool:
+    return (
+        manifest["dtype"] == "pq"
+        and manifest.get("codebooks") is None
+        and manifest["rows"] >= PQ_MIN_TRAIN_ROWS
+    )
+
+
+def _load_segment(path: Path, codebooks: np.ndarray | None) -> Segment:
+    scales, raw = path / "scales.npy", path / "raw.npy"
+    codes = np.load(path / "codes.npy", mmap_mode="r")
+    return Segment(
+        codes=codes,
+        scales=np.load(scales) if scales.exists() else None,
+        # Float32 rows of PQ shards predate the codebooks.
+        codebooks=codebooks if codes.dtype == np.uint8 else None,
+        raw=np.load(raw, mmap_mode="r") if raw.exists() else None,
+        offsets=np.load(path / "offsets.npy"),
+        doc_ords=np.load(path / "doc_ords.npy", mmap_mode="r"),
+        chunk_indexes=np.load(path / "chunk_indexes.npy", mmap_mode="r"),
+    )
+
+
+def default_n_lists(n_vectors: int) -> int:
+    """Number of IVF lists for ``n_vectors`` (about 4·√n)."""
+    return int(np.clip(4 * np.sqrt(n_vectors), 1, MAX_LISTS))
+
+
+def assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Nearest centroid (by cosine) of each normalized vector."""
+    return np.argmax(vectors @ centroids.T, axis=1).astype(np.int64)
+
+
+def train_centroids(vectors: np.ndarray, n_lists: int, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on a sample of normalized ``vectors``."""
+    rng = np.random.default_rng(seed)
+    n_lists = max(1, min(n_lists, len(vectors)))
+    sample_size = min(len(vectors), n_lists * KMEANS_SAMPLE_PER_LIST)
+    sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        labels = assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        empty = np.bincount(labels, minlength=n_lists) == 0
+        # Re-seed empty lists with random points so none stays unused.
+        sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+        centroids = normalize(sums)
+    return centroids
@@ -0,0 +1,549 @@
+"""Web search tool: search results with the main text of their pages.
+
+A ``SearchProvider`` returns the top ``WEB_SEARCH_RESULTS`` hits for a
+query; their pages are then fetched concurrently over one pooled HTTP
+client, at most ``WEB_FETCH_PER_HOST`` at a time per host, and reduced to
+their main text in a worker thread. Each page gets
+``WEB_FETCH_TIMEOUT_SECONDS`` in all (waiting for its host included) and
+falls back to the search snippet, so a search costs at most the search
+call plus one page timeout.
+
+Hits are cached in Redis by normalized query and page text by URL, each
+with a TTL, so a repeated or similar query is served without calling the
+provider or refetching pages. Redis failures are treated as misses.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import codecs
+import hashlib
+import ipaddress
+import json
+import logging
+import re
+import socket
+import weakref
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from html import unescape
+from html.parser import HTMLParser
+from typing import Protocol
+from urllib.parse import urlsplit
+
+import httpx
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.redis_client import get_async_redis
+from app.services.embedding_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+WEB_CACHE_KEY_PREFIX = "docmind:web:"
+FAILED_PAGE_TTL_SECONDS = 600  # Before a page that could not be read is retried
+USER_AGENT = "DocMind/1.0 (research assistant)"
+BRAVE_SEARCH_URL = "https://api.search.brave.com/res/v1/web/search"
+TEXT_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+MAX_TRACKED_HOSTS = 1024  # Idle per-host limits are dropped beyond this
+MIN_MAIN_CHARS = 200  # Shorter <main>/<article> text means the markup lied
+SKIPPED_TAGS = frozenset(
+    {
+        "aside",
+        "button",
+        "footer",
+        "form",
+        "head",
+        "header",
+        "iframe",
+        "nav",
+        "noscript",
+        "script",
+        "select",
+        "style",
+        "svg",
+        "template",
+    }
+)
+BLOCK_TAGS = frozenset(
+    {
+        "article",
+        "blockquote",
+        "br",
+        "dd",
+        "div",
+        "dt",
+        "h1",
+        "h2",
+        "h3",
+        "h4",
+        "h5",
+        "h6",
+        "li",
+        "main",
+        "p",
+        "pre",
+        "section",
+        "td",
+        "th",
+        "tr",
+    }
+)
+_TAG = re.compile(r"<[^>]+>")
+_SPACES = re.compile(r"[ \t\r\f\v]+")
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    """One search result as returned by the provider."""
+
+    url: str
+    title: str
+    snippet: str
+
+
+class SearchProvider(Protocol):
+    """A web search API."""
+
+    name: str
+
+    async def search(self, query: str, limit: int) -> list[SearchHit]: ...
+
+
+class BraveSearch:
+    """Brave Search API provider.
+
+    Args:
+        client: Pooled HTTP client (shared with the page fetches).
+        api_key: Subscription token.
+    """
+
+    name = "brave"
+
+    def __init__(self, client: httpx.AsyncClient, api_key: str) -> None:
+        self._client = client
+        self._api_key = api_key
+
+    async def search(self, query: str, limit: int) -> list[SearchHit]:
+        response = await self._client.get(
+            BRAVE_SEARCH_URL,
+            params={"q": query, "count": limit},
+            headers={
+                "Accept": "application/json",
+                "X-Subscription-Token": self._api_key,
+            },
+        )
+        response.raise_for_status()
+        results = response.json().get("web", {}).get("results", [])
+        return [
+            SearchHit(
+                url=result["url"],
+                title=_strip_tags(result.get("title", "")),
+                snippet=_strip_tags(result.get("description", "")),
+            )
+            for result in results[:limit]
+        ]
+
+
+class StubSearch:
+    """Provider with canned hits per normalized query (tests, local runs).
+
+    Queries it has no hits for return none, like a search without results.
+    """
+
+    name = "stub"
+
+    def __init__(self, hits: dict[str, list[SearchHit]] | None = None) -> None:
+        self.hits = {normalize_query(query): h for query, h in (hits or {}).items()}
+        self.calls = 0
+
+    async def search(self, query: str, limit: int) -> list[SearchHit]:
+        self.calls += 1
+        return self.hits.get(normalize_query(query), [])[:limit]
+
+
+class WebSearchService:
+    """Searches the web and reads the top pages.
+
+    Args:
+        provider: Search API.
+        client: Pooled HTTP client the pages are fetched with.
+        redis_factory: Returns the asyncio Redis client holding the caches.
+        results: Hits (and so pages) per query.
+        search_timeout: Seconds allowed for the provider call.
+        page_timeout: Seconds allowed per page, fetch and extraction.
+        per_host: Concurrent fetches per host.
+        max_bytes: Page bytes read; the rest is not downloaded.
+        max_chars: Extracted characters kept per page.
+        query_ttl: Seconds hits are cached for.
+        page_ttl: Seconds page text is cached for.
+    """
+
+    def __init__(
+        self,
+        provider: SearchProvider,
+        client: httpx.AsyncClient,
+        redis_factory: Callable[[], aioredis.Redis] = get_async_redis,
+        results: int | None = None,
+        search_timeout: float | None = None,
+        page_timeout: float | None = None,
+        per_host: int | None = None,
+        max_bytes: int | None = None,
+        max_chars: int | None = None,
+        query_ttl: int | None = None,
+        page_ttl: int | None = None,
+    ) -> None:
+        self.provider = provider
+        self.results = results or settings.WEB_SEARCH_RESULTS
+        self.search_timeout = search_timeout or settings.WEB_SEARCH_TIMEOUT_SECONDS
+        self.page_timeout = page_timeout or settings.WEB_FETCH_TIMEOUT_SECONDS
+        self.max_bytes = max_bytes or settings.WEB_FETCH_MAX_BYTES
+        self.max_chars = max_chars or settings.WEB_PAGE_MAX_CHARS
+        self._client = client
+        self._redis_factory = redis_factory
+        self._query_ttl = query_ttl or settings.WEB_SEARCH_CACHE_TTL_SECONDS
+        self._page_ttl = page_ttl or settings.WEB_PAGE_CACHE_TTL_SECONDS
+        self._per_host = per_host or settings.WEB_FETCH_PER_HOST
+        self._hosts: dict[str, asyncio.Semaphore] = {}
+
+    async def search(self, query: str) -> list[dict]:
+        """Top hits for ``query`` as ``{"url", "title", "content"}`` dicts.
+
+        ``content`` is the page's main text, or the search snippet when the
+        page could not be read in time. Provider failures return no results.
+        """
+        hits = await self._hits(query)
+        if not hits:
+            return []
+        texts = await self._cached_pages([hit.url for hit in hits])
+        missing = [i for i, text in enumerate(texts) if text is None]
+        fetched = await asyncio.gather(*(self._read(hits[i].url) for i in missing))
+        for i, text in zip(missing, fetched):
+            texts[i] = text
+        return [
+            {"url": hit.url, "title": hit.title, "content": text or hit.snippet}
+            for hit, text in zip(hits, texts)
+            if text or hit.snippet
+        ]
+
+    async def close(self) -> None:
+        """Close the HTTP connection pool."""
+        await self._client.aclose()
+
+    async def _hits(self, query: str) -> list[SearchHit]:
+        key = self._query_key(query)
+        cached = await self._get(key)
+        if cached is not None:
+            return [SearchHit(**hit) for hit in json.loads(cached)]
+        try:
+            hits = await asyncio.wait_for(
+                self.provider.search(query, self.results), self.search_timeout
+            )
+        except (TimeoutError, httpx.HTTPError, KeyError, ValueError) as exc:
+            logger.warning("Web search failed: %s | %r", self.provider.name, exc)
+            return []
+        await self._set(key, json.dumps([asdict(hit) for hit in hits]), self._query_ttl)
+        return hits
+
+    async def _read(self, url: str) -> str:
+        """Fetch and extract one page; "" (cached briefly) if it failed."""
+        try:
+            text = await asyncio.wait_for(self._fetch(url), self.page_timeout)
+        except (TimeoutError, httpx.HTTPError, UnicodeError, ValueError) as exc:
+            logger.info("Page not read: %s | %r", url, exc)
+            text = ""
+        await self._set(
+            self._page_key(url),
+            text,
+            self._page_ttl if text else FAILED_PAGE_TTL_SECONDS,
+        )
+        return text
+
+    async def _fetch(self, url: str) -> str:
+        if not is_public_url(url):
+            raise ValueError("not a public http(s) URL")
+        async with self._host_gate(urlsplit(url).hostname or ""):
+            async with self._client.stream("GET", url) as response:
+                response.raise_for_status()
+                content_type = response.headers.get("content-type", "")
+                if not content_type.startswith(TEXT_CONTENT_TYPES):
+                    return ""
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body += chunk
+                    if len(body) >= self.max_bytes:
+                        break
+                encoding = _codec(response.charset_encoding)
+        document = body[: self.max_bytes].decode(encoding, "replace")
+        if content_type.startswith("text/plain"):
+            return _truncate(_clean_lines(document.splitlines()), self.max_chars)
+        return await asyncio.to_thread(extract_main_text, document, self.max_chars)
+
+    def _host_gate(self, host: str) -> asyncio.Semaphore:
+        gate = self._hosts.get(host)
+        if gate is None:
+            if len(self._hosts) >= MAX_TRACKED_HOSTS:
+                self._hosts = {h: g for h, g in self._hosts.items() if g.locked()}
+            gate = self._hosts[host] = asyncio.Semaphore(self._per_host)
+        return gate
+
+    async def _cached_pages(self, urls: list[str]) -> list[str | None]:
+        try:
+            values = await self._redis_factory().mget(
+                [self._page_key(url) for url in urls]
+            )
+        except RedisError as exc:
+            logger.warning("Web page cache read failed | %s", exc)
+            return [None] * len(urls)
+        return [None if value is None else value.decode() for value in values]
+
+    async def _get(self, key: str) -> bytes | None:
+        try:
+            return await self._redis_factory().get(key)
+        except RedisError as exc:
+            logger.warning("Web search cache read failed | %s", exc)
+            return None
+
+    async def _set(self, key: str, value: str, ttl: int) -> None:
+        try:
+            await self._redis_factory().set(key, value, ex=ttl)
+        except RedisError as exc:
+            logger.warning("Web search cache write failed | %s", exc)
+
+    def _query_key(self, query: str) -> str:
+        digest = _digest(normalize_query(query))
+        return f"{WEB_CACHE_KEY_PREFIX}q:{self.provider.name}:{self.results}:{digest}"
+
+    def _page_key(self, url: str) -> str:
+        return f"{WEB_CACHE_KEY_PREFIX}page:{_digest(normalize_url(url))}"
+
+
+class _MainTextParser(HTMLParser):
+    """Collects visible text, separately for <main>/<article> content."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.all: list[str] = []
+        self.main: list[str] = []
+        self._skipping = 0
+        self._in_main = 0
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag in SKIPPED_TAGS:
+            self._skipping += 1
+        elif tag in ("main", "article"):
+            self._in_main += 1
+        if tag in BLOCK_TAGS:
+            self._append("\n")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in SKIPPED_TAGS:
+            self._skipping = max(self._skipping - 1, 0)
+        elif tag in ("main", "article"):
+            self._in_main = max(self._in_main - 1, 0)
+        if tag in BLOCK_TAGS:
+            self._append("\n")
+
+    def handle_data(self, data: str) -> None:
+        if not self._skipping:
+            self._append(data)
+
+    def _append(self, text: str) -> None:
+        self.all.append(text)
+        if self._in_main:
+            self.main.append(text)
+
+
+def extract_main_text(html: str, max_chars: int) -> str:
+    """Readable text of an HTML page, without scripts and page chrome.
+
+    Navigation, headers, footers, forms and sidebars are dropped; when the
+    page marks its content with ``<main>`` or ``<article>``, only that is
+    kept. CPU-bound: call it off the event loop.
+    """
+    parser = _MainTextParser()
+    parser.feed(html)
+    parser.close()
+    main = _clean_lines("".join(parser.main).splitlines())
+    text = main if len(main) >= MIN_MAIN_CHARS else None
+    return _truncate(text or _clean_lines("".join(parser.all).splitlines()), max_chars)
+
+
+def normalize_query(query: str) -> str:
+    """Cache form of a query (NFC, collapsed whitespace, case-folded)."""
+    return normalize_text(query).casefold()
+
+
+def normalize_url(url: str) -> str:
+    """Cache form of a URL (lower-case scheme and host, no fragment)."""
+    parts = urlsplit(url.strip())
+    return parts._replace(
+        scheme=parts.scheme.lower(), netloc=parts.netloc.lower(), fragment=""
+    ).geturl()
+
+
+def is_public_url(url: str) -> bool:
+    """Whether ``url`` is http(s) and does not name a local or private host.
+
+    Guards the fetcher against search results (or redirects) pointing into
+    the deployment's own network by address. Names are not resolved here;
+    the web client also checks the addresses a name resolves to.
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or "").rstrip(".")
+    if parts.scheme not in ("http", "https") or not host:
+        return False
+    if host == "localhost" or host.endswith((".localhost", ".internal", ".local")):
+        return False
+    try:
+        return ipaddress.ip_address(host).is_global
+    except ValueError:
+        return True  # A name, not an address
+
+
+async def resolve_host(host: str) -> list[str]:
+    """Return every address ``host`` resolves to.
+
+    Raises:
+        OSError: If the name does not resolve.
+    """
+    infos = await asyncio.get_running_loop().getaddrinfo(
+        host, None, type=socket.SOCK_STREAM
+    )
+    return [info[4][0] for info in infos]
+
+
+def _refuse_private(
+    resolver: Callable[[str], Awaitable[list[str]]] | None,
+) -> Callable[[httpx.Request], Awaitable[None]]:
+    async def hook(request: httpx.Request) -> None:
+        if not is_public_url(str(request.url)):
+            raise httpx.RequestError(
+                f"Refusing to fetch {request.url}", request=request
+            )
+        if resolver is None or _is_address(request.url.host):
+            return
+        try:
+            addresses = await resolver(request.url.host)
+        except OSError as exc:
+            raise httpx.ConnectError(str(exc), request=request) from exc
+        if not addresses or not all(
+            ipaddress.ip_address(address).is_global for address in addresses
+        ):
+            raise httpx.RequestError(
+                f"Refusing to fetch {request.url}: resolves to {addresses}",
+                request=request,
+            )
+
+    return hook
+
+
+def _is_address(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+def build_web_client(
+    transport: httpx.AsyncBaseTransport | None = None,
+    resolver: Callable[[str], Awaitable[list[str]]] | None = None,
+) -> httpx.AsyncClient:
+    """Create the pooled client for search calls and page fetches.
+
+    Every request, redirects included, must go to a public host: the URL
+    may not name a private address, and every address its host name
+    resolves to must be public. The connection resolves the name again, so
+    a DNS server that answers differently within milliseconds (rebinding)
+    can still get past the check; egress filtering is the complete defense.
+
+    Args:
+        transport: Replaces the network transport (tests).
+        resolver: Resolves host names to addresses; DNS (``resolve_host``)
+            when using the network transport, none with a test transport.
+    """
+    if resolver is None and transport is None:
+        resolver = resolve_host
+    return httpx.AsyncClient(
+        headers={"User-Agent": USER_AGENT},
+        timeout=settings.WEB_FETCH_TIMEOUT_SECONDS,
+        follow_redirects=True,
+        max_redirects=3,
+        limits=httpx.Limits(
+            max_connections=settings.WEB_FETCH_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.WEB_FETCH_MAX_CONNECTIONS,
+        ),
+        event_hooks={"request": [_refuse_private(resolver)]},
+        transport=transport,
+    )
+
+
+def build_search_provider(name: str, client: httpx.AsyncClient) -> SearchProvider:
+    """Instantiate the provider selected by ``WEB_SEARCH_PROVIDER``.
+
+    Raises:
+        ValueError: If the provider name is unknown.
+    """
+    if name == "brave":
+        return BraveSearch(client, settings.WEB_SEARCH_API_KEY)
+    if name == "stub":
+        return StubSearch()
+    raise ValueError(f"Unknown web search provider: {name}")
+
+
+def _codec(charset: str | None) -> str:
+    """The page's declared charset if Python knows it, else UTF-8."""
+    try:
+        return codecs.lookup(charset or "utf-8").name
+    except LookupError:
+        return "utf-8"
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _strip_tags(text: str) -> str:
+    return unescape(_TAG.sub("", text))
+
+
+def _clean_lines(lines: list[str]) -> str:
+    cleaned = (_SPACES.sub(" ", line).strip() for line in lines)
+    return "\n".join(line for line in cleaned if line)
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + " …"
+
+
+_services: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, WebSearchService] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_web_search() -> WebSearchService:
+    """Return the web search service of the running event loop.
+
+    Its connection pool is bound to the loop, so services are kept per loop
+    like the asyncio Redis clients.
+    """
+    loop = asyncio.get_running_loop()
+    service = _services.get(loop)
+    if service is None:
+        client = build_web_client()
+        service = WebSearchService(
+            build_search_provider(settings.WEB_SEARCH_PROVIDER, client), client
+        )
+        _services[loop] = service
+    return service
+
+
+async def close_web_search() -> None:
+    """Close the running event loop's service, if one was created."""
+    service = _services.pop(asyncio.get_running_loop(), None)
+    if service is not None:
+        await service.close()
@@ -0,0 +1,205 @@
+"""Fair scheduling of document processing across users.
+
+Documents are routed by workload class: text and Markdown files up to
+``INGEST_SMALL_FILE_MB`` go to ``documents.small``, PDFs and larger files to
+``documents.large``, so a backlog of big PDFs never delays a quick note.
+Within a queue a document's priority comes from how many of its owner's
+documents are already queued or running: a user's first document gets the
+highest priority and the rest of a bulk upload sinks behind everyone
+else's first documents. Workers also cap how many of one user's documents
+run at once; a task over the cap goes back to its queue.
+
+Fairness state lives in Redis so every API process and worker shares it.
+Queue depth is read from the Redis broker's priority lists.
+"""
+
+from __future__ import annotations
+
+import time
+from functools import lru_cache
+
+import numpy as np
+import redis
+
+from app.core.config import settings
+from app.core.metrics import Counters, RedisCounters
+from app.core.redis_client import get_redis
+from app.schemas.metrics import IngestQueueMetrics
+
+QUEUE_SMALL = "documents.small"
+QUEUE_LARGE = "documents.large"
+QUEUES = (QUEUE_SMALL, QUEUE_LARGE)
+QUEUE_REINDEX = "documents.reindex"  # Background re-embedding, own worker
+SMALL_MIME_TYPES = frozenset({"text/plain", "text/markdown"})
+
+# Redis transport priorities: 0 is served first, 9 last.
+PRIORITY_STEPS = list(range(10))
+LOWEST_PRIORITY = PRIORITY_STEPS[-1]
+BROKER_PRIORITY_SEP = ":"
+
+INGEST_KEY_PREFIX = "docmind:ingest:"
+PENDING_TTL_SECONDS = 24 * 3600  # Forgets counts leaked by lost tasks
+TIMING_SAMPLES = 1000  # Recent waits kept per queue for percentiles
+
+
+def workload_queue(mime_type: str | None, size_bytes: int | None) -> str:
+    """Return the queue for a document of this type and size."""
+    small_bytes = settings.INGEST_SMALL_FILE_MB * 1024 * 1024
+    if mime_type in SMALL_MIME_TYPES and (size_bytes or 0) <= small_bytes:
+        return QUEUE_SMALL
+    return QUEUE_LARGE
+
+
+def priority_for(ahead: int) -> int:
+    """Broker priority for a document with ``ahead`` of its owner's in flight."""
+    return min(ahead, LOWEST_PRIORITY)
+
+
+class IngestScheduler:
+    """Per-user queueing, concurrency slots and queue timing metrics.
+
+    Args:
+        client: Redis holding the fairness state and timing samples.
+        broker: Redis broker whose queue lengths are reported.
+        counters: Started/deferred/finished counts.
+        max_per_user: Documents of one user processed at once.
+        lease_seconds: A slot held this long is freed even if its worker
+            died without releasing it.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        broker: redis.Redis,
+        counters: Counters,
+        max_per_user: int = 3,
+        lease_seconds: int = 1800,
+    ) -> None:
+        self._client = client
+        self._broker = broker
+        self._counters = counters
+        self.max_per_user = max_per_user
+        self.lease_seconds = lease_seconds
+
+    def enqueue(self, user_id: str) -> int:
+        """Count a newly queued document and return its priority."""
+        key = f"{INGEST_KEY_PREFIX}pending:{user_id}"
+        with self._client.pipeline(transaction=True) as pipe:
+            pipe.incr(key)
+            pipe.expire(key, PENDING_TTL_SECONDS)
+            in_flight, _ = pipe.execute()
+        return priority_for(int(in_flight) - 1)
+
+    def acquire(self, user_id: str, task_id: str) -> bool:
+        """Take one of the user's processing slots for ``task_id``.
+
+        Returns:
+            False if the user already has ``max_per_user`` documents
+            running; the caller should requeue the task.
+        """
+        key = f"{INGEST_KEY_PREFIX}running:{user_id}"
+        now = time.time()
+        with self._client.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(key, "-inf", now)
+            pipe.zadd(key, {task_id: now + self.lease_seconds})
+            pipe.expire(key, self.lease_seconds)
+            pipe.zcard(key)
+            running = pipe.execute()[-1]
+        if running <= self.max_per_user:
+            return True
+        # Two tasks racing for the last slot may both back off; neither
+        # ever runs past the cap.
+        self._client.zrem(key, task_id)
+        return False
+
+    def renew(self, user_id: str, task_id: str) -> None:
+        """Extend the lease of a slot ``task_id`` still holds."""
+        key = f"{INGEST_KEY_PREFIX}running:{user_id}"
+        with self._client.pipeline(transaction=True) as pipe:
+            pipe.zadd(key, {task_id: time.time() + self.lease_seconds}, xx=True)
+            pipe.expire(key, self.lease_seconds)
+            pipe.execute()
+
+    def release(self, user_id: str, task_id: str) -> None:
+        """Free the slot taken by ``task_id``."""
+        self._client.zrem(f"{INGEST_KEY_PREFIX}running:{user_id}", task_id)
+
+    def started(self, queue: str, enqueued_at: float | None) -> None:
+        """Record that a document left ``queue`` for processing."""
+        self._counters.incr(f"{queue}:started")
+        if enqueued_at is not None:
+            self._sample(f"wait:{queue}", time.time() - enqueued_at)
+
+    def deferred(self, queue: str) -> None:
+        """Record a task requeued because its owner was at the cap."""
+        self._counters.incr(f"{queue}:deferred")
+
+    def finished(self, user_id: str, queue: str, enqueued_at: float | None) -> None:
+        """Record that a document reached READY or FAILED."""
+        key = f"{INGEST_KEY_PREFIX}pending:{user_id}"
+        if self._client.decr(key) <= 0:
+            self._client.delete(key)
+        self._counters.incr(f"{queue}:finished")
+        if enqueued_at is not None:
+            self._sample(f"done:{queue}", time.time() - enqueued_at)
+
+    def stats(self) -> list[IngestQueueMetrics]:
+        """Return depth, throughput counts and wait percentiles per queue."""
+        counts = self._counters.snapshot()
+        metrics = []
+        for queue in QUEUES:
+            waits = self._samples(f"wait:{queue}")
+            done = self._samples(f"done:{queue}")
+            metrics.append(
+                IngestQueueMetrics(
+                    queue=queue,
+                    depth=self._depth(queue),
+                    started=counts.get(f"{queue}:started", 0),
+                    deferred=counts.get(f"{queue}:deferred", 0),
+                    finished=counts.get(f"{queue}:finished", 0),
+                    p50_wait_ms=_percentile_ms(waits, 50),
+                    p95_wait_ms=_percentile_ms(waits, 95),
+                    p95_time_to_done_ms=_percentile_ms(done, 95),
+                )
+            )
+        return metrics
+
+    def _depth(self, queue: str) -> int:
+        # Kombu keeps one Redis list per priority step; step 0 is the bare name.
+        with self._broker.pipeline(transaction=False) as pipe:
+            for step in PRIORITY_STEPS:
+                pipe.llen(f"{queue}{BROKER_PRIORITY_SEP}{step}" if step else queue)
+            return sum(pipe.execute())
+
+    def _sample(self, name: str, seconds: float) -> None:
+        key = f"{INGEST_KEY_PREFIX}{name}"
+        with self._client.pipeline(transaction=False) as pipe:
+            pipe.lpush(key, round(seconds * 1000))
+            pipe.ltrim(key, 0, TIMING_SAMPLES - 1)
+            pipe.execute()
+
+    def _samples(self, name: str) -> list[int]:
+        return [
+            int(v) for v in self._client.lrange(f"{INGEST_KEY_PREFIX}{name}", 0, -1)
+        ]
+
+
+def _percentile_ms(samples: list[int], q: float) -> float:
+    return float(np.percentile(samples, q)) if samples else 0.0
+
+
+@lru_cache(maxsize=1)
+def get_ingest_scheduler() -> IngestScheduler:
+    """Return the Redis-backed scheduler (one per process)."""
+    client = get_redis()
+    broker_url = settings.CELERY_BROKER_URL or settings.REDIS_URL
+    broker = (
+        client if broker_url == settings.REDIS_URL else redis.Redis.from_url(broker_url)
+    )
+    return IngestScheduler(
+        client,
+        broker,
+        RedisCounters(client, "ingest"),
+        max_per_user=settings.INGEST_MAX_PER_USER,
+        lease_seconds=settings.INGEST_SLOT_LEASE_SECONDS,
+    )
@@ -0,0 +1,66 @@
+"""Page-range sharding of large PDFs across workers.
+
+A PDF with more than ``INGEST_SHARD_PAGES`` pages is split into page
+ranges that are extracted, chunked, embedded and staged by separate tasks
+in parallel; a finalizer publishes the staged chunks once every range is
+done. Each finished range is checkpointed in Redis with its chunk count,
+so a retried or redelivered range task, or a re-run of the whole fan-out,
+skips the ranges that already completed.
+
+Chunks never span two ranges: a chunk that would cross a range boundary
+is cut there, so neighbouring chunks of adjacent ranges do not overlap.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+
+import redis
+
+from app.core.redis_client import get_redis
+
+SHARDS_KEY_PREFIX = "docmind:ingest:shards:"
+CHECKPOINT_TTL_SECONDS = 24 * 3600  # Outlives every retry of a document
+
+
+def plan_shards(page_count: int, pages_per_shard: int) -> list[range]:
+    """Split pages 1..page_count into consecutive ranges of 1-based pages."""
+    return [
+        range(first, min(first + pages_per_shard, page_count + 1))
+        for first in range(1, page_count + 1, pages_per_shard)
+    ]
+
+
+class ShardCheckpoints:
+    """Chunk counts of a document's completed shards, in one Redis hash."""
+
+    def __init__(self, client: redis.Redis) -> None:
+        self._client = client
+
+    def get(self, document_id: str, shard: int) -> int | None:
+        """Return the chunk count of a completed shard, or None."""
+        count = self._client.hget(SHARDS_KEY_PREFIX + document_id, str(shard))
+        return None if count is None else int(count)
+
+    def completed(self, document_id: str) -> dict[int, int]:
+        """Return ``{shard: chunk count}`` of every completed shard."""
+        raw = self._client.hgetall(SHARDS_KEY_PREFIX + document_id)
+        return {int(shard): int(count) for shard, count in raw.items()}
+
+    def complete(self, document_id: str, shard: int, count: int) -> None:
+        """Record that ``shard`` staged ``count`` chunks."""
+        key = SHARDS_KEY_PREFIX + document_id
+        with self._client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, str(shard), count)
+            pipe.expire(key, CHECKPOINT_TTL_SECONDS)
+            pipe.execute()
+
+    def clear(self, document_id: str) -> None:
+        """Forget a document's shards once it is published or failed."""
+        self._client.delete(SHARDS_KEY_PREFIX + document_id)
+
+
+@lru_cache(maxsize=1)
+def get_shard_checkpoints() -> ShardCheckpoints:
+    """Return the Redis-backed checkpoints (one per process)."""
+    return ShardCheckpoints(get_redis())
@@ -2,14 +2,59 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
+from collections.abc import Callable, Coroutine
+from functools import partial
+from typing import Any, TypeVar
 
-from celery import Celery
+from celery import Celery, Task, chord, group
+from celery.exceptions import Retry
+from celery.signals import worker_ready
 
 from app.core.config import settings
+from app.core.constants import DocumentStatus
+from app.core.redis_client import close_async_redis, get_redis
+from app.core.supabase_client import get_supabase_client
+from app.services.chunking import get_tokenizer
+from app.services.database import SupabaseDatabase
+from app.services.dedup import get_dedup_service
+from app.services.document_events import get_document_events
+from app.services.embedding import get_embedding_service_for
+from app.services.extraction import PDF_MIME_TYPE, ExtractionError
+from app.services.index_versions import (
+    INITIAL_INDEX_VERSION,
+    IndexSpec,
+    IndexVersion,
+    get_index_versions,
+)
+from app.services.ingestion import StagedChunkSink, count_pages, ingest_document
+from app.services.retrieval import (
+    SupabaseKnowledgeBaseStore,
+    add_to_vector_index,
+    bump_kb_version,
+    drop_vector_index,
+)
+from app.services.storage import build_storage
+from app.workers.scheduling import (
+    BROKER_PRIORITY_SEP,
+    LOWEST_PRIORITY,
+    PRIORITY_STEPS,
+    QUEUE_LARGE,
+    QUEUE_REINDEX,
+    get_ingest_scheduler,
+    priority_for,
+    workload_queue,
+)
+from app.workers.sharding import get_shard_checkpoints, plan_shards
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+REINDEX_PAGE_ROWS = 500  # READY documents listed per request by a sweep
+
 broker_url = settings.CELERY_BROKER_URL or settings.REDIS_URL
 
 celery_app = Celery(
@@ -25,6 +70,14 @@ celery_app.conf.update(
     task_acks_late=True,  # Ensures messages are re-queued on worker crash
     task_reject_on_worker_lost=True,
     worker_prefetch_multiplier=1,
+    # Workers consume documents.small and documents.large (see scheduling);
+    # the Redis transport keeps one list per priority step and serves 0 first.
+    task_default_queue=QUEUE_LARGE,
+    broker_transport_options={
+        "priority_steps": PRIORITY_STEPS,
+        "sep": BROKER_PRIORITY_SEP,
+        "queue_order_strategy": "priority",
+    },
 )
 
 
@@ -34,34 +87,642 @@ celery_app.conf.update(
     default_retry_delay=settings.CELERY_TASK_RETRY_DELAY_SECONDS,
     name="tasks.process_document",
 )
-def process_document(self, document_id: str, user_id: str, storage_path: str) -> None:
+def process_document(
+    self,
+    document_id: str,
+    user_id: str,
+    storage_path: str,
+    content_hash: str | None = None,
+    mime_type: str | None = None,
+    size_bytes: int | None = None,
+    enqueued_at: float | None = None,
+) -> None:
     """Async task: extract → chunk → embed → store vectors.
 
+    Byte-identical content that was already ingested is linked to the
+    existing chunks and vectors instead of being processed again. Otherwise
+    the document is streamed through the bounded ingestion pipeline, or,
+    for a PDF of more than ``INGEST_SHARD_PAGES`` pages, split into page
+    ranges processed by parallel ``process_page_range`` tasks and published
+    by ``finalize_document``; the document then keeps its processing slot
+    until it is finalized or failed. If the owner already has
+    ``INGEST_MAX_PER_USER`` documents processing, the task is requeued.
+
     Args:
         document_id: UUID of the document record.
         user_id: Owner's Supabase user ID.
         storage_path: Path in Supabase Storage bucket.
+        content_hash: SHA-256 of the stored bytes, computed during upload.
+        mime_type: Declared content type; inferred from the path if omitted.
+        size_bytes: Stored size, which selects the workload queue.
+        enqueued_at: Epoch seconds of the upload, for queue wait metrics.
 
     Status transitions: PENDING → PROCESSING → READY | FAILED
-    # TODO(#3): Implement full extraction/chunking/embedding pipeline.
     """
+    scheduler = get_ingest_scheduler()
+    queue = workload_queue(mime_type, size_bytes)
+    if not scheduler.acquire(user_id, document_id):
+        logger.info("Deferring doc_id=%s: user=%s at capacity", document_id, user_id)
+        scheduler.deferred(queue)
+        process_document.apply_async(
+            (document_id, user_id, storage_path, content_hash, mime_type),
+            {"size_bytes": size_bytes, "enqueued_at": enqueued_at},
+            queue=queue,
+            priority=LOWEST_PRIORITY,
+            countdown=settings.INGEST_DEFER_SECONDS,
+        )
+        return
+    if not self.request.retries:
+        scheduler.started(queue, enqueued_at)
+
+    retrying = handed_off = False
+    try:
+        handed_off = _process(
+            self,
+            document_id,
+            user_id,
+            storage_path,
+            content_hash,
+            mime_type,
+            size_bytes,
+            enqueued_at,
+        )
+    except Retry:
+        retrying = True
+        raise
+    finally:
+        if not handed_off:
+            scheduler.release(user_id, document_id)
+        if not (retrying or handed_off):
+            scheduler.finished(user_id, queue, enqueued_at)
+
+
+@celery_app.task(
+    bind=True,
+    max_retries=settings.CELERY_TASK_MAX_RETRIES,
+    default_retry_delay=settings.CELERY_TASK_RETRY_DELAY_SECONDS,
+    name="tasks.process_page_range",
+)
+def process_page_range(
+    self,
+    document_id: str,
+    user_id: str,
+    storage_path: str,
+    mime_type: str | None,
+    shard: int,
+    first_page: int,
+    last_page: int,
+    index_version: str = INITIAL_INDEX_VERSION,
+) -> int:
+    """Stage the chunks of pages ``first_page``..``last_page`` of a PDF.
+
+    Retries only repeat this range. A range that already completed (e.g. a
+    redelivered task) returns its checkpointed count without any work.
+
+    Returns:
+        Number of chunks staged for the range.
+    """
+    checkpoints = get_shard_checkpoints()
+    count = checkpoints.get(document_id, shard)
+    if count is not None:
+        return count
+    get_ingest_scheduler().renew(user_id, document_id)
+    try:
+        count = _run(
+            _ingest(
+                document_id,
+                user_id,
+                storage_path,
+                mime_type,
+                shard=shard,
+                pages=range(first_page, last_page + 1),
+                version=get_index_versions().get(index_version),
+            )
+        )
+    except ExtractionError:
+        raise  # Retrying cannot make the PDF readable; fails the document.
+    except Exception as exc:
+        logger.error(
+            "Page range %d-%d failed: doc_id=%s | %s",
+            first_page,
+            last_page,
+            document_id,
+            exc,
+        )
+        raise self.retry(exc=exc) from exc
+    checkpoints.complete(document_id, shard, count)
+    get_document_events().add_progress(
+        document_id, user_id, last_page - first_page + 1, count
+    )
+    return count
+
+
+@celery_app.task(
+    bind=True,
+    max_retries=settings.CELERY_TASK_MAX_RETRIES,
+    default_retry_delay=settings.CELERY_TASK_RETRY_DELAY_SECONDS,
+    name="tasks.finalize_document",
+)
+def finalize_document(
+    self,
+    counts: list[int],
+    document_id: str,
+    user_id: str,
+    content_hash: str | None = None,
+    enqueued_at: float | None = None,
+    index_version: str = INITIAL_INDEX_VERSION,
+) -> None:
+    """Publish the staged chunks of every page range and mark READY.
+
+    Args:
+        counts: Chunks staged per page range (the chord's results).
+    """
+    total = sum(counts)
+    if total == 0:
+        _set_status(
+            document_id,
+            user_id,
+            DocumentStatus.FAILED,
+            error_message="Document contains no extractable text.",
+        )
+    else:
+        try:
+            _run(_publish(document_id, total, index_version))
+        except Exception as exc:
+            logger.error("Publishing failed: doc_id=%s | %s", document_id, exc)
+            raise self.retry(exc=exc) from exc
+        if content_hash:
+            get_dedup_service().register(content_hash, document_id, total)
+        _announce_ready(document_id, user_id, index_version)
+    logger.info("Sharded doc_id=%s finalized: %d chunks", document_id, total)
+    _finish_sharded(document_id, user_id, enqueued_at)
+
+
+@celery_app.task(name="tasks.fail_document")
+def fail_document(
+    request,
+    exc: BaseException,
+    traceback,
+    document_id: str,
+    user_id: str,
+    enqueued_at: float | None = None,
+    index_version: str = INITIAL_INDEX_VERSION,
+) -> None:
+    """Mark a sharded document FAILED when a range or the finalizer gives up."""
+    logger.error("Sharded processing failed: doc_id=%s | %s", document_id, exc)
+    _set_status(document_id, user_id, DocumentStatus.FAILED, error_message=str(exc))
+    try:
+        _run(_discard_staged(document_id, index_version))
+    except Exception as cleanup_exc:
+        logger.warning("Staged rows left for doc_id=%s | %s", document_id, cleanup_exc)
+    _finish_sharded(document_id, user_id, enqueued_at)
+
+
+@celery_app.task(name="tasks.reindex_corpus")
+def reindex_corpus() -> None:
+    """Sweep READY documents into the target index version, then cut over.
+
+    Each sweep dispatches ``reembed_document`` for every READY document
+    without rows for the target version (skipping those claimed within
+    ``REINDEX_CLAIM_SECONDS``) and schedules the next sweep. The sweep that
+    finds nothing left switches queries to the target version. Queries use
+    the active version throughout, so none are dropped or mixed.
+    """
+    versions = get_index_versions()
+    target = versions.target()
+    if target is None or not versions.claim_sweep(
+        target.id, max(settings.REINDEX_SWEEP_SECONDS - 1, 1)
+    ):
+        return
+    remaining = _run(_sweep(target))
+    versions.record_remaining(target.id, remaining)
+    if remaining == 0:
+        _cut_over(target)
+        return
+    logger.info("Re-embedding into %s: %d documents left", target.id, remaining)
+    reindex_corpus.apply_async(
+        queue=QUEUE_REINDEX, countdown=settings.REINDEX_SWEEP_SECONDS
+    )
+
+
+@celery_app.task(
+    bind=True,
+    max_retries=settings.CELERY_TASK_MAX_RETRIES,
+    default_retry_delay=settings.CELERY_TASK_RETRY_DELAY_SECONDS,
+    rate_limit=settings.REINDEX_RATE_LIMIT,
+    name="tasks.reembed_document",
+)
+def reembed_document(self, document_id: str, user_id: str, index_version: str) -> None:
+    """Re-chunk and re-embed one READY document into ``index_version``.
+
+    The new rows are staged and published next to the document's rows of
+    other versions, which stay searchable until the cut-over retires them.
+    A document that became unreadable is counted as migrated, so it cannot
+    hold the cut-over back; other failures retry, and a document that still
+    fails is picked up again by a later sweep.
+    """
+    versions = get_index_versions()
+    version = versions.get(index_version)
+    try:
+        document = _run(_get_document(document_id, user_id))
+        if document is None:
+            return  # Deleted since the sweep listed it.
+        count = _run(
+            _ingest(
+                document_id,
+                user_id,
+                document["storage_path"],
+                document.get("mime_type"),
+                version=version,
+            )
+        )
+    except ExtractionError as exc:
+        logger.warning("Re-embedding skipped doc_id=%s | %s", document_id, exc)
+        versions.migrated(index_version, document_id, user_id)
+        return
+    except Exception as exc:
+        logger.error("Re-embedding failed: doc_id=%s | %s", document_id, exc)
+        raise self.retry(exc=exc) from exc
+    if count:
+        _add_to_vector_index(document_id, user_id, index_version)
+    versions.migrated(index_version, document_id, user_id)
+    _follow_cut_over(document_id, user_id, index_version)
+
+
+@celery_app.task(name="tasks.retire_index_version")
+def retire_index_version(index_version: str, user_ids: list[str]) -> None:
+    """Delete the rows and shards of a version queries no longer read."""
+    versions = get_index_versions()
+    target = versions.target()
+    if index_version == versions.active().id or (
+        target is not None and index_version == target.id
+    ):
+        logger.info("Index version %s is in use again; not retiring", index_version)
+        return
+    deleted = _run(_delete_chunk_version(index_version, user_ids))
+    for user_id in user_ids:
+        drop_vector_index(user_id, index_version)
+    logger.info("Retired index version %s: %d chunks", index_version, deleted)
+
+
+def start_reindex() -> IndexVersion | None:
+    """Start migrating to the configured index spec if it is not active.
+
+    Returns:
+        The target version, or None if the configuration matches the
+        active version.
+    """
+    target = get_index_versions().begin(IndexSpec.from_settings())
+    if target is not None:
+        logger.info("Index settings changed; re-embedding into %s", target.id)
+        reindex_corpus.apply_async(queue=QUEUE_REINDEX)
+    return target
+
+
+@worker_ready.connect
+def _start_reindex_on_boot(**kwargs) -> None:
+    if settings.REINDEX_AUTO_START:
+        start_reindex()
+
+
+def enqueue_document(
+    document_id: str,
+    user_id: str,
+    storage_path: str,
+    content_hash: str | None,
+    mime_type: str | None,
+    size_bytes: int | None,
+) -> None:
+    """Queue a document on its workload queue at its owner's fair priority."""
+    process_document.apply_async(
+        (document_id, user_id, storage_path, content_hash, mime_type),
+        {"size_bytes": size_bytes, "enqueued_at": time.time()},
+        queue=workload_queue(mime_type, size_bytes),
+        priority=get_ingest_scheduler().enqueue(user_id),
+    )
+
+
+def _process(
+    task: Task,
+    document_id: str,
+    user_id: str,
+    storage_path: str,
+    content_hash: str | None,
+    mime_type: str | None,
+    size_bytes: int | None,
+    enqueued_at: float | None,
+) -> bool:
+    """Process a document; return True if it was handed off to range tasks."""
     logger.info("Processing document: doc_id=%s user=%s", document_id, user_id)
     try:
-        # TODO(#3): 1. Download file from Supabase Storage
-        # TODO(#3): 2. Extract text (PyMuPDF for PDF, plain read for MD/TXT)
-        # TODO(#3): 3. Chunk text (512 tokens, 64 overlap)
-        # TODO(#4): 4. Generate embeddings via embedding service
-        # TODO(#4): 5. Store vectors in pgvector
-        # TODO(#3): 6. Update document status → READY
-        raise NotImplementedError(
-            "Document processing pipeline not implemented (Issue #3)."
+        version = get_index_versions().active()
+        dedup = get_dedup_service()
+        if content_hash and dedup.link_duplicate(
+            content_hash, document_id, user_id, version.id
+        ):
+            _mark_ready(document_id, user_id, version.id)
+            return False
+        _set_status(document_id, user_id, DocumentStatus.PROCESSING)
+        if _shardable(mime_type, size_bytes):
+            pages = _run(_count_pages(storage_path, mime_type))
+            if pages > settings.INGEST_SHARD_PAGES:
+                _fan_out(
+                    task,
+                    document_id,
+                    user_id,
+                    storage_path,
+                    content_hash,
+                    mime_type,
+                    enqueued_at,
+                    pages,
+                    version.id,
+                )
+                return True
+        progress = partial(get_document_events().progress, document_id, user_id)
+        chunk_count = _run(
+            _ingest(
+                document_id,
+                user_id,
+                storage_path,
+                mime_type,
+                version=version,
+                progress=progress,
+            )
         )
+        if content_hash:
+            dedup.register(content_hash, document_id, chunk_count)
+        # Publishing the chunks already marked the document READY.
+        _announce_ready(document_id, user_id, version.id)
+    except ExtractionError as exc:
+        # Retrying cannot make an unreadable or empty document readable.
+        logger.warning("Extraction failed: doc_id=%s | %s", document_id, exc)
+        _set_status(document_id, user_id, DocumentStatus.FAILED, error_message=str(exc))
     except Exception as exc:
         logger.error("Document processing failed: doc_id=%s | %s", document_id, exc)
+        if task.request.retries < task.max_retries:
+            raise task.retry(exc=exc) from exc
+        # Retrying with ``exc`` re-raises it once retries run out, so the
+        # last attempt marks the document FAILED itself.
+        logger.error("Max retries exceeded for doc_id=%s — marking FAILED", document_id)
+        _set_status(document_id, user_id, DocumentStatus.FAILED, error_message=str(exc))
+    return False
+
+
+def _shardable(mime_type: str | None, size_bytes: int | None) -> bool:
+    # Small PDFs are never split, which skips downloading them to count pages.
+    min_bytes = settings.INGEST_SHARD_MIN_MB * 1024 * 1024
+    return (
+        settings.INGEST_SHARD_PAGES > 0
+        and mime_type == PDF_MIME_TYPE
+        and (size_bytes or 0) >= min_bytes
+    )
+
+
+def _fan_out(
+    task: Task,
+    document_id: str,
+    user_id: str,
+    storage_path: str,
+    content_hash: str | None,
+    mime_type: str | None,
+    enqueued_at: float | None,
+    pages: int,
+    index_version: str,
+) -> None:
+    """Dispatch one task per page range, then a finalizer once all succeed."""
+    if not get_shard_checkpoints().completed(document_id):
+        # Rows staged by an earlier unsharded attempt would break the count.
+        _run(_discard_staged(document_id, index_version))
+    shards = plan_shards(pages, settings.INGEST_SHARD_PAGES)
+    # Ranges sink in priority like a burst of uploads, so other users' first
+    # documents still go ahead of most of a huge PDF.
+    base = (task.request.delivery_info or {}).get("priority") or 0
+    header = group(
+        process_page_range.si(
+            document_id,
+            user_id,
+            storage_path,
+            mime_type,
+            shard,
+            page_range.start,
+            page_range.stop - 1,
+            index_version,
+        ).set(queue=QUEUE_LARGE, priority=priority_for(base + shard))
+        for shard, page_range in enumerate(shards)
+    )
+    finalize = finalize_document.s(
+        document_id, user_id, content_hash, enqueued_at, index_version
+    )
+    chord(header)(
+        finalize.set(queue=QUEUE_LARGE, priority=0).on_error(
+            fail_document.s(document_id, user_id, enqueued_at, index_version)
+        )
+    )
+    logger.info(
+        "Sharded doc_id=%s: %d pages in %d ranges", document_id, pages, len(shards)
+    )
+
+
+def _finish_sharded(document_id: str, user_id: str, enqueued_at: float | None) -> None:
+    get_shard_checkpoints().clear(document_id)
+    get_document_events().clear_progress(document_id)
+    scheduler = get_ingest_scheduler()
+    scheduler.release(user_id, document_id)
+    scheduler.finished(user_id, QUEUE_LARGE, enqueued_at)
+
+
+def _run(coro: Coroutine[Any, Any, T]) -> T:
+    """``asyncio.run`` that closes the loop's asyncio Redis client at the end.
+
+    Each run gets a new event loop, and with it a new client from
+    ``get_async_redis``; without this its connections would outlive the loop.
+    """
+
+    async def main() -> T:
         try:
-            self.retry(exc=exc)
-        except self.MaxRetriesExceededError:
-            logger.error(
-                "Max retries exceeded for doc_id=%s — marking FAILED", document_id
-            )
-            # TODO(#3): Update document status → FAILED in Supabase DB
+            return await coro
+        finally:
+            await close_async_redis()
+
+    return asyncio.run(main())
+
+
+def _database() -> SupabaseDatabase:
+    # Per task: the pooled client belongs to this task's event loop.
+    return SupabaseDatabase(
+        settings.SUPABASE_URL,
+        settings.SUPABASE_SERVICE_KEY,
+        timeout=settings.DATABASE_TIMEOUT_SECONDS,
+        bulk_rows=settings.DATABASE_BULK_ROWS,
+    )
+
+
+async def _count_pages(storage_path: str, mime_type: str | None) -> int:
+    storage = build_storage()
+    try:
+        return await count_pages(storage, storage_path, mime_type)
+    finally:
+        await storage.aclose()
+
+
+async def _publish(document_id: str, count: int, index_version: str) -> None:
+    database = _database()
+    try:
+        await database.publish_chunks(document_id, count, index_version)
+    finally:
+        await database.aclose()
+
+
+async def _discard_staged(document_id: str, index_version: str) -> None:
+    database = _database()
+    try:
+        await database.discard_staged_chunks(document_id, index_version=index_version)
+    finally:
+        await database.aclose()
+
+
+async def _get_document(document_id: str, user_id: str) -> dict | None:
+    database = _database()
+    try:
+        return await database.get_document(
+            document_id, user_id, "id,storage_path,mime_type"
+        )
+    finally:
+        await database.aclose()
+
+
+async def _sweep(target: IndexVersion) -> int:
+    """Dispatch re-embedding of unmigrated READY documents; return how many."""
+    versions = get_index_versions()
+    database = _database()
+    remaining, after = 0, None
+    try:
+        while page := await database.ready_documents(after, REINDEX_PAGE_ROWS):
+            owners = {row["id"]: row["user_id"] for row in page}
+            for document_id in versions.unmigrated(target.id, list(owners)):
+                remaining += 1
+                if versions.claim(
+                    target.id, document_id, settings.REINDEX_CLAIM_SECONDS
+                ):
+                    reembed_document.apply_async(
+                        (document_id, owners[document_id], target.id),
+                        queue=QUEUE_REINDEX,
+                    )
+            after = page[-1]["id"]
+    finally:
+        await database.aclose()
+    return remaining
+
+
+async def _delete_chunk_version(index_version: str, user_ids: list[str]) -> int:
+    database = _database()
+    try:
+        # Per user, so no single statement locks every row of the version.
+        return sum(
+            [
+                await database.delete_chunk_version(index_version, user_id)
+                for user_id in user_ids
+            ]
+        )
+    finally:
+        await database.aclose()
+
+
+async def _ingest(
+    document_id: str,
+    user_id: str,
+    storage_path: str,
+    mime_type: str | None,
+    shard: int | None = None,
+    pages: range | None = None,
+    version: IndexVersion | None = None,
+    progress: Callable[[int, int], None] | None = None,
+) -> int:
+    # Chunked and embedded with the settings of the version (default: active).
+    version = version or get_index_versions().active()
+    spec = version.spec
+    storage = build_storage()
+    database = _database()
+    try:
+        return await ingest_document(
+            storage,
+            storage_path,
+            mime_type,
+            document_id,
+            user_id,
+            get_embedding_service_for(spec.embedding_provider, spec.embedding_model),
+            StagedChunkSink(database, shard, version.id),
+            chunk_size=spec.chunk_size,
+            overlap=spec.chunk_overlap,
+            batch_size=settings.INGEST_BATCH_CHUNKS,
+            tokenizer=get_tokenizer(spec.chunk_tokenizer),
+            pages=pages,
+            progress=progress,
+        )
+    finally:
+        await storage.aclose()
+        await database.aclose()
+
+
+def _mark_ready(document_id: str, user_id: str, index_version: str) -> None:
+    """Mark a document READY and invalidate the owner's cached search index."""
+    _add_to_vector_index(document_id, user_id, index_version)
+    _set_status(document_id, user_id, DocumentStatus.READY)
+    bump_kb_version(get_redis(), user_id)
+    _follow_cut_over(document_id, user_id, index_version)
+
+
+def _announce_ready(document_id: str, user_id: str, index_version: str) -> None:
+    """Index a document already marked READY and invalidate cached indexes."""
+    _add_to_vector_index(document_id, user_id, index_version)
+    bump_kb_version(get_redis(), user_id)
+    get_document_events().status(document_id, user_id, DocumentStatus.READY)
+    _follow_cut_over(document_id, user_id, index_version)
+
+
+def _follow_cut_over(document_id: str, user_id: str, index_version: str) -> None:
+    # Written for a version that was cut over from while it was processed:
+    # the migration's last sweep missed it, so re-embed it right away.
+    versions = get_index_versions()
+    active, target = versions.active(), versions.target()
+    if index_version not in (active.id, target and target.id):
+        logger.info("Index cut over during doc_id=%s — re-embedding", document_id)
+        reembed_document.apply_async(
+            (document_id, user_id, active.id), queue=QUEUE_LARGE
+        )
+
+
+def _cut_over(target: IndexVersion) -> None:
+    """Switch queries to ``target`` and schedule the old version's removal."""
+    # Cached search indexes are keyed by version, so none need invalidating.
+    previous, user_ids = get_index_versions().cut_over(target.id)
+    logger.info("Index cut over from %s to %s", previous.id, target.id)
+    # In-flight searches finish on the old rows before they are deleted.
+    retire_index_version.apply_async(
+        (previous.id, user_ids),
+        queue=QUEUE_REINDEX,
+        countdown=settings.REINDEX_RETIRE_DELAY_SECONDS,
+    )
+
+
+def _add_to_vector_index(document_id: str, user_id: str, index_version: str) -> None:
+    try:
+        add_to_vector_index(
+            SupabaseKnowledgeBaseStore(get_supabase_client(), get_redis()),
+            user_id,
+            document_id,
+            index_version,
+        )
+    except Exception as exc:
+        # The API rebuilds an index that lags behind Postgres on next load.
+        logger.error("Vector index insert failed: doc_id=%s | %s", document_id, exc)
+
+
+def _set_status(
+    document_id: str, user_id: str, status: str, error_message: str | None = None
+) -> None:
+    """Update a document's processing status and notify its owner."""
+    get_supabase_client().table("documents").update(
+        {"status": status, "error_message": error_message}
+    ).eq("id", document_id).execute()
+    get_document_events().status(document_id, user_id, status, error_message)
@@ -0,0 +1,116 @@
+"""Recall@k and query latency of the IVF index against exact search.
+
+Writes a synthetic clustered corpus (topics with per-chunk noise, like
+embeddings of a course library) to an on-disk IVF index, memory-maps it, and
+for each ``nprobe`` compares the vector top-k with the exact brute-force
+top-k over the same normalized matrix.
+
+Usage:
+    uv run python -m benchmarks.bench_ann --chunks 200000 --nprobe 8 32 128
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+LATENT_RANK = 32
+
+
+def synthetic_corpus(n: int, dimension: int, topics: int, seed: int) -> np.ndarray:
+    # Topic centres plus variation along a shared low-rank subspace, so
+    # neighbourhoods overlap rather than forming trivially separable clusters.
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((topics, dimension), dtype=np.float32)
+    basis = rng.standard_normal((LATENT_RANK, dimension), dtype=np.float32)
+    latent = rng.standard_normal((n, LATENT_RANK), dtype=np.float32)
+    labels = rng.integers(0, topics, n)
+    return 0.5 * centers[labels] + latent @ basis
+
+
+def _measure(index, queries: np.ndarray, k: int) -> tuple[list[np.ndarray], float]:
+    results, latencies = [], []
+    for query in queries:
+        started = time.perf_counter()
+        positions, _ = index.search(query, k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append(positions)
+    return results, latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=200_000)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 32, 64, 128])
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench")
+    from app.services.vector_index import (
+        ExactIndex,
+        ShardVectorIndex,
+        VectorShards,
+        VectorShardWriter,
+        default_n_lists,
+        normalize,
+    )
+
+    vectors = synthetic_corpus(args.chunks, args.dimension, args.topics, seed=0)
+    # Queries are perturbed corpus points, so true neighbours exist but are
+    # not guaranteed to share the query's nearest centroid.
+    rng = np.random.default_rng(1)
+    picks = rng.choice(args.chunks, args.queries, replace=False)
+    queries = normalize(
+        vectors[picks]
+        + 0.5 * rng.standard_normal((args.queries, args.dimension), dtype=np.float32)
+    )
+    keys = [("doc", i) for i in range(args.chunks)]
+    exact = ExactIndex(vectors)
+
+    with tempfile.TemporaryDirectory(prefix="docmind-ann-") as tmp:
+        started = time.perf_counter()
+        VectorShardWriter(Path(tmp)).rebuild(keys, vectors)
+        build_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        ivf = VectorShards.open(Path(tmp))
+        lists = len(ivf.centroids)
+        open_s = time.perf_counter() - started
+
+        truth, exact_ms = _measure(exact, queries, args.top_k)
+        p50, p95 = np.percentile(exact_ms, [50, 95])
+        print(
+            f"{args.chunks} chunks x {args.dimension}d, {args.topics} topics, "
+            f"{lists} lists (default {default_n_lists(args.chunks)})"
+        )
+        print(f"ivf build: {build_s:.2f}s  open (mmap): {open_s * 1000:.1f}ms")
+        print(f"{'mode':<12} {'recall@' + str(args.top_k):>10} {'p50':>8} {'p95':>8}")
+        print(f"{'exact':<12} {1.0:>10.3f} {p50:>6.1f}ms {p95:>6.1f}ms")
+        for nprobe in args.nprobe:
+            found, ann_ms = _measure(
+                ShardVectorIndex(ivf, keys, nprobe), queries, args.top_k
+            )
+            recall = np.mean(
+                [
+                    len(set(f.tolist()) & set(t.tolist())) / args.top_k
+                    for f, t in zip(found, truth, strict=True)
+                ]
+            )
+            p50, p95 = np.percentile(ann_ms, [50, 95])
+            print(
+                f"{'ivf/' + str(nprobe):<12} {recall:>10.3f} {p50:>6.1f}ms {p95:>6.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
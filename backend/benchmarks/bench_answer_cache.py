@@ -0,0 +1,148 @@
+"""Answer cache hit rate per threshold and lookup cost per bucket size.
+
+Simulates one course: ``--questions`` distinct questions, each asked
+``--askers`` times as paraphrases (the question's query embedding plus
+noise), in random order, against an in-memory stand-in for Redis. For every
+threshold it reports the hit rate, the share of hits that replayed a
+different question's answer, and the generation time saved with the given
+mean answer latency. It then times a lookup against full buckets.
+
+Usage:
+    uv run python -m benchmarks.bench_answer_cache --questions 200 --askers 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+
+import numpy as np
+
+# Paraphrases of one question have cosine ~ 1 / (1 + noise^2) ~ 0.96.
+PARAPHRASE_NOISE = 0.2
+
+
+class MemoryRedis:
+    """Dict-backed stand-in for the Redis commands AnswerCache uses."""
+
+    def __init__(self) -> None:
+        self.strings: dict[str, bytes] = {}
+        self.lists: dict[str, list[bytes]] = {}
+
+    async def get(self, key):
+        return self.strings.get(key)
+
+    async def mget(self, *keys):
+        return [self.strings.get(key) for key in keys]
+
+    async def lindex(self, key, index):
+        return self.lists[key][index]
+
+    async def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    def pipeline(self, transaction: bool = True):
+        return _Pipeline(self)
+
+
+class _Pipeline:
+    def __init__(self, redis: MemoryRedis) -> None:
+        self._redis = redis
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def append(self, key, value):
+        self._redis.strings[key] = self._redis.strings.get(key, b"") + value
+
+    def rpush(self, key, value):
+        self._redis.lists.setdefault(key, []).append(value.encode())
+
+    def expire(self, key, seconds):
+        pass
+
+    async def execute(self):
+        pass
+
+
+async def _run(args: argparse.Namespace) -> None:
+    from app.services.answer_cache import AnswerCache, CachedAnswer
+    from app.services.vector_index import normalize
+
+    rng = np.random.default_rng(0)
+    questions = normalize(
+        rng.standard_normal((args.questions, args.dimension), dtype=np.float32)
+    )
+    asked = np.repeat(np.arange(args.questions), args.askers)
+    rng.shuffle(asked)
+    noise = rng.standard_normal((len(asked), args.dimension), dtype=np.float32)
+    queries = normalize(questions[asked] + PARAPHRASE_NOISE * normalize(noise))
+
+    print(
+        f"{args.questions} questions x {args.askers} askers, "
+        f"{args.answer_ms:.0f}ms per generated answer"
+    )
+    print(f"{'threshold':>9} {'hit rate':>9} {'wrong':>7} {'saved':>9}")
+    for threshold in args.thresholds:
+        redis = MemoryRedis()
+        cache = AnswerCache(
+            "bench", args.dimension, threshold, args.max_entries, 60, lambda: redis
+        )
+        wrong = 0
+        for question, query in zip(asked, queries, strict=True):
+            hit, version = await cache.lookup("course", query)
+            if hit is None:
+                await cache.store(
+                    "course", version, query, CachedAnswer(str(question), [], 0.0)
+                )
+            elif hit.answer != str(question):
+                wrong += 1
+        stats = cache.stats()
+        saved_s = stats.hits * args.answer_ms / 1000
+        print(
+            f"{threshold:>9.2f} {stats.hit_rate:>8.1%} "
+            f"{wrong / max(stats.hits, 1):>6.1%} {saved_s:>8.0f}s"
+        )
+
+    # Excludes the network transfer of the vectors a real Redis lookup reads.
+    print(f"{'entries':>9} {'bytes read':>11} {'lookup p50':>11}")
+    for entries in (16, 64, 256, 1024):
+        redis = MemoryRedis()
+        cache = AnswerCache("bench", args.dimension, 0.99, entries, 60, lambda: redis)
+        fill = rng.standard_normal((entries, args.dimension), dtype=np.float32)
+        for vector in fill:
+            await cache.store("u", "v1:0", vector, CachedAnswer("a", [], 0.0))
+        latencies = []
+        for query in queries[:200]:
+            started = time.perf_counter()
+            await cache.lookup("u", query)
+            latencies.append((time.perf_counter() - started) * 1000)
+        read_kb = entries * args.dimension * 2 / 1024  # float16
+        print(f"{entries:>9} {read_kb:>9.0f}KB {np.median(latencies):>9.3f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--askers", type=int, default=10)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--max-entries", type=int, default=256)
+    parser.add_argument("--answer-ms", type=float, default=4000)
+    parser.add_argument(
+        "--thresholds", type=float, nargs="+", default=[0.9, 0.95, 0.97, 0.99]
+    )
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench")
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
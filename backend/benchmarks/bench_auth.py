@@ -0,0 +1,144 @@
+"""Auth overhead and event-loop blocking: Supabase round trip vs local JWT checks.
+
+Authenticates ``--requests`` concurrent requests (``--concurrency`` in
+flight, ``--users`` distinct tokens) in four modes:
+
+* ``remote-blocking``: the previous dependency, a synchronous
+  ``supabase.auth.get_user`` call (simulated as a ``--rtt-ms`` sleep) made
+  on the event loop;
+* ``remote-threadpool``: the same call off the loop (the fallback path),
+  with the verified-token cache disabled;
+* ``local``: signature and expiry checks with the cache disabled;
+* ``local+cache``: the default, local checks behind the verified-token cache.
+
+Reports per-request auth latency, throughput, and event-loop lag (how late a
+10 ms ticker wakes up), which every other request on the process pays.
+
+Usage:
+    uv run python -m benchmarks.bench_auth --rtt-ms 40 --concurrency 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+TICK_SECONDS = 0.01
+SECRET = "bench-secret-with-at-least-32-bytes!"
+ISSUER = "https://bench.supabase.co/auth/v1"
+
+
+class SimulatedSupabase:
+    """``supabase.auth.get_user`` as a blocking network round trip."""
+
+    def __init__(self, rtt_ms: float) -> None:
+        self.auth = self
+        self._rtt = rtt_ms / 1000
+
+    def get_user(self, token: str) -> SimpleNamespace:
+        time.sleep(self._rtt)
+        return SimpleNamespace(user=SimpleNamespace(id="user", email=None))
+
+
+async def _remote_blocking(credentials, supabase, verifier) -> dict:
+    response = supabase.auth.get_user(credentials.credentials)
+    return {"id": response.user.id, "email": response.user.email}
+
+
+async def _ticker(lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append((time.perf_counter() - started - TICK_SECONDS) * 1000)
+
+
+async def _run(authenticate, tokens, supabase, verifier, args) -> dict:
+    from fastapi.security import HTTPAuthorizationCredentials
+
+    limit = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+
+    async def request(token: str) -> None:
+        async with limit:
+            credentials = HTTPAuthorizationCredentials(
+                scheme="Bearer", credentials=token
+            )
+            started = time.perf_counter()
+            await authenticate(credentials, supabase, verifier)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    lags: list[float] = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_ticker(lags, stop))
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(request(tokens[i % len(tokens)]) for i in range(args.requests))
+    )
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+    return {
+        "p50": np.percentile(latencies, 50),
+        "p99": np.percentile(latencies, 99),
+        "rps": args.requests / elapsed,
+        "lag": max(lags, default=0.0),
+    }
+
+
+async def _main(args: argparse.Namespace) -> None:
+    import jwt
+
+    from app.core.security import TokenVerifier, get_current_user
+
+    expires = int(time.time()) + 3600
+    tokens = [
+        jwt.encode(
+            {"sub": f"user-{i}", "aud": "authenticated", "iss": ISSUER, "exp": expires},
+            SECRET,
+        )
+        for i in range(args.users)
+    ]
+    supabase = SimulatedSupabase(args.rtt_ms)
+    modes = {
+        "remote-blocking": (_remote_blocking, TokenVerifier(SECRET, ISSUER, "")),
+        "remote-threadpool": (
+            get_current_user,
+            TokenVerifier("", ISSUER, "", cache_ttl_seconds=0),
+        ),
+        "local": (get_current_user, TokenVerifier(SECRET, ISSUER, "", cache_size=0)),
+        "local+cache": (get_current_user, TokenVerifier(SECRET, ISSUER, "")),
+    }
+    print(
+        f"{args.requests} requests, {args.concurrency} in flight, {args.users} "
+        f"users, Supabase RTT {args.rtt_ms:.0f}ms"
+    )
+    print(f"{'mode':<18} {'p50':>9} {'p99':>9} {'req/s':>9} {'max loop lag':>13}")
+    for mode, (authenticate, verifier) in modes.items():
+        result = await _run(authenticate, tokens, supabase, verifier, args)
+        print(
+            f"{mode:<18} {result['p50']:>7.2f}ms {result['p99']:>7.2f}ms "
+            f"{result['rps']:>9.0f} {result['lag']:>11.1f}ms"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--rtt-ms", type=float, default=40)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench")
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Chunk write throughput: per-row vs per-batch inserts vs staged bulk writes.
+
+Writes one ``--chunks``-chunk document three ways and reports rows/s,
+requests and request payload:
+
+* ``per-row``: one insert per chunk (timed on the first ``--sample`` rows);
+* ``per-batch``: one insert per embedding batch of ``--batch`` rows, in
+  sequence, full-precision vectors (the previous sink);
+* ``staged-bulk``: ``StagedChunkSink`` — ``--bulk-rows`` rows per request,
+  a few requests in flight, compact vectors, then one publish call that
+  swaps the rows in and marks the document READY.
+
+By default it runs against the in-memory PostgREST stub with
+``--latency-ms`` per request. Point ``--url``/``--key`` at a Supabase stack
+(e.g. ``supabase start``: Postgres with pgvector behind PostgREST) with the
+migrations applied and an existing ``--document-id``/``--user-id`` to
+measure real inserts; the document's chunks are replaced.
+
+Usage:
+    uv run python -m benchmarks.bench_chunk_writes --chunks 10000
+    uv run python -m benchmarks.bench_chunk_writes --url http://127.0.0.1:54321 \\
+        --key $SUPABASE_SERVICE_KEY --document-id <uuid> --user-id <uuid>
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import time
+
+import numpy as np
+
+
+def _document(count: int, dim: int, seed: int = 0):
+    from app.services.chunking import Chunk
+
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((count, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    words = [f"term{i}" for i in range(500)]
+    chunks = []
+    for index in range(count):
+        text = " ".join(rng.choice(words, 300))
+        chunks.append(Chunk(index, index // 4 + 1, text, 512, 0, len(text)))
+    return chunks, vectors
+
+
+def _full_precision_rows(document_id, user_id, chunks, vectors) -> list[dict]:
+    return [
+        {
+            "document_id": document_id,
+            "user_id": user_id,
+            "chunk_index": chunk.index,
+            "page_number": chunk.page_number,
+            "char_start": chunk.char_start,
+            "char_end": chunk.char_end,
+            "content": chunk.text,
+            "embedding": vector.tolist(),
+        }
+        for chunk, vector in zip(chunks, vectors, strict=True)
+    ]
+
+
+async def _run(args: argparse.Namespace) -> None:
+    from app.services.database import SupabaseDatabase
+    from app.services.ingestion import StagedChunkSink, chunk_rows
+    from benchmarks.postgrest_stub import PostgrestStub, add_migrations, serve
+
+    chunks, vectors = _document(args.chunks, args.dim)
+    document_id, user_id = args.document_id, args.user_id
+    stub = None
+    with contextlib.ExitStack() as stack:
+        url = args.url
+        if url is None:
+            stub = PostgrestStub(latency_ms=args.latency_ms)
+            add_migrations(stub)
+            stub.tables["documents"] = [{"id": document_id, "status": "PROCESSING"}]
+            url = stack.enter_context(serve(stub))
+        database = SupabaseDatabase(
+            url, args.key, timeout=120, bulk_rows=args.bulk_rows
+        )
+
+        def reset() -> None:
+            if stub is not None:
+                stub.reset_counters()
+                stub.tables["document_chunks"] = []
+
+        async def per_row() -> int:
+            rows = _full_precision_rows(
+                document_id, user_id, chunks[: args.sample], vectors[: args.sample]
+            )
+            for row in rows:
+                await database.insert_chunks([row])
+            return len(rows)
+
+        async def per_batch() -> int:
+            for start in range(0, len(chunks), args.batch):
+                end = start + args.batch
+                await database.insert_chunks(
+                    _full_precision_rows(
+                        document_id, user_id, chunks[start:end], vectors[start:end]
+                    )
+                )
+            return len(chunks)
+
+        async def staged_bulk() -> int:
+            sink = StagedChunkSink(database)
+            await sink.clear(document_id)
+            for start in range(0, len(chunks), args.batch):
+                end = start + args.batch
+                await sink.write(
+                    document_id, user_id, chunks[start:end], vectors[start:end]
+                )
+            await sink.publish(document_id, len(chunks))
+            return len(chunks)
+
+        sample = chunks[: args.batch], vectors[: args.batch]
+        full_bytes = len(
+            json.dumps(_full_precision_rows(document_id, user_id, *sample))
+        )
+        compact_bytes = len(json.dumps(chunk_rows(document_id, user_id, *sample)))
+        print(
+            f"{args.chunks} chunks x {args.dim} dims, "
+            + (f"stub {args.latency_ms:.0f}ms/request" if stub else url)
+        )
+        print(
+            f"payload per row: full {full_bytes / args.batch / 1024:.1f} KiB, "
+            f"compact {compact_bytes / args.batch / 1024:.1f} KiB"
+        )
+        print(f"{'mode':<12} {'rows':>6} {'rows/s':>9} {'seconds':>8} {'requests':>9}")
+        for mode, write in (
+            ("per-row", per_row),
+            ("per-batch", per_batch),
+            ("staged-bulk", staged_bulk),
+        ):
+            reset()
+            started = time.perf_counter()
+            rows = await write()
+            elapsed = time.perf_counter() - started
+            requests = f"{stub.requests:>9}" if stub else f"{'-':>9}"
+            print(
+                f"{mode:<12} {rows:>6} {rows / elapsed:>9.0f} {elapsed:>8.2f} "
+                f"{requests}"
+            )
+            if stub is None and mode != "staged-bulk":
+                await database.delete_chunks([document_id])
+        if stub is not None:
+            status = stub.tables["documents"][0]["status"]
+            print(f"published {len(stub.tables['document_chunks'])} rows, {status}")
+        await database.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=10_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--sample", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--bulk-rows", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=5)
+    parser.add_argument("--url")
+    parser.add_argument("--key", default="bench")
+    parser.add_argument("--document-id", default="bench-doc")
+    parser.add_argument("--user-id", default="bench-user")
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench")
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
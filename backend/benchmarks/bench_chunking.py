@@ -0,0 +1,111 @@
+"""Chunking throughput (MB/s) on a synthetic text corpus.
+
+Compares a naive windowed chunker, which re-tokenizes the text of every
+window with the ``re`` module starting from the previous window's overlap,
+against ``iter_chunks``, which tokenizes each page once into offset arrays
+and cuts windows by index arithmetic (with sentence/paragraph snapping).
+
+Usage:
+    uv run python -m benchmarks.bench_chunking --size-mb 20 --pages 400
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import re
+import time
+
+WORDS = (
+    "graph node edge weight path dynamic programming recurrence table "
+    "complexity lemma proof theorem induction invariant heap queue stack"
+).split()
+CHARS_PER_TOKEN_GUESS = 8  # Naive chunker's look-ahead per wanted token
+NAIVE_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def _corpus(size_bytes: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    parts: list[str] = []
+    total = 0
+    while total < size_bytes:
+        sentence = " ".join(rng.choices(WORDS, k=rng.randint(6, 24))).capitalize()
+        sentence += "." + ("\n\n" if rng.random() < 0.1 else " ")
+        parts.append(sentence)
+        total += len(sentence)
+    return "".join(parts)
+
+
+def _naive(text: str, chunk_size: int, overlap: int) -> int:
+    count = 0
+    pos = 0
+    while pos < len(text):
+        window = text[pos : pos + chunk_size * CHARS_PER_TOKEN_GUESS]
+        spans = [m.span() for m in NAIVE_TOKEN.finditer(window)][:chunk_size]
+        if not spans:
+            break
+        _ = window[spans[0][0] : spans[-1][1]]
+        count += 1
+        if len(spans) < chunk_size:
+            break
+        pos += spans[chunk_size - overlap][0]
+    return count
+
+
+def _timed(fn) -> tuple[float, int]:
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=20.0)
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--overlap", type=int, default=64)
+    parser.add_argument(
+        "--tokenizer", default="regex", help="regex or a tiktoken encoding name"
+    )
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench")
+    from app.services.chunking import get_tokenizer, iter_chunks
+    from app.services.extraction import PageText
+
+    tokenizer = get_tokenizer(args.tokenizer)
+    text = _corpus(int(args.size_mb * 1024 * 1024))
+    megabytes = len(text.encode()) / (1024 * 1024)
+    step = -(-len(text) // args.pages)
+    pages = [
+        PageText(i + 1, text[start : start + step])
+        for i, start in enumerate(range(0, len(text), step))
+    ]
+
+    naive_s, naive_n = _timed(lambda: _naive(text, args.chunk_size, args.overlap))
+    offsets_s, offsets_n = _timed(
+        lambda: sum(
+            1 for _ in iter_chunks(pages, args.chunk_size, args.overlap, tokenizer)
+        )
+    )
+
+    print(
+        f"{megabytes:.1f} MB corpus, {len(pages)} pages, {args.tokenizer} tokenizer, "
+        f"{args.chunk_size}/{args.overlap} tokens"
+    )
+    print(f"{'mode':<18} {'time':>8} {'MB/s':>8} {'chunks':>8}")
+    print(
+        f"{'naive windows':<18} {naive_s:>7.2f}s {megabytes / naive_s:>8.1f} {naive_n:>8}"
+    )
+    print(
+        f"{'offset arrays':<18} {offsets_s:>7.2f}s "
+        f"{megabytes / offsets_s:>8.1f} {offsets_n:>8}"
+    )
+    print(f"speedup: {naive_s / offsets_s:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
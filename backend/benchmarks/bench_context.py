@@ -0,0 +1,90 @@
+"""Prompt context size: raw top-k chunks vs deduplicated, merged and budgeted.
+
+Simulates retrieval results the way the chunker produces them: consecutive
+chunks of a document share ``--overlap`` tokens, a share of hits are
+neighbours of another hit, and some documents were uploaded twice. Reports
+tokens sent to the LLM per query before and after context assembly, and the
+assembly time.
+
+Usage:
+    uv run python -m benchmarks.bench_context --top-k 10 --budget 3000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+
+def _query_chunks(
+    rng: np.random.Generator, args: argparse.Namespace, vocabulary: list[str]
+) -> list[dict]:
+    step = args.chunk_tokens - args.overlap
+    text = list(rng.choice(vocabulary, size=step * 40 + args.chunk_tokens))
+    chunks: list[dict] = []
+    index = int(rng.integers(0, 20))
+    while len(chunks) < args.top_k:
+        if rng.random() >= args.adjacent:
+            index = int(rng.integers(0, 40))
+        elif any(chunk["chunk_index"] == index for chunk in chunks):
+            index = min(index + 1, 39)
+        document_id = "copy" if rng.random() < args.duplicates else "doc"
+        content = " ".join(text[index * step : index * step + args.chunk_tokens])
+        chunks.append(
+            {
+                "document_id": document_id,
+                "filename": f"{document_id}.pdf",
+                "chunk_index": index,
+                "page_number": index // 2 + 1,
+                "content": content,
+            }
+        )
+    return chunks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--chunk-tokens", type=int, default=512)
+    parser.add_argument("--overlap", type=int, default=64)
+    parser.add_argument("--adjacent", type=float, default=0.4)
+    parser.add_argument("--duplicates", type=float, default=0.1)
+    parser.add_argument("--budget", type=int, default=3000)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench")
+    from app.agent.context import build_context
+    from app.services.chunking import RegexTokenizer
+
+    rng = np.random.default_rng(0)
+    vocabulary = [f"term{i}" for i in range(5000)]
+    tokenizer = RegexTokenizer()
+    tokens_in, tokens_out, passages, latencies = [], [], [], []
+    for _ in range(args.queries):
+        chunks = _query_chunks(rng, args, vocabulary)
+        started = time.perf_counter()
+        context = build_context(chunks, args.budget, tokenizer)
+        latencies.append((time.perf_counter() - started) * 1000)
+        tokens_in.append(context.tokens_in)
+        tokens_out.append(context.tokens)
+        passages.append(len(context.passages))
+
+    saved = 1 - np.sum(tokens_out) / np.sum(tokens_in)
+    print(
+        f"top-{args.top_k} chunks of {args.chunk_tokens} tokens "
+        f"({args.overlap} overlap), budget {args.budget}"
+    )
+    print(f"tokens/query in:  {np.mean(tokens_in):>8.0f}")
+    print(f"tokens/query out: {np.mean(tokens_out):>8.0f}  ({saved:.1%} saved)")
+    print(f"passages/query:   {np.mean(passages):>8.1f}")
+    print(f"assembly p50:     {np.median(latencies):>8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Database access throughput: sync client vs async pooled PostgREST client.
+
+Serves the in-memory PostgREST stub on a local port with ``--latency-ms``
+per request and issues ``--requests`` document lookups, ``--concurrency``
+at a time, the way concurrent API requests would:
+
+* ``sync-on-loop``: a synchronous client called from async code (blocks
+  the event loop, so requests run one at a time);
+* ``sync-threadpool``: the same client through ``run_in_threadpool``
+  (bounded by the threadpool, 40 threads by default);
+* ``async-pooled/N``: ``SupabaseDatabase`` on a keep-alive pool of N
+  connections, for each N in ``--pools``.
+
+Pooled throughput is bounded by pool size / latency and holds no threads;
+the sync client opens a new connection whenever its small idle pool is
+full. httpx's async pool gets slower per request as it grows, so past a
+few dozen connections add API workers rather than pool size.
+
+Then inserts ``--chunks`` chunk rows one request per row vs in bulk.
+
+Usage:
+    uv run python -m benchmarks.bench_database --latency-ms 20 --pools 10,20
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+from functools import partial
+
+import numpy as np
+
+
+async def _lookups(call, args: argparse.Namespace) -> dict:
+    limit = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+
+    async def one() -> None:
+        async with limit:
+            started = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(args.requests)))
+    return {
+        "rps": args.requests / (time.perf_counter() - started),
+        "p50": np.percentile(latencies, 50),
+    }
+
+
+async def _run(args: argparse.Namespace) -> None:
+    import httpx
+    from starlette.concurrency import run_in_threadpool
+
+    from app.core.config import settings
+    from app.services.database import SupabaseDatabase
+    from benchmarks.postgrest_stub import PostgrestStub, serve
+
+    stub = PostgrestStub(latency_ms=args.latency_ms)
+    stub.tables["documents"] = [{"id": "a", "user_id": "u"}]
+    params = {"select": "*", "id": "eq.a", "user_id": "eq.u"}
+    with serve(stub) as url:
+        sync = httpx.Client(base_url=f"{url}/rest/v1")
+
+        async def on_loop():
+            sync.get("/documents", params=params)
+
+        async def threadpool():
+            await run_in_threadpool(sync.get, "/documents", params=params)
+
+        print(
+            f"{args.requests} lookups, {args.concurrency} concurrent, "
+            f"{args.latency_ms:.0f}ms per request"
+        )
+        print(f"{'mode':<16} {'req/s':>8} {'p50':>10} {'connections':>12}")
+        modes = [("sync-on-loop", on_loop), ("sync-threadpool", threadpool)]
+        databases = []
+        for size in args.pools:
+            settings.SUPABASE_HTTP_MAX_CONNECTIONS = size
+            settings.SUPABASE_HTTP_MAX_KEEPALIVE = size
+            databases.append(SupabaseDatabase(url, "bench"))
+            modes.append(
+                (f"async-pooled/{size}", partial(databases[-1].get_document, "a", "u"))
+            )
+        for mode, call in modes:
+            stub.reset_counters()
+            result = await _lookups(call, args)
+            print(
+                f"{mode:<16} {result['rps']:>8.0f} {result['p50']:>8.1f}ms "
+                f"{len(stub.connections):>12}"
+            )
+        database = databases[0]
+
+        rows = [
+            {"document_id": "doc", "chunk_index": i, "content": "x" * 2000}
+            for i in range(args.chunks)
+        ]
+        print(f"insert {args.chunks} chunk rows")
+        stub.reset_counters()
+        started = time.perf_counter()
+        for row in rows:
+            await database.insert_chunks([row])
+        per_row = time.perf_counter() - started
+        print(f"  one request per row: {per_row * 1000:>8.0f}ms ({stub.requests} req)")
+        stub.reset_counters()
+        started = time.perf_counter()
+        await database.insert_chunks(rows)
+        bulk = time.perf_counter() - started
+        print(f"  bulk:                {bulk * 1000:>8.0f}ms ({stub.requests} req)")
+
+        sync.close()
+        for database in databases:
+            await database.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument(
+        "--pools",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=[10, 20],
+    )
+    parser.add_argument("--chunks", type=int, default=500)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench")
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Status update load and delay: client polling vs pushed document events.
+
+``--clients`` browser tabs (``--users`` users) watch their documents while
+``--events`` status and progress events are published:
+
+* ``poll``: each tab re-reads its documents every ``--poll-seconds``
+  seconds, so the API serves and the database answers clients /
+  poll-seconds queries per second, and a change is seen after half a poll
+  interval on average;
+* ``push``: one ``DocumentEventHub`` per API process holds a single
+  subscription and fans each event out to the owner's tabs. Measured in
+  process with an in-memory pub/sub (Redis adds one network hop): delay
+  from publish to the tab's queue, and API CPU per event.
+
+Usage:
+    uv run python -m benchmarks.bench_document_events --clients 2000 --users 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+import numpy as np
+
+
+class _Broker:
+    """In-memory stand-in for the asyncio Redis client's pub/sub."""
+
+    def __init__(self) -> None:
+        self.inboxes: list[asyncio.Queue] = []
+        self.subscriptions = 0
+
+    def pubsub(self) -> _PubSub:
+        return _PubSub(self)
+
+    def publish(self, message: str) -> None:
+        for inbox in self.inboxes:
+            inbox.put_nowait(message)
+
+
+class _PubSub:
+    def __init__(self, broker: _Broker) -> None:
+        self._broker = broker
+        self._inbox: asyncio.Queue = asyncio.Queue()
+
+    async def subscribe(self, channel: str) -> None:
+        self._broker.subscriptions += 1
+        self._broker.inboxes.append(self._inbox)
+
+    async def get_message(self, ignore_subscribe_messages: bool, timeout):
+        return {"type": "message", "data": await self._inbox.get()}
+
+    async def aclose(self) -> None:
+        self._broker.inboxes.remove(self._inbox)
+
+
+async def _push(args: argparse.Namespace) -> tuple[list[float], float, int]:
+    from contextlib import AsyncExitStack
+
+    from app.schemas.document import DocumentEvent
+    from app.services.document_events import DocumentEventHub
+
+    broker = _Broker()
+    hub = DocumentEventHub(lambda: broker, buffer=args.events + 1)
+    rng = random.Random(args.seed)
+    owners = [f"user-{rng.randrange(args.users)}" for _ in range(args.clients)]
+    delays: list[float] = []
+
+    async def tab(queue: asyncio.Queue) -> None:
+        while True:
+            event = await queue.get()
+            if event is not None:
+                delays.append(time.perf_counter() - float(event.document_id))
+
+    async with AsyncExitStack() as stack:
+        queues = [
+            await stack.enter_async_context(hub.subscribe(owner)) for owner in owners
+        ]
+        tabs = [asyncio.create_task(tab(queue)) for queue in queues]
+        await asyncio.sleep(0.01)
+        cpu = time.process_time()
+        for _ in range(args.events):
+            user = rng.choice(owners)
+            # The publish time rides in document_id to time the delivery.
+            event = DocumentEvent(
+                event="progress",
+                document_id=repr(time.perf_counter()),
+                user_id=user,
+                status="PROCESSING",
+                pages=1,
+                chunks=64,
+            )
+            broker.publish(event.model_dump_json())
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.05)
+        cpu = time.process_time() - cpu
+        for task in tabs:
+            task.cancel()
+    return delays, cpu / args.events, broker.subscriptions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--poll-seconds", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench")
+
+    delays, cpu_per_event, subscriptions = asyncio.run(_push(args))
+    delays_ms = np.array(delays) * 1000
+    print(f"{args.clients} tabs of {args.users} users, {args.events} events")
+    print(
+        f"{'mode':<5} {'API req/s':>10} {'DB queries/s':>13} {'subs':>5} "
+        f"{'delay p50':>10} {'delay p95':>10} {'CPU/event':>10}"
+    )
+    polls = args.clients / args.poll_seconds
+    print(
+        f"{'poll':<5} {polls:>10.0f} {polls:>13.0f} {'-':>5} "
+        f"{args.poll_seconds * 500:>8.0f}ms {args.poll_seconds * 950:>8.0f}ms "
+        f"{'-':>10}"
+    )
+    print(
+        f"{'push':<5} {0:>10} {0:>13} {subscriptions:>5} "
+        f"{np.percentile(delays_ms, 50):>8.2f}ms "
+        f"{np.percentile(delays_ms, 95):>8.2f}ms {cpu_per_event * 1e6:>8.0f}us"
+    )
+
+
+if __name__ == "__main__":
+    main()
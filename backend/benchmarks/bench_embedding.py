@@ -0,0 +1,91 @@
+"""Throughput benchmark for the embedding service using the fake provider.
+
+Compares one request per chunk (the naive ingestion loop) against
+``EmbeddingService`` batching with adaptive concurrency. The fake provider
+simulates per-request latency, per-text cost and a server-side concurrency
+cap that answers 429 when exceeded.
+
+Usage:
+    uv run python -m benchmarks.bench_embedding --chunks 2000 --capacity 6
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+
+NAIVE_SAMPLE = 200  # Naive mode is extrapolated from this many chunks
+
+
+async def _naive(provider, texts: list[str]) -> float:
+    started = time.perf_counter()
+    for text in texts:
+        await provider.embed_batch([text])
+    return time.perf_counter() - started
+
+
+async def _batched(service, texts: list[str]) -> float:
+    started = time.perf_counter()
+    await service.embed_documents(texts)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--per-text-ms", type=float, default=0.5)
+    parser.add_argument("--capacity", type=int, default=6)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench")
+    from app.services.embedding import (
+        BatchLimits,
+        EmbeddingService,
+        FakeEmbeddingProvider,
+    )
+
+    def provider() -> FakeEmbeddingProvider:
+        return FakeEmbeddingProvider(
+            latency_s=args.latency_ms / 1000,
+            per_text_latency_s=args.per_text_ms / 1000,
+            capacity=args.capacity,
+            limits=BatchLimits(max_texts=args.batch, max_tokens=10_000_000),
+        )
+
+    texts = [f"chunk {i} " + "lorem ipsum " * 170 for i in range(args.chunks)]
+
+    sample = min(NAIVE_SAMPLE, len(texts))
+    naive_s = asyncio.run(_naive(provider(), texts[:sample])) * len(texts) / sample
+
+    batched_provider = provider()
+    service = EmbeddingService(batched_provider, max_concurrency=args.concurrency)
+    batched_s = asyncio.run(_batched(service, texts))
+
+    print(
+        f"{args.chunks} chunks, {args.latency_ms:.0f}ms/request + "
+        f"{args.per_text_ms}ms/text, server capacity {args.capacity}"
+    )
+    print(f"{'mode':<22} {'time':>9} {'chunks/s':>10} {'requests':>9} {'429s':>6}")
+    print(
+        f"{'naive (extrapolated)':<22} {naive_s:>8.2f}s "
+        f"{args.chunks / naive_s:>10.0f} {args.chunks:>9} {0:>6}"
+    )
+    print(
+        f"{'batched+concurrent':<22} {batched_s:>8.2f}s "
+        f"{args.chunks / batched_s:>10.0f} {batched_provider.calls:>9} "
+        f"{batched_provider.rate_limited:>6}"
+    )
+    print(
+        f"speedup: {naive_s / batched_s:.1f}x (final limit {service.concurrency_limit})"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""End-to-end agent latency: sequential web fallback vs speculative fan-out.
+
+Runs the compiled agent graph with simulated KB retrieval, web search and
+LLM latencies, for a query the knowledge base answers confidently and one
+that falls back to the web. Sequentially the fallback costs retrieval plus
+web search; with speculative branches it costs the slower of the two, but a
+confident query also waits for the web branch (bounded by the timeout). The
+speculative graph only fans out when the router is unsure of the route
+(``unsure``, below ``AGENT_SPECULATIVE_MAX_CONFIDENCE``); a confidently
+routed query (``sure``) runs like the sequential graph.
+
+Usage:
+    uv run python -m benchmarks.bench_fanout --retrieval-ms 300 --web-ms 800
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+
+async def _run(args: argparse.Namespace) -> None:
+    from app.agent import graph as agent
+    from app.services.retrieval import RetrievalResult
+
+    async def web_search(state, writer=None):
+        await asyncio.sleep(args.web_ms / 1000)
+        return {
+            "web_search_results": [
+                {"url": "https://bench.example/", "title": "Web", "content": "web"}
+            ]
+        }
+
+    print(
+        f"retrieval {args.retrieval_ms:.0f}ms, web search {args.web_ms:.0f}ms, "
+        f"branch timeout {args.timeout_ms:.0f}ms"
+    )
+    print(f"{'query':<12} {'mode':<19} {'p50':>8}")
+    for label, confidence in (("confident", 0.9), ("fallback", 0.2)):
+
+        async def search(user_id, query, confidence=confidence):
+            await asyncio.sleep(args.retrieval_ms / 1000)
+            return RetrievalResult([], confidence)
+
+        for mode, speculative, route_confidence in (
+            ("sequential", False, 1.0),
+            ("speculative/unsure", True, 0.7),
+            ("speculative/sure", True, 1.0),
+        ):
+            decision = MagicMock(intent="retrieve", confidence=route_confidence)
+            latencies = []
+            for _ in range(args.runs):
+                model = GenericFakeChatModel(messages=iter([AIMessage("answer")]))
+                with (
+                    patch.object(agent, "get_chat_model", return_value=model),
+                    patch.object(agent, "get_retrieval_service") as service,
+                    patch.object(agent, "get_intent_router") as router,
+                    patch.object(agent, "node_web_search", web_search),
+                ):
+                    service.return_value.search = search
+                    router.return_value.route.return_value = decision
+                    graph = agent.build_agent_graph(
+                        speculative, branch_timeout=args.timeout_ms / 1000
+                    )
+                    started = time.perf_counter()
+                    await graph.ainvoke({"user_id": "bench", "query": "q"})
+                    latencies.append((time.perf_counter() - started) * 1000)
+            print(f"{label:<12} {mode:<19} {np.median(latencies):>6.0f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--retrieval-ms", type=float, default=300)
+    parser.add_argument("--web-ms", type=float, default=800)
+    parser.add_argument("--timeout-ms", type=float, default=8000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench")
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Prompt history size per turn: full replay vs rolling window + summary.
+
+Plays a long synthetic conversation through ``ConversationHistory`` backed by
+the in-memory store, with a simulated summarizer that returns a summary of
+``SUMMARY_MAX_WORDS`` words. At each checkpoint it reports the history
+tokens the next prompt would carry if every prior turn were replayed, the
+tokens actually loaded (summary plus recent turns), the summarization calls
+made so far, and the load time.
+
+Usage:
+    uv run python -m benchmarks.bench_history --turns 100 --answer-tokens 300
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+
+import numpy as np
+from langchain_core.messages import AIMessage
+
+
+class SimulatedSummarizer:
+    """Stands in for the chat model; returns a fixed-length summary."""
+
+    def __init__(self, words: int) -> None:
+        self.calls = 0
+        self._summary = " ".join(f"fact{i}" for i in range(words))
+
+    async def ainvoke(self, messages) -> AIMessage:
+        self.calls += 1
+        return AIMessage(self._summary)
+
+
+async def _run(args: argparse.Namespace) -> None:
+    from app.services.chunking import RegexTokenizer
+    from app.services.conversation import (
+        SUMMARY_MAX_WORDS,
+        ConversationHistory,
+        InMemoryConversationStore,
+        Turn,
+    )
+
+    tokenizer = RegexTokenizer()
+
+    def count(text: str) -> int:
+        return len(tokenizer.token_spans(text)[0])
+
+    rng = np.random.default_rng(0)
+    vocabulary = [f"term{i}" for i in range(2000)]
+    summarizer = SimulatedSummarizer(SUMMARY_MAX_WORDS)
+    history = ConversationHistory(
+        InMemoryConversationStore(),
+        args.window,
+        args.batch,
+        model_factory=lambda: summarizer,
+    )
+    checkpoints = {10, 25, 50, args.turns}
+    replay_tokens = 0
+    print(
+        f"window {args.window} turns, summary batch {args.batch}, "
+        f"~{args.query_tokens}+{args.answer_tokens} tokens per turn"
+    )
+    print(
+        f"{'turn':>5} {'full replay':>12} {'windowed':>9} {'summaries':>10} {'load':>8}"
+    )
+    for n in range(1, args.turns + 1):
+        query = " ".join(rng.choice(vocabulary, size=args.query_tokens))
+        answer = " ".join(rng.choice(vocabulary, size=args.answer_tokens))
+        await history.record("bench", "c", Turn(query, answer))
+        replay_tokens += count(query) + count(answer)
+        if n not in checkpoints:
+            continue
+        started = time.perf_counter()
+        conversation = await history.load("bench", "c")
+        load_us = (time.perf_counter() - started) * 1e6
+        windowed = count(conversation.summary) + sum(
+            count(turn.query) + count(turn.answer) for turn in conversation.turns
+        )
+        print(
+            f"{n:>5} {replay_tokens:>12} {windowed:>9} {summarizer.calls:>10} "
+            f"{load_us:>6.0f}us"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--window", type=int, default=6)
+    parser.add_argument("--batch", type=int, default=4)
+    parser.add_argument("--query-tokens", type=int, default=30)
+    parser.add_argument("--answer-tokens", type=int, default=300)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench")
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
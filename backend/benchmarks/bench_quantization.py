@@ -0,0 +1,101 @@
+"""Memory reduction and recall loss of quantized vector shards vs float32.
+
+Stores one synthetic corpus (overlapping topics, as in ``bench_ann``) as
+vector shards in each dtype and runs exhaustive searches; recall@k is
+measured against exact float32 search. Quantized dtypes are also measured
+with float32 re-ranking of the best ``--rerank`` candidates, which keeps a
+raw copy on disk but reads only those rows per query.
+
+Usage:
+    uv run python -m benchmarks.bench_quantization --chunks 100000 --rerank 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.bench_ann import synthetic_corpus
+
+QUANTIZED = ("float16", "int8", "pq")
+
+
+def _codes_bytes(path: Path) -> int:
+    return sum(
+        f.stat().st_size
+        for f in path.rglob("*.npy")
+        if f.name in ("codes.npy", "scales.npy")
+    ) + sum(f.stat().st_size for f in path.glob("codebooks-*.npy"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rerank", type=int, default=100)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench")
+    from app.services.vector_index import (
+        ExactIndex,
+        ShardVectorIndex,
+        VectorShards,
+        VectorShardWriter,
+        normalize,
+    )
+
+    vectors = synthetic_corpus(args.chunks, args.dimension, args.topics, seed=0)
+    rng = np.random.default_rng(1)
+    picks = rng.choice(args.chunks, args.queries, replace=False)
+    queries = normalize(
+        vectors[picks]
+        + 0.5 * rng.standard_normal((args.queries, args.dimension), dtype=np.float32)
+    )
+    keys = [("doc", i) for i in range(args.chunks)]
+    truth = [ExactIndex(vectors).search(q, args.top_k)[0] for q in queries]
+
+    print(f"{args.chunks} chunks x {args.dimension}d, exhaustive search")
+    print(
+        f"{'dtype':<18} {'bytes/vec':>10} {'memory':>8} {'recall@' + str(args.top_k):>10} "
+        f"{'p50':>8} {'build':>8}"
+    )
+    with tempfile.TemporaryDirectory(prefix="docmind-quant-") as tmp:
+        baseline = None
+        for dtype in ("float32", *QUANTIZED):
+            path = Path(tmp) / dtype
+            started = time.perf_counter()
+            VectorShardWriter(
+                path, n_lists=1, dtype=dtype, keep_raw=dtype != "float32"
+            ).rebuild(keys, vectors)
+            build_s = time.perf_counter() - started
+            size = _codes_bytes(path)
+            baseline = baseline or size
+            shards = VectorShards.open(path)
+            for rerank in (0, args.rerank) if dtype != "float32" else (0,):
+                index = ShardVectorIndex(shards, keys, rerank=rerank)
+                hits, latencies = 0, []
+                for query, expected in zip(queries, truth, strict=True):
+                    started = time.perf_counter()
+                    found, _ = index.search(query, args.top_k)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    hits += len(set(found.tolist()) & set(expected.tolist()))
+                label = dtype + (f"+rerank{rerank}" if rerank else "")
+                print(
+                    f"{label:<18} {size / args.chunks:>10.0f} "
+                    f"{baseline / size:>7.1f}x {hits / (args.top_k * args.queries):>10.3f} "
+                    f"{np.median(latencies):>6.1f}ms {build_s:>6.1f}s"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Search quality while the corpus is re-embedded for a new model.
+
+Stands in for two embedding models with two random projections of the
+same ``--chunks`` latent vectors (documents of ``--chunks-per-doc`` chunks)
+and measures recall@``--k`` of ``--queries`` queries, against exact search
+over a fully consistent corpus, as a migration to the new model progresses:
+
+* ``overwrite``: documents are re-embedded in place and queries use the
+  new model, so they score a corpus of mixed old and new vectors;
+* ``rebuild``: the old rows are dropped first and documents reappear as
+  they are re-embedded;
+* ``versioned``: new rows are written under the target index version and
+  queries keep using the active version (old model) until the cut-over.
+
+Also reports how long the migration takes at ``--rate`` documents per
+minute, and the extra rows held by the versioned migration at its peak.
+
+Usage:
+    uv run python -m benchmarks.bench_reindex --chunks 50000 --rate 30
+"""
+
+from __future__ import annotations
+
+import argparse
+
+import numpy as np
+
+
+def _model(latent: np.ndarray, projection: np.ndarray) -> np.ndarray:
+    vectors = latent @ projection
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _top_k(corpus: np.ndarray, queries: np.ndarray, ids: np.ndarray, k: int):
+    scores = queries @ corpus.T
+    top = np.argpartition(-scores, k, axis=1)[:, :k]
+    return [set(ids[row]) for row in top]
+
+
+def _recall(found: list[set], truth: list[set], k: int) -> float:
+    return float(np.mean([len(f & t) / k for f, t in zip(found, truth)]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=50_000)
+    parser.add_argument("--chunks-per-doc", type=int, default=50)
+    parser.add_argument("--latent", type=int, default=64)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=30, help="documents/minute")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    latent = rng.standard_normal((args.chunks, args.latent)).astype(np.float32)
+    questions = latent[rng.choice(args.chunks, args.queries, replace=False)]
+    questions = questions + 0.3 * rng.standard_normal(questions.shape)
+    old, new = (
+        rng.standard_normal((args.latent, args.dim)).astype(np.float32)
+        for _ in range(2)
+    )
+    corpus_old, corpus_new = _model(latent, old), _model(latent, new)
+    queries_old, queries_new = _model(questions, old), _model(questions, new)
+    ids = np.arange(args.chunks)
+    truth_old = _top_k(corpus_old, queries_old, ids, args.k)
+    truth_new = _top_k(corpus_new, queries_new, ids, args.k)
+
+    documents = args.chunks // args.chunks_per_doc
+    order = rng.permutation(documents)  # Order documents are re-embedded in
+    minutes = documents / args.rate
+    print(
+        f"{args.chunks} chunks in {documents} documents; migration takes "
+        f"{minutes:.0f} min at {args.rate:.0f} documents/min"
+    )
+    print(f"{'migrated':>8} {'overwrite':>10} {'rebuild':>8} {'versioned':>10}")
+    for share in (0.0, 0.25, 0.5, 0.75, 0.99):
+        done = np.zeros(args.chunks, bool)
+        for document in order[: int(share * documents)]:
+            start = document * args.chunks_per_doc
+            done[start : start + args.chunks_per_doc] = True
+        mixed = np.where(done[:, None], corpus_new, corpus_old)
+        overwrite = _recall(_top_k(mixed, queries_new, ids, args.k), truth_new, args.k)
+        if done.sum() > args.k:
+            rebuilt = _top_k(corpus_new[done], queries_new, ids[done], args.k)
+            rebuild = _recall(rebuilt, truth_new, args.k)
+        else:
+            rebuild = 0.0
+        # Queries read only the active (old) version until the cut-over.
+        versioned = _recall(
+            _top_k(corpus_old, queries_old, ids, args.k), truth_old, args.k
+        )
+        print(f"{share:>7.0%} {overwrite:>10.3f} {rebuild:>8.3f} {versioned:>10.3f}")
+    print(
+        f"versioned peak: {args.chunks} extra rows (2x) until the old version "
+        "is retired after the cut-over"
+    )
+
+
+if __name__ == "__main__":
+    main()
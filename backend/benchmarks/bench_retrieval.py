@@ -0,0 +1,78 @@
+"""Hybrid search latency as a user's knowledge base grows.
+
+Builds a ``KnowledgeBaseIndex`` over synthetic chunks with random unit
+embeddings and reports index build time and p50/p95 query latency of
+BM25 + cosine scoring with argpartition top-k and RRF fusion.
+
+Usage:
+    uv run python -m benchmarks.bench_retrieval --chunks 100000 --queries 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import time
+
+import numpy as np
+
+VOCABULARY = [f"term{i}" for i in range(20_000)]
+WORDS_PER_CHUNK = 350
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench")
+    from app.services.retrieval import ChunkRecord, KnowledgeBaseIndex
+    from app.services.vector_index import ExactIndex
+
+    rng = random.Random(0)
+    # Zipf-like term frequencies, as in natural text.
+    weights = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+    records = [
+        ChunkRecord(
+            "doc",
+            "bench.pdf",
+            i,
+            1,
+            " ".join(rng.choices(VOCABULARY, weights, k=WORDS_PER_CHUNK)),
+        )
+        for i in range(args.chunks)
+    ]
+    vectors = np.random.default_rng(0).standard_normal(
+        (args.chunks, args.dimension), dtype=np.float32
+    )
+
+    started = time.perf_counter()
+    index = KnowledgeBaseIndex(records, ExactIndex(vectors))
+    build_s = time.perf_counter() - started
+
+    latencies = []
+    query_rng = np.random.default_rng(1)
+    for _ in range(args.queries):
+        query = " ".join(rng.choices(VOCABULARY[:2000], k=6))
+        vector = query_rng.standard_normal(args.dimension, dtype=np.float32)
+        started = time.perf_counter()
+        index.search(query, vector, args.top_k, threshold=0.0)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    p50, p95 = np.percentile(latencies, [50, 95])
+    print(
+        f"{args.chunks} chunks x {args.dimension}d, {len(index.bm25.vocabulary)} "
+        f"terms, {len(index.bm25.doc_ids)} postings"
+    )
+    print(f"index build: {build_s:.2f}s")
+    print(f"query latency: p50 {p50:.1f}ms  p95 {p95:.1f}ms (top-{args.top_k})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Offline evaluation of the local intent router: accuracy and latency saved.
+
+Routes every labelled query in ``benchmarks/data/intents.jsonl`` with the
+local rules and reports rule accuracy per intent, the share of queries the
+router would defer to the LLM at each confidence threshold (and the
+accuracy if the LLM then answers correctly), rule latency, and the latency
+saved per query compared with asking the LLM every time. The labelled set
+was used while writing the rules; add misrouted production queries to it
+rather than reading its accuracy as a held-out estimate.
+
+Usage:
+    uv run python -m benchmarks.bench_router --llm-ms 600
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+DATA = Path(__file__).parent / "data" / "intents.jsonl"
+REPEATS = 200
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", type=Path, default=DATA)
+    parser.add_argument("--llm-ms", type=float, default=600)
+    parser.add_argument(
+        "--thresholds", type=float, nargs="+", default=[0.5, 0.6, 0.7, 0.8]
+    )
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench")
+    from app.agent.router import INTENTS, IntentRouter
+
+    rows = [json.loads(line) for line in args.data.read_text().splitlines() if line]
+    router = IntentRouter()
+    decisions, latencies = [], []
+    for row in rows:
+        started = time.perf_counter()
+        for _ in range(REPEATS):
+            decision = router.route(row["query"])
+        latencies.append((time.perf_counter() - started) / REPEATS * 1e6)
+        decisions.append(decision)
+
+    correct = [d.intent == r["intent"] for d, r in zip(decisions, rows, strict=True)]
+    totals = Counter(r["intent"] for r in rows)
+    hits = Counter(r["intent"] for r, ok in zip(rows, correct, strict=True) if ok)
+    print(f"{len(rows)} labelled queries, rules accuracy {np.mean(correct):.1%}")
+    for intent in INTENTS:
+        print(f"  {intent:<11} {hits[intent]:>3}/{totals[intent]:<3}")
+    for decision, row, ok in zip(decisions, rows, correct, strict=True):
+        if not ok:
+            print(f"  misrouted to {decision.intent}: {row['query'][:60]!r}")
+
+    p50, p99 = np.percentile(latencies, [50, 99])
+    print(f"rule latency: p50 {p50:.1f}us  p99 {p99:.1f}us")
+    print(f"{'threshold':>9} {'to LLM':>7} {'accuracy':>9} {'saved/query':>12}")
+    for threshold in args.thresholds:
+        deferred = np.array([d.confidence < threshold for d in decisions])
+        accuracy = np.mean(deferred | np.array(correct))  # LLM assumed right
+        saved_ms = (1 - deferred.mean()) * args.llm_ms - np.mean(latencies) / 1000
+        print(
+            f"{threshold:>9.2f} {deferred.mean():>6.1%} {accuracy:>8.1%} "
+            f"{saved_ms:>10.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
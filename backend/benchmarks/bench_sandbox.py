@@ -0,0 +1,113 @@
+"""Code execution latency: a fresh interpreter per run vs the warm pool.
+
+Runs ``--runs`` small snippets (``--concurrency`` at a time) three ways:
+
+* ``bare``: ``python -I -c <code>`` per run, with no limits or imports
+  (the floor for any per-run process);
+* ``cold``: a new sandbox worker per run, so each pays interpreter start-up
+  and the preloaded imports before its confined child runs the code;
+* ``warm``: ``SandboxPool`` with ``--pool`` pre-started workers, which only
+  fork a confined child per run.
+
+Usage:
+    uv run python -m benchmarks.bench_sandbox --runs 200 --pool 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+SNIPPET = "import math\nprint(sum(math.sqrt(i) for i in range(10_000)))"
+
+
+async def _bare(code: str) -> None:
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-I", "-c", code, stdout=asyncio.subprocess.PIPE
+    )
+    await process.communicate()
+
+
+async def _cold(code: str, limits: dict) -> None:
+    from app.services.sandbox import RUNNER_PATH
+
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-I",
+        str(RUNNER_PATH),
+        json.dumps(limits),
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+    )
+    request = json.dumps({"code": code, "timeout": 10}) + "\n"
+    await process.communicate(request.encode())
+
+
+async def _measure(run, runs: int, concurrency: int) -> tuple[list[float], float]:
+    gate = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one() -> None:
+        async with gate:
+            started = time.perf_counter()
+            await run()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(runs)))
+    return latencies, time.perf_counter() - started
+
+
+async def _bench(args: argparse.Namespace) -> list[tuple[str, list[float], float]]:
+    from app.services.sandbox import SandboxPool
+
+    pool = SandboxPool(size=args.pool, max_runs=args.max_runs)
+    rows = [
+        ("bare", *await _measure(lambda: _bare(SNIPPET), args.runs, args.concurrency)),
+        (
+            "cold",
+            *await _measure(
+                lambda: _cold(SNIPPET, pool.limits), args.runs, args.concurrency
+            ),
+        ),
+    ]
+    await pool.start()
+    try:
+        rows.append(
+            ("warm", *await _measure(lambda: pool.run(SNIPPET), args.runs, args.pool))
+        )
+    finally:
+        await pool.close()
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--pool", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--max-runs", type=int, default=100)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench")
+
+    print(f"{args.runs} runs, {args.concurrency} at a time, pool of {args.pool}")
+    print(f"{'mode':<5} {'p50':>9} {'p95':>9} {'runs/s':>8}")
+    for mode, latencies, elapsed in asyncio.run(_bench(args)):
+        ms = np.array(latencies) * 1000
+        print(
+            f"{mode:<5} {np.percentile(ms, 50):>7.1f}ms "
+            f"{np.percentile(ms, 95):>7.1f}ms {args.runs / elapsed:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
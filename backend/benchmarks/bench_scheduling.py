@@ -0,0 +1,176 @@
+"""Time to READY under a bulk upload: one FIFO queue vs fair scheduling.
+
+Simulates document processing in virtual time (no Redis or Celery): one
+user uploads ``--bulk`` PDFs at once while ``--users`` other users each
+upload one document, arriving at random over ``--window`` seconds (a mix of
+small Markdown notes and PDFs). Processing takes ``--small-seconds`` per
+note and ``--pdf-seconds`` per PDF. Both setups have ``--workers`` worker
+processes:
+
+* ``fifo``: one queue, first in first out (the previous setup);
+* ``fair``: the ``documents.small``/``documents.large`` queues with two of
+  the workers on the small queue only, priorities from the owner's
+  documents in flight and at most ``--max-per-user`` documents of one user
+  running at once (others are requeued after ``--defer-seconds``).
+
+Reports p50/p95 time from upload to READY for the other users and for the
+bulk uploader, and when the last document finished.
+
+Usage:
+    uv run python -m benchmarks.bench_scheduling --bulk 60 --users 40
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import itertools
+import os
+import random
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+import numpy as np
+
+
+@dataclass(order=True)
+class _Job:
+    priority: int
+    sequence: int
+    user: str = field(compare=False)
+    queue: str = field(compare=False)
+    seconds: float = field(compare=False)
+    uploaded: float = field(compare=False)
+
+
+def _uploads(args: argparse.Namespace) -> list[tuple[float, str, str, int]]:
+    """(time, user, mime type, size) of every upload, in time order."""
+    rng = random.Random(args.seed)
+    uploads = [(0.0, "bulk", "application/pdf", 4 << 20) for _ in range(args.bulk)]
+    for user in range(args.users):
+        small = rng.random() < args.small_share
+        uploads.append(
+            (
+                rng.uniform(0, args.window),
+                f"user-{user}",
+                "text/markdown" if small else "application/pdf",
+                20_000 if small else 2 << 20,
+            )
+        )
+    return sorted(uploads, key=lambda upload: upload[0])
+
+
+def _simulate(args: argparse.Namespace, fair: bool) -> dict[str, list[float]]:
+    from app.workers.scheduling import (
+        LOWEST_PRIORITY,
+        QUEUE_LARGE,
+        QUEUE_SMALL,
+        priority_for,
+        workload_queue,
+    )
+
+    sequence = itertools.count()
+    queues: dict[str, list[_Job]] = {QUEUE_SMALL: [], QUEUE_LARGE: []}
+    in_flight: dict[str, int] = defaultdict(int)
+    running: dict[str, int] = defaultdict(int)
+    if fair:
+        small_only = min(2, args.workers - 1)
+        workers = [[QUEUE_SMALL]] * small_only + [[QUEUE_LARGE, QUEUE_SMALL]] * (
+            args.workers - small_only
+        )
+    else:
+        workers = [[QUEUE_LARGE]] * args.workers
+    idle = list(range(len(workers)))
+    # (time, order, kind, payload): uploads, requeues and finished jobs.
+    events: list[tuple[float, int, str, object]] = []
+    for uploaded, user, mime_type, size in _uploads(args):
+        events.append((uploaded, next(sequence), "upload", (user, mime_type, size)))
+    heapq.heapify(events)
+    done: dict[str, list[float]] = {"others": [], "bulk": []}
+
+    def dispatch(now: float) -> None:
+        for worker in list(idle):
+            for name in workers[worker]:
+                while queues[name]:
+                    job = heapq.heappop(queues[name])
+                    if fair and running[job.user] >= args.max_per_user:
+                        job.priority = LOWEST_PRIORITY
+                        heapq.heappush(
+                            events,
+                            (now + args.defer_seconds, next(sequence), "requeue", job),
+                        )
+                        continue
+                    running[job.user] += 1
+                    idle.remove(worker)
+                    heapq.heappush(
+                        events,
+                        (now + job.seconds, next(sequence), "finish", (worker, job)),
+                    )
+                    break
+                if worker not in idle:
+                    break
+
+    while events:
+        now, _, kind, payload = heapq.heappop(events)
+        if kind == "upload":
+            user, mime_type, size = payload
+            queue = workload_queue(mime_type, size) if fair else QUEUE_LARGE
+            seconds = (
+                args.small_seconds if mime_type == "text/markdown" else args.pdf_seconds
+            )
+            in_flight[user] += 1
+            priority = priority_for(in_flight[user] - 1) if fair else 0
+            job = _Job(priority, next(sequence), user, queue, seconds, now)
+            heapq.heappush(queues[queue], job)
+        elif kind == "requeue":
+            heapq.heappush(queues[payload.queue], payload)
+        else:
+            worker, job = payload
+            idle.append(worker)
+            running[job.user] -= 1
+            in_flight[job.user] -= 1
+            done["bulk" if job.user == "bulk" else "others"].append(now - job.uploaded)
+            done.setdefault("last", []).append(now)
+        dispatch(now)
+    return done
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bulk", type=int, default=60)
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--window", type=float, default=600)
+    parser.add_argument("--small-share", type=float, default=0.5)
+    parser.add_argument("--small-seconds", type=float, default=3)
+    parser.add_argument("--pdf-seconds", type=float, default=30)
+    parser.add_argument("--workers", type=int, default=6)
+    parser.add_argument("--max-per-user", type=int, default=3)
+    parser.add_argument("--defer-seconds", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench")
+
+    print(
+        f"{args.bulk} bulk PDFs at t=0, {args.users} other uploads over "
+        f"{args.window:.0f}s, {args.workers} workers"
+    )
+    print(
+        f"{'mode':<6} {'others p50':>11} {'others p95':>11} "
+        f"{'bulk p50':>9} {'bulk p95':>9} {'last done':>10}"
+    )
+    for mode in ("fifo", "fair"):
+        done = _simulate(args, fair=mode == "fair")
+        others, bulk = done["others"], done["bulk"]
+        print(
+            f"{mode:<6} {np.percentile(others, 50):>10.0f}s "
+            f"{np.percentile(others, 95):>10.0f}s "
+            f"{np.percentile(bulk, 50):>8.0f}s {np.percentile(bulk, 95):>8.0f}s "
+            f"{max(done['last']):>9.0f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Time to READY of a long PDF: one task vs page-range shards on N workers.
+
+Builds a ``--pages`` page PDF and extracts, chunks and "embeds" it (each
+batch of ``--batch`` chunks sleeps ``--embed-ms`` to stand in for the
+embedding API) either in one process or as ``--shard-pages`` page ranges
+spread over ``--workers`` worker processes, as ``process_page_range`` tasks
+would be. Also reports the work redone when the last range fails once:
+the unsharded task restarts from page 1, the sharded document retries
+only that range.
+
+Usage:
+    uv run python -m benchmarks.bench_sharding --pages 1000 --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+WORDS = "graph search dynamic programming matrix proof lemma vector".split()
+
+
+def _build_pdf(path: Path, pages: int) -> None:
+    import pymupdf
+
+    with pymupdf.open() as pdf:
+        for number in range(pages):
+            page = pdf.new_page()
+            lines = [
+                " ".join(WORDS[(number + line + i) % len(WORDS)] for i in range(12))
+                + "."
+                for line in range(40)
+            ]
+            page.insert_text((36, 48), "\n".join(lines), fontsize=9)
+        pdf.save(path)
+
+
+def _ingest_range(
+    path: str, first: int, last: int, batch: int, embed_ms: float
+) -> tuple[int, float]:
+    """Chunks and seconds for pages first..last, as one range task."""
+    from app.core.config import settings
+    from app.services.chunking import iter_chunks
+    from app.services.extraction import iter_pages
+
+    started = time.perf_counter()
+    chunks = iter_chunks(
+        iter_pages(Path(path), "application/pdf", range(first, last + 1)),
+        settings.CHUNK_SIZE_TOKENS,
+        settings.CHUNK_OVERLAP_TOKENS,
+    )
+    count = pending = 0
+    for _ in chunks:
+        count += 1
+        pending += 1
+        if pending == batch:
+            time.sleep(embed_ms / 1000)
+            pending = 0
+    if pending:
+        time.sleep(embed_ms / 1000)
+    return count, time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--shard-pages", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--embed-ms", type=float, default=150)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench")
+    from app.workers.sharding import plan_shards
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "book.pdf"
+        _build_pdf(path, args.pages)
+        shards = plan_shards(args.pages, args.shard_pages)
+
+        started = time.perf_counter()
+        single_chunks, _ = _ingest_range(
+            str(path), 1, args.pages, args.batch, args.embed_ms
+        )
+        single = time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ProcessPoolExecutor(args.workers) as pool:
+            results = list(
+                pool.map(
+                    _ingest_range,
+                    [str(path)] * len(shards),
+                    [r.start for r in shards],
+                    [r.stop - 1 for r in shards],
+                    [args.batch] * len(shards),
+                    [args.embed_ms] * len(shards),
+                )
+            )
+        sharded = time.perf_counter() - started
+
+    sharded_chunks = sum(count for count, _ in results)
+    last_range = results[-1][1]
+    print(
+        f"{args.pages} pages, {len(shards)} ranges of {args.shard_pages}, "
+        f"{args.workers} workers, {args.embed_ms:.0f} ms per {args.batch} chunks"
+    )
+    print(f"{'mode':<8} {'chunks':>7} {'to READY':>9} {'redo if last range fails':>25}")
+    print(f"{'single':<8} {single_chunks:>7} {single:>8.1f}s {single:>24.1f}s")
+    print(f"{'sharded':<8} {sharded_chunks:>7} {sharded:>8.1f}s {last_range:>24.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Cold-load time and memory per process: private copies vs shared shards.
+
+Writes one user's synthetic vectors both as a plain float32 ``.npy`` (the
+per-process copy ``exact`` mode builds from pgvector; loading a local file
+is a lower bound on fetching it from Postgres) and as memory-mapped vector
+shards in each requested dtype. For every layout, the files are evicted
+from the page cache and ``--processes`` concurrent processes each open the
+vectors and run an exhaustive query (the first one cold); once all of them
+have queried, each reports its RSS, PSS (shared pages split between the
+processes that map them) and private anonymous memory from
+``/proc/self/smaps_rollup``. Linux only.
+
+Usage:
+    uv run python -m benchmarks.bench_shards --chunks 200000 --processes 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+WARM_QUERIES = 20
+
+
+def _env() -> None:
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench")
+
+
+def _memory_mb() -> dict[str, float]:
+    fields = {}
+    with open("/proc/self/smaps_rollup") as handle:
+        for line in handle:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:", "Anonymous:"):
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return fields
+
+
+def _evict(path: Path) -> None:
+    for file in path.rglob("*.npy"):
+        fd = os.open(file, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def _worker(layout: str, path: str, dimension: int, barrier, results) -> None:
+    _env()
+    from app.services.vector_index import (
+        ExactIndex,
+        ShardVectorIndex,
+        VectorShards,
+        normalize,
+    )
+
+    started = time.perf_counter()
+    if layout == "copy":
+        index = ExactIndex(np.load(Path(path) / "copy.npy"))
+    else:
+        shards = VectorShards.open(Path(path) / layout)
+        index = ShardVectorIndex(shards, list(shards.live_keys()))
+    open_ms = (time.perf_counter() - started) * 1000
+
+    queries = normalize(
+        np.random.default_rng(os.getpid()).standard_normal(
+            (WARM_QUERIES + 1, dimension), dtype=np.float32
+        )
+    )
+    started = time.perf_counter()
+    index.search(queries[0], 10)
+    cold_ms = (time.perf_counter() - started) * 1000
+    warm = []
+    for query in queries[1:]:
+        started = time.perf_counter()
+        index.search(query, 10)
+        warm.append((time.perf_counter() - started) * 1000)
+
+    barrier.wait()  # Every process has its pages resident before measuring.
+    results.put(
+        {"open": open_ms, "cold": cold_ms, "warm": np.median(warm), **_memory_mb()}
+    )
+    barrier.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=200_000)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--dtypes", nargs="+", default=["float32", "float16", "int8"])
+    args = parser.parse_args()
+
+    _env()
+    from app.services.vector_index import VectorShardWriter
+
+    vectors = np.random.default_rng(0).standard_normal(
+        (args.chunks, args.dimension), dtype=np.float32
+    )
+    keys = [(f"doc-{i // 500}", i % 500) for i in range(args.chunks)]
+    context = mp.get_context("spawn")
+
+    with tempfile.TemporaryDirectory(prefix="docmind-shards-") as tmp:
+        root = Path(tmp)
+        np.save(root / "copy.npy", vectors)
+        for dtype in args.dtypes:
+            VectorShardWriter(root / dtype, n_lists=1, dtype=dtype).rebuild(
+                keys, vectors
+            )
+        del vectors
+
+        print(
+            f"{args.chunks} chunks x {args.dimension}d, "
+            f"{args.processes} concurrent processes per layout"
+        )
+        print(
+            f"{'layout':<10} {'on disk':>9} {'open':>8} {'cold q':>8} {'warm q':>8} "
+            f"{'RSS':>8} {'PSS':>8} {'private':>8}"
+        )
+        for layout in ["copy", *args.dtypes]:
+            files = (
+                [root / "copy.npy"]
+                if layout == "copy"
+                else list((root / layout).rglob("*.npy"))
+            )
+            disk_mb = sum(f.stat().st_size for f in files) / 2**20
+            _evict(root)
+            barrier = context.Barrier(args.processes)
+            results = context.Queue()
+            workers = [
+                context.Process(
+                    target=_worker,
+                    args=(layout, tmp, args.dimension, barrier, results),
+                )
+                for _ in range(args.processes)
+            ]
+            for worker in workers:
+                worker.start()
+            rows = [results.get() for _ in workers]
+            for worker in workers:
+                worker.join()
+
+            mean = {key: np.mean([r[key] for r in rows]) for key in rows[0]}
+            print(
+                f"{layout:<10} {disk_mb:>7.0f}MB {mean['open']:>6.0f}ms "
+                f"{mean['cold']:>6.0f}ms {mean['warm']:>6.1f}ms "
+                f"{mean['Rss']:>6.0f}MB {mean['Pss']:>6.0f}MB "
+                f"{mean['Anonymous']:>6.0f}MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
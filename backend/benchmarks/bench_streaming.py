@@ -0,0 +1,137 @@
+"""Time to first visible output: buffered answers vs token streaming.
+
+Runs the agent graph against a simulated LLM (fixed first-token latency,
+then a steady decode rate) and compares when a client could first show
+something: after the whole answer (buffered ``ainvoke``, what the chat
+route used to return) or at the first streamed token (``stream_agent``).
+It then abandons streamed requests after a few tokens and counts the tokens
+the simulated provider still produced, i.e. work wasted on disconnects.
+
+Usage:
+    uv run python -m benchmarks.bench_streaming --tokens 400 --requests 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+ABANDON_AFTER_TOKENS = 5
+
+
+class SimulatedLLM(BaseChatModel):
+    """Chat model that streams ``tokens`` words at a fixed rate."""
+
+    first_token_s: float
+    token_s: float
+    tokens: int
+    produced: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "simulated"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise NotImplementedError("SimulatedLLM is async only")
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        text = "".join([c.message.content async for c in self._astream(messages, stop)])
+        return ChatResult(generations=[ChatGeneration(message=AIMessageChunk(text))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.first_token_s)
+        for i in range(self.tokens):
+            if i:
+                await asyncio.sleep(self.token_s)
+            self.produced += 1
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=f" w{i}"))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+async def _run(args: argparse.Namespace) -> None:
+    from app.agent.graph import agent_graph
+    from app.agent.streaming import GenerationStats, stream_agent
+    from app.services.retrieval import RetrievalResult
+
+    llm = SimulatedLLM(
+        first_token_s=args.first_token_ms / 1000,
+        token_s=1 / args.tokens_per_second,
+        tokens=args.tokens,
+    )
+    state = {"user_id": "bench", "query": "What does Dijkstra's algorithm need?"}
+    with (
+        patch("app.agent.graph.get_chat_model", return_value=llm),
+        patch("app.agent.graph.get_retrieval_service") as service,
+    ):
+        service.return_value.search = AsyncMock(return_value=RetrievalResult([], 0.9))
+
+        buffered = []
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            await agent_graph.ainvoke(state)
+            buffered.append((time.perf_counter() - started) * 1000)
+
+        ttft, rates = [], []
+        for _ in range(args.requests):
+            stats = GenerationStats()
+            async for _event in stream_agent(agent_graph, state, stats):
+                pass
+            ttft.append(stats.ttft_ms)
+            rates.append(stats.tokens_per_second)
+
+        wasted = []
+        for _ in range(args.requests):
+            llm.produced = 0
+            events = stream_agent(agent_graph, state, GenerationStats())
+            async for event, _data in events:
+                if event == "token" and llm.produced >= ABANDON_AFTER_TOKENS:
+                    break
+            await events.aclose()  # What the route does when the client leaves
+            seen = llm.produced
+            await asyncio.sleep(args.tokens / args.tokens_per_second)
+            wasted.append(llm.produced - seen)
+
+    print(
+        f"{args.tokens} tokens, {args.first_token_ms:.0f}ms to first token, "
+        f"{args.tokens_per_second:.0f} tok/s, {args.requests} requests"
+    )
+    print(f"{'mode':<28} {'p50':>9} {'p95':>9}")
+    for name, values in (
+        ("buffered: full answer", buffered),
+        ("streamed: first token", ttft),
+    ):
+        p50, p95 = np.percentile(values, [50, 95])
+        print(f"{name:<28} {p50:>7.0f}ms {p95:>7.0f}ms")
+    print(f"streamed decode rate: {np.median(rates):.0f} tok/s")
+    print(
+        f"abandoned after {ABANDON_AFTER_TOKENS} tokens: "
+        f"{np.mean(wasted):.1f} tokens generated afterwards (mean)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=400)
+    parser.add_argument("--first-token-ms", type=float, default=400)
+    parser.add_argument("--tokens-per-second", type=float, default=200)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench")
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Peak-RSS benchmark: document uploads through the HTTP endpoint.
+
+Sends ``--concurrency`` concurrent multipart uploads of a ``--size-mb`` file
+through the ASGI app in-process (``httpx.ASGITransport`` delivers the body
+to the app chunk by chunk, as a client would send it) and reports the peak
+resident set size of a fresh process per mode:
+
+* ``buffered``: an ``UploadFile`` endpoint that does ``await file.read()``
+  and stores the bytes (the original upload path);
+* ``spooled``: an ``UploadFile`` endpoint that hands the file to
+  ``store_upload`` (Starlette has already received and spooled the body);
+* ``streaming``: the real ``POST /api/documents/upload``.
+
+Each mode then sends one upload of twice ``--limit-mb`` without a
+Content-Length and reports how much of it the app pulled before answering
+413: the ``UploadFile`` endpoints receive the whole body first.
+
+Usage:
+    uv run python -m benchmarks.bench_upload --concurrency 50 --size-mb 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi import FastAPI, File, HTTPException, UploadFile
+
+BOUNDARY = "bench-upload-boundary"
+CHUNK = 64 * 1024
+
+
+class _Body:
+    """Multipart body streamed from ``source``, counting the bytes pulled."""
+
+    def __init__(self, source: Path, size: int | None = None) -> None:
+        self.source = source
+        self.size = size  # Repeat the file's bytes up to ``size`` if given
+        self.sent = 0
+
+    async def __aiter__(self):
+        yield (
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; '
+            f'filename="{self.source.name}"\r\nContent-Type: application/pdf\r\n\r\n'
+        ).encode()
+        remaining = self.size if self.size is not None else self.source.stat().st_size
+        with open(self.source, "rb") as handle:
+            while remaining > 0:
+                chunk = handle.read(min(CHUNK, remaining))
+                if not chunk:
+                    handle.seek(0)
+                    continue
+                remaining -= len(chunk)
+                self.sent += len(chunk)
+                yield chunk
+        yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+class _Database:
+    async def insert_document(self, row: dict) -> dict:
+        now = datetime.now(UTC)
+        return {**row, "created_at": now, "updated_at": now}
+
+
+def _app(mode: str, storage):
+    from app.api.dependencies import get_authenticated_user
+    from app.core.config import settings
+    from app.main import app
+    from app.services.database import get_database
+    from app.services.storage import FileTooLargeError, get_storage, store_upload
+
+    app.dependency_overrides[get_authenticated_user] = lambda: {"id": "bench-user"}
+    app.dependency_overrides[get_database] = _Database
+    app.dependency_overrides[get_storage] = lambda: storage
+    if mode == "streaming":
+        return app, "/api/documents/upload"
+
+    legacy = FastAPI()
+
+    @legacy.post("/upload", status_code=202)
+    async def upload(file: UploadFile = File(...)) -> dict:
+        max_bytes = settings.MAX_FILE_SIZE_MB * 1024 * 1024
+        path = f"bench-user/{id(file)}/{file.filename}"
+        if mode == "buffered":
+            contents = await file.read()
+            if len(contents) > max_bytes:
+                raise HTTPException(413)
+
+            async def single():
+                yield contents
+
+            await storage.upload_stream(path, single(), file.content_type)
+            return {"size": len(contents)}
+        try:
+            stored = await store_upload(storage, file, path, max_bytes)
+        except FileTooLargeError as exc:
+            raise HTTPException(413) from exc
+        return {"size": stored.size_bytes}
+
+    return legacy, "/upload"
+
+
+async def _bench(mode: str, source: Path, count: int, root: str, limit_mb: int):
+    import httpx
+
+    from app.core.config import settings
+    from app.services.storage import LocalStorage
+
+    settings.MAX_FILE_SIZE_MB = limit_mb
+    app, url = _app(mode, LocalStorage(root))
+    headers = {"content-type": f"multipart/form-data; boundary={BOUNDARY}"}
+    transport = httpx.ASGITransport(app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+
+        async def one() -> None:
+            response = await client.post(url, content=_Body(source), headers=headers)
+            assert response.status_code == 202, response.text
+
+        baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(count)))
+        elapsed = time.perf_counter() - started
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        oversized = _Body(source, size=2 * limit_mb * 1024 * 1024)
+        response = await client.post(url, content=oversized, headers=headers)
+        assert response.status_code == 413, response.status_code
+    return baseline_kb, peak_kb, elapsed, oversized.sent
+
+
+def _run(mode: str, source: str, count: int, root: str, limit_mb: int, queue) -> None:
+    with patch("app.api.routes.documents.enqueue_document"):
+        result = asyncio.run(_bench(mode, Path(source), count, root, limit_mb))
+    queue.put((mode, *result))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--size-mb", type=int, default=10)
+    parser.add_argument("--limit-mb", type=int, default=50)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench")
+
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "source.pdf"
+        source.write_bytes(os.urandom(args.size_mb * 1024 * 1024))
+        print(
+            f"{args.concurrency} concurrent uploads x {args.size_mb} MiB "
+            f"({args.concurrency * args.size_mb} MiB total); oversized upload "
+            f"{2 * args.limit_mb} MiB against a {args.limit_mb} MiB limit"
+        )
+        print(
+            f"{'mode':<10} {'base RSS':>10} {'peak RSS':>10} {'delta':>10} "
+            f"{'time':>8} {'read before 413':>16}"
+        )
+        for mode in ("buffered", "spooled", "streaming"):
+            queue = ctx.Queue()
+            proc = ctx.Process(
+                target=_run,
+                args=(
+                    mode,
+                    str(source),
+                    args.concurrency,
+                    f"{tmp}/{mode}",
+                    args.limit_mb,
+                    queue,
+                ),
+            )
+            proc.start()
+            mode, base_kb, peak_kb, elapsed, sent = queue.get()
+            proc.join()
+            print(
+                f"{mode:<10} {base_kb / 1024:>8.1f}MB {peak_kb / 1024:>8.1f}MB "
+                f"{(peak_kb - base_kb) / 1024:>8.1f}MB {elapsed:>7.2f}s "
+                f"{sent / (1024 * 1024):>13.1f}MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Web search latency: sequential page fetches vs concurrent vs cached.
+
+Simulates a search API (``--search-ms``) and pages whose latency is
+log-normal around ``--page-ms``, with ``--slow-share`` of them hanging for
+``--slow-ms``. ``--queries`` queries are drawn Zipf-like from
+``--distinct`` distinct ones, each returning ``--results`` pages from a
+shared pool of URLs:
+
+* ``sequential``: search, then fetch each page one after another with no
+  overall deadline (a hung page is waited for);
+* ``concurrent``: ``WebSearchService`` with the caches disabled: pages in
+  parallel, each bounded by ``WEB_FETCH_TIMEOUT_SECONDS``;
+* ``cached``: the same with the query and page caches (in-memory Redis).
+
+Usage:
+    uv run python -m benchmarks.bench_web_search --queries 100 --slow-share 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+import numpy as np
+
+PAGE = "<html><body><article>{}</article></body></html>"
+
+
+class _MemoryRedis:
+    """In-process stand-in for the asyncio Redis client (no TTLs)."""
+
+    def __init__(self, enabled: bool) -> None:
+        self.enabled = enabled
+        self.store: dict[str, bytes] = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    async def set(self, key, value, ex=None):
+        if self.enabled:
+            self.store[key] = value.encode()
+
+
+def _world(args: argparse.Namespace):
+    import httpx
+
+    from app.services.web_search import SearchHit
+
+    rng = random.Random(args.seed)
+    urls = [f"https://site{i % 50}.example/page/{i}" for i in range(args.pages)]
+    delays = {
+        url: (
+            args.slow_ms
+            if rng.random() < args.slow_share
+            else rng.lognormvariate(np.log(args.page_ms), 0.5)
+        )
+        / 1000
+        for url in urls
+    }
+    paragraph = "<p>" + "Lorem ipsum dolor sit amet. " * 40 + "</p>"
+    queries = {
+        f"query {q}": [
+            SearchHit(url, url, "snippet") for url in rng.sample(urls, args.results)
+        ]
+        for q in range(args.distinct)
+    }
+
+    async def serve(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(delays[str(request.url)])
+        return httpx.Response(
+            200, text=PAGE.format(paragraph * 20), headers={"content-type": "text/html"}
+        )
+
+    weights = [1 / (rank + 1) for rank in range(args.distinct)]
+    stream = rng.choices(list(queries), weights, k=args.queries)
+    return queries, serve, stream
+
+
+class _SlowStub:
+    def __init__(self, hits, seconds: float) -> None:
+        from app.services.web_search import StubSearch
+
+        self._stub = StubSearch(hits)
+        self._seconds = seconds
+        self.name = "stub"
+
+    async def search(self, query: str, limit: int):
+        await asyncio.sleep(self._seconds)
+        return await self._stub.search(query, limit)
+
+
+async def _run(args: argparse.Namespace) -> dict[str, list[float]]:
+    import httpx
+
+    from app.services.web_search import (
+        WebSearchService,
+        build_web_client,
+        extract_main_text,
+    )
+
+    queries, serve, stream = _world(args)
+    provider = _SlowStub(queries, args.search_ms / 1000)
+    latencies: dict[str, list[float]] = {}
+
+    client = build_web_client(httpx.MockTransport(serve))
+    sequential = []
+    for query in stream[: args.sequential_queries]:
+        started = time.perf_counter()
+        for hit in await provider.search(query, args.results):
+            response = await client.get(hit.url)
+            extract_main_text(response.text, 4000)
+        sequential.append(time.perf_counter() - started)
+    latencies["sequential"] = sequential
+
+    for mode, cache in (("concurrent", False), ("cached", True)):
+        redis = _MemoryRedis(cache)
+        service = WebSearchService(
+            provider, build_web_client(httpx.MockTransport(serve)), lambda: redis
+        )
+        samples = []
+        for query in stream:
+            started = time.perf_counter()
+            await service.search(query)
+            samples.append(time.perf_counter() - started)
+        latencies[mode] = samples
+        await service.close()
+    await client.aclose()
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--sequential-queries", type=int, default=15)
+    parser.add_argument("--distinct", type=int, default=40)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--results", type=int, default=5)
+    parser.add_argument("--search-ms", type=float, default=400)
+    parser.add_argument("--page-ms", type=float, default=350)
+    parser.add_argument("--slow-share", type=float, default=0.05)
+    parser.add_argument("--slow-ms", type=float, default=6000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench")
+    from app.core.config import settings
+
+    latencies = asyncio.run(_run(args))
+    print(
+        f"{args.queries} queries ({args.distinct} distinct), {args.results} pages "
+        f"each, {args.slow_share:.0%} of pages hang {args.slow_ms:.0f}ms; "
+        f"page timeout {settings.WEB_FETCH_TIMEOUT_SECONDS:.1f}s"
+    )
+    print(f"{'mode':<11} {'queries':>7} {'p50':>8} {'p95':>8} {'max':>8}")
+    for mode, samples in latencies.items():
+        ms = np.array(samples) * 1000
+        print(
+            f"{mode:<11} {len(samples):>7} {np.percentile(ms, 50):>6.0f}ms "
+            f"{np.percentile(ms, 95):>6.0f}ms {ms.max():>6.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""In-memory PostgREST stand-in for the benchmarks and tests.
+
+Implements the slice of PostgREST that ``SupabaseDatabase`` uses: row
+inserts, ``eq.``/``in.``/``gt.``/``gte.``/``lt.`` filters, column selection,
+ascending ``order`` and ``limit``, updates, deletes with
+``Prefer: count=exact`` and registered RPC functions (``add_migrations``
+registers Python versions of the repo's own SQL functions). Every request can be
+delayed to simulate network and database latency, and the stub records the
+peak number of requests in flight and the client connections it saw, so
+pooling and keep-alive are observable. ``serve`` runs it on a local port
+for real-socket measurements.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import threading
+import time
+from collections.abc import Callable, Iterator
+from typing import Any
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from app.services.index_versions import INITIAL_INDEX_VERSION
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset"}
+
+
+class PostgrestStub:
+    """Tables of JSON rows behind a PostgREST-shaped ASGI app."""
+
+    def __init__(self, latency_ms: float = 0.0) -> None:
+        self.latency_ms = latency_ms
+        self.tables: dict[str, list[dict[str, Any]]] = {}
+        self.defaults: dict[str, dict[str, Any]] = {}  # Column defaults per table
+        self.functions: dict[str, Callable[[dict[str, Any]], Any]] = {}
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.connections: set[tuple[str, int]] = set()
+        self.app = Starlette(
+            routes=[
+                Route("/rest/v1/rpc/{function}", self._rpc, methods=["POST"]),
+                Route(
+                    "/rest/v1/{table}",
+                    self._table,
+                    methods=["GET", "POST", "PATCH", "DELETE"],
+                ),
+            ]
+        )
+
+    def reset_counters(self) -> None:
+        self.requests = self.max_in_flight = 0
+        self.connections.clear()
+
+    async def _table(self, request: Request) -> Response:
+        async with self._track(request):
+            table = self.tables.setdefault(request.path_params["table"], [])
+            prefer = request.headers.get("Prefer", "")
+            matches = [row for row in table if _matches(row, request.query_params)]
+            if request.method == "GET":
+                if "order" in request.query_params:
+                    column = request.query_params["order"]
+                    matches.sort(key=lambda row: str(row.get(column)))
+                if "limit" in request.query_params:
+                    matches = matches[: int(request.query_params["limit"])]
+                columns = request.query_params.get("select", "*")
+                return JSONResponse([_select(row, columns) for row in matches])
+            if request.method == "POST":
+                body = await request.json()
+                defaults = self.defaults.get(request.path_params["table"], {})
+                rows = [
+                    {**defaults, **row}
+                    for row in (body if isinstance(body, list) else [body])
+                ]
+                table.extend(rows)
+                if "return=representation" in prefer:
+                    return JSONResponse(rows, status_code=201)
+                return Response(status_code=201)
+            if request.method == "PATCH":
+                fields = await request.json()
+                for row in matches:
+                    row.update(fields)
+                return Response(status_code=204)
+            table[:] = [row for row in table if row not in matches]
+            headers = {}
+            if "count=exact" in prefer:
+                headers["Content-Range"] = f"*/{len(matches)}"
+            return Response(status_code=204, headers=headers)
+
+    async def _rpc(self, request: Request) -> Response:
+        async with self._track(request):
+            function = self.functions.get(request.path_params["function"])
+            if function is None:
+                return JSONResponse({"message": "function not found"}, 404)
+            try:
+                result = function(await request.json())
+            except ValueError as exc:
+                # PostgREST maps a raised exception to 400, like a failed check.
+                return JSONResponse({"message": str(exc)}, 400)
+            return JSONResponse(result)
+
+    @contextlib.asynccontextmanager
+    async def _track(self, request: Request):
+        self.requests += 1
+        if request.client is not None:
+            self.connections.add((request.client.host, request.client.port))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency_ms:
+                await asyncio.sleep(self.latency_ms / 1000)
+            yield
+        finally:
+            self.in_flight -= 1
+
+
+def _matches(row: dict[str, Any], params) -> bool:
+    for column, condition in params.multi_items():
+        if column in RESERVED_PARAMS:
+            continue
+        operator, _, value = condition.partition(".")
+        actual = str(row.get(column))
+        if operator == "eq" and actual != value:
+            return False
+        if operator == "in" and actual not in value.strip("()").split(","):
+            return False
+        if operator == "gt" and not _key(actual) > _key(value):
+            return False
+        if operator == "gte" and not _key(actual) >= _key(value):
+            return False
+        if operator == "lt" and not _key(actual) < _key(value):
+            return False
+    return True
+
+
+def _key(value: str) -> tuple[int, float | str]:
+    # Numbers compare as numbers, anything else (ids) as text.
+    try:
+        return (0, float(value))
+    except ValueError:
+        return (1, value)
+
+
+def _select(row: dict[str, Any], columns: str) -> dict[str, Any]:
+    if columns == "*":
+        return dict(row)
+    names = [column.strip() for column in columns.split(",")]
+    return {name: row.get(name) for name in names}
+
+
+def add_migrations(stub: PostgrestStub) -> None:
+    """Register the SQL functions in ``supabase/migrations`` on ``stub``."""
+
+    def publish_document_chunks(params: dict[str, Any]) -> int:
+        document_id = params["target_document_id"]
+        version = params["target_index_version"]
+
+        def ours(row: dict[str, Any]) -> bool:
+            return (
+                row["document_id"] == document_id
+                and row.get("index_version", INITIAL_INDEX_VERSION) == version
+            )
+
+        staging = stub.tables.setdefault("document_chunks_staging", [])
+        staged = [row for row in staging if ours(row)]
+        documents = [
+            row for row in stub.tables.get("documents", []) if row["id"] == document_id
+        ]
+        if not documents:
+            staging[:] = [row for row in staging if not ours(row)]
+            return 0
+        if len(staged) != params["expected_chunks"]:
+            raise ValueError(
+                f"document {document_id} staged {len(staged)} chunks, "
+                f"expected {params['expected_chunks']}"
+            )
+        chunks = stub.tables.setdefault("document_chunks", [])
+        chunks[:] = [row for row in chunks if not ours(row)]
+        staged.sort(key=lambda row: row["chunk_index"])
+        chunks.extend(
+            {**row, "chunk_index": index, "index_version": version}
+            for index, row in enumerate(staged)
+        )
+        staging[:] = [row for row in staging if not ours(row)]
+        for row in documents:
+            row.update(status="READY", error_message=None)
+        return len(staged)
+
+    def delete_user_documents(params: dict[str, Any]) -> int:
+        documents = stub.tables.setdefault("documents", [])
+        ids = {
+            row["id"]
+            for row in documents
+            if row["user_id"] == params["target_user_id"]
+            and row["id"] in params["target_document_ids"]
+        }
+        for table in ("document_chunks_staging", "document_chunks"):
+            rows = stub.tables.setdefault(table, [])
+            rows[:] = [row for row in rows if row["document_id"] not in ids]
+        documents[:] = [row for row in documents if row["id"] not in ids]
+        return len(ids)
+
+    stub.functions["publish_document_chunks"] = publish_document_chunks
+    stub.functions["delete_user_documents"] = delete_user_documents
+
+
+@contextlib.contextmanager
+def serve(stub: PostgrestStub) -> Iterator[str]:
+    """Serve ``stub`` on a free local port; yield its base URL."""
+    import uvicorn
+
+    server = uvicorn.Server(
+        uvicorn.Config(stub.app, host="127.0.0.1", port=0, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
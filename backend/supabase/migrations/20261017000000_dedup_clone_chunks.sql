@@ -0,0 +1,32 @@
+-- Content-addressed dedup: link a duplicate upload to an existing ingestion.
+--
+-- Copies every chunk row (text, page, embedding) of the canonical document to
+-- the new document inside Postgres, so vectors never leave the database and
+-- no embedding calls are made. Returns the number of chunks copied (0 if the
+-- canonical document no longer exists).
+
+alter table documents add column if not exists content_hash text;
+alter table documents add column if not exists size_bytes bigint;
+create index if not exists documents_content_hash_idx on documents (content_hash);
+
+create or replace function clone_document_chunks(
+    source_document_id uuid,
+    target_document_id uuid,
+    target_user_id uuid
+) returns integer
+language sql
+security definer
+as $$
+    with copied as (
+        insert into document_chunks
+            (document_id, user_id, chunk_index, page_number, content, embedding)
+        select target_document_id, target_user_id, chunk_index, page_number,
+               content, embedding
+        from document_chunks
+        where document_id = source_document_id
+        returning 1
+    )
+    select count(*)::integer from copied;
+$$;
+
+revoke execute on function clone_document_chunks(uuid, uuid, uuid) from public, anon, authenticated;
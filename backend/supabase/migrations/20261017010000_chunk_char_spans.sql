@@ -0,0 +1,28 @@
+-- Character spans of each chunk within the text of its page, used to build
+-- citation excerpts without re-chunking the source document.
+
+alter table document_chunks add column if not exists char_start integer;
+alter table document_chunks add column if not exists char_end integer;
+
+create or replace function clone_document_chunks(
+    source_document_id uuid,
+    target_document_id uuid,
+    target_user_id uuid
+) returns integer
+language sql
+security definer
+as $$
+    with copied as (
+        insert into document_chunks
+            (document_id, user_id, chunk_index, page_number, char_start,
+             char_end, content, embedding)
+        select target_document_id, target_user_id, chunk_index, page_number,
+               char_start, char_end, content, embedding
+        from document_chunks
+        where document_id = source_document_id
+        returning 1
+    )
+    select count(*)::integer from copied;
+$$;
+
+revoke execute on function clone_document_chunks(uuid, uuid, uuid) from public, anon, authenticated;
@@ -0,0 +1,54 @@
+-- Staged bulk chunk writes: ingestion inserts chunk rows in large batches into
+-- an unlogged staging table that search never reads, then publishes them.
+--
+-- publish_document_chunks replaces the document's chunks with its staged rows
+-- and marks the document READY in one transaction, so a document is never
+-- searchable half-written and a retried ingestion never duplicates chunks.
+-- Raises (rolling everything back) if the staged row count is not the count
+-- the worker wrote. Returns the number of chunks published.
+
+create unlogged table if not exists document_chunks_staging
+    (like document_chunks including defaults);
+create index if not exists document_chunks_staging_document_id_idx
+    on document_chunks_staging (document_id);
+alter table document_chunks_staging enable row level security;
+
+create or replace function publish_document_chunks(
+    target_document_id uuid,
+    expected_chunks integer
+) returns integer
+language plpgsql
+security definer
+as $$
+declare
+    published integer;
+begin
+    delete from document_chunks where document_id = target_document_id;
+
+    with staged as (
+        delete from document_chunks_staging
+        where document_id = target_document_id
+        returning user_id, chunk_index, page_number, char_start, char_end,
+                  content, embedding
+    )
+    insert into document_chunks
+        (document_id, user_id, chunk_index, page_number, char_start,
+         char_end, content, embedding)
+    select target_document_id, user_id, chunk_index, page_number, char_start,
+           char_end, content, embedding
+    from staged;
+    get diagnostics published = row_count;
+
+    if published <> expected_chunks then
+        raise exception 'document % staged % chunks, expected %',
+            target_document_id, published, expected_chunks;
+    end if;
+
+    update documents
+    set status = 'READY', error_message = null
+    where id = target_document_id;
+    return published;
+end;
+$$;
+
+revoke execute on function publish_document_chunks(uuid, integer) from public, anon, authenticated;
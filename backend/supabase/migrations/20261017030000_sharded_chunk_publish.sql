@@ -0,0 +1,48 @@
+-- Sharded ingestion: workers stage the chunks of one page range each, with
+-- chunk_index offset by the shard number (shard * 1000000 + position), so
+-- shards never collide and a retried shard can drop only its own rows.
+--
+-- publish_document_chunks now renumbers staged rows 0..n-1 in document order
+-- while moving them into document_chunks; unsharded ingestion already stages
+-- contiguous indexes, which are kept as they are.
+
+create or replace function publish_document_chunks(
+    target_document_id uuid,
+    expected_chunks integer
+) returns integer
+language plpgsql
+security definer
+as $$
+declare
+    published integer;
+begin
+    delete from document_chunks where document_id = target_document_id;
+
+    with staged as (
+        delete from document_chunks_staging
+        where document_id = target_document_id
+        returning user_id, chunk_index, page_number, char_start, char_end,
+                  content, embedding
+    )
+    insert into document_chunks
+        (document_id, user_id, chunk_index, page_number, char_start,
+         char_end, content, embedding)
+    select target_document_id, user_id,
+           (row_number() over (order by chunk_index) - 1)::integer,
+           page_number, char_start, char_end, content, embedding
+    from staged;
+    get diagnostics published = row_count;
+
+    if published <> expected_chunks then
+        raise exception 'document % staged % chunks, expected %',
+            target_document_id, published, expected_chunks;
+    end if;
+
+    update documents
+    set status = 'READY', error_message = null
+    where id = target_document_id;
+    return published;
+end;
+$$;
+
+revoke execute on function publish_document_chunks(uuid, integer) from public, anon, authenticated;
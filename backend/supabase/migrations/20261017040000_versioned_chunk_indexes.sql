@@ -0,0 +1,98 @@
+-- Versioned search indexes: every chunk row records the index version (the
+-- embedding model and chunking settings, registered in Redis as v1, v2, ...)
+-- it was built for. Search reads only the active version, so a background
+-- migration can write a new version's rows next to the old ones and queries
+-- switch over in one step once every document has them. Rows from before
+-- versioning are v1.
+--
+-- The embedding column keeps its dimension: moving to a model of another
+-- dimension also needs the column (and its vector index) retyped.
+
+alter table document_chunks
+    add column if not exists index_version text not null default 'v1';
+alter table document_chunks_staging
+    add column if not exists index_version text not null default 'v1';
+
+create index if not exists document_chunks_version_user_idx
+    on document_chunks (index_version, user_id);
+
+-- publish_document_chunks now replaces one version's rows only. A document
+-- deleted while it was being re-embedded publishes nothing.
+drop function if exists publish_document_chunks(uuid, integer);
+
+create or replace function publish_document_chunks(
+    target_document_id uuid,
+    expected_chunks integer,
+    target_index_version text
+) returns integer
+language plpgsql
+security definer
+as $$
+declare
+    published integer;
+begin
+    if not exists (select 1 from documents where id = target_document_id) then
+        delete from document_chunks_staging
+        where document_id = target_document_id
+          and index_version = target_index_version;
+        return 0;
+    end if;
+
+    delete from document_chunks
+    where document_id = target_document_id
+      and index_version = target_index_version;
+
+    with staged as (
+        delete from document_chunks_staging
+        where document_id = target_document_id
+          and index_version = target_index_version
+        returning user_id, chunk_index, page_number, char_start, char_end,
+                  content, embedding
+    )
+    insert into document_chunks
+        (document_id, user_id, chunk_index, page_number, char_start,
+         char_end, content, embedding, index_version)
+    select target_document_id, user_id,
+           (row_number() over (order by chunk_index) - 1)::integer,
+           page_number, char_start, char_end, content, embedding,
+           target_index_version
+    from staged;
+    get diagnostics published = row_count;
+
+    if published <> expected_chunks then
+        raise exception 'document % staged % chunks, expected %',
+            target_document_id, published, expected_chunks;
+    end if;
+
+    update documents
+    set status = 'READY', error_message = null
+    where id = target_document_id;
+    return published;
+end;
+$$;
+
+revoke execute on function publish_document_chunks(uuid, integer, text) from public, anon, authenticated;
+
+-- Duplicates are linked with the rows of every version the canonical copy has.
+create or replace function clone_document_chunks(
+    source_document_id uuid,
+    target_document_id uuid,
+    target_user_id uuid
+) returns integer
+language sql
+security definer
+as $$
+    with copied as (
+        insert into document_chunks
+            (document_id, user_id, chunk_index, page_number, char_start,
+             char_end, content, embedding, index_version)
+        select target_document_id, target_user_id, chunk_index, page_number,
+               char_start, char_end, content, embedding, index_version
+        from document_chunks
+        where document_id = source_document_id
+        returning 1
+    )
+    select count(*)::integer from copied;
+$$;
+
+revoke execute on function clone_document_chunks(uuid, uuid, uuid) from public, anon, authenticated;
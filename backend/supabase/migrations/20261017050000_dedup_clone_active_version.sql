@@ -0,0 +1,30 @@
+-- Duplicates are linked with the rows of one index version only: the active
+-- version fresh ingestion would have written. Rows of a version still being
+-- migrated to are added by the re-embed sweep like for any other document,
+-- and the returned count is the number of embeddings the link saved.
+drop function if exists clone_document_chunks(uuid, uuid, uuid);
+
+create or replace function clone_document_chunks(
+    source_document_id uuid,
+    target_document_id uuid,
+    target_user_id uuid,
+    source_index_version text
+) returns integer
+language sql
+security definer
+as $$
+    with copied as (
+        insert into document_chunks
+            (document_id, user_id, chunk_index, page_number, char_start,
+             char_end, content, embedding, index_version)
+        select target_document_id, target_user_id, chunk_index, page_number,
+               char_start, char_end, content, embedding, index_version
+        from document_chunks
+        where document_id = source_document_id
+          and index_version = source_index_version
+        returning 1
+    )
+    select count(*)::integer from copied;
+$$;
+
+revoke execute on function clone_document_chunks(uuid, uuid, uuid, text) from public, anon, authenticated;
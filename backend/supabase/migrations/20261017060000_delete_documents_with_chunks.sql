@@ -0,0 +1,33 @@
+-- Deleting a document removes its chunks and its row in one transaction.
+-- Deleting them in separate requests could leave chunks without their
+-- document, still searchable by user_id, when the second request failed.
+-- Staged rows go as well, and a publish that runs afterwards finds no
+-- document and publishes nothing.
+create or replace function delete_user_documents(
+    target_user_id uuid,
+    target_document_ids uuid[]
+) returns integer
+language plpgsql
+security definer
+as $$
+declare
+    deleted integer;
+begin
+    delete from document_chunks_staging
+    where document_id in (
+        select id from documents
+        where user_id = target_user_id and id = any(target_document_ids)
+    );
+    delete from document_chunks
+    where document_id in (
+        select id from documents
+        where user_id = target_user_id and id = any(target_document_ids)
+    );
+    delete from documents
+    where user_id = target_user_id and id = any(target_document_ids);
+    get diagnostics deleted = row_count;
+    return deleted;
+end;
+$$;
+
+revoke execute on function delete_user_documents(uuid, uuid[]) from public, anon, authenticated;
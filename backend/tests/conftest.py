@@ -2,13 +2,25 @@
 
 from __future__ import annotations
 
+from pathlib import Path
 from unittest.mock import MagicMock
 
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 
 from app.api.dependencies import get_authenticated_user, get_supabase_client
+from app.core.config import settings
 from app.main import app
+from app.services.database import SupabaseDatabase, get_database
+from app.services.storage import LocalStorage, get_storage
+from benchmarks.postgrest_stub import PostgrestStub, add_migrations
+
+
+@pytest.fixture(autouse=True)
+def no_sandbox_prewarm(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Don't start sandbox workers with every TestClient."""
+    monkeypatch.setattr(settings, "SANDBOX_PREWARM", False)
 
 
 @pytest.fixture
@@ -24,10 +36,39 @@ def mock_supabase() -> MagicMock:
 
 
 @pytest.fixture
-def client(mock_user: dict, mock_supabase: MagicMock) -> TestClient:
-    """Test client with auth and Supabase dependencies overridden."""
+def local_storage(tmp_path: Path) -> LocalStorage:
+    """Filesystem-backed storage rooted in a per-test temp directory."""
+    return LocalStorage(tmp_path / "storage")
+
+
+@pytest.fixture
+def postgrest() -> PostgrestStub:
+    """An empty in-memory PostgREST with the repo's SQL functions."""
+    stub = PostgrestStub()
+    add_migrations(stub)
+    return stub
+
+
+@pytest.fixture
+def database(postgrest: PostgrestStub) -> SupabaseDatabase:
+    """Database client wired to the in-memory PostgREST."""
+    return SupabaseDatabase(
+        "http://postgrest.test", "key", transport=httpx.ASGITransport(postgrest.app)
+    )
+
+
+@pytest.fixture
+def client(
+    mock_user: dict,
+    mock_supabase: MagicMock,
+    database: SupabaseDatabase,
+    local_storage: LocalStorage,
+) -> TestClient:
+    """Test client with auth, database and storage dependencies overridden."""
     app.dependency_overrides[get_authenticated_user] = lambda: mock_user
     app.dependency_overrides[get_supabase_client] = lambda: mock_supabase
+    app.dependency_overrides[get_database] = lambda: database
+    app.dependency_overrides[get_storage] = lambda: local_storage
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
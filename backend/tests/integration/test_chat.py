@@ -0,0 +1,110 @@
+"""Integration tests for the streaming chat endpoint."""
+
+from __future__ import annotations
+
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.agent.streaming import StreamMetrics, get_stream_metrics
+from app.core.metrics import InMemoryCounters
+from app.main import app
+from app.services.answer_cache import get_answer_cache
+from app.services.conversation import (
+    ConversationHistory,
+    InMemoryConversationStore,
+    get_conversation_history,
+)
+from app.services.embedding import (
+    EmbeddingService,
+    FakeEmbeddingProvider,
+    get_embedding_service,
+)
+from app.services.retrieval import RetrievalResult, RetrievedChunk
+
+CHUNK = RetrievedChunk("doc-1", "notes.pdf", 0, 1, "Heaps order keys.", 0.1, 0.9)
+
+
+@pytest.fixture
+def metrics() -> StreamMetrics:
+    metrics = StreamMetrics(InMemoryCounters())
+    app.dependency_overrides[get_stream_metrics] = lambda: metrics
+    return metrics
+
+
+@pytest.fixture
+def history() -> ConversationHistory:
+    history = ConversationHistory(
+        InMemoryConversationStore(), 2, 2, model_factory=GenericFakeChatModel
+    )
+    app.dependency_overrides[get_conversation_history] = lambda: history
+    return history
+
+
+@pytest.fixture(autouse=True)
+def _agent(history):
+    app.dependency_overrides[get_answer_cache] = lambda: None
+    app.dependency_overrides[get_embedding_service] = lambda: EmbeddingService(
+        FakeEmbeddingProvider(dimension=8)
+    )
+    model = GenericFakeChatModel(
+        messages=iter([AIMessage("Heaps keep order."), AIMessage("Yes.")])
+    )
+    with (
+        patch("app.agent.graph.get_chat_model", return_value=model),
+        patch("app.agent.graph.get_retrieval_service") as service,
+    ):
+        service.return_value.search = AsyncMock(
+            return_value=RetrievalResult([CHUNK], 0.9)
+        )
+        yield
+
+
+def _events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data[6:])))
+    return events
+
+
+def test_chat_streams_sources_tokens_and_timing(client, metrics):
+    with client.stream(
+        "POST", "/api/chat", json={"message": "heaps?", "conversation_id": "c-1"}
+    ) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = _events(response.read().decode())
+
+    kinds = [kind for kind, _ in events]
+    assert kinds.index("sources") < kinds.index("token")
+    assert events[kinds.index("sources")][1]["sources"][0]["document_id"] == "doc-1"
+    text = "".join(data["text"] for kind, data in events if kind == "token")
+    assert text == "Heaps keep order."
+    assert events[-1][0] == "done"
+    assert events[-1][1]["conversation_id"] == "c-1"
+    assert events[-1][1]["ttft_ms"] >= 0
+    assert events[-1][1]["context_tokens"] > 0
+
+
+def test_chat_rejects_empty_message(client, metrics):
+    assert client.post("/api/chat", json={"message": ""}).status_code == 422
+
+
+def test_chat_replays_conversation_history(client, metrics, history):
+    with patch("app.agent.graph.build_generation_messages") as build:
+        build.side_effect = lambda state: [HumanMessage(state["query"])]
+        for message in ("heaps?", "always?"):
+            client.post(
+                "/api/chat", json={"message": message, "conversation_id": "c-1"}
+            ).read()
+
+    first, second = (call.args[0] for call in build.call_args_list)
+    assert first["messages"] == []
+    assert second["messages"] == [
+        HumanMessage("heaps?"),
+        AIMessage("Heaps keep order."),
+    ]
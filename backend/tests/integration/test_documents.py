@@ -0,0 +1,250 @@
+"""Integration tests for the document endpoints."""
+
+from __future__ import annotations
+
+import hashlib
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.main import app
+from app.services.database import DatabaseError
+from app.services.storage import StorageError
+
+
+@pytest.fixture
+def queued():
+    with patch("app.api.routes.documents.enqueue_document") as enqueue:
+        yield enqueue
+
+
+def test_upload_streams_to_storage_and_queues_processing(
+    client, postgrest, queued, tmp_path
+):
+    created = "2026-01-01T00:00:00Z"
+    postgrest.defaults["documents"] = {"created_at": created, "updated_at": created}
+    data = b"# Week 3\nDynamic programming.\n"
+
+    response = client.post(
+        "/api/documents/upload",
+        files={"file": ("../week3.md", data, "text/markdown")},
+    )
+
+    assert response.status_code == 202
+    body = response.json()
+    assert body["status"] == "PENDING"
+    assert body["filename"] == "week3.md"
+
+    (row,) = postgrest.tables["documents"]
+    assert row["content_hash"] == hashlib.sha256(data).hexdigest()
+    assert row["size_bytes"] == len(data)
+    assert (tmp_path / "storage" / row["storage_path"]).read_bytes() == data
+    queued.assert_called_once_with(
+        body["id"],
+        "test-user-uuid",
+        row["storage_path"],
+        row["content_hash"],
+        "text/markdown",
+        len(data),
+    )
+
+
+def test_upload_rejects_oversized_file(
+    client, postgrest, queued, monkeypatch, tmp_path
+):
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE_MB", 1)
+
+    response = client.post(
+        "/api/documents/upload",
+        files={"file": ("big.txt", b"x" * (1024 * 1024 + 1), "text/plain")},
+    )
+
+    assert response.status_code == 413
+    assert postgrest.requests == 0
+    queued.assert_not_called()
+    assert not any((tmp_path / "storage").rglob("*.txt*"))
+
+
+@pytest.fixture
+async def async_client(client):
+    """Client whose request body reaches the app chunk by chunk, as sent."""
+    transport = httpx.ASGITransport(app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+
+class Body:
+    """Multipart upload sent in ``chunk``-byte pieces, counting those pulled."""
+
+    boundary = "test-boundary"
+
+    def __init__(self, size: int, chunk: int = 64 * 1024) -> None:
+        self.head = (
+            f"--{self.boundary}\r\nContent-Disposition: form-data; "
+            f'name="file"; filename="big.txt"\r\nContent-Type: text/plain\r\n\r\n'
+        ).encode()
+        self.tail = f"\r\n--{self.boundary}--\r\n".encode()
+        self.size = size
+        self.chunk = chunk
+        self.pulled = 0
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {"content-type": f"multipart/form-data; boundary={self.boundary}"}
+
+    async def __aiter__(self):
+        self.pulled += 1
+        yield self.head
+        for _ in range(0, self.size, self.chunk):
+            self.pulled += 1
+            yield b"x" * self.chunk
+        yield self.tail
+
+
+async def test_upload_with_oversized_content_length_is_refused_unread(
+    async_client, postgrest, queued, monkeypatch
+):
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE_MB", 1)
+    body = Body(4 * 1024 * 1024)
+    headers = {**body.headers, "content-length": str(4 * 1024 * 1024 + 200)}
+
+    response = await async_client.post(
+        "/api/documents/upload", content=body, headers=headers
+    )
+
+    assert response.status_code == 413
+    assert body.pulled == 0
+    queued.assert_not_called()
+
+
+async def test_streamed_oversized_upload_is_refused_at_the_limit(
+    async_client, postgrest, queued, monkeypatch, tmp_path
+):
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE_MB", 1)
+    body = Body(8 * 1024 * 1024)  # No Content-Length: sent chunked
+
+    response = await async_client.post(
+        "/api/documents/upload", content=body, headers=body.headers
+    )
+
+    assert response.status_code == 413
+    # About the 16 chunks that fit in the limit, not all 128
+    assert body.pulled < 2 * (1024 * 1024 // body.chunk)
+    assert postgrest.requests == 0
+    assert not any((tmp_path / "storage").rglob("*.txt*"))
+
+
+def test_upload_without_a_file_is_rejected(client, queued):
+    response = client.post("/api/documents/upload", data={"note": "no file"})
+
+    assert response.status_code == 422
+    queued.assert_not_called()
+
+
+def test_upload_rejects_unsupported_type(client, queued):
+    response = client.post(
+        "/api/documents/upload",
+        files={"file": ("run.exe", b"MZ", "application/octet-stream")},
+    )
+
+    assert response.status_code == 415
+
+
+def test_upload_removes_object_when_insert_fails(client, database, queued, tmp_path):
+    database.insert_document = AsyncMock(side_effect=DatabaseError("db down"))
+
+    response = client.post(
+        "/api/documents/upload", files={"file": ("a.txt", b"hello", "text/plain")}
+    )
+
+    assert response.status_code == 502
+    assert not any((tmp_path / "storage").rglob("a.txt"))
+    queued.assert_not_called()
+
+
+def test_upload_reports_insert_failure_when_cleanup_fails(
+    client, database, local_storage, queued
+):
+    database.insert_document = AsyncMock(side_effect=DatabaseError("db down"))
+    local_storage.delete = AsyncMock(side_effect=StorageError("storage down"))
+
+    response = client.post(
+        "/api/documents/upload", files={"file": ("a.txt", b"hello", "text/plain")}
+    )
+
+    assert response.status_code == 502
+    assert response.json()["detail"] == "Could not record the uploaded document."
+    local_storage.delete.assert_awaited_once()
+
+
+@pytest.fixture
+def kb_hooks():
+    with (
+        patch("app.api.routes.documents.get_redis") as redis,
+        patch("app.api.routes.documents.remove_from_vector_index") as remove,
+    ):
+        yield redis.return_value, remove
+
+
+def test_delete_removes_rows_object_and_vectors(client, postgrest, kb_hooks, tmp_path):
+    redis, remove = kb_hooks
+    stored = tmp_path / "storage" / "test-user-uuid" / "doc-1" / "a.txt"
+    stored.parent.mkdir(parents=True)
+    stored.write_text("hello")
+    postgrest.tables = {
+        "documents": [
+            {
+                "id": "doc-1",
+                "user_id": "test-user-uuid",
+                "storage_path": "test-user-uuid/doc-1/a.txt",
+            },
+            {"id": "doc-2", "user_id": "test-user-uuid", "storage_path": "b.txt"},
+        ],
+        "document_chunks": [
+            {"document_id": "doc-1", "chunk_index": 0},
+            {"document_id": "doc-1", "chunk_index": 1},
+            {"document_id": "doc-2", "chunk_index": 0},
+        ],
+    }
+
+    response = client.delete("/api/documents/doc-1")
+
+    assert response.status_code == 200
+    assert response.json()["id"] == "doc-1"
+    assert not stored.exists()
+    assert [d["id"] for d in postgrest.tables["documents"]] == ["doc-2"]
+    assert postgrest.tables["document_chunks"] == [
+        {"document_id": "doc-2", "chunk_index": 0}
+    ]
+    remove.assert_called_once_with("test-user-uuid", "doc-1")
+    redis.incr.assert_called_once_with("docmind:kb-version:test-user-uuid")
+
+
+def test_delete_other_users_document_returns_404(client, postgrest, kb_hooks):
+    _, remove = kb_hooks
+    postgrest.tables["documents"] = [{"id": "doc-9", "user_id": "someone-else"}]
+
+    response = client.delete("/api/documents/doc-9")
+
+    assert response.status_code == 404
+    assert len(postgrest.tables["documents"]) == 1
+    remove.assert_not_called()
+
+
+@pytest.mark.parametrize("failing", ["get_document", "delete_documents"])
+def test_delete_reports_database_failure(
+    client, database, postgrest, kb_hooks, failing
+):
+    _, remove = kb_hooks
+    postgrest.tables["documents"] = [
+        {"id": "doc-1", "user_id": "test-user-uuid", "storage_path": "a.txt"}
+    ]
+    setattr(database, failing, AsyncMock(side_effect=DatabaseError("db down")))
+
+    response = client.delete("/api/documents/doc-1")
+
+    assert response.status_code == 502
+    assert response.json()["detail"] == "Could not delete the document."
+    remove.assert_not_called()
@@ -0,0 +1,130 @@
+"""Integration tests for the metrics endpoint."""
+
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.agent.streaming import GenerationStats, StreamMetrics, get_stream_metrics
+from app.core.metrics import InMemoryCounters
+from app.main import app
+from app.schemas.metrics import IndexVersionMetrics, IngestQueueMetrics
+from app.services.answer_cache import get_answer_cache
+from app.services.dedup import DedupService, InMemoryContentRegistry, get_dedup_service
+from app.services.embedding import (
+    EmbeddingService,
+    FakeEmbeddingProvider,
+    get_embedding_service,
+)
+from app.services.embedding_cache import EmbeddingCache
+from app.services.index_versions import get_index_versions
+from app.workers.scheduling import get_ingest_scheduler
+
+
+@pytest.fixture
+def embedding_cache() -> EmbeddingCache:
+    return EmbeddingCache("fake-embedding", 8, max_bytes=1 << 20, ttl_seconds=60)
+
+
+@pytest.fixture(autouse=True)
+def _services(mock_supabase, embedding_cache):
+    app.dependency_overrides[get_dedup_service] = lambda: DedupService(
+        InMemoryContentRegistry(), mock_supabase, InMemoryCounters()
+    )
+    app.dependency_overrides[get_embedding_service] = lambda: EmbeddingService(
+        FakeEmbeddingProvider(dimension=8), cache=embedding_cache
+    )
+    app.dependency_overrides[get_stream_metrics] = lambda: StreamMetrics(
+        InMemoryCounters()
+    )
+    app.dependency_overrides[get_answer_cache] = lambda: None
+    app.dependency_overrides[get_ingest_scheduler] = lambda: MagicMock(
+        stats=MagicMock(return_value=[])
+    )
+    app.dependency_overrides[get_index_versions] = lambda: MagicMock(
+        stats=MagicMock(return_value=IndexVersionMetrics(active="v1"))
+    )
+
+
+def test_metrics_reports_dedup_savings(client, mock_supabase):
+    counters = InMemoryCounters()
+    counters.incr("hits", 3)
+    counters.incr("misses", 1)
+    counters.incr("embedding_calls_saved", 120)
+    app.dependency_overrides[get_dedup_service] = lambda: DedupService(
+        InMemoryContentRegistry(), mock_supabase, counters
+    )
+
+    response = client.get("/api/metrics")
+
+    assert response.status_code == 200
+    assert response.json()["dedup"] == {
+        "hits": 3,
+        "misses": 1,
+        "hit_rate": 0.75,
+        "embedding_calls_saved": 120,
+    }
+
+
+async def test_metrics_reports_embedding_cache(client, embedding_cache):
+    await embedding_cache.get_many(["a"])
+    vector = FakeEmbeddingProvider(dimension=8).vector("a")
+    await embedding_cache.put_many(["a"], vector[None])
+    await embedding_cache.get_many(["a"])
+
+    body = client.get("/api/metrics").json()["embedding_cache"]
+
+    assert (body["l1_hits"], body["misses"], body["hit_rate"]) == (1, 1, 0.5)
+    assert body["l1_entries"] == 1
+
+
+def test_metrics_reports_chat_streaming(client):
+    metrics = StreamMetrics(InMemoryCounters())
+    metrics.record(
+        GenerationStats(
+            started=0.0,
+            first_token_at=0.3,
+            finished_at=2.3,
+            tokens=80,
+            outcome="completed",
+        )
+    )
+    app.dependency_overrides[get_stream_metrics] = lambda: metrics
+
+    body = client.get("/api/metrics").json()["chat"]
+
+    assert body["requests"] == body["completed"] == 1
+    assert body["mean_ttft_ms"] == 300
+    assert body["tokens_per_second"] == 40
+
+
+def test_metrics_reports_ingest_queues(client):
+    queue = IngestQueueMetrics(
+        queue="documents.small",
+        depth=4,
+        started=10,
+        deferred=2,
+        finished=9,
+        p50_wait_ms=120.0,
+        p95_wait_ms=900.0,
+        p95_time_to_done_ms=4000.0,
+    )
+    app.dependency_overrides[get_ingest_scheduler] = lambda: MagicMock(
+        stats=MagicMock(return_value=[queue])
+    )
+
+    body = client.get("/api/metrics").json()["ingest"]
+
+    assert body == [queue.model_dump()]
+
+
+def test_metrics_reports_reindex_progress(client):
+    index = IndexVersionMetrics(active="v1", target="v2", migrated=40, remaining=8)
+    app.dependency_overrides[get_index_versions] = lambda: MagicMock(
+        stats=MagicMock(return_value=index)
+    )
+
+    body = client.get("/api/metrics").json()["index"]
+
+    assert body == {"active": "v1", "target": "v2", "migrated": 40, "remaining": 8}
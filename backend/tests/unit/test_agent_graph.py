@@ -0,0 +1,173 @@
+"""Unit tests for the agent graph's sequential and speculative wiring."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from app.agent.graph import build_agent_graph, node_web_search
+from app.services.retrieval import RetrievalResult
+from app.services.sandbox import SandboxBusyError, SandboxResult
+
+WEB_RESULTS = [{"url": "https://example.com", "content": "web"}]
+BRANCH_SECONDS = 0.2
+
+
+async def _slow_web_search(state, writer=None):
+    await asyncio.sleep(BRANCH_SECONDS)
+    return {"web_search_results": WEB_RESULTS}
+
+
+def _search(confidence: float, seconds: float = BRANCH_SECONDS):
+    async def search(user_id, query):
+        await asyncio.sleep(seconds)
+        return RetrievalResult([], confidence)
+
+    return search
+
+
+@pytest.fixture
+def retrieval():
+    model = GenericFakeChatModel(messages=iter([AIMessage("answer")]))
+    with (
+        patch("app.agent.graph.get_chat_model", return_value=model),
+        patch("app.agent.graph.get_retrieval_service") as service,
+        patch("app.agent.graph.node_web_search", _slow_web_search),
+    ):
+        yield service.return_value
+
+
+def _routed(intent: str, confidence: float):
+    decision = MagicMock(intent=intent, confidence=confidence)
+    router = MagicMock(**{"route.return_value": decision})
+    return patch("app.agent.graph.get_intent_router", return_value=router)
+
+
+@pytest.fixture
+def unsure_route():
+    """Routes to retrieval, but not confidently enough to skip the web."""
+    with _routed("retrieve", 0.7):
+        yield
+
+
+@pytest.mark.parametrize(("confidence", "web_results"), [(0.2, WEB_RESULTS), (0.9, [])])
+async def test_speculative_branches_run_concurrently(
+    retrieval, unsure_route, confidence, web_results
+):
+    retrieval.search = _search(confidence)
+    graph = build_agent_graph(speculative=True, branch_timeout=5)
+
+    started = time.perf_counter()
+    state = await graph.ainvoke({"user_id": "u", "query": "q"})
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 1.75 * BRANCH_SECONDS  # max(branch), not the sum
+    assert state["answer"] == "answer"
+    assert state["web_search_results"] == web_results  # Dropped when KB is confident
+
+
+async def test_speculative_branch_timeout_contributes_empty_results(
+    retrieval, unsure_route
+):
+    retrieval.search = _search(0.9, seconds=5)
+    graph = build_agent_graph(speculative=True, branch_timeout=0.05)
+
+    state = await graph.ainvoke({"user_id": "u", "query": "q"})
+
+    assert state["retrieved_chunks"] == []
+    assert state["retrieval_confidence"] == 0.0
+    assert state["web_search_results"] == []  # Web search timed out as well
+    assert state["answer"] == "answer"
+
+
+@pytest.mark.parametrize(("confidence", "searched"), [(0.9, False), (0.2, True)])
+async def test_confident_route_does_not_fan_out(retrieval, confidence, searched):
+    retrieval.search = _search(confidence)
+    graph = build_agent_graph(speculative=True, branch_timeout=5)
+
+    started = time.perf_counter()
+    state = await graph.ainvoke({"user_id": "u", "query": "q"})  # Rules: retrieve
+    elapsed = time.perf_counter() - started
+
+    assert state["route_confidence"] == 1.0
+    assert ("web_search_results" in state) is searched  # Only as a fallback
+    # The fallback searches after retrieval, as in the sequential graph.
+    assert (elapsed > 1.75 * BRANCH_SECONDS) is searched
+
+
+async def test_join_keeps_web_results_of_a_web_search_route(retrieval):
+    retrieval.search = _search(0.9)
+    graph = build_agent_graph(speculative=True, branch_timeout=5)
+
+    with _routed("web_search", 0.7):
+        state = await graph.ainvoke({"user_id": "u", "query": "latest news"})
+
+    assert state["retrieval_confidence"] == 0.9
+    assert state["web_search_results"] == WEB_RESULTS
+
+
+@pytest.mark.parametrize(("confidence", "searched"), [(0.9, False), (0.2, True)])
+async def test_sequential_graph_searches_web_only_after_low_confidence(
+    retrieval, confidence, searched
+):
+    retrieval.search = AsyncMock(return_value=RetrievalResult([], confidence))
+
+    state = await build_agent_graph().ainvoke({"user_id": "u", "query": "q"})
+
+    assert ("web_search_results" in state) is searched
+    assert state["answer"] == "answer"
+
+
+@pytest.fixture
+def code_route():
+    model = GenericFakeChatModel(
+        messages=iter([AIMessage("```python\nprint(6 * 7)\n```"), AIMessage("42")])
+    )
+    decision = MagicMock(intent="code_exec", confidence=1.0)
+    with (
+        patch("app.agent.graph.get_chat_model", return_value=model),
+        patch("app.agent.graph.get_intent_router") as router,
+        patch("app.agent.graph.get_sandbox_pool") as pool,
+    ):
+        router.return_value.route.return_value = decision
+        pool.return_value.run = AsyncMock(return_value=SandboxResult("ok", "42\n"))
+        yield pool.return_value
+
+
+@pytest.mark.parametrize("speculative", [False, True])
+async def test_code_exec_runs_generated_code_before_generation(code_route, speculative):
+    graph = build_agent_graph(speculative=speculative)
+
+    state = await graph.ainvoke({"user_id": "u", "query": "what is 6 times 7"})
+
+    code_route.run.assert_awaited_once_with("print(6 * 7)\n")
+    assert "Output:\n42" in state["code_exec_result"]
+    assert "retrieved_chunks" not in state
+    assert state["answer"] == "42"
+
+
+async def test_code_exec_without_a_free_sandbox_still_answers(code_route):
+    code_route.run.side_effect = SandboxBusyError("busy")
+
+    state = await build_agent_graph().ainvoke(
+        {"user_id": "u", "query": "run\n```python\nprint(1)\n```"}
+    )
+
+    code_route.run.assert_awaited_once_with("print(1)\n")
+    assert state["code_exec_result"] is None
+    assert state["answer"] == "```python\nprint(6 * 7)\n```"  # No code was asked for
+
+
+async def test_web_search_node_returns_the_service_results():
+    with patch("app.agent.graph.get_web_search") as service:
+        service.return_value.search = AsyncMock(return_value=WEB_RESULTS)
+
+        update = await node_web_search({"user_id": "u", "query": "latest news"})
+
+    service.return_value.search.assert_awaited_once_with("latest news")
+    assert update == {"web_search_results": WEB_RESULTS}
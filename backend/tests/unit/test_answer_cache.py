@@ -0,0 +1,197 @@
+"""Unit tests for the semantic answer cache."""
+
+from __future__ import annotations
+
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.agent.graph import agent_graph
+from app.agent.streaming import GenerationStats, cached_stream
+from app.services.answer_cache import AnswerCache, CachedAnswer
+from app.services.embedding import EmbeddingService, FakeEmbeddingProvider
+from app.services.index_versions import ACTIVE_INDEX_KEY
+from app.services.retrieval import KB_VERSION_KEY_PREFIX, RetrievalResult
+
+DIM = 8
+
+
+class FakeAsyncRedis:
+    """The slice of redis.asyncio.Redis used by AnswerCache."""
+
+    def __init__(self) -> None:
+        self.strings: dict[str, bytes] = {}
+        self.lists: dict[str, list[bytes]] = {}
+        self.ttls: dict[str, int] = {}
+        self.fail = False
+
+    async def get(self, key):
+        if self.fail:
+            raise RedisConnectionError("down")
+        return self.strings.get(key)
+
+    async def mget(self, *keys):
+        if self.fail:
+            raise RedisConnectionError("down")
+        return [self.strings.get(key) for key in keys]
+
+    async def lindex(self, key, index):
+        items = self.lists.get(key, [])
+        return items[index] if index < len(items) else None
+
+    async def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    def pipeline(self, transaction: bool = True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, redis: FakeAsyncRedis) -> None:
+        self._redis = redis
+        self._ops = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def append(self, key, value):
+        self._ops.append(
+            lambda r: r.strings.update({key: r.strings.get(key, b"") + value})
+        )
+
+    def rpush(self, key, value):
+        self._ops.append(lambda r: r.lists.setdefault(key, []).append(value.encode()))
+
+    def expire(self, key, seconds):
+        self._ops.append(lambda r: r.ttls.update({key: seconds}))
+
+    async def execute(self):
+        for op in self._ops:
+            op(self._redis)
+
+
+@pytest.fixture
+def redis() -> FakeAsyncRedis:
+    return FakeAsyncRedis()
+
+
+@pytest.fixture
+def cache(redis) -> AnswerCache:
+    return AnswerCache("llm/emb", DIM, 0.95, 4, 60, redis_factory=lambda: redis)
+
+
+def _vector(seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+
+
+ANSWER = CachedAnswer("Use a heap.", [{"document_id": "doc-1"}], 900.0)
+
+
+async def test_similar_query_hits_and_dissimilar_misses(cache):
+    query = _vector(0)
+    assert await cache.lookup("u", query) == (None, "v1:0")
+    await cache.store("u", "v1:0", query, ANSWER)
+
+    near = query + 0.01 * _vector(1)
+    assert await cache.lookup("u", near) == (ANSWER, "v1:0")
+    assert (await cache.lookup("u", _vector(2)))[0] is None
+    assert (await cache.lookup("other-user", query))[0] is None
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses) == (1, 3)
+
+
+async def test_new_kb_version_invalidates(cache, redis):
+    query = _vector(0)
+    await cache.store("u", "v1:0", query, ANSWER)
+
+    redis.strings[KB_VERSION_KEY_PREFIX + "u"] = b"1"
+
+    assert await cache.lookup("u", query) == (None, "v1:1")
+
+
+async def test_index_cut_over_invalidates(cache, redis):
+    query = _vector(0)
+    await cache.store("u", "v1:0", query, ANSWER)
+
+    redis.strings[ACTIVE_INDEX_KEY] = b"v2"
+
+    assert await cache.lookup("u", query) == (None, "v2:0")
+
+
+async def test_bucket_stops_growing_at_max_entries(cache, redis):
+    for seed in range(6):
+        await cache.store("u", "v1:0", _vector(seed), ANSWER)
+
+    (entries,) = [v for k, v in redis.lists.items() if k.endswith(":entries")]
+    assert len(entries) == 4
+    assert set(redis.ttls.values()) == {60}
+
+
+async def test_redis_failure_is_a_miss(cache, redis):
+    redis.fail = True
+
+    assert await cache.lookup("u", _vector(0)) == (None, None)
+    assert cache.stats().misses == 1
+
+
+async def test_cached_stream_replays_hit_without_running_the_graph(cache):
+    embeddings = EmbeddingService(FakeEmbeddingProvider(dimension=DIM))
+    state = {"conversation_id": "c", "user_id": "u", "query": "what is a heap?"}
+    model = GenericFakeChatModel(messages=iter([AIMessage("A tree [1].")]))
+
+    with (
+        patch("app.agent.graph.get_chat_model", return_value=model),
+        patch("app.agent.graph.get_retrieval_service") as service,
+    ):
+        service.return_value.search = AsyncMock(return_value=RetrievalResult([], 0.9))
+        first = [
+            e
+            async for e in cached_stream(
+                agent_graph, state, GenerationStats(), cache, embeddings
+            )
+        ]
+        stats = GenerationStats()
+        second = [
+            e async for e in cached_stream(agent_graph, state, stats, cache, embeddings)
+        ]
+
+    assert service.return_value.search.await_count == 1
+    assert first[-1][1].get("cached") is None
+    assert [k for k, _ in second] == ["status", "sources", "token", "done"]
+    assert second[2][1]["text"] == "A tree [1]."
+    assert second[-1][1]["cached"] is True
+    assert stats.outcome == "cached"
+    assert cache.stats().latency_saved_ms >= 0
+
+
+async def test_cached_stream_stores_only_knowledge_base_answers(cache, redis):
+    embeddings = EmbeddingService(FakeEmbeddingProvider(dimension=DIM))
+    state = {"conversation_id": "c", "user_id": "u", "query": "what is a heap?"}
+    web = [{"url": "https://a.example/", "title": "A", "content": "Heaps."}]
+    model = GenericFakeChatModel(messages=iter([AIMessage("From the web [W1].")]))
+
+    with (
+        patch("app.agent.graph.get_chat_model", return_value=model),
+        patch("app.agent.graph.get_retrieval_service") as service,
+        patch("app.agent.graph.get_web_search") as web_search,
+    ):
+        # Low retrieval confidence: the answer falls back to web results.
+        service.return_value.search = AsyncMock(return_value=RetrievalResult([], 0.1))
+        web_search.return_value.search = AsyncMock(return_value=web)
+        stats = GenerationStats()
+        events = [
+            e async for e in cached_stream(agent_graph, state, stats, cache, embeddings)
+        ]
+
+    assert events[-1][0] == "done"
+    assert (stats.route, stats.web_results) == ("retrieve", 1)
+    assert not stats.from_knowledge_base
+    assert redis.lists == {}
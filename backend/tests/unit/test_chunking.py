@@ -0,0 +1,212 @@
+"""Unit tests for streaming extraction and offset-based chunking."""
+
+from __future__ import annotations
+
+import random
+
+import pymupdf
+import pytest
+
+from app.services import extraction
+from app.services.chunking import (
+    SNAP_FRACTION,
+    RegexTokenizer,
+    excerpt,
+    iter_chunks,
+    split_text,
+)
+from app.services.extraction import PageText, iter_pages, page_count
+
+VOCAB = ["graph", "node", "edge", "dp", "naïve", "O(n)", "42", "weight", "über"]
+
+
+def _words(n: int, start: int = 0) -> str:
+    return " ".join(f"w{i}" for i in range(start, start + n))
+
+
+def test_chunks_overlap_and_cover_every_token():
+    chunks = list(iter_chunks([PageText(1, _words(24))], chunk_size=10, overlap=3))
+
+    assert [c.token_count for c in chunks] == [10, 10, 10]
+    assert chunks[0].text == _words(10)
+    assert chunks[1].text.startswith("w7 w8 w9 w10")
+    assert chunks[-1].text.endswith("w23")
+    assert [c.index for c in chunks] == [0, 1, 2]
+
+
+def test_no_trailing_chunk_of_only_overlap():
+    chunks = list(iter_chunks([PageText(1, _words(17))], chunk_size=10, overlap=3))
+
+    assert len(chunks) == 2
+
+
+def test_chunk_keeps_page_of_its_first_token():
+    pages = [PageText(1, _words(8)), PageText(2, _words(8, 8)), PageText(3, "end")]
+
+    chunks = list(iter_chunks(pages, chunk_size=6, overlap=2))
+
+    assert [c.page_number for c in chunks] == [1, 1, 2, 2]
+
+
+def test_chunking_is_lazy():
+    def pages():
+        yield PageText(1, _words(10))
+        raise AssertionError("second page read too early")
+
+    first = next(iter_chunks(pages(), chunk_size=5, overlap=1))
+
+    assert first.text == _words(5)
+
+
+def test_overlap_must_be_smaller_than_chunk_size():
+    with pytest.raises(ValueError):
+        list(iter_chunks([], chunk_size=4, overlap=4))
+
+
+def test_text_files_are_read_in_line_aligned_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(extraction, "TEXT_BLOCK_CHARS", 20)
+    path = tmp_path / "notes.md"
+    path.write_text("# Title\nfirst line\nsecond line\nthird\n")
+
+    blocks = list(iter_pages(path, "text/markdown"))
+
+    assert len(blocks) == 2
+    assert all(b.page_number == 1 and b.text.endswith("\n") for b in blocks)
+    assert "".join(b.text for b in blocks) == path.read_text()
+
+
+def test_pdf_pages_are_numbered_from_one(tmp_path):
+    path = tmp_path / "slides.pdf"
+    with pymupdf.open() as pdf:
+        for text in ("Intro", "Graphs"):
+            pdf.new_page().insert_text((72, 72), text)
+        pdf.save(path)
+
+    pages = list(iter_pages(path, "application/pdf"))
+
+    assert [(p.page_number, p.text.strip()) for p in pages] == [
+        (1, "Intro"),
+        (2, "Graphs"),
+    ]
+
+
+def test_pdf_page_range_reads_only_those_pages(tmp_path):
+    path = tmp_path / "book.pdf"
+    with pymupdf.open() as pdf:
+        for number in range(1, 6):
+            pdf.new_page().insert_text((72, 72), f"Page {number}")
+        pdf.save(path)
+
+    pages = list(iter_pages(path, "application/pdf", range(2, 4)))
+
+    assert [(p.page_number, p.text.strip()) for p in pages] == [
+        (2, "Page 2"),
+        (3, "Page 3"),
+    ]
+    assert page_count(path, "application/pdf") == 5
+    assert page_count(tmp_path / "notes.txt", "text/plain") == 1
+
+
+def _random_pages(rng: random.Random) -> list[PageText]:
+    pages = []
+    for number in range(1, rng.randint(1, 4) + 1):
+        parts = []
+        for _ in range(rng.randint(0, 120)):
+            parts.append(rng.choice(VOCAB))
+            parts.append(rng.choice([" ", " ", " ", ", ", ". ", "!\n", "\n\n"]))
+        pages.append(PageText(number, "".join(parts)))
+    return pages
+
+
+def _token_index(starts, offset: int) -> int:
+    return int(starts.searchsorted(offset))
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_chunks_cover_every_token_with_exact_overlap(seed):
+    rng = random.Random(seed)
+    pages = _random_pages(rng)
+    chunk_size = rng.randint(2, 40)
+    overlap = rng.randint(0, chunk_size - 1)
+    text = "".join(p.text for p in pages)
+    page_offsets = {}
+    offset = 0
+    for page in pages:
+        page_offsets[page.page_number] = offset
+        offset += len(page.text)
+    # Pages are tokenized separately; re-tokenize them the same way here.
+    starts = RegexTokenizer().token_spans(text)[0]
+    tokens = sum(len(RegexTokenizer().token_spans(p.text)[0]) for p in pages)
+    assert tokens == len(starts)
+
+    chunks = list(iter_chunks(pages, chunk_size, overlap))
+
+    if not tokens:
+        assert chunks == []
+        return
+    spans = []
+    for chunk in chunks:
+        start = page_offsets[chunk.page_number] + chunk.char_start
+        end = page_offsets[chunk.page_number] + chunk.char_end
+        assert text[start:end] == chunk.text
+        first = _token_index(starts, start)
+        spans.append((first, first + chunk.token_count))
+        assert 0 < chunk.token_count <= chunk_size
+    assert [c.index for c in chunks] == list(range(len(chunks)))
+    assert spans[0][0] == 0 and spans[-1][1] == tokens
+    slack = min(int(chunk_size * SNAP_FRACTION), chunk_size - overlap - 1)
+    for (prev_start, prev_end), (next_start, _) in zip(spans, spans[1:]):
+        assert next_start == prev_end - overlap
+        assert prev_end - prev_start >= chunk_size - slack
+
+
+def test_window_end_snaps_to_sentence_break():
+    text = "one two three four five six seven. eight nine ten eleven twelve"
+
+    first = split_text(text, chunk_size=9, overlap=1)[0]
+
+    assert first.text == "one two three four five six seven."
+
+
+def test_paragraph_break_beats_a_later_sentence_break():
+    text = "a b c d e f\n\ng. h i j k l m n o p"
+
+    first = split_text(text, chunk_size=8, overlap=0)[0]
+
+    assert first.text == "a b c d e f"
+
+
+def test_excerpt_prefers_sentence_end():
+    text = "First sentence here. Second one is longer and keeps going on."
+
+    assert excerpt(text, max_chars=30) == "First sentence here. …"
+    assert excerpt("short", max_chars=30) == "short"
+
+
+def test_tiktoken_spans_tile_the_text(monkeypatch):
+    tiktoken = pytest.importorskip("tiktoken")
+    from app.services import chunking
+
+    # Byte-level encoding with a few merges, built offline (no download).
+    ranks = {bytes([b]): b for b in range(256)}
+    for merge in (b"th", b"the", "ü".encode()):
+        ranks.setdefault(merge, len(ranks))
+    encoding = tiktoken.Encoding(
+        name="test_bytes",
+        pat_str=r"""\s?\S+|\s+""",
+        mergeable_ranks=ranks,
+        special_tokens={},
+    )
+    monkeypatch.setattr(tiktoken, "get_encoding", lambda name: encoding)
+    chunking._token_byte_lengths.cache_clear()
+    tokenizer = chunking.TiktokenTokenizer("test_bytes")
+    text = "the über-graph — 最短路径 🚀 done.\n\nthe end."
+
+    starts, ends = tokenizer.token_spans(text)
+
+    assert len(starts) > len(text.split())
+    assert starts[0] == 0 and ends[-1] == len(text)
+    assert (starts[1:] >= ends[:-1] - 1).all() and (starts < ends).all()
+    pieces = split_text(text, 12, 3, tokenizer)
+    assert "".join(p.text for p in pieces).count("路") >= 1
+    assert all(text[p.char_start : p.char_end] == p.text for p in pieces)
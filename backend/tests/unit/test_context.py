@@ -0,0 +1,116 @@
+"""Unit tests for token-budgeted context assembly."""
+
+from __future__ import annotations
+
+import pytest
+
+from app.agent.context import build_context, join_overlapping
+from app.services.chunking import RegexTokenizer
+
+WORDS = [f"w{i}" for i in range(300)]
+
+
+def _chunk(index: int, content: str, document_id: str = "doc-1") -> dict:
+    return {
+        "document_id": document_id,
+        "filename": f"{document_id}.pdf",
+        "chunk_index": index,
+        "page_number": 1,
+        "content": content,
+    }
+
+
+def _window(start: int, stop: int) -> str:
+    return " ".join(WORDS[start:stop])
+
+
+@pytest.fixture
+def tokenizer() -> RegexTokenizer:
+    return RegexTokenizer()
+
+
+def test_join_overlapping_writes_shared_text_once():
+    assert join_overlapping(_window(0, 60), _window(50, 100)) == _window(0, 100)
+    assert join_overlapping("alpha beta", "gamma") == "alpha beta\ngamma"
+
+
+def test_adjacent_chunks_merge_and_cite_best_ranked(tokenizer):
+    chunks = [_chunk(5, _window(50, 100)), _chunk(4, _window(0, 60))]
+
+    context = build_context(chunks, 1000, tokenizer)
+
+    (passage,) = context.passages
+    assert passage["content"] == _window(0, 100)
+    assert passage["chunk_indexes"] == [4, 5]
+    assert context.sources[0]["chunk_index"] == 5  # Ranked first
+    assert context.sources[0]["excerpt"].startswith("w50")
+    assert (context.tokens_in, context.tokens, context.tokens_saved) == (110, 100, 10)
+
+
+def test_near_duplicates_are_dropped(tokenizer):
+    chunks = [
+        _chunk(0, _window(0, 50)),
+        _chunk(7, _window(0, 50), document_id="doc-2"),
+        _chunk(9, _window(200, 220)),
+    ]
+
+    context = build_context(chunks, 1000, tokenizer)
+
+    assert [source["chunk_index"] for source in context.sources] == [0, 9]
+    assert context.tokens_saved == 50
+
+
+def test_budget_keeps_best_passages_and_falls_back_to_single_chunk(tokenizer):
+    chunks = [
+        _chunk(0, _window(0, 40), document_id="doc-a"),
+        _chunk(1, _window(100, 140), document_id="doc-b"),
+        _chunk(2, _window(140, 180), document_id="doc-b"),
+        _chunk(0, _window(200, 240), document_id="doc-c"),
+    ]
+
+    context = build_context(chunks, 90, tokenizer)
+
+    # doc-b's merged passage (80 tokens) no longer fits after doc-a, but its
+    # best chunk does; doc-c does not fit at all.
+    assert [p["document_id"] for p in context.passages] == ["doc-a", "doc-b"]
+    assert context.passages[1]["chunk_indexes"] == [1]
+    assert context.tokens == 80
+    assert context.tokens <= 90
+
+
+def test_sources_align_with_passage_numbers(tokenizer):
+    chunks = [
+        _chunk(3, _window(0, 20), document_id="doc-b"),
+        _chunk(0, _window(50, 70), document_id="doc-a"),
+    ]
+
+    context = build_context(chunks, 1000, tokenizer)
+
+    assert [p["document_id"] for p in context.passages] == ["doc-b", "doc-a"]
+    assert [s["document_id"] for s in context.sources] == ["doc-b", "doc-a"]
+    assert context.sources[0] == {
+        "document_id": "doc-b",
+        "filename": "doc-b.pdf",
+        "chunk_index": 3,
+        "excerpt": _window(0, 20),
+        "page_number": 1,
+        "char_start": None,
+        "char_end": None,
+    }
+
+
+def test_chunk_spans_locate_the_overlap_and_the_citation(tokenizer):
+    page = "alpha beta gamma delta epsilon zeta"
+    first = {**_chunk(0, page[:22]), "char_start": 0, "char_end": 22}
+    second = {**_chunk(1, page[17:]), "char_start": 17, "char_end": 35}
+
+    context = build_context([second, first], 1000, tokenizer)
+
+    # Too short an overlap for the text probe, but the spans locate it.
+    assert join_overlapping(first["content"], second["content"]) != page
+    assert context.passages[0]["content"] == page
+    assert context.sources[0]["excerpt"] == "delta epsilon zeta"
+    assert (context.sources[0]["char_start"], context.sources[0]["char_end"]) == (
+        17,
+        35,
+    )
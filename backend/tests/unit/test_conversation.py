@@ -0,0 +1,209 @@
+"""Unit tests for conversation history with incremental summarization."""
+
+from __future__ import annotations
+
+from unittest.mock import AsyncMock
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.agent.prompts import build_generation_messages
+from app.services.conversation import (
+    TURN_MAX_CHARS,
+    Conversation,
+    ConversationHistory,
+    InMemoryConversationStore,
+    RedisConversationStore,
+    Turn,
+    summarize_turns,
+)
+
+
+class FakeAsyncRedis:
+    """The slice of redis.asyncio.Redis used by RedisConversationStore."""
+
+    def __init__(self) -> None:
+        self.strings: dict[str, bytes] = {}
+        self.lists: dict[str, list[bytes]] = {}
+        self.ttls: dict[str, int] = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.strings:
+            return None
+        self.strings[key] = str(value).encode()
+        if ex:
+            self.ttls[key] = ex
+        return True
+
+    async def delete(self, key):
+        self.strings.pop(key, None)
+
+    def pipeline(self, transaction: bool = True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, redis: FakeAsyncRedis) -> None:
+        self._redis = redis
+        self._ops = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def get(self, key):
+        self._ops.append(lambda r: r.strings.get(key))
+
+    def set(self, key, value, ex=None):
+        self._ops.append(
+            lambda r: (
+                r.strings.update({key: value.encode()}),
+                r.ttls.update({key: ex}),
+            )
+        )
+
+    def lrange(self, key, start, stop):
+        def run(r):
+            items = r.lists.get(key, [])
+            end = len(items) if stop == -1 else stop + 1
+            return items[max(start + len(items), 0) if start < 0 else start : end]
+
+        self._ops.append(run)
+
+    def rpush(self, key, value):
+        def run(r):
+            r.lists.setdefault(key, []).append(value.encode())
+            return len(r.lists[key])
+
+        self._ops.append(run)
+
+    def ltrim(self, key, start, stop):
+        self._ops.append(lambda r: r.lists.update({key: r.lists[key][start:]}))
+
+    def expire(self, key, seconds):
+        self._ops.append(lambda r: r.ttls.update({key: seconds}))
+
+    async def execute(self):
+        return [op(self._redis) for op in self._ops]
+
+
+def _summarizer(*replies: str) -> GenericFakeChatModel:
+    return GenericFakeChatModel(messages=iter([AIMessage(r) for r in replies]))
+
+
+def _turn(n: int) -> Turn:
+    return Turn(f"question {n}", f"answer {n}")
+
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request):
+    if request.param == "memory":
+        return InMemoryConversationStore()
+    redis = FakeAsyncRedis()
+    return RedisConversationStore(3600, redis_factory=lambda: redis)
+
+
+async def test_window_overflow_is_folded_into_summary_in_batches(store):
+    model = _summarizer("Covered heaps.", "Covered heaps and tries.")
+    history = ConversationHistory(store, 2, 2, model_factory=lambda: model)
+
+    for n in range(3):
+        await history.record("u", "c", _turn(n))
+    assert await history.load("u", "c") == Conversation(
+        "", [_turn(0), _turn(1), _turn(2)]
+    )
+
+    await history.record("u", "c", _turn(3))  # Window of 2 overflows by 2
+    assert await history.load("u", "c") == Conversation(
+        "Covered heaps.", [_turn(2), _turn(3)]
+    )
+
+    for n in range(4, 6):
+        await history.record("u", "c", _turn(n))
+    conversation = await history.load("u", "c")
+    assert conversation.summary == "Covered heaps and tries."
+    assert conversation.turns == [_turn(4), _turn(5)]
+
+
+async def test_conversations_are_scoped_by_user(store):
+    history = ConversationHistory(store, 2, 2, model_factory=_summarizer)
+    await history.record("u", "c", _turn(0))
+
+    assert await history.load("other-user", "c") == Conversation()
+
+
+async def test_load_is_bounded_when_summaries_fail(store):
+    model = AsyncMock()
+    model.ainvoke.side_effect = RuntimeError("LLM down")
+    history = ConversationHistory(store, 2, 2, model_factory=lambda: model)
+
+    for n in range(10):
+        await history.record("u", "c", _turn(n))
+
+    conversation = await history.load("u", "c")
+    assert len(conversation.turns) == history.max_turns == 3
+    assert conversation.turns[-1] == _turn(9)
+
+
+async def test_long_answers_are_truncated(store):
+    history = ConversationHistory(store, 2, 2, model_factory=_summarizer)
+    await history.record("u", "c", Turn("q", "x" * (TURN_MAX_CHARS + 10)))
+
+    (turn,) = (await history.load("u", "c")).turns
+    assert len(turn.answer) == TURN_MAX_CHARS
+
+
+async def test_redis_failure_loads_empty_conversation():
+    store = AsyncMock()
+    store.load.side_effect = RedisConnectionError("down")
+    history = ConversationHistory(store, 2, 2, model_factory=_summarizer)
+
+    assert await history.load("u", "c") == Conversation()
+
+
+async def test_redis_keys_expire_and_fold_lock_is_released():
+    redis = FakeAsyncRedis()
+    store = RedisConversationStore(60, redis_factory=lambda: redis)
+    history = ConversationHistory(store, 1, 1, lambda: _summarizer("Summary."))
+
+    await history.record("u", "c", _turn(0))
+    await history.record("u", "c", _turn(1))
+
+    assert {ttl for key, ttl in redis.ttls.items() if ":lock" not in key} == {60}
+    assert redis.strings[next(k for k in redis.strings if k.endswith(":summary"))]
+    assert not any(key.endswith(":lock") for key in redis.strings)
+
+
+async def test_summarizer_sees_previous_summary_and_new_turns():
+    model = AsyncMock()
+    model.ainvoke.return_value = AIMessage(" New summary. ")
+
+    summary = await summarize_turns(model, "Old summary.", [_turn(0)])
+
+    prompt = model.ainvoke.await_args.args[0][1].content
+    assert "Old summary." in prompt
+    assert "Student: question 0\nAssistant: answer 0" in prompt
+    assert summary == "New summary."
+
+
+def test_generation_prompt_includes_summary_and_recent_turns():
+    conversation = Conversation("Discussed heaps.", [_turn(0)])
+
+    messages = build_generation_messages(
+        {
+            "query": "and tries?",
+            "messages": conversation.messages(),
+            "history_summary": conversation.summary,
+        }
+    )
+
+    assert "Earlier in this conversation:\nDiscussed heaps." in messages[0].content
+    assert messages[1:] == [
+        HumanMessage("question 0"),
+        AIMessage("answer 0"),
+        HumanMessage("and tries?"),
+    ]
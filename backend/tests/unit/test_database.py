@@ -0,0 +1,123 @@
+"""Unit tests for the async PostgREST data-access layer."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services.database import DatabaseError, SupabaseDatabase
+from benchmarks.postgrest_stub import PostgrestStub, serve
+
+
+def _chunks(document_id: str, count: int) -> list[dict]:
+    return [{"document_id": document_id, "chunk_index": i} for i in range(count)]
+
+
+async def test_bulk_chunk_insert_is_batched(postgrest, database):
+    database.bulk_rows = 2
+
+    assert await database.insert_chunks(_chunks("doc-1", 5)) == 5
+
+    assert postgrest.requests == 3
+    rows = postgrest.tables["document_chunks"]
+    assert [row["chunk_index"] for row in rows] == list(range(5))
+
+
+async def test_bulk_deletes_by_document_id(postgrest, database):
+    postgrest.tables = {
+        "documents": [
+            {"id": "a", "user_id": "u"},
+            {"id": "b", "user_id": "u"},
+            {"id": "c", "user_id": "other"},
+        ],
+        "document_chunks": _chunks("a", 2) + _chunks("b", 3) + _chunks("c", 1),
+    }
+
+    assert await database.delete_chunks(["a"]) == 2
+    assert await database.delete_documents("u", ["a", "b", "c"]) == 2
+    assert await database.delete_chunks([]) == 0
+    assert await database.delete_documents("u", []) == 0
+
+    # The documents' remaining chunks went with them, in one request.
+    assert postgrest.tables["documents"] == [{"id": "c", "user_id": "other"}]
+    assert postgrest.tables["document_chunks"] == _chunks("c", 1)
+
+
+async def test_document_reads_and_updates_are_scoped(postgrest, database):
+    await database.insert_document({"id": "a", "user_id": "u", "status": "PENDING"})
+    await database.update_document("a", {"status": "READY"})
+
+    assert await database.get_document("a", "u", "id,status") == {
+        "id": "a",
+        "status": "READY",
+    }
+    assert await database.get_document("a", "other") is None
+
+
+async def test_ready_documents_are_paged_by_id(postgrest, database):
+    postgrest.tables["documents"] = [
+        {"id": doc, "user_id": "u", "status": status}
+        for doc, status in (("c", "READY"), ("a", "READY"), ("b", "FAILED"))
+    ] + [{"id": "d", "user_id": "v", "status": "READY"}]
+
+    first = await database.ready_documents(limit=2)
+    second = await database.ready_documents(first[-1]["id"], limit=2)
+
+    assert [row["id"] for row in first] == ["a", "c"]
+    assert [row["id"] for row in second] == ["d"]
+    assert await database.ready_documents("d") == []
+
+
+async def test_retired_index_version_is_deleted_per_user(postgrest, database):
+    postgrest.tables["document_chunks"] = [
+        {"user_id": user, "index_version": version}
+        for user, version in (("u", "v1"), ("u", "v2"), ("other", "v1"))
+    ]
+
+    assert await database.delete_chunk_version("v1", "u") == 1
+
+    assert postgrest.tables["document_chunks"] == [
+        {"user_id": "u", "index_version": "v2"},
+        {"user_id": "other", "index_version": "v1"},
+    ]
+
+
+async def test_rpc_and_errors(postgrest, database):
+    postgrest.functions["clone"] = lambda params: params["n"] * 2
+
+    assert await database.rpc("clone", {"n": 21}) == 42
+    with pytest.raises(DatabaseError, match="404"):
+        await database.rpc("missing", {})
+
+
+async def test_transport_failure_is_a_database_error():
+    def refuse(request):
+        raise httpx.ConnectError("refused")
+
+    database = SupabaseDatabase(
+        "http://down", "key", transport=httpx.MockTransport(refuse)
+    )
+
+    with pytest.raises(DatabaseError, match="refused"):
+        await database.get_document("a", "u")
+
+
+async def test_pool_bounds_concurrency_and_reuses_connections(monkeypatch):
+    monkeypatch.setattr(settings, "SUPABASE_HTTP_MAX_CONNECTIONS", 4)
+    stub = PostgrestStub(latency_ms=50)
+    with serve(stub) as url:
+        database = SupabaseDatabase(url, "key")
+        try:
+            started = time.perf_counter()
+            await asyncio.gather(*(database.get_document("a", "u") for _ in range(16)))
+            elapsed = time.perf_counter() - started
+        finally:
+            await database.aclose()
+
+    assert stub.max_in_flight == 4
+    assert len(stub.connections) == 4  # Kept alive across the 4 waves
+    assert 0.2 <= elapsed < 0.8
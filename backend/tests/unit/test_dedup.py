@@ -0,0 +1,93 @@
+"""Unit tests for content-addressed ingestion dedup."""
+
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.core.metrics import InMemoryCounters
+from app.services.dedup import (
+    CLONE_CHUNKS_RPC,
+    DedupService,
+    InMemoryContentRegistry,
+    RedisContentRegistry,
+    index_signature,
+)
+
+HASH = "ab" * 32
+
+
+@pytest.fixture
+def service(mock_supabase: MagicMock) -> DedupService:
+    return DedupService(InMemoryContentRegistry(), mock_supabase, InMemoryCounters())
+
+
+def _cloned(mock_supabase: MagicMock, rows: int) -> None:
+    mock_supabase.rpc.return_value.execute.return_value.data = rows
+
+
+def test_first_upload_is_a_miss(service, mock_supabase):
+    assert service.link_duplicate(HASH, "doc-1", "user-a", "v1") is None
+    mock_supabase.rpc.assert_not_called()
+    assert service.stats().misses == 1
+
+
+def test_duplicate_from_another_user_is_linked(service, mock_supabase):
+    service.register(HASH, "doc-1", chunk_count=40)
+    _cloned(mock_supabase, 40)
+
+    assert service.link_duplicate(HASH, "doc-2", "user-b", "v1") == 40
+
+    mock_supabase.rpc.assert_called_once_with(
+        CLONE_CHUNKS_RPC,
+        {
+            "source_document_id": "doc-1",
+            "target_document_id": "doc-2",
+            "target_user_id": "user-b",
+            "source_index_version": "v1",
+        },
+    )
+    stats = service.stats()
+    assert (stats.hits, stats.embedding_calls_saved) == (1, 40)
+
+
+def test_stale_entry_is_forgotten(service, mock_supabase):
+    service.register(HASH, "deleted-doc", chunk_count=5)
+    _cloned(mock_supabase, 0)
+
+    assert service.link_duplicate(HASH, "doc-2", "user-b", "v1") is None
+
+    service.register(HASH, "doc-2", chunk_count=5)
+    _cloned(mock_supabase, 5)
+    assert service.link_duplicate(HASH, "doc-3", "user-c", "v1") == 5
+
+
+def test_retry_of_canonical_document_is_not_linked_to_itself(service, mock_supabase):
+    service.register(HASH, "doc-1", chunk_count=3)
+    assert service.link_duplicate(HASH, "doc-1", "user-a", "v1") is None
+    mock_supabase.rpc.assert_not_called()
+
+
+def test_stats_hit_rate(service, mock_supabase):
+    service.register(HASH, "doc-1", chunk_count=2)
+    _cloned(mock_supabase, 2)
+    for i in range(3):
+        service.link_duplicate(HASH, f"dup-{i}", "user-b", "v1")
+    service.link_duplicate("cd" * 32, "new", "user-b", "v1")
+
+    assert service.stats().hit_rate == pytest.approx(0.75)
+
+
+def test_redis_registry_scopes_keys_by_index_signature():
+    client = MagicMock()
+    client.get.return_value = b'{"document_id": "doc-1", "chunk_count": 7}'
+    registry = RedisContentRegistry(client, index_signature())
+
+    entry = registry.lookup(HASH)
+    registry.register(HASH, entry)
+
+    key = client.get.call_args.args[0]
+    assert index_signature() in key and key.endswith(HASH)
+    assert entry.chunk_count == 7
+    assert client.set.call_args.kwargs == {"nx": True}
@@ -0,0 +1,250 @@
+"""Unit tests for push-based document status events."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.api.routes.documents import _relay, document_events
+from app.core.config import settings
+from app.schemas.document import DocumentEvent
+from app.services.document_events import (
+    DOCUMENT_EVENTS_CHANNEL,
+    DocumentEventHub,
+    DocumentEvents,
+)
+
+
+class FakeRedis:
+    """The slice of redis.Redis used by DocumentEvents."""
+
+    def __init__(self) -> None:
+        self.published: list[tuple[str, str]] = []
+        self.hashes: dict[str, dict[str, int]] = {}
+        self.down = False
+
+    def publish(self, channel, message):
+        if self.down:
+            raise RedisConnectionError("down")
+        self.published.append((channel, message))
+
+    def hincrby(self, key, field, amount):
+        fields = self.hashes.setdefault(key, {})
+        fields[field] = fields.get(field, 0) + amount
+        return fields[field]
+
+    def expire(self, key, seconds):
+        return True
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+
+    def pipeline(self, transaction: bool = True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, redis: FakeRedis) -> None:
+        self._redis = redis
+        self._calls = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self._calls.append((name, args, kwargs))
+
+        return queue
+
+    def execute(self):
+        if self._redis.down:
+            raise RedisConnectionError("down")
+        return [getattr(self._redis, n)(*a, **k) for n, a, k in self._calls]
+
+
+class FakeBroker:
+    """An asyncio Redis client whose pub/sub delivers in process."""
+
+    def __init__(self) -> None:
+        self.subscriptions: list[FakePubSub] = []
+        self.opened = 0
+
+    def pubsub(self) -> FakePubSub:
+        return FakePubSub(self)
+
+    def publish(self, message) -> None:
+        for pubsub in self.subscriptions:
+            pubsub.inbox.put_nowait(message)
+
+
+class FakePubSub:
+    def __init__(self, broker: FakeBroker) -> None:
+        self.broker = broker
+        self.inbox: asyncio.Queue = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        assert channel == DOCUMENT_EVENTS_CHANNEL
+        self.broker.opened += 1
+        self.broker.subscriptions.append(self)
+
+    async def get_message(self, ignore_subscribe_messages, timeout):
+        message = await self.inbox.get()
+        if isinstance(message, Exception):
+            raise message
+        return {"type": "message", "data": message}
+
+    async def aclose(self):
+        self.broker.subscriptions.remove(self)
+
+
+def _event(user_id: str, document_id: str = "doc-1", **fields) -> DocumentEvent:
+    return DocumentEvent(
+        document_id=document_id, user_id=user_id, status="PROCESSING", **fields
+    )
+
+
+async def _settle() -> None:
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def test_status_and_progress_are_published():
+    client = FakeRedis()
+    events = DocumentEvents(client)
+
+    events.status("doc-1", "user-a", "FAILED", "no text")
+    events.add_progress("doc-2", "user-a", 50, 120)
+    events.add_progress("doc-2", "user-a", 20, 30)
+
+    channels = {channel for channel, _ in client.published}
+    assert channels == {DOCUMENT_EVENTS_CHANNEL}
+    first, _, last = (json.loads(message) for _, message in client.published)
+    assert first["status"] == "FAILED"
+    assert first["error_message"] == "no text"
+    assert (last["event"], last["pages"], last["chunks"]) == ("progress", 70, 150)
+
+    events.clear_progress("doc-2")
+    assert client.hashes == {}
+
+
+def test_publishing_never_fails_the_worker():
+    client = FakeRedis()
+    client.down = True
+    events = DocumentEvents(client)
+
+    events.status("doc-1", "user-a", "READY")
+    events.add_progress("doc-1", "user-a", 1, 1)
+
+    assert client.published == []
+
+
+async def test_one_subscription_serves_every_client():
+    broker = FakeBroker()
+    hub = DocumentEventHub(lambda: broker)
+
+    async with (
+        hub.subscribe("user-a") as first,
+        hub.subscribe("user-a") as second,
+        hub.subscribe("user-b") as other,
+    ):
+        await _settle()
+        assert broker.opened == 1
+        assert hub.clients == 3
+        broker.publish(_event("user-a", pages=3, chunks=40).model_dump_json())
+        await _settle()
+
+        for queue in (first, second):
+            assert queue.get_nowait() is None  # Subscription is live.
+            assert queue.get_nowait().chunks == 40
+        assert other.get_nowait() is None
+        assert other.empty()
+
+        # A client joining a live subscription is told to load statuses.
+        async with hub.subscribe("user-b") as late:
+            assert late.get_nowait() is None
+            assert broker.opened == 1
+
+    await _settle()
+    assert broker.subscriptions == []
+    assert hub.clients == 0
+
+
+async def test_lagging_client_is_told_to_resync():
+    hub = DocumentEventHub(FakeBroker, buffer=2)
+
+    async with hub.subscribe("user-a") as queue:
+        await _settle()
+        for pages in range(3):
+            hub.dispatch(_event("user-a", pages=pages, chunks=pages))
+
+        # The events it missed are replaced by one resync marker.
+        assert queue.get_nowait() is None
+        assert queue.get_nowait().pages == 2
+        assert queue.empty()
+
+
+async def test_lost_subscription_is_reopened_and_clients_resync():
+    broker = FakeBroker()
+    hub = DocumentEventHub(lambda: broker, resubscribe_seconds=0)
+
+    async with hub.subscribe("user-a") as queue:
+        await _settle()
+        assert queue.get_nowait() is None
+        broker.publish(b"not json")
+        broker.publish(RedisConnectionError("reset"))
+        await _settle()
+
+        assert broker.opened == 2
+        assert queue.get_nowait() is None
+        assert queue.empty()
+
+
+async def test_relay_sends_statuses_then_events(postgrest, database, monkeypatch):
+    monkeypatch.setattr(settings, "DOCUMENT_EVENTS_KEEPALIVE_SECONDS", 0.01)
+    postgrest.tables["documents"] = [
+        {"id": "doc-1", "user_id": "user-a", "status": "READY"},
+        {"id": "doc-2", "user_id": "user-a", "status": "FAILED", "error_message": "x"},
+        {"id": "doc-3", "user_id": "user-b", "status": "PENDING"},
+    ]
+    queue: asyncio.Queue = asyncio.Queue()
+    queue.put_nowait(None)
+    queue.put_nowait(_event("user-a", "doc-4", event="progress", pages=2, chunks=9))
+    relay = _relay(queue, database, "user-a")
+
+    messages = [await anext(relay) for _ in range(4)]
+    await relay.aclose()
+
+    assert messages[:3] == [
+        'event: status\ndata: {"document_id": "doc-1", "status": "READY"}\n\n',
+        "event: status\n"
+        'data: {"document_id": "doc-2", "status": "FAILED", "error_message": "x"}\n\n',
+        "event: progress\ndata: "
+        '{"document_id": "doc-4", "status": "PROCESSING", "pages": 2, "chunks": 9}\n\n',
+    ]
+    assert messages[3] == ": keepalive\n\n"
+
+
+async def test_event_stream_ends_when_the_client_disconnects(database):
+    broker = FakeBroker()
+    hub = DocumentEventHub(lambda: broker)
+    request = MagicMock()
+    request.is_disconnected = AsyncMock(side_effect=[False, True])
+
+    response = await document_events(
+        request, {"id": "user-a"}, database, hub  # type: ignore[arg-type]
+    )
+    assert response.media_type == "text/event-stream"
+    with pytest.raises(StopAsyncIteration):
+        await asyncio.wait_for(anext(response.body_iterator), 5)
+
+    await _settle()
+    assert hub.clients == 0
+    assert broker.subscriptions == []
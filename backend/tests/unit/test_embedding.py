@@ -0,0 +1,129 @@
+"""Unit tests for the batched embedding service."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.services.embedding import (
+    BatchLimits,
+    EmbeddingError,
+    EmbeddingService,
+    FakeEmbeddingProvider,
+    LangChainEmbeddingProvider,
+    RateLimitError,
+    build_provider,
+    pack_batches,
+)
+
+
+def test_pack_batches_respects_text_and_token_limits():
+    texts = ["a" * 40] * 7  # 11 estimated tokens each
+
+    assert pack_batches(texts, BatchLimits(max_texts=3, max_tokens=10_000)) == [
+        [0, 1, 2],
+        [3, 4, 5],
+        [6],
+    ]
+    assert [len(b) for b in pack_batches(texts, BatchLimits(100, 25))] == [2, 2, 2, 1]
+
+
+def test_pack_batches_keeps_oversized_text_in_its_own_batch():
+    assert pack_batches(["x" * 1000, "y"], BatchLimits(10, 50)) == [[0], [1]]
+
+
+async def test_embed_documents_preserves_input_order():
+    provider = FakeEmbeddingProvider(limits=BatchLimits(max_texts=4, max_tokens=1000))
+    service = EmbeddingService(provider, max_concurrency=3)
+    texts = [f"chunk {i}" for i in range(10)]
+
+    vectors = await service.embed_documents(texts)
+
+    assert vectors.shape == (10, provider.dimension)
+    assert vectors.dtype == np.float32
+    assert provider.calls == 3
+    for i, text in enumerate(texts):
+        np.testing.assert_allclose(vectors[i], provider.vector(text))
+
+
+async def test_embed_documents_empty_input():
+    service = EmbeddingService(FakeEmbeddingProvider())
+    assert (await service.embed_documents([])).shape[0] == 0
+
+
+async def test_rate_limits_shrink_concurrency_and_all_batches_succeed(monkeypatch):
+    monkeypatch.setattr("app.services.embedding._backoff_delay", lambda attempt: 0)
+    provider = FakeEmbeddingProvider(
+        latency_s=0.001, capacity=2, limits=BatchLimits(max_texts=1, max_tokens=100)
+    )
+    service = EmbeddingService(provider, max_concurrency=8, max_retries=20)
+
+    vectors = await service.embed_documents([f"t{i}" for i in range(40)])
+
+    assert vectors.shape[0] == 40
+    assert provider.calls == 40
+    assert provider.rate_limited > 0
+    assert service.rate_limited == provider.rate_limited
+
+
+async def test_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr("app.services.embedding._backoff_delay", lambda attempt: 0)
+    provider = FakeEmbeddingProvider(capacity=0)
+    service = EmbeddingService(provider, max_retries=2)
+
+    with pytest.raises(EmbeddingError, match="Rate limited after 3 attempts"):
+        await service.embed_documents(["x"])
+
+
+async def test_failures_do_not_grow_the_concurrency_limit(monkeypatch):
+    monkeypatch.setattr("app.services.embedding._backoff_delay", lambda attempt: 0)
+
+    class Flaky:
+        name, model, limits = "flaky", "m", BatchLimits(1, 100)
+        responses = [RateLimitError("slow down")] + [EmbeddingError("500")] * 10
+
+        async def embed_batch(self, texts):
+            if self.responses:
+                raise self.responses.pop(0)
+            return [[0.0] for _ in texts]
+
+    service = EmbeddingService(Flaky(), max_concurrency=4)
+    for _ in range(10):
+        with pytest.raises(EmbeddingError):
+            await service.embed_documents(["x"])
+    assert service.concurrency_limit == 2  # Halved by the 429, not regrown
+
+    for _ in range(2):
+        await service.embed_documents(["x"])
+    assert service.concurrency_limit == 3
+
+
+class _Failing:
+    def __init__(self, exc: Exception) -> None:
+        self.exc = exc
+
+    async def aembed_documents(self, texts):
+        raise self.exc
+
+
+class _HttpError(Exception):
+    def __init__(self, status_code: int) -> None:
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+async def test_langchain_adapter_translates_rate_limits():
+    provider = LangChainEmbeddingProvider("openai", "m", _Failing(_HttpError(429)))
+    with pytest.raises(RateLimitError):
+        await provider.embed_batch(["x"])
+
+    provider = LangChainEmbeddingProvider("gemini", "m", _Failing(_HttpError(500)))
+    with pytest.raises(EmbeddingError) as info:
+        await provider.embed_batch(["x"])
+    assert not isinstance(info.value, RateLimitError)
+
+
+def test_build_provider():
+    assert build_provider("fake", "m").model == "m"
+    with pytest.raises(ValueError):
+        build_provider("nope", "m")
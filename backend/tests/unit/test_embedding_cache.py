@@ -0,0 +1,136 @@
+"""Unit tests for the two-tier embedding cache."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.services.embedding import EmbeddingService, FakeEmbeddingProvider
+from app.services.embedding_cache import (
+    EmbeddingCache,
+    LRUVectorCache,
+    normalize_text,
+)
+
+DIM = 8
+
+
+class FakeAsyncRedis:
+    """The slice of redis.asyncio.Redis used by EmbeddingCache."""
+
+    def __init__(self) -> None:
+        self.store: dict[str, bytes] = {}
+        self.ttls: dict[str, int] = {}
+        self.fail = False
+
+    async def mget(self, keys):
+        if self.fail:
+            raise RedisConnectionError("down")
+        return [self.store.get(k) for k in keys]
+
+    def pipeline(self, transaction: bool = True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, redis: FakeAsyncRedis) -> None:
+        self._redis = redis
+        self._ops: list[tuple[str, bytes, int]] = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def set(self, key, value, ex):
+        self._ops.append((key, value, ex))
+
+    async def execute(self):
+        if self._redis.fail:
+            raise RedisConnectionError("down")
+        for key, value, ex in self._ops:
+            self._redis.store[key] = value
+            self._redis.ttls[key] = ex
+
+
+@pytest.fixture
+def redis() -> FakeAsyncRedis:
+    return FakeAsyncRedis()
+
+
+def _cache(redis, model: str = "m1", max_bytes: int = 1 << 20) -> EmbeddingCache:
+    return EmbeddingCache(model, DIM, max_bytes, 60, redis_factory=lambda: redis)
+
+
+def _service(cache: EmbeddingCache) -> tuple[EmbeddingService, FakeEmbeddingProvider]:
+    provider = FakeEmbeddingProvider(dimension=DIM)
+    return EmbeddingService(provider, cache=cache), provider
+
+
+def test_normalize_text():
+    assert normalize_text("  Café \n\t menu ") == "Café menu"
+
+
+def test_lru_evicts_least_recently_used_by_bytes():
+    lru = LRUVectorCache(max_bytes=2 * DIM * 4)
+    a, b, c = (np.full(DIM, v, dtype=np.float32) for v in (1, 2, 3))
+    lru.put("a", a)
+    lru.put("b", b)
+    lru.get("a")
+    lru.put("c", c)
+
+    assert lru.get("b") is None
+    assert lru.get("a") is not None and lru.get("c") is not None
+    assert lru.nbytes == 2 * DIM * 4
+
+
+async def test_second_call_is_served_from_memory(redis):
+    cache = _cache(redis)
+    service, provider = _service(cache)
+
+    first = await service.embed_documents(["alpha", "beta", "alpha"])
+    again = await service.embed_documents(["alpha ", "beta"])
+
+    assert provider.calls == 1  # "alpha" sent once despite appearing twice
+    np.testing.assert_array_equal(first[0], first[2])
+    np.testing.assert_array_equal(again, first[:2])
+    stats = cache.stats()
+    assert (stats.l1_hits, stats.l2_hits, stats.misses) == (2, 0, 3)
+
+
+async def test_redis_tier_is_shared_across_processes_as_float32_bytes(redis):
+    service, _ = _service(_cache(redis))
+    vector = await service.embed_query("shared text")
+
+    other_cache = _cache(redis)
+    other, other_provider = _service(other_cache)
+    again = await other.embed_query("shared text")
+
+    assert other_provider.calls == 0
+    np.testing.assert_array_equal(again, vector)
+    blob = next(iter(redis.store.values()))
+    assert len(blob) == DIM * 4
+    assert set(redis.ttls.values()) == {60}
+    assert other_cache.stats().l2_hits == 1
+
+
+async def test_keys_are_scoped_by_model(redis):
+    assert _cache(redis, "m1").key("x") != _cache(redis, "m2").key("x")
+
+    await _service(_cache(redis, "m1"))[0].embed_query("x")
+    service, provider = _service(_cache(redis, "m2"))
+    await service.embed_query("x")
+
+    assert provider.calls == 1
+
+
+async def test_redis_outage_degrades_to_provider(redis):
+    redis.fail = True
+    service, provider = _service(_cache(redis))
+
+    vectors = await service.embed_documents(["a", "b"])
+
+    assert vectors.shape == (2, DIM)
+    assert provider.calls == 1
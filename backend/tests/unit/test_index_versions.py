@@ -0,0 +1,168 @@
+"""Unit tests for the index version registry."""
+
+from __future__ import annotations
+
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+from app.services.index_versions import IndexSpec, IndexVersions, shard_root
+
+
+class FakeRedis:
+    """The slice of redis.Redis used by IndexVersions."""
+
+    def __init__(self) -> None:
+        self.values: dict[str, bytes] = {}
+        self.hashes: dict[str, dict[str, bytes]] = {}
+        self.sets: dict[str, set[bytes]] = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = str(value).encode()
+        return True
+
+    def incr(self, key):
+        value = int(self.values.get(key, b"0")) + 1
+        self.values[key] = str(value).encode()
+        return value
+
+    def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    def hsetnx(self, key, field, value):
+        fields = self.hashes.setdefault(key, {})
+        if field in fields:
+            return 0
+        fields[field] = value.encode()
+        return 1
+
+    def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(m.encode() for m in members)
+
+    def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    def smismember(self, key, members):
+        return [int(m.encode() in self.sets.get(key, set())) for m in members]
+
+    def scard(self, key):
+        return len(self.sets.get(key, set()))
+
+    def delete(self, *keys):
+        for key in keys:
+            for store in (self.values, self.hashes, self.sets):
+                store.pop(key, None)
+
+    def pipeline(self, transaction: bool = True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, redis: FakeRedis) -> None:
+        self._redis = redis
+        self._calls = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self._calls.append((name, args, kwargs))
+
+        return queue
+
+    def execute(self):
+        return [getattr(self._redis, n)(*a, **k) for n, a, k in self._calls]
+
+
+@pytest.fixture
+def versions():
+    return IndexVersions(FakeRedis())
+
+
+def _other_spec() -> IndexSpec:
+    return replace(IndexSpec.from_settings(), embedding_model="other-model")
+
+
+def test_configured_spec_is_the_initial_active_version(versions):
+    active = versions.active()
+
+    assert active.id == "v1"
+    assert active.spec == IndexSpec.from_settings()
+    assert versions.target() is None
+    assert versions.register(IndexSpec.from_settings()) == active
+
+
+def test_changed_spec_becomes_the_target(versions):
+    versions.active()
+
+    target = versions.begin(_other_spec())
+
+    assert target.id == "v2"
+    assert versions.target() == target
+    assert versions.active().id == "v1"
+    # Starting again (e.g. another worker booting) keeps the same target.
+    assert versions.begin(_other_spec()) == target
+
+
+def test_reverting_the_settings_abandons_the_migration(versions):
+    versions.begin(_other_spec())
+
+    assert versions.begin(IndexSpec.from_settings()) is None
+    assert versions.target() is None
+
+
+def test_migration_progress_and_cut_over(versions):
+    target = versions.begin(_other_spec())
+    versions.migrated(target.id, "doc-1", "user-a")
+    versions.migrated(target.id, "doc-2", "user-b")
+    versions.record_remaining(target.id, 1)
+
+    assert versions.unmigrated(target.id, ["doc-1", "doc-3"]) == ["doc-3"]
+    assert versions.unmigrated(target.id, []) == []
+    stats = versions.stats()
+    assert (stats.active, stats.target, stats.migrated, stats.remaining) == (
+        "v1",
+        "v2",
+        2,
+        1,
+    )
+
+    previous, users = versions.cut_over(target.id)
+
+    assert previous.id == "v1"
+    assert users == ["user-a", "user-b"]
+    assert versions.active() == target
+    assert versions.target() is None
+    assert versions.stats().model_dump() == {
+        "active": "v2",
+        "target": None,
+        "migrated": 0,
+        "remaining": None,
+    }
+
+
+def test_claims_expire_rather_than_block(versions):
+    assert versions.claim("v2", "doc-1", 60)
+    assert not versions.claim("v2", "doc-1", 60)
+    assert versions.claim_sweep("v2", 59)
+    assert not versions.claim_sweep("v2", 59)
+
+
+def test_unknown_version_is_an_error(versions):
+    with pytest.raises(LookupError):
+        versions.get("v9")
+
+
+def test_initial_version_keeps_the_unversioned_shard_root():
+    assert shard_root("/data/shards", "v1") == Path("/data/shards")
+    assert shard_root("/data/shards", "v2") == Path("/data/shards/v2")
@@ -0,0 +1,250 @@
+"""Unit tests for the bounded ingestion pipeline."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.services.chunking import Chunk
+from app.services.database import DatabaseError
+from app.services.embedding import EmbeddingService, FakeEmbeddingProvider
+from app.services.extraction import ExtractionError
+from app.services.ingestion import (
+    SHARD_INDEX_STRIDE,
+    StagedChunkSink,
+    ingest_document,
+    ingest_file,
+)
+
+DIM = 8
+
+
+class RecordingSink:
+    def __init__(self) -> None:
+        self.cleared: list[str] = []
+        self.batches: list[tuple[list, np.ndarray]] = []
+        self.published: list[tuple[str, int]] = []
+
+    async def clear(self, document_id):
+        self.cleared.append(document_id)
+
+    async def write(self, document_id, user_id, chunks, vectors):
+        self.batches.append((list(chunks), vectors))
+
+    async def publish(self, document_id, count):
+        self.published.append((document_id, count))
+
+
+@pytest.fixture
+def embedder() -> EmbeddingService:
+    return EmbeddingService(FakeEmbeddingProvider(dimension=DIM))
+
+
+async def test_document_is_written_in_bounded_batches(tmp_path, embedder):
+    path = tmp_path / "notes.txt"
+    path.write_text(" ".join(f"w{i}" for i in range(98)))
+    sink = RecordingSink()
+
+    count = await ingest_file(
+        path,
+        "text/plain",
+        "doc-1",
+        "user-a",
+        embedder,
+        sink,
+        chunk_size=10,
+        overlap=2,
+        batch_size=4,
+    )
+
+    assert count == 12
+    assert sink.cleared == ["doc-1"]
+    assert sink.published == [("doc-1", 12)]
+    assert [len(chunks) for chunks, _ in sink.batches] == [4, 4, 4]
+    chunks = [c for batch, _ in sink.batches for c in batch]
+    assert [c.index for c in chunks] == list(range(12))
+    for batch, vectors in sink.batches:
+        assert vectors.shape == (len(batch), DIM)
+        np.testing.assert_allclose(vectors[0], embedder.provider.vector(batch[0].text))
+
+
+async def test_empty_document_is_an_extraction_error(tmp_path, embedder):
+    path = tmp_path / "empty.txt"
+    path.write_text("  \n")
+
+    sink = RecordingSink()
+
+    with pytest.raises(ExtractionError):
+        await ingest_file(
+            path,
+            "text/plain",
+            "doc-1",
+            "user-a",
+            embedder,
+            sink,
+            chunk_size=10,
+            overlap=2,
+            batch_size=4,
+        )
+
+    assert sink.published == []
+
+
+async def test_ingest_document_downloads_from_storage(local_storage, embedder):
+    async def body():
+        yield b"Dynamic programming, week 3.\n"
+
+    await local_storage.upload_stream("u/d/week3.md", body(), "text/markdown")
+    sink = RecordingSink()
+
+    count = await ingest_document(
+        local_storage,
+        "u/d/week3.md",
+        "text/markdown",
+        "doc-1",
+        "user-a",
+        embedder,
+        sink,
+        chunk_size=16,
+        overlap=2,
+        batch_size=8,
+    )
+
+    assert count == 1
+    (chunk,), _ = sink.batches[0]
+    assert (chunk.page_number, chunk.text) == (1, "Dynamic programming, week 3.")
+
+
+async def test_staged_sink_bulk_writes_and_publishes_atomically(
+    tmp_path, embedder, postgrest, database
+):
+    path = tmp_path / "notes.txt"
+    path.write_text(" ".join(f"w{i}" for i in range(98)))
+    postgrest.tables["documents"] = [{"id": "doc-1", "status": "PROCESSING"}]
+    postgrest.tables["document_chunks"] = [{"document_id": "doc-1", "chunk_index": 0}]
+    postgrest.tables["document_chunks_staging"] = [
+        {"document_id": "doc-1", "index_version": "v1"}
+    ]
+    database.bulk_rows = 5
+
+    count = await ingest_file(
+        path,
+        "text/plain",
+        "doc-1",
+        "user-a",
+        embedder,
+        StagedChunkSink(database),
+        chunk_size=10,
+        overlap=2,
+        batch_size=4,
+    )
+
+    # 1 discard, 12 rows staged as 5 + 5 + 2, 1 publish.
+    assert postgrest.requests == 5
+    assert count == 12
+    rows = postgrest.tables["document_chunks"]
+    assert [row["chunk_index"] for row in rows] == list(range(12))
+    assert rows[0]["user_id"] == "user-a"
+    assert len(rows[0]["embedding"]) == DIM
+    assert postgrest.tables["document_chunks_staging"] == []
+    assert postgrest.tables["documents"][0]["status"] == "READY"
+
+
+async def test_publish_rejects_a_partial_staging(postgrest, database):
+    postgrest.tables["documents"] = [{"id": "doc-1", "status": "PROCESSING"}]
+    sink = StagedChunkSink(database)
+    chunks = [Chunk(0, 1, "hi", 1, char_start=0, char_end=2)]
+    await sink.write("doc-1", "user-a", chunks, np.zeros((1, DIM), np.float32))
+
+    with pytest.raises(DatabaseError, match="staged 1 chunks, expected 2"):
+        await sink.publish("doc-1", 2)
+
+    assert postgrest.tables["documents"][0]["status"] == "PROCESSING"
+    assert postgrest.tables.get("document_chunks", []) == []
+
+
+async def test_shards_stage_offset_indexes_and_publish_in_page_order(
+    postgrest, database
+):
+    postgrest.tables["documents"] = [{"id": "doc-1", "status": "PROCESSING"}]
+    stale = {
+        "document_id": "doc-1",
+        "chunk_index": SHARD_INDEX_STRIDE,
+        "index_version": "v1",
+    }
+    postgrest.tables["document_chunks_staging"] = [stale]
+    vectors = np.zeros((2, DIM), np.float32)
+
+    # Shard 1 finishes first; its retry drops only its own stale row.
+    for shard, pages in ((1, (3, 4)), (0, (1, 2))):
+        sink = StagedChunkSink(database, shard)
+        await sink.clear("doc-1")
+        chunks = [
+            Chunk(i, i + 1, f"p{page}", page, char_start=0, char_end=2)
+            for i, page in enumerate(pages)
+        ]
+        await sink.write("doc-1", "user-a", chunks, vectors)
+        await sink.publish("doc-1", 2)
+
+    staged = postgrest.tables["document_chunks_staging"]
+    assert sorted(row["chunk_index"] for row in staged) == [
+        0,
+        1,
+        SHARD_INDEX_STRIDE,
+        SHARD_INDEX_STRIDE + 1,
+    ]
+    assert postgrest.tables["documents"][0]["status"] == "PROCESSING"
+
+    await database.publish_chunks("doc-1", 4)
+
+    rows = postgrest.tables["document_chunks"]
+    assert [(r["chunk_index"], r["content"]) for r in rows] == [
+        (0, "p1"),
+        (1, "p2"),
+        (2, "p3"),
+        (3, "p4"),
+    ]
+
+
+async def test_new_index_version_is_published_next_to_the_active_one(
+    postgrest, database
+):
+    postgrest.tables["documents"] = [{"id": "doc-1", "status": "READY"}]
+    postgrest.tables["document_chunks"] = [
+        {"document_id": "doc-1", "chunk_index": 0, "index_version": "v1"}
+    ]
+    sink = StagedChunkSink(database, index_version="v2")
+    chunks = [Chunk(0, 1, "hi", 1, char_start=0, char_end=2)]
+    await sink.clear("doc-1")
+    await sink.write("doc-1", "user-a", chunks, np.zeros((1, DIM), np.float32))
+    await sink.publish("doc-1", 1)
+
+    rows = postgrest.tables["document_chunks"]
+    assert sorted(row["index_version"] for row in rows) == ["v1", "v2"]
+
+    # A document deleted while it was re-embedded publishes nothing.
+    postgrest.tables["documents"] = []
+    await sink.write("doc-1", "user-a", chunks, np.zeros((1, DIM), np.float32))
+    assert await database.publish_chunks("doc-1", 1, "v2") == 0
+    assert postgrest.tables["document_chunks_staging"] == []
+
+
+async def test_progress_is_reported_per_embedded_batch(tmp_path, embedder):
+    path = tmp_path / "notes.txt"
+    path.write_text(" ".join(f"w{i}" for i in range(98)))
+    reports: list[tuple[int, int]] = []
+
+    await ingest_file(
+        path,
+        "text/plain",
+        "doc-1",
+        "user-a",
+        embedder,
+        RecordingSink(),
+        chunk_size=10,
+        overlap=2,
+        batch_size=5,
+        progress=lambda pages, chunks: reports.append((pages, chunks)),
+    )
+
+    assert reports == [(1, 5), (1, 10), (1, 12)]
@@ -0,0 +1,65 @@
+"""Unit tests for scalar and product quantization."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.services.quantization import (
+    adc_scores,
+    adc_table,
+    pq_decode,
+    pq_encode,
+    scalar_quantize,
+    train_codebooks,
+)
+
+
+def _unit_rows(n: int, dimension: int = 32, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((n, dimension))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def test_scalar_quantization_round_trips_within_half_a_step():
+    vectors = _unit_rows(100)
+
+    codes, scales = scalar_quantize(vectors)
+
+    assert codes.dtype == np.int8
+    assert np.abs(codes).max() == 127
+    error = np.abs(codes * scales[:, None] - vectors)
+    assert (error <= scales[:, None] / 2 + 1e-7).all()
+
+
+def test_pq_reconstruction_beats_a_single_codeword():
+    vectors = _unit_rows(2000)
+    codebooks = train_codebooks(vectors, n_subvectors=8)
+
+    codes = pq_encode(vectors, codebooks)
+    error = np.linalg.norm(pq_decode(codes, codebooks) - vectors, axis=1)
+
+    assert codebooks.shape == (8, 256, 4)
+    assert codes.shape == (2000, 8) and codes.dtype == np.uint8
+    assert error.mean() < 0.5  # A random unit vector is ~1.41 away
+
+
+def test_adc_scores_equal_inner_products_with_reconstructions():
+    vectors = _unit_rows(500)
+    codebooks = train_codebooks(vectors, n_subvectors=4)
+    codes = pq_encode(vectors, codebooks)
+    query = _unit_rows(1, seed=1)[0]
+
+    scores = adc_scores(adc_table(codebooks, query), codes)
+
+    np.testing.assert_allclose(
+        scores, pq_decode(codes, codebooks) @ query, rtol=1e-4, atol=1e-5
+    )
+
+
+def test_codebooks_shrink_to_the_training_set():
+    assert train_codebooks(_unit_rows(10), n_subvectors=4).shape == (4, 10, 8)
+
+
+def test_subvectors_must_divide_the_dimension():
+    with pytest.raises(ValueError):
+        train_codebooks(_unit_rows(10), n_subvectors=5)
@@ -0,0 +1,220 @@
+"""Unit tests for hybrid BM25 + vector retrieval."""
+
+from __future__ import annotations
+
+import math
+from collections import Counter
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pytest
+
+from app.agent.graph import node_retrieve, route_intent
+from app.services.embedding import EmbeddingService, FakeEmbeddingProvider
+from app.services.index_versions import IndexSpec, IndexVersion
+from app.services.retrieval import (
+    BM25Index,
+    ChunkRecord,
+    KnowledgeBaseIndex,
+    RetrievalResult,
+    RetrievalService,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+from app.services.vector_index import ExactIndex, top_k_indices
+
+DIM = 8
+TEXTS = [
+    "Dijkstra finds shortest paths in weighted graphs.",
+    "Dynamic programming solves overlapping subproblems.",
+    "Bellman-Ford handles negative edge weights in graphs.",
+    "Heaps give Dijkstra its logarithmic priority queue.",
+]
+
+
+def _records(texts: list[str]) -> list[ChunkRecord]:
+    return [ChunkRecord("doc-1", "notes.pdf", i, 1, t) for i, t in enumerate(texts)]
+
+
+def _bm25_reference(texts, query, k1=1.2, b=0.75):
+    docs = [Counter(tokenize(t)) for t in texts]
+    avg = sum(sum(d.values()) for d in docs) / len(docs)
+    scores = []
+    for doc in docs:
+        length = sum(doc.values())
+        score = 0.0
+        for term in set(tokenize(query)):
+            df = sum(term in d for d in docs)
+            if not doc[term]:
+                continue
+            idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+            tf = doc[term]
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg))
+        scores.append(score)
+    return scores
+
+
+def test_bm25_matches_reference_formula():
+    index = BM25Index(TEXTS)
+
+    for query in ("dijkstra graphs", "weights negative", "unknown words"):
+        np.testing.assert_allclose(
+            index.scores(query), _bm25_reference(TEXTS, query), rtol=1e-5
+        )
+
+
+def test_bm25_postings_are_flat_arrays():
+    index = BM25Index(TEXTS)
+
+    assert index.indptr[-1] == len(index.doc_ids) == len(index.term_freqs)
+    term = index.vocabulary["dijkstra"]
+    postings = index.doc_ids[index.indptr[term] : index.indptr[term + 1]]
+    assert postings.tolist() == [0, 3]
+
+
+def test_top_k_indices_matches_full_sort():
+    scores = np.random.default_rng(0).standard_normal(10_000).astype(np.float32)
+
+    assert top_k_indices(scores, 25).tolist() == np.argsort(-scores)[:25].tolist()
+    assert len(top_k_indices(scores[:3], 10)) == 3
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    ids, scores = reciprocal_rank_fusion([np.array([1, 2, 3]), np.array([3, 1])])
+
+    assert ids.tolist() == [1, 3, 2]
+    assert scores[0] == pytest.approx(1 / 61 + 1 / 62)
+
+
+def test_search_applies_threshold_and_reports_confidence():
+    provider = FakeEmbeddingProvider(dimension=DIM)
+    embeddings = np.stack([provider.vector(t) for t in TEXTS])
+    index = KnowledgeBaseIndex(_records(TEXTS), ExactIndex(embeddings))
+
+    result = index.search(
+        "heaps priority queue", provider.vector(TEXTS[3]), top_k=2, threshold=0.99
+    )
+
+    assert result.chunks[0].chunk_index == 3
+    assert result.confidence == pytest.approx(1.0, abs=1e-5)
+    assert len(result.chunks) == 1  # No other chunk passes either ranker
+
+
+def test_search_on_empty_knowledge_base():
+    index = KnowledgeBaseIndex([], ExactIndex(np.empty((0, DIM))))
+
+    assert index.search("x", np.ones(DIM), top_k=5) == RetrievalResult([], 0.0)
+
+
+class FakeStore:
+    def __init__(self) -> None:
+        self.kb_version = 0
+        self.loads = 0
+        self.loaded_versions: list[str | None] = []
+        self.texts = TEXTS[:2]
+        self.provider = FakeEmbeddingProvider(dimension=DIM)
+
+    def version(self, user_id):
+        return self.kb_version
+
+    def load(self, user_id, with_embeddings=True, index_version=None):
+        self.loads += 1
+        self.loaded_versions.append(index_version)
+        if not with_embeddings:
+            return _records(self.texts), None
+        vectors = np.stack([self.provider.vector(t) for t in self.texts])
+        return _records(self.texts), vectors
+
+    def document_vectors(self, document_id, index_version=None):
+        vectors = np.stack([self.provider.vector(t) for t in self.texts])
+        return np.arange(len(self.texts)), vectors
+
+
+async def test_service_caches_index_until_version_changes():
+    store = FakeStore()
+    service = RetrievalService(
+        store, EmbeddingService(FakeEmbeddingProvider(dimension=DIM))
+    )
+
+    await service.search("user-a", "dijkstra", top_k=3)
+    await service.search("user-a", "dynamic", top_k=3)
+    assert store.loads == 1
+
+    store.texts = TEXTS
+    store.kb_version = 1
+    result = await service.search("user-a", "bellman ford", top_k=3)
+
+    assert store.loads == 2
+    assert result.chunks[0].chunk_index == 2
+
+
+@pytest.mark.parametrize("nprobe", [None, 64])
+async def test_shard_modes_build_shards_once_and_serve_from_disk(tmp_path, nprobe):
+    store = FakeStore()
+    store.texts = TEXTS
+    service = RetrievalService(
+        store,
+        EmbeddingService(FakeEmbeddingProvider(dimension=DIM)),
+        shard_dir=tmp_path,
+        nprobe=nprobe,
+    )
+
+    result = await service.search("user-a", "bellman ford", top_k=3)
+    assert result.chunks[0].chunk_index == 2
+    assert (tmp_path / "user-a" / "manifest.json").exists()
+    assert store.loads == 2  # Records, then embeddings for the initial build
+
+    store.kb_version = 1
+    await service.search("user-a", "bellman ford", top_k=3)
+    assert store.loads == 3  # Covered by the shards: records only
+
+
+async def test_search_reads_the_active_index_version(tmp_path):
+    store = FakeStore()
+    store.texts = TEXTS
+    old = IndexVersion("v1", _spec("old-model"))
+    new = IndexVersion("v2", _spec("new-model"))
+    versions = MagicMock()
+    versions.active.return_value = old
+    embedders = {
+        spec: EmbeddingService(
+            FakeEmbeddingProvider(model=spec.embedding_model, dimension=DIM)
+        )
+        for spec in (old.spec, new.spec)
+    }
+    service = RetrievalService(
+        store,
+        EmbeddingService(FakeEmbeddingProvider(dimension=DIM)),
+        shard_dir=tmp_path,
+        versions=versions,
+        embedders=embedders.__getitem__,
+    )
+
+    await service.search("user-a", "bellman ford", top_k=3)
+    assert store.loaded_versions == ["v1", "v1"]
+    assert (tmp_path / "user-a" / "manifest.json").exists()
+    assert embedders[old.spec].provider.calls == 1
+
+    # A cut-over switches the next query over, without a KB version bump.
+    versions.active.return_value = new
+    await service.search("user-a", "bellman ford", top_k=3)
+
+    assert store.loaded_versions[2:] == ["v2", "v2"]
+    assert (tmp_path / "v2" / "user-a" / "manifest.json").exists()
+    assert embedders[new.spec].provider.calls == 1
+
+
+def _spec(model: str) -> IndexSpec:
+    return IndexSpec("fake", model, DIM, 512, 64, "regex")
+
+
+async def test_retrieve_node_fills_state_and_routes_on_confidence():
+    result = RetrievalResult([], 0.2)
+    with patch("app.agent.graph.get_retrieval_service") as service:
+        service.return_value.search = AsyncMock(return_value=result)
+        state = await node_retrieve({"user_id": "user-a", "query": "dp"})
+
+    assert state["retrieved_chunks"] == []
+    assert state["retrieval_confidence"] == 0.2
+    assert route_intent(state) == "web_search"
+    assert route_intent({**state, "retrieval_confidence": 0.9}) == "generate"
@@ -0,0 +1,85 @@
+"""Unit tests for local intent routing."""
+
+from __future__ import annotations
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from app.agent.graph import build_agent_graph, node_route
+from app.agent.router import IntentRouter, RouteDecision, classify_with_llm
+
+AMBIGUOUS = "What is the latest version of Python?"  # KB question words + recency
+
+
+@pytest.mark.parametrize(
+    ("query", "intent"),
+    [
+        ("Summarize chapter 4 of my notes", "retrieve"),
+        ("Why does Bellman-Ford allow negative weights?", "retrieve"),
+        ("Search the web for recent RAG papers", "web_search"),
+        ("Run this code:\n```python\nprint(1)\n```", "code_exec"),
+        ("Compute the factorial of 20", "code_exec"),
+        ("Thanks!", "generate"),
+        ("Translate 'heap' into German", "generate"),
+    ],
+)
+def test_rules_route_common_queries(query, intent):
+    assert IntentRouter().route(query).intent == intent
+
+
+def test_no_evidence_defaults_to_confident_retrieval():
+    assert IntentRouter().route("Tarjan SCC") == RouteDecision("retrieve", 1.0)
+
+
+def test_conflicting_evidence_lowers_confidence():
+    assert IntentRouter().route(AMBIGUOUS).confidence < 0.6
+
+
+async def test_llm_reply_is_validated():
+    fallback = RouteDecision("retrieve", 0.55)
+    good = GenericFakeChatModel(messages=iter([AIMessage("web_search.")]))
+    bad = GenericFakeChatModel(messages=iter([AIMessage("I would search")]))
+
+    assert await classify_with_llm(good, "q", fallback) == RouteDecision(
+        "web_search", 1.0, "llm"
+    )
+    assert await classify_with_llm(bad, "q", fallback) == fallback
+
+
+async def test_llm_failure_keeps_the_rule_decision():
+    fallback = RouteDecision("retrieve", 0.55)
+    model = AsyncMock()
+    model.ainvoke.side_effect = TimeoutError("provider timed out")
+
+    assert await classify_with_llm(model, "q", fallback) == fallback
+
+
+@pytest.mark.parametrize(("query", "llm_calls"), [("Thanks!", 0), (AMBIGUOUS, 1)])
+async def test_route_node_asks_llm_only_for_close_calls(query, llm_calls):
+    with (
+        patch("app.agent.graph.get_chat_model"),
+        patch(
+            "app.agent.graph.classify_with_llm",
+            AsyncMock(return_value=RouteDecision("web_search", 1.0, "llm")),
+        ) as llm,
+    ):
+        update = await node_route({"query": query})
+
+    assert llm.await_count == llm_calls
+    assert update["next_tool"] == ("generate" if llm_calls == 0 else "web_search")
+
+
+async def test_generate_intent_skips_retrieval():
+    model = GenericFakeChatModel(messages=iter([AIMessage("Hello!")]))
+    with (
+        patch("app.agent.graph.get_chat_model", return_value=model),
+        patch("app.agent.graph.get_retrieval_service") as service,
+    ):
+        state = await build_agent_graph().ainvoke({"user_id": "u", "query": "Hi"})
+
+    service.assert_not_called()
+    assert state["next_tool"] == "generate"
+    assert state["answer"] == "Hello!"
@@ -0,0 +1,204 @@
+"""Unit tests for the warm sandbox pool (real worker processes)."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.agent.prompts import (
+    build_generation_messages,
+    extract_code,
+    format_code_result,
+)
+from app.services.sandbox import SandboxBusyError, SandboxPool, SandboxResult
+
+
+@pytest.fixture
+async def pool():
+    pool = SandboxPool(
+        size=1,
+        max_runs=3,
+        timeout=5,
+        queue_timeout=10,
+        cpu_seconds=1,
+        memory_mb=256,
+        max_output_bytes=256,
+    )
+    await pool.start()
+    yield pool
+    await pool.close()
+
+
+async def _settle(pool: SandboxPool) -> None:
+    """Wait for replacement workers to start."""
+    for _ in range(200):
+        if not pool._replacements:
+            return
+        await asyncio.sleep(0.05)
+
+
+async def test_runs_code_and_captures_output(pool):
+    result = await pool.run("import math\nprint(math.factorial(10))")
+
+    assert result.status == "ok"
+    assert result.output == "3628800\n"
+    assert not result.violation
+
+
+async def test_exception_returns_the_snippet_traceback(pool):
+    result = await pool.run("x = 1\n1 / 0")
+
+    assert result.status == "error"
+    assert 'File "<sandbox>", line 2' in result.error
+    assert result.error.endswith("ZeroDivisionError: division by zero")
+    assert "sandbox_runner" not in result.error
+
+
+async def test_output_is_capped(pool):
+    result = await pool.run("print('x' * 1000)")
+
+    assert result.output == "x" * 256
+    assert result.truncated
+
+
+@pytest.mark.parametrize(
+    ("code", "status", "timeout"),
+    [
+        ("while True: pass", "timeout", None),  # CPU limit
+        ("import time\ntime.sleep(10)", "timeout", 0.5),  # Wall clock
+        ("x = bytearray(1 << 30)", "memory", None),
+    ],
+)
+async def test_violation_replaces_the_worker(pool, code, status, timeout):
+    result = await pool.run(code, timeout=timeout)
+    await _settle(pool)
+
+    assert result.status == status
+    assert pool.spawned == 2
+    assert (await pool.run("print('next')")).output == "next\n"
+
+
+@pytest.mark.parametrize(
+    ("code", "event"),
+    [
+        ("import socket\nsocket.create_connection(('1.1.1.1', 80))", "socket"),
+        ("import subprocess\nsubprocess.run(['ls'])", "subprocess.Popen"),
+        ("import os\nos.system('ls')", "os.system"),
+        ("import os\nos.fork()", "os.fork"),
+    ],
+)
+async def test_network_and_processes_are_denied(pool, code, event):
+    result = await pool.run(code)
+
+    assert result.status == "error"
+    assert f"PermissionError: {event}" in result.error
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "import os\nopen(f'/proc/{os.getppid()}/environ').read()",
+        "open('/etc/passwd').read()",
+        "import os\nos.listdir('/')",
+        "import os\nos.symlink('/etc/passwd', 'link')\nopen('link').read()",
+        "import os\nos.chdir('/etc')",
+        "open('/tmp/docmind-sandbox-escape.txt', 'w')",
+    ],
+)
+async def test_files_outside_the_workdir_are_denied(pool, code):
+    result = await pool.run(code)
+
+    assert result.status == "error"
+    assert "outside the sandbox directory is not allowed" in result.error
+
+
+async def test_workdir_files_and_library_imports_are_allowed(pool):
+    result = await pool.run(
+        "import json, os, xml.dom.minidom\n"
+        "os.mkdir('data')\n"
+        "open('data/a.json', 'w').write(json.dumps([1]))\n"
+        "print(open('data/a.json').read(), os.listdir('data'))"
+    )
+
+    assert result.status == "ok", result.error
+    assert result.output == "[1] ['a.json']\n"
+
+
+async def test_runs_do_not_share_state(pool):
+    await pool.run(
+        "import math\nmath.pi = 3\nsecret = 1\nopen('left.txt', 'w').write('x')"
+    )
+
+    result = await pool.run(
+        "import math, os\nprint(math.pi > 3, os.listdir('.'), 'secret' in dir())"
+    )
+
+    assert result.output == "True [] False\n"
+
+
+async def test_worker_is_replaced_after_max_runs(pool):
+    for _ in range(3):
+        assert (await pool.run("print(1)")).status == "ok"
+    await _settle(pool)
+
+    assert pool.spawned == 2
+
+
+async def test_runs_queue_for_a_free_worker(pool):
+    first = asyncio.create_task(pool.run("import time\ntime.sleep(0.3)\nprint(1)"))
+    second = asyncio.create_task(pool.run("print(2)"))
+
+    assert [(await first).output, (await second).output] == ["1\n", "2\n"]
+
+
+async def test_busy_pool_fails_after_queue_timeout(pool):
+    pool.queue_timeout = 0.05
+    slow = asyncio.create_task(pool.run("import time\ntime.sleep(0.5)"))
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(SandboxBusyError):
+        await pool.run("print(1)")
+    assert (await slow).status == "ok"
+
+
+async def test_cancelled_run_replaces_the_worker(pool):
+    task = asyncio.create_task(pool.run("import time\ntime.sleep(10)"))
+    await asyncio.sleep(0.2)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    await _settle(pool)
+
+    assert pool.spawned == 2
+    assert (await pool.run("print(1)")).output == "1\n"
+
+
+@pytest.mark.parametrize(
+    ("text", "code"),
+    [
+        ("Run this:\n```python\nprint(1)\n```", "print(1)\n"),
+        ("```\nprint(2)\n```", "print(2)\n"),
+        ("```js\nconsole.log(1)\n```", None),
+        ("What is 2 + 2?", None),
+    ],
+)
+def test_extract_code(text, code):
+    assert extract_code(text) == code
+
+
+def test_format_code_result():
+    result = SandboxResult("error", "partial", True, "ValueError: bad", 0.5)
+
+    assert format_code_result("f()\n", result) == (
+        "```python\nf()\n```\nStatus: error (0.50s)\n"
+        "Output:\npartial\n[output truncated]\nError:\nValueError: bad"
+    )
+
+
+def test_generation_prompt_includes_the_code_result():
+    messages = build_generation_messages(
+        {"query": "q", "code_exec_result": "Status: ok (0.01s)"}
+    )
+
+    assert messages[0].content.endswith("\n\nCode execution:\nStatus: ok (0.01s)")
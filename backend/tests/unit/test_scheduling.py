@@ -0,0 +1,168 @@
+"""Unit tests for fair document processing scheduling."""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.core.metrics import InMemoryCounters
+from app.workers.scheduling import (
+    QUEUE_LARGE,
+    QUEUE_SMALL,
+    IngestScheduler,
+    workload_queue,
+)
+
+
+class FakeRedis:
+    """The slice of redis.Redis used by IngestScheduler."""
+
+    def __init__(self) -> None:
+        self.strings: dict[str, int] = {}
+        self.zsets: dict[str, dict[str, float]] = {}
+        self.lists: dict[str, list[bytes]] = {}
+
+    def incr(self, key):
+        self.strings[key] = self.strings.get(key, 0) + 1
+        return self.strings[key]
+
+    def decr(self, key):
+        self.strings[key] = self.strings.get(key, 0) - 1
+        return self.strings[key]
+
+    def expire(self, key, seconds):
+        return True
+
+    def delete(self, key):
+        self.strings.pop(key, None)
+
+    def zremrangebyscore(self, key, low, high):
+        zset = self.zsets.get(key, {})
+        for member in [m for m, score in zset.items() if score <= high]:
+            del zset[member]
+
+    def zadd(self, key, mapping, xx=False):
+        zset = self.zsets.setdefault(key, {})
+        zset.update({m: score for m, score in mapping.items() if m in zset or not xx})
+
+    def zcard(self, key):
+        return len(self.zsets.get(key, {}))
+
+    def zrem(self, key, member):
+        self.zsets.get(key, {}).pop(member, None)
+
+    def lpush(self, key, value):
+        self.lists.setdefault(key, []).insert(0, str(value).encode())
+
+    def ltrim(self, key, start, end):
+        self.lists[key] = self.lists.get(key, [])[start : end + 1]
+
+    def lrange(self, key, start, end):
+        return list(self.lists.get(key, []))
+
+    def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    def pipeline(self, transaction: bool = True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, redis: FakeRedis) -> None:
+        self._redis = redis
+        self._calls = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self._calls.append((name, args, kwargs))
+
+        return queue
+
+    def execute(self):
+        return [getattr(self._redis, n)(*a, **k) for n, a, k in self._calls]
+
+
+@pytest.fixture
+def redis_client() -> FakeRedis:
+    return FakeRedis()
+
+
+@pytest.fixture
+def scheduler(redis_client) -> IngestScheduler:
+    return IngestScheduler(redis_client, redis_client, InMemoryCounters())
+
+
+def test_small_text_files_use_the_small_queue(monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_SMALL_FILE_MB", 1)
+
+    assert workload_queue("text/markdown", 10_000) == QUEUE_SMALL
+    assert workload_queue("text/plain", 2 * 1024 * 1024) == QUEUE_LARGE
+    assert workload_queue("application/pdf", 10_000) == QUEUE_LARGE
+    assert workload_queue(None, None) == QUEUE_LARGE
+
+
+def test_first_document_in_flight_gets_top_priority(scheduler):
+    burst = [scheduler.enqueue("bulk") for _ in range(12)]
+
+    assert burst[:3] == [0, 1, 2]
+    assert burst[-1] == 9  # Lowest Redis priority step
+    assert scheduler.enqueue("other") == 0
+
+    scheduler.finished("other", QUEUE_SMALL, None)
+    assert scheduler.enqueue("other") == 0
+
+
+def test_per_user_slots_are_capped_and_leased(scheduler, redis_client):
+    scheduler.max_per_user = 2
+
+    assert scheduler.acquire("u", "doc-1")
+    assert scheduler.acquire("u", "doc-2")
+    assert not scheduler.acquire("u", "doc-3")
+    assert scheduler.acquire("other", "doc-4")
+
+    scheduler.release("u", "doc-1")
+    assert scheduler.acquire("u", "doc-3")
+
+    # A crashed worker's slot is freed once its lease runs out.
+    redis_client.zsets["docmind:ingest:running:u"]["doc-2"] = time.time() - 1
+    assert scheduler.acquire("u", "doc-5")
+
+
+def test_renewing_extends_only_a_held_slot(scheduler, redis_client):
+    running = redis_client.zsets.setdefault("docmind:ingest:running:u", {})
+    assert scheduler.acquire("u", "doc-1")
+    running["doc-1"] = time.time() + 1
+
+    scheduler.renew("u", "doc-1")
+    scheduler.renew("u", "doc-2")
+
+    assert running["doc-1"] > time.time() + scheduler.lease_seconds - 60
+    assert "doc-2" not in running
+
+
+def test_stats_report_depth_and_wait_percentiles(scheduler, redis_client):
+    redis_client.lists[QUEUE_SMALL] = [b"m"] * 2
+    redis_client.lists[f"{QUEUE_SMALL}:9"] = [b"m"] * 3
+    now = time.time()
+    for wait in (1.0, 2.0, 3.0, 4.0):
+        scheduler.started(QUEUE_SMALL, now - wait)
+    scheduler.deferred(QUEUE_SMALL)
+    scheduler.enqueue("u")
+    scheduler.finished("u", QUEUE_SMALL, now - 5)
+
+    small, large = scheduler.stats()
+
+    assert (small.queue, small.depth, large.depth) == (QUEUE_SMALL, 5, 0)
+    assert (small.started, small.deferred, small.finished) == (4, 1, 1)
+    assert small.p50_wait_ms == pytest.approx(2500, abs=50)
+    assert small.p95_time_to_done_ms == pytest.approx(5000, abs=50)
+    assert large.p95_wait_ms == 0.0
+    assert "docmind:ingest:pending:u" not in redis_client.strings
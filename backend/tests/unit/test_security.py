@@ -0,0 +1,129 @@
+"""Unit tests for local Supabase JWT verification."""
+
+from __future__ import annotations
+
+import json
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.core.security import TokenVerifier, get_current_user
+
+SECRET = "test-secret-with-at-least-32-bytes!"
+ISSUER = "https://project.supabase.co/auth/v1"
+EC_KEY = ec.generate_private_key(ec.SECP256R1())
+
+
+def _token(key=SECRET, algorithm="HS256", kid=None, **claims) -> str:
+    payload = {
+        "sub": "user-1",
+        "email": "a@example.com",
+        "aud": "authenticated",
+        "iss": ISSUER,
+        "exp": int(time.time()) + 3600,
+        **claims,
+    }
+    headers = {"kid": kid} if kid else None
+    return jwt.encode(payload, key, algorithm=algorithm, headers=headers)
+
+
+def _jwks(kid: str = "key-1") -> dict:
+    jwk = json.loads(jwt.algorithms.ECAlgorithm.to_jwk(EC_KEY.public_key()))
+    return {"keys": [{**jwk, "kid": kid, "alg": "ES256", "use": "sig"}]}
+
+
+def _verifier(secret: str = SECRET) -> TokenVerifier:
+    return TokenVerifier(secret, ISSUER, "https://project.supabase.co/jwks")
+
+
+def _credentials(token: str) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+@pytest.fixture
+def supabase() -> MagicMock:
+    supabase = MagicMock()
+    supabase.auth.get_user.return_value = SimpleNamespace(
+        user=SimpleNamespace(id="user-1", email="a@example.com")
+    )
+    return supabase
+
+
+async def test_valid_token_is_verified_without_supabase(supabase):
+    user = await get_current_user(_credentials(_token()), supabase, _verifier())
+
+    assert user == {"id": "user-1", "email": "a@example.com"}
+    supabase.auth.get_user.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        _token(exp=int(time.time()) - 10),
+        _token(key="another-secret-with-at-least-32-bytes"),
+        _token(aud="anon"),
+        _token(iss="https://other.supabase.co/auth/v1"),
+        "not-a-jwt",
+    ],
+    ids=["expired", "forged", "audience", "issuer", "malformed"],
+)
+async def test_invalid_tokens_are_rejected_locally(token, supabase):
+    with pytest.raises(HTTPException) as exc:
+        await get_current_user(_credentials(token), supabase, _verifier())
+
+    assert exc.value.status_code == 401
+    supabase.auth.get_user.assert_not_called()
+
+
+async def test_verified_tokens_are_cached():
+    verifier, token = _verifier(), _token()
+    await verifier.verify(token)
+
+    with patch("app.core.security.jwt.decode") as decode:
+        assert (await verifier.verify(token))["id"] == "user-1"
+    decode.assert_not_called()
+
+
+async def test_asymmetric_tokens_use_cached_jwks():
+    verifier = _verifier(secret="")
+    with patch.object(verifier, "_fetch_jwks", AsyncMock(return_value=_jwks())) as f:
+        for _ in range(3):
+            token = _token(EC_KEY, "ES256", kid="key-1")
+            assert (await verifier.verify(token))["id"] == "user-1"
+
+    f.assert_awaited_once()
+
+
+async def test_unknown_key_refresh_is_rate_limited():
+    verifier = _verifier(secret="")
+    with patch.object(verifier, "_fetch_jwks", AsyncMock(return_value=_jwks())) as f:
+        await verifier.verify(_token(EC_KEY, "ES256", kid="key-1"))
+        assert await verifier.verify(_token(EC_KEY, "ES256", kid="rotated")) is None
+
+    f.assert_awaited_once()
+
+
+async def test_falls_back_to_supabase_when_keys_are_unavailable(supabase):
+    verifier = _verifier(secret="")
+    token = _token(EC_KEY, "ES256", kid="key-1")
+    with patch.object(verifier, "_fetch_jwks", AsyncMock(side_effect=ValueError)):
+        first = await get_current_user(_credentials(token), supabase, verifier)
+        second = await get_current_user(_credentials(token), supabase, verifier)
+
+    assert first == second == {"id": "user-1", "email": "a@example.com"}
+    supabase.auth.get_user.assert_called_once_with(token)
+
+
+async def test_supabase_rejection_is_401(supabase):
+    supabase.auth.get_user.return_value = SimpleNamespace(user=None)
+
+    with pytest.raises(HTTPException) as exc:
+        await get_current_user(_credentials(_token()), supabase, _verifier(""))
+
+    assert exc.value.status_code == 401
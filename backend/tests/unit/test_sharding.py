@@ -0,0 +1,74 @@
+"""Unit tests for page-range sharding."""
+
+from __future__ import annotations
+
+from app.workers.sharding import ShardCheckpoints, plan_shards
+
+
+class FakeRedis:
+    """The slice of redis.Redis used by ShardCheckpoints."""
+
+    def __init__(self) -> None:
+        self.hashes: dict[str, dict[str, bytes]] = {}
+
+    def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    def hgetall(self, key):
+        return {k.encode(): v for k, v in self.hashes.get(key, {}).items()}
+
+    def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = str(value).encode()
+
+    def expire(self, key, seconds):
+        return True
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+
+    def pipeline(self, transaction: bool = True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, redis: FakeRedis) -> None:
+        self._redis = redis
+        self._calls = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self._calls.append((name, args, kwargs))
+
+        return queue
+
+    def execute(self):
+        return [getattr(self._redis, n)(*a, **k) for n, a, k in self._calls]
+
+
+def test_shards_cover_every_page_once():
+    shards = plan_shards(120, 50)
+
+    assert shards == [range(1, 51), range(51, 101), range(101, 121)]
+    assert plan_shards(50, 50) == [range(1, 51)]
+    assert plan_shards(0, 50) == []
+
+
+def test_checkpoints_record_completed_shards():
+    checkpoints = ShardCheckpoints(FakeRedis())
+
+    assert checkpoints.get("doc-1", 0) is None
+    checkpoints.complete("doc-1", 0, 12)
+    checkpoints.complete("doc-1", 2, 0)
+
+    assert checkpoints.get("doc-1", 0) == 12
+    assert checkpoints.completed("doc-1") == {0: 12, 2: 0}
+    assert checkpoints.completed("doc-2") == {}
+
+    checkpoints.clear("doc-1")
+    assert checkpoints.completed("doc-1") == {}
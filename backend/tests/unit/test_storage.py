@@ -0,0 +1,80 @@
+"""Unit tests for streaming document storage."""
+
+from __future__ import annotations
+
+import hashlib
+import io
+
+import pytest
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+
+from app.services.storage import (
+    FileTooLargeError,
+    LocalStorage,
+    StorageError,
+    store_upload,
+)
+
+
+def _upload(data: bytes, size: int | None = None) -> UploadFile:
+    return UploadFile(
+        io.BytesIO(data),
+        size=size,
+        filename="notes.txt",
+        headers=Headers({"content-type": "text/plain"}),
+    )
+
+
+async def test_store_upload_streams_and_hashes(local_storage: LocalStorage, tmp_path):
+    data = b"lecture notes " * 10_000
+
+    stored = await store_upload(
+        local_storage,
+        _upload(data),
+        "u1/d1/notes.txt",
+        max_bytes=1 << 20,
+        chunk_size=4096,
+    )
+
+    assert stored.size_bytes == len(data)
+    assert stored.sha256 == hashlib.sha256(data).hexdigest()
+    assert (tmp_path / "storage" / "u1/d1/notes.txt").read_bytes() == data
+
+
+async def test_store_upload_aborts_mid_stream_and_leaves_nothing(
+    local_storage: LocalStorage, tmp_path
+):
+    reads = []
+    upload = _upload(b"x" * 10_000)
+    original_read = upload.read
+
+    async def tracking_read(size: int = -1) -> bytes:
+        chunk = await original_read(size)
+        reads.append(len(chunk))
+        return chunk
+
+    upload.read = tracking_read  # type: ignore[method-assign]
+
+    with pytest.raises(FileTooLargeError):
+        await store_upload(
+            local_storage, upload, "u1/d1/big.txt", max_bytes=2_500, chunk_size=1_000
+        )
+
+    # Rejected on the third chunk — the rest of the body is never read.
+    assert reads == [1_000, 1_000, 1_000]
+    assert not any((tmp_path / "storage").rglob("*.txt*"))
+
+
+async def test_store_upload_rejects_declared_size_before_reading(
+    local_storage: LocalStorage,
+):
+    with pytest.raises(FileTooLargeError):
+        await store_upload(
+            local_storage, _upload(b"", size=5_000), "u1/d1/a.txt", max_bytes=1_000
+        )
+
+
+async def test_local_storage_rejects_path_traversal(local_storage: LocalStorage):
+    with pytest.raises(StorageError):
+        await store_upload(local_storage, _upload(b"hi"), "../escape.txt", 1_000)
@@ -0,0 +1,168 @@
+"""Unit tests for token streaming of agent runs."""
+
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from app.agent.graph import agent_graph
+from app.agent.prompts import build_generation_messages
+from app.agent.streaming import (
+    GenerationStats,
+    StreamMetrics,
+    format_sse,
+    stream_agent,
+    until_disconnected,
+)
+from app.core.metrics import InMemoryCounters
+from app.services.llm import build_chat_model
+from app.services.retrieval import RetrievalResult, RetrievedChunk
+
+CHUNK = RetrievedChunk("doc-1", "notes.pdf", 3, 2, "Dijkstra uses a heap.", 0.1, 0.9)
+
+
+@pytest.fixture
+def agent():
+    model = GenericFakeChatModel(messages=iter([AIMessage("Use a heap [1].")]))
+    with (
+        patch("app.agent.graph.get_chat_model", return_value=model),
+        patch("app.agent.graph.get_retrieval_service") as service,
+    ):
+        service.return_value.search = AsyncMock(
+            return_value=RetrievalResult([CHUNK], 0.9)
+        )
+        yield model
+
+
+async def test_stream_agent_sends_sources_before_tokens(agent):
+    stats = GenerationStats()
+    state = {"conversation_id": "c-1", "user_id": "u", "query": "heap?"}
+
+    events = [e async for e in stream_agent(agent_graph, state, stats)]
+
+    kinds = [kind for kind, _ in events]
+    assert kinds[:3] == ["status", "sources", "status"]
+    assert events[1][1]["sources"] == [
+        {
+            "document_id": "doc-1",
+            "filename": "notes.pdf",
+            "chunk_index": 3,
+            "excerpt": "Dijkstra uses a heap.",
+            "page_number": 2,
+            "char_start": None,
+            "char_end": None,
+        }
+    ]
+    assert "".join(d["text"] for k, d in events if k == "token") == "Use a heap [1]."
+    kind, done = events[-1]
+    assert kind == "done" and done["conversation_id"] == "c-1"
+    assert stats.outcome == "completed"
+    assert stats.tokens == done["tokens"] > 0
+    assert 0 <= stats.ttft_ms == pytest.approx(done["ttft_ms"], abs=0.1)
+
+
+async def test_stream_agent_reports_failures():
+    stats = GenerationStats()
+    with patch("app.agent.graph.get_retrieval_service") as service:
+        service.return_value.search = AsyncMock(side_effect=RuntimeError("db down"))
+        events = [
+            e
+            async for e in stream_agent(
+                agent_graph, {"user_id": "u", "query": "q"}, stats
+            )
+        ]
+
+    assert events[-1][0] == "error"
+    assert stats.outcome == "failed"
+
+
+async def test_until_disconnected_cancels_upstream_while_waiting():
+    cancelled = asyncio.Event()
+
+    async def upstream():
+        yield "status"
+        try:
+            await asyncio.sleep(3600)  # An LLM that has not answered yet
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        yield "token"  # pragma: no cover
+
+    checks = iter([False, True])
+
+    async def is_disconnected():
+        return next(checks)
+
+    relayed = [e async for e in until_disconnected(upstream(), is_disconnected, 0.01)]
+
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert relayed == ["status"]
+
+
+async def test_until_disconnected_closes_upstream_when_consumer_stops():
+    closed = []
+
+    async def upstream():
+        try:
+            yield 1
+            yield 2
+        finally:
+            closed.append(True)
+
+    relay = until_disconnected(upstream(), AsyncMock(return_value=False))
+    assert await anext(relay) == 1
+    await relay.aclose()
+
+    assert closed == [True]
+
+
+def test_stream_metrics_aggregate_ttft_and_throughput():
+    metrics = StreamMetrics(InMemoryCounters())
+    metrics.record(
+        GenerationStats(
+            started=0.0,
+            first_token_at=0.2,
+            finished_at=1.2,
+            tokens=50,
+            outcome="completed",
+            context_tokens=900,
+            context_tokens_saved=300,
+        )
+    )
+    metrics.record(GenerationStats(started=0.0))
+
+    stats = metrics.stats()
+
+    assert (stats.requests, stats.completed, stats.cancelled) == (2, 1, 1)
+    assert stats.mean_ttft_ms == 200
+    assert stats.tokens_per_second == pytest.approx(50)
+    assert (stats.mean_context_tokens, stats.mean_context_tokens_saved) == (900, 300)
+
+
+def test_generation_prompt_numbers_context():
+    state = {
+        "query": "heap?",
+        "retrieved_chunks": [
+            {"filename": "notes.pdf", "page_number": 2, "content": "A"}
+        ],
+        "messages": [HumanMessage("earlier"), AIMessage("reply")],
+    }
+
+    messages = build_generation_messages(state)
+
+    assert isinstance(messages[0], SystemMessage)
+    assert "[1] notes.pdf, page 2\nA" in messages[0].content
+    assert [m.content for m in messages[1:]] == ["earlier", "reply", "heap?"]
+
+
+def test_format_sse():
+    assert format_sse("token", {"text": "é"}) == 'event: token\ndata: {"text": "é"}\n\n'
+
+
+def test_build_chat_model_rejects_unknown_provider():
+    with pytest.raises(ValueError, match="Unknown LLM provider"):
+        build_chat_model("nope", "model")
@@ -0,0 +1,576 @@
+"""Unit tests for the document processing Celery task."""
+
+from __future__ import annotations
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from celery.exceptions import Retry
+
+from app.core.config import settings
+from app.core.constants import DocumentStatus
+from app.core.redis_client import get_async_redis
+from app.services.extraction import ExtractionError
+from app.services.index_versions import IndexSpec, IndexVersion
+from app.workers.scheduling import (
+    LOWEST_PRIORITY,
+    QUEUE_LARGE,
+    QUEUE_REINDEX,
+    QUEUE_SMALL,
+)
+from app.workers.tasks import (
+    _run,
+    _set_status,
+    enqueue_document,
+    fail_document,
+    finalize_document,
+    process_document,
+    process_page_range,
+    reembed_document,
+    reindex_corpus,
+    retire_index_version,
+    start_reindex,
+)
+
+V1 = IndexVersion("v1", IndexSpec.from_settings())
+V2 = IndexVersion("v2", IndexSpec("local", "other-model", 384, 256, 32, "word"))
+
+
+@pytest.fixture
+def dedup():
+    service = MagicMock()
+    with patch("app.workers.tasks.get_dedup_service", return_value=service):
+        yield service
+
+
+@pytest.fixture(autouse=True)
+def redis_client():
+    client = MagicMock()
+    with patch("app.workers.tasks.get_redis", return_value=client):
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def scheduler():
+    service = MagicMock()
+    service.acquire.return_value = True
+    with patch("app.workers.tasks.get_ingest_scheduler", return_value=service):
+        yield service
+
+
+@pytest.fixture(autouse=True)
+def checkpoints():
+    service = MagicMock()
+    service.get.return_value = None
+    service.completed.return_value = {}
+    with patch("app.workers.tasks.get_shard_checkpoints", return_value=service):
+        yield service
+
+
+@pytest.fixture(autouse=True)
+def index_versions():
+    registry = MagicMock()
+    registry.active.return_value = V1
+    registry.target.return_value = None
+    registry.get.side_effect = {"v1": V1, "v2": V2}.__getitem__
+    with patch("app.workers.tasks.get_index_versions", return_value=registry):
+        yield registry
+
+
+@pytest.fixture(autouse=True)
+def document_events():
+    publisher = MagicMock()
+    with patch("app.workers.tasks.get_document_events", return_value=publisher):
+        yield publisher
+
+
+@pytest.fixture
+def set_status():
+    with patch("app.workers.tasks._set_status") as mocked:
+        yield mocked
+
+
+def test_duplicate_content_is_linked_and_marked_ready(dedup, set_status, redis_client):
+    dedup.link_duplicate.return_value = 12
+
+    process_document.run("doc-2", "user-b", "user-b/doc-2/a.pdf", "ab" * 32)
+
+    dedup.link_duplicate.assert_called_once_with("ab" * 32, "doc-2", "user-b", "v1")
+    set_status.assert_called_once_with("doc-2", "user-b", DocumentStatus.READY)
+    redis_client.incr.assert_called_once_with("docmind:kb-version:user-b")
+
+
+def test_new_content_is_ingested_and_registered(
+    dedup, set_status, redis_client, document_events
+):
+    dedup.link_duplicate.return_value = None
+
+    with patch("app.workers.tasks._ingest", return_value=7):
+        process_document.run(
+            "doc-1", "user-a", "user-a/doc-1/a.pdf", "ab" * 32, "application/pdf"
+        )
+
+    dedup.register.assert_called_once_with("ab" * 32, "doc-1", 7)
+    document_events.status.assert_called_once_with("doc-1", "user-a", "READY")
+    # Publishing the chunks marks the document READY inside the database.
+    assert [c.args for c in set_status.call_args_list] == [
+        ("doc-1", "user-a", DocumentStatus.PROCESSING)
+    ]
+    redis_client.incr.assert_called_once_with("docmind:kb-version:user-a")
+
+
+def test_unreadable_document_fails_without_retry(dedup, set_status):
+    dedup.link_duplicate.return_value = None
+
+    with (
+        patch("app.workers.tasks._ingest", side_effect=ExtractionError("no text")),
+        patch.object(process_document, "retry") as retry,
+    ):
+        process_document.run("doc-1", "user-a", "user-a/doc-1/a.pdf")
+
+    retry.assert_not_called()
+    set_status.assert_called_with(
+        "doc-1", "user-a", DocumentStatus.FAILED, error_message="no text"
+    )
+
+
+def test_vector_index_failure_does_not_block_ready(dedup, set_status):
+    dedup.link_duplicate.return_value = 3
+
+    with patch(
+        "app.workers.tasks.add_to_vector_index", side_effect=OSError("disk full")
+    ) as add:
+        process_document.run("doc-1", "user-a", "user-a/doc-1/a.pdf", "ab" * 32)
+
+    assert add.call_args.args[1:] == ("user-a", "doc-1", "v1")
+    set_status.assert_called_with("doc-1", "user-a", DocumentStatus.READY)
+
+
+def test_upload_is_queued_by_workload_at_fair_priority(scheduler):
+    scheduler.enqueue.return_value = 3
+
+    with patch.object(process_document, "apply_async") as send:
+        enqueue_document("doc-1", "user-a", "p/a.md", "ab", "text/markdown", 120)
+
+    scheduler.enqueue.assert_called_once_with("user-a")
+    args, kwargs = send.call_args.args
+    assert args == ("doc-1", "user-a", "p/a.md", "ab", "text/markdown")
+    assert kwargs["size_bytes"] == 120
+    assert send.call_args.kwargs == {"queue": QUEUE_SMALL, "priority": 3}
+
+
+def test_user_at_capacity_is_deferred(dedup, scheduler, set_status):
+    scheduler.acquire.return_value = False
+
+    with patch.object(process_document, "apply_async") as send:
+        process_document.run(
+            "doc-3", "user-a", "p/a.pdf", None, "application/pdf", 9, 100.0
+        )
+
+    dedup.link_duplicate.assert_not_called()
+    set_status.assert_not_called()
+    scheduler.deferred.assert_called_once_with(QUEUE_LARGE)
+    assert send.call_args.args[1] == {"size_bytes": 9, "enqueued_at": 100.0}
+    assert send.call_args.kwargs["priority"] == LOWEST_PRIORITY
+
+
+def test_slot_is_released_and_document_finished(dedup, scheduler, set_status):
+    dedup.link_duplicate.return_value = None
+
+    with patch("app.workers.tasks._ingest", return_value=2):
+        process_document.run("doc-1", "user-a", "p/a.pdf", enqueued_at=100.0)
+
+    scheduler.started.assert_called_once_with(QUEUE_LARGE, 100.0)
+    scheduler.release.assert_called_once_with("user-a", "doc-1")
+    scheduler.finished.assert_called_once_with("user-a", QUEUE_LARGE, 100.0)
+
+
+def test_retry_releases_the_slot_but_keeps_the_document_pending(
+    dedup, scheduler, set_status
+):
+    dedup.link_duplicate.return_value = None
+
+    with (
+        patch("app.workers.tasks._ingest", side_effect=OSError("timeout")),
+        patch.object(process_document, "retry", side_effect=Retry()),
+        pytest.raises(Retry),
+    ):
+        process_document.run("doc-1", "user-a", "p/a.pdf")
+
+    scheduler.release.assert_called_once_with("user-a", "doc-1")
+    scheduler.finished.assert_not_called()
+
+
+def test_last_failed_retry_marks_the_document_failed(dedup, scheduler, set_status):
+    dedup.link_duplicate.return_value = None
+
+    with patch("app.workers.tasks._ingest", side_effect=OSError("timeout")) as ingest:
+        # Eager retries run at once, each one a new attempt of the task.
+        process_document.apply(("doc-1", "user-a", "p/a.pdf")).get()
+
+    assert ingest.call_count == settings.CELERY_TASK_MAX_RETRIES + 1
+    set_status.assert_called_with(
+        "doc-1", "user-a", DocumentStatus.FAILED, error_message="timeout"
+    )
+    assert scheduler.release.call_count == settings.CELERY_TASK_MAX_RETRIES + 1
+    scheduler.finished.assert_called_once_with("user-a", QUEUE_LARGE, None)
+
+
+def test_large_pdf_is_fanned_out_by_page_range(
+    dedup, scheduler, set_status, monkeypatch
+):
+    monkeypatch.setattr(settings, "INGEST_SHARD_PAGES", 50)
+    monkeypatch.setattr(settings, "INGEST_SHARD_MIN_MB", 1)
+    dedup.link_duplicate.return_value = None
+
+    with (
+        patch("app.workers.tasks._count_pages", return_value=120),
+        patch("app.workers.tasks._discard_staged") as discard,
+        patch("app.workers.tasks._ingest") as ingest,
+        patch("app.workers.tasks.chord") as chord,
+    ):
+        process_document.run(
+            "doc-1", "user-a", "p/a.pdf", "ab", "application/pdf", 4 << 20, 100.0
+        )
+
+    ingest.assert_not_called()
+    discard.assert_called_once_with("doc-1", "v1")
+    header = list(chord.call_args.args[0].tasks)
+    assert [t.args[4:] for t in header] == [
+        (0, 1, 50, "v1"),
+        (1, 51, 100, "v1"),
+        (2, 101, 120, "v1"),
+    ]
+    assert [t.options["priority"] for t in header] == [0, 1, 2]
+    finalize = chord.return_value.call_args.args[0]
+    assert finalize.task == "tasks.finalize_document"
+    assert finalize.options["link_error"][0].task == "tasks.fail_document"
+    # The document keeps its slot until the range tasks finish it.
+    scheduler.release.assert_not_called()
+    scheduler.finished.assert_not_called()
+
+
+def test_small_pdf_is_not_split(dedup, set_status, monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_SHARD_MIN_MB", 1)
+    dedup.link_duplicate.return_value = None
+
+    with (
+        patch("app.workers.tasks._count_pages") as count,
+        patch("app.workers.tasks._ingest", return_value=3) as ingest,
+    ):
+        process_document.run("doc-1", "user-a", "p/a.pdf", None, "application/pdf", 9)
+
+    count.assert_not_called()
+    ingest.assert_called_once()
+
+
+def test_page_range_is_staged_and_checkpointed(scheduler, checkpoints, document_events):
+    with patch("app.workers.tasks._ingest", return_value=8) as ingest:
+        count = process_page_range.run(
+            "doc-1", "user-a", "p/a.pdf", "application/pdf", 1, 51, 100
+        )
+
+    assert count == 8
+    assert ingest.call_args.kwargs == {
+        "shard": 1,
+        "pages": range(51, 101),
+        "version": V1,
+    }
+    checkpoints.complete.assert_called_once_with("doc-1", 1, 8)
+    document_events.add_progress.assert_called_once_with("doc-1", "user-a", 50, 8)
+    scheduler.renew.assert_called_once_with("user-a", "doc-1")
+
+
+def test_completed_page_range_is_skipped(checkpoints):
+    checkpoints.get.return_value = 5
+
+    with patch("app.workers.tasks._ingest") as ingest:
+        count = process_page_range.run(
+            "doc-1", "user-a", "p/a.pdf", "application/pdf", 0, 1, 50
+        )
+
+    assert count == 5
+    ingest.assert_not_called()
+
+
+def test_failed_page_range_retries_only_itself(scheduler, checkpoints):
+    with (
+        patch("app.workers.tasks._ingest", side_effect=OSError("timeout")),
+        patch.object(process_page_range, "retry", side_effect=Retry()),
+        pytest.raises(Retry),
+    ):
+        process_page_range.run("doc-1", "user-a", "p/a.pdf", None, 2, 101, 120)
+
+    checkpoints.complete.assert_not_called()
+
+
+def test_finalize_publishes_all_ranges(dedup, scheduler, checkpoints, redis_client):
+    with patch("app.workers.tasks._publish") as publish:
+        finalize_document.run([8, 0, 5], "doc-1", "user-a", "ab", 100.0)
+
+    publish.assert_called_once_with("doc-1", 13, "v1")
+    dedup.register.assert_called_once_with("ab", "doc-1", 13)
+    redis_client.incr.assert_called_once_with("docmind:kb-version:user-a")
+    checkpoints.clear.assert_called_once_with("doc-1")
+    scheduler.release.assert_called_once_with("user-a", "doc-1")
+    scheduler.finished.assert_called_once_with("user-a", QUEUE_LARGE, 100.0)
+
+
+def test_finalize_without_text_fails_the_document(set_status, scheduler, checkpoints):
+    with patch("app.workers.tasks._publish") as publish:
+        finalize_document.run([0, 0], "doc-1", "user-a")
+
+    publish.assert_not_called()
+    set_status.assert_called_once_with(
+        "doc-1",
+        "user-a",
+        DocumentStatus.FAILED,
+        error_message="Document contains no extractable text.",
+    )
+
+
+def test_failed_shard_fails_the_document(set_status, scheduler, checkpoints):
+    with patch(
+        "app.workers.tasks._discard_staged", side_effect=OSError("down")
+    ) as discard:
+        fail_document.run(
+            MagicMock(), ExtractionError("bad page"), None, "doc-1", "user-a", 100.0
+        )
+
+    set_status.assert_called_once_with(
+        "doc-1", "user-a", DocumentStatus.FAILED, error_message="bad page"
+    )
+    discard.assert_called_once_with("doc-1", "v1")
+    checkpoints.clear.assert_called_once_with("doc-1")
+    scheduler.release.assert_called_once_with("user-a", "doc-1")
+    scheduler.finished.assert_called_once_with("user-a", QUEUE_LARGE, 100.0)
+
+
+def test_new_content_is_ingested_for_the_active_version(dedup, index_versions):
+    index_versions.active.return_value = V2
+    dedup.link_duplicate.return_value = None
+
+    with (
+        patch("app.workers.tasks._set_status"),
+        patch("app.workers.tasks._ingest", return_value=4) as ingest,
+    ):
+        process_document.run("doc-1", "user-a", "p/a.md", None, "text/markdown")
+
+    assert ingest.call_args.kwargs["version"] == V2
+
+
+def test_changed_settings_start_a_migration(index_versions):
+    index_versions.begin.return_value = V2
+
+    with patch.object(reindex_corpus, "apply_async") as send:
+        assert start_reindex() == V2
+
+    index_versions.begin.assert_called_once_with(IndexSpec.from_settings())
+    send.assert_called_once_with(queue=QUEUE_REINDEX)
+
+
+def test_unchanged_settings_start_nothing(index_versions):
+    index_versions.begin.return_value = None
+
+    with patch.object(reindex_corpus, "apply_async") as send:
+        assert start_reindex() is None
+
+    send.assert_not_called()
+
+
+def _ready(*ids):
+    return [
+        {"id": doc, "user_id": f"user-{doc}", "storage_path": f"p/{doc}.md"}
+        for doc in ids
+    ]
+
+
+def test_sweep_dispatches_unmigrated_documents(index_versions, monkeypatch):
+    monkeypatch.setattr(settings, "REINDEX_SWEEP_SECONDS", 60)
+    index_versions.target.return_value = V2
+    index_versions.unmigrated.side_effect = lambda version, ids: ids[1:]
+    index_versions.claim.side_effect = lambda version, doc, lease: doc != "c"
+    database = MagicMock()
+    database.ready_documents = MagicMock(
+        side_effect=_async_results(_ready("a", "b"), _ready("c"), [])
+    )
+    database.aclose = _async_results(None, None)
+
+    with (
+        patch("app.workers.tasks._database", return_value=database),
+        patch.object(reembed_document, "apply_async") as reembed,
+        patch.object(reindex_corpus, "apply_async") as next_sweep,
+    ):
+        reindex_corpus.run()
+
+    # "a" is migrated; "c" was claimed by an earlier sweep and is in flight.
+    assert [c.args[0] for c in reembed.call_args_list] == [("b", "user-b", "v2")]
+    assert [c.args for c in database.ready_documents.call_args_list] == [
+        (None, 500),
+        ("b", 500),
+        ("c", 500),
+    ]
+    index_versions.record_remaining.assert_called_once_with("v2", 1)
+    next_sweep.assert_called_once_with(queue=QUEUE_REINDEX, countdown=60)
+    index_versions.cut_over.assert_not_called()
+
+
+def test_last_sweep_cuts_over_and_schedules_retirement(index_versions, monkeypatch):
+    monkeypatch.setattr(settings, "REINDEX_RETIRE_DELAY_SECONDS", 600)
+    index_versions.target.return_value = V2
+    index_versions.cut_over.return_value = (V1, ["user-a"])
+
+    with (
+        patch("app.workers.tasks._sweep", return_value=0),
+        patch.object(reindex_corpus, "apply_async") as next_sweep,
+        patch.object(retire_index_version, "apply_async") as retire,
+    ):
+        reindex_corpus.run()
+
+    index_versions.cut_over.assert_called_once_with("v2")
+    next_sweep.assert_not_called()
+    retire.assert_called_once_with(
+        ("v1", ["user-a"]), queue=QUEUE_REINDEX, countdown=600
+    )
+
+
+def test_sweep_without_target_or_claim_does_nothing(index_versions):
+    with patch("app.workers.tasks._sweep") as sweep:
+        reindex_corpus.run()
+        index_versions.target.return_value = V2
+        index_versions.claim_sweep.return_value = False
+        reindex_corpus.run()
+
+    sweep.assert_not_called()
+
+
+def test_reembedding_publishes_the_target_version(index_versions):
+    index_versions.target.return_value = V2
+
+    with (
+        patch(
+            "app.workers.tasks._get_document",
+            return_value={"storage_path": "p/a.md", "mime_type": "text/markdown"},
+        ),
+        patch("app.workers.tasks._ingest", return_value=6) as ingest,
+        patch("app.workers.tasks.add_to_vector_index") as add,
+    ):
+        reembed_document.run("doc-1", "user-a", "v2")
+
+    ingest.assert_called_once_with(
+        "doc-1", "user-a", "p/a.md", "text/markdown", version=V2
+    )
+    assert add.call_args.args[1:] == ("user-a", "doc-1", "v2")
+    index_versions.migrated.assert_called_once_with("v2", "doc-1", "user-a")
+
+
+def test_reembedding_skips_deleted_documents(index_versions):
+    with (
+        patch("app.workers.tasks._get_document", return_value=None),
+        patch("app.workers.tasks._ingest") as ingest,
+    ):
+        reembed_document.run("doc-1", "user-a", "v2")
+
+    ingest.assert_not_called()
+    index_versions.migrated.assert_not_called()
+
+
+def test_unreadable_document_does_not_hold_the_migration_back(index_versions):
+    with (
+        patch("app.workers.tasks._get_document", return_value={"storage_path": "p"}),
+        patch("app.workers.tasks._ingest", side_effect=ExtractionError("no text")),
+    ):
+        reembed_document.run("doc-1", "user-a", "v2")
+
+    index_versions.migrated.assert_called_once_with("v2", "doc-1", "user-a")
+
+
+def test_failed_reembedding_retries_and_stays_unmigrated(index_versions):
+    with (
+        patch("app.workers.tasks._get_document", return_value={"storage_path": "p"}),
+        patch("app.workers.tasks._ingest", side_effect=OSError("timeout")),
+        patch.object(reembed_document, "retry", side_effect=Retry()),
+        pytest.raises(Retry),
+    ):
+        reembed_document.run("doc-1", "user-a", "v2")
+
+    index_versions.migrated.assert_not_called()
+
+
+def test_document_ingested_across_a_cut_over_is_reembedded(dedup, index_versions):
+    # Active was v1 when processing started and v2 once it finished.
+    index_versions.active.side_effect = [V1, V2]
+    dedup.link_duplicate.return_value = None
+
+    with (
+        patch("app.workers.tasks._set_status"),
+        patch("app.workers.tasks._ingest", return_value=3),
+        patch.object(reembed_document, "apply_async") as reembed,
+    ):
+        process_document.run("doc-1", "user-a", "p/a.md", None, "text/markdown")
+
+    reembed.assert_called_once_with(("doc-1", "user-a", "v2"), queue=QUEUE_LARGE)
+
+
+def test_retired_version_rows_and_shards_are_dropped(index_versions):
+    with (
+        patch("app.workers.tasks._delete_chunk_version", return_value=9) as delete,
+        patch("app.workers.tasks.drop_vector_index") as drop,
+    ):
+        retire_index_version.run("v2", ["user-a", "user-b"])
+
+    delete.assert_called_once_with("v2", ["user-a", "user-b"])
+    assert [c.args for c in drop.call_args_list] == [
+        ("user-a", "v2"),
+        ("user-b", "v2"),
+    ]
+
+
+def test_version_in_use_again_is_not_retired(index_versions):
+    index_versions.target.return_value = V2
+
+    with patch("app.workers.tasks._delete_chunk_version") as delete:
+        retire_index_version.run("v1", ["user-a"])
+        retire_index_version.run("v2", ["user-a"])
+
+    delete.assert_not_called()
+
+
+def _async_results(*results):
+    """An async callable returning ``results`` one per call."""
+    pending = iter(results)
+
+    async def call(*args, **kwargs):
+        return next(pending)
+
+    return call
+
+
+def test_status_changes_are_pushed_to_the_owner(document_events, mock_supabase):
+    with patch("app.workers.tasks.get_supabase_client", return_value=mock_supabase):
+        _set_status("doc-1", "user-a", DocumentStatus.FAILED, error_message="bad")
+
+    mock_supabase.table.return_value.update.assert_called_once_with(
+        {"status": "FAILED", "error_message": "bad"}
+    )
+    document_events.status.assert_called_once_with("doc-1", "user-a", "FAILED", "bad")
+
+
+def test_each_run_closes_its_async_redis_client():
+    created = []
+
+    def from_url(url):
+        created.append(MagicMock(aclose=AsyncMock()))
+        return created[-1]
+
+    async def use_redis() -> int:
+        assert get_async_redis() is get_async_redis()
+        return 7
+
+    with patch("app.core.redis_client.aioredis.Redis.from_url", side_effect=from_url):
+        assert _run(use_redis()) == 7
+        assert _run(use_redis()) == 7
+
+    assert len(created) == 2  # One client per run's event loop
+    for client in created:
+        client.aclose.assert_awaited_once()
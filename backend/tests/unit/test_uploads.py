@@ -0,0 +1,112 @@
+"""Unit tests for the streaming multipart upload reader."""
+
+from __future__ import annotations
+
+import pytest
+from starlette.requests import Request
+
+from app.api.uploads import MultipartUpload, UploadFormatError
+
+BOUNDARY = "b0undary"
+
+
+def _form(*parts: tuple[str, str | None, str | None, bytes]) -> bytes:
+    body = b""
+    for name, filename, content_type, data in parts:
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        head = f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n"
+        if content_type:
+            head += f"Content-Type: {content_type}\r\n"
+        body += head.encode() + b"\r\n" + data + b"\r\n"
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+
+def _request(
+    body: bytes, chunk: int = 7, content_type: str | None = None
+) -> tuple[Request, list[int]]:
+    """A request whose body arrives in ``chunk``-byte messages, counting them."""
+    pieces = [body[i : i + chunk] for i in range(0, len(body), chunk)] or [b""]
+    received: list[int] = []
+
+    async def receive() -> dict:
+        index = len(received)
+        received.append(index)
+        if index >= len(pieces):
+            return {"type": "http.disconnect"}
+        return {
+            "type": "http.request",
+            "body": pieces[index],
+            "more_body": index < len(pieces) - 1,
+        }
+
+    content_type = content_type or f"multipart/form-data; boundary={BOUNDARY}"
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/",
+        "headers": [(b"content-type", content_type.encode())],
+    }
+    return Request(scope, receive), received
+
+
+async def _read_all(upload: MultipartUpload, size: int = 5) -> bytes:
+    data = b""
+    while chunk := await upload.read(size):
+        data += chunk
+    return data
+
+
+async def test_file_is_read_across_small_receive_messages():
+    data = bytes(range(256)) * 4 + b"\r\n--not-the-boundary"
+    body = _form(
+        ("note", None, None, b"first"),
+        ("file", "notes.md", "text/markdown", data),
+        ("after", None, None, b"ignored"),
+    )
+    request, _ = _request(body)
+    upload = MultipartUpload(request)
+
+    await upload.open()
+
+    assert upload.filename == "notes.md"
+    assert upload.content_type == "text/markdown"
+    assert await _read_all(upload) == data
+    assert await upload.read(5) == b""
+
+
+async def test_file_headers_are_known_before_its_content_is_received():
+    body = _form(("file", "a.txt", "text/plain", b"x" * 10_000))
+    request, received = _request(body, chunk=1000)
+    upload = MultipartUpload(request)
+
+    await upload.open()
+
+    assert upload.content_type == "text/plain"
+    assert len(received) == 1  # Only the first message has been pulled
+
+
+async def test_missing_file_field_is_a_format_error():
+    request, _ = _request(_form(("file", None, None, b"a plain value")))
+
+    with pytest.raises(UploadFormatError, match="No file"):
+        await MultipartUpload(request).open()
+
+
+async def test_non_multipart_body_is_a_format_error():
+    request, received = _request(b"{}", content_type="application/json")
+
+    with pytest.raises(UploadFormatError, match="multipart"):
+        await MultipartUpload(request).open()
+    assert received == []
+
+
+async def test_body_ending_inside_the_file_is_a_format_error():
+    body = _form(("file", "a.txt", "text/plain", b"x" * 100))
+    request, _ = _request(body[:-40])
+    upload = MultipartUpload(request)
+    await upload.open()
+
+    with pytest.raises(UploadFormatError, match="ended"):
+        await _read_all(upload)
@@ -0,0 +1,242 @@
+"""Unit tests for the in-memory index and memory-mapped vector shards."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.services.vector_index import (
+    MAX_SEGMENTS,
+    ExactIndex,
+    ShardVectorIndex,
+    VectorShards,
+    VectorShardWriter,
+    normalize,
+    train_centroids,
+    user_shard_path,
+)
+
+DIM = 16
+
+
+def _clustered(n: int, seed: int = 0, clusters: int = 8) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, DIM))
+    labels = rng.integers(0, clusters, n)
+    return (centers[labels] + 0.1 * rng.standard_normal((n, DIM))).astype(np.float32)
+
+
+def _keys(document_id: str, n: int) -> list[tuple[str, int]]:
+    return [(document_id, i) for i in range(n)]
+
+
+def test_exact_index_ranks_by_cosine():
+    vectors = np.eye(4, DIM, dtype=np.float32) * [[1], [2], [3], [4]]
+    index = ExactIndex(vectors)
+
+    positions, sims = index.search(normalize(vectors[2]), 2)
+
+    assert positions[0] == 2
+    assert sims[0] == pytest.approx(1.0)
+    np.testing.assert_allclose(
+        index.similarity(np.array([1, 2]), normalize(vectors[2])), [0, 1]
+    )
+
+
+def test_ivf_probing_every_list_matches_exact_search(tmp_path):
+    vectors = _clustered(500)
+    VectorShardWriter(tmp_path, n_lists=8).rebuild(_keys("doc", 500), vectors)
+    shards = VectorShards.open(tmp_path)
+    exact = ExactIndex(vectors)
+    ann = ShardVectorIndex(shards, _keys("doc", 500), nprobe=8)
+
+    query = normalize(_clustered(1, seed=1)[0])
+    positions, sims = ann.search(query, 10)
+    expected, expected_sims = exact.search(query, 10)
+
+    assert positions.tolist() == expected.tolist()
+    np.testing.assert_allclose(sims, expected_sims, rtol=1e-5)
+    np.testing.assert_allclose(ann.similarity(positions, query), sims, rtol=1e-5)
+    assert isinstance(shards.segments[0].codes, np.memmap)
+
+
+@pytest.mark.parametrize(("dtype", "tolerance"), [("float16", 1e-3), ("int8", 2e-2)])
+def test_exhaustive_scan_of_quantized_shards_tracks_exact(tmp_path, dtype, tolerance):
+    vectors = _clustered(300)
+    keys = _keys("doc", 300)
+    VectorShardWriter(tmp_path, n_lists=4, dtype=dtype).rebuild(keys, vectors)
+    shards = VectorShards.open(tmp_path)
+    index = ShardVectorIndex(shards, keys)
+
+    query = normalize(_clustered(1, seed=7)[0])
+    positions, sims = index.search(query, 300)
+
+    exact = ExactIndex(vectors).similarity(positions, query)
+    np.testing.assert_allclose(sims, exact, atol=tolerance)
+    assert shards.dtype == dtype
+    assert shards.segments[0].codes.dtype == np.dtype(dtype)
+
+
+def test_pq_rows_stay_float32_until_codebooks_are_trained(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.services.vector_index.PQ_MIN_TRAIN_ROWS", 300)
+    writer = VectorShardWriter(tmp_path, n_lists=4, dtype="pq", pq_subvectors=4)
+
+    writer.add("doc-a", np.arange(200), _clustered(200))
+    assert VectorShards.open(tmp_path).segments[0].codes.dtype == np.float32
+
+    writer.add("doc-b", np.arange(200), _clustered(200, seed=1))
+    shards = VectorShards.open(tmp_path)
+
+    assert len(shards.segments) == 1  # Compacted and encoded
+    assert shards.segments[0].codes.shape == (400, 4)
+    assert shards.segments[0].codebooks.shape == (4, 256, 4)
+
+
+def test_rerank_restores_exact_similarities(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.services.vector_index.PQ_MIN_TRAIN_ROWS", 300)
+    vectors = _clustered(400)
+    keys = _keys("doc", 400)
+    VectorShardWriter(
+        tmp_path, n_lists=4, dtype="pq", keep_raw=True, pq_subvectors=4
+    ).rebuild(keys, vectors)
+    shards = VectorShards.open(tmp_path)
+    query = normalize(_clustered(1, seed=8)[0])
+
+    approximate = ShardVectorIndex(shards, keys)
+    reranked = ShardVectorIndex(shards, keys, rerank=50)
+    positions, sims = reranked.search(query, 10)
+
+    exact_positions, exact_sims = ExactIndex(vectors).search(query, 10)
+    assert shards.segments[0].raw is not None
+    np.testing.assert_allclose(sims, exact_sims, rtol=1e-5)
+    assert positions.tolist() == exact_positions.tolist()
+    assert not np.allclose(approximate.search(query, 10)[1], exact_sims)
+
+
+@pytest.mark.parametrize("dtype", ["float32", "pq"])
+def test_float32_segments_keep_no_raw_copy(tmp_path, dtype):
+    # PQ rows stay float32 until there are enough of them to train codebooks.
+    VectorShardWriter(
+        tmp_path, n_lists=2, dtype=dtype, keep_raw=True, pq_subvectors=4
+    ).add("doc-a", np.arange(20), _clustered(20))
+
+    shards = VectorShards.open(tmp_path)
+
+    assert shards.segments[0].codes.dtype == np.float32
+    assert shards.segments[0].raw is None
+    assert not list(tmp_path.glob("seg-*/raw.npy"))
+
+
+def test_inserts_keep_the_dtype_the_shards_were_created_with(tmp_path):
+    VectorShardWriter(tmp_path, n_lists=2, dtype="int8").add(
+        "doc-a", np.arange(10), _clustered(10)
+    )
+    VectorShardWriter(tmp_path, n_lists=2).add("doc-b", np.arange(10), _clustered(10))
+
+    shards = VectorShards.open(tmp_path)
+
+    assert {s.codes.dtype for s in shards.segments} == {np.dtype(np.int8)}
+
+
+def test_unknown_dtype_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        VectorShardWriter(tmp_path, dtype="float8")
+
+
+def test_ivf_with_few_probes_keeps_high_recall(tmp_path):
+    vectors = _clustered(2000)
+    VectorShardWriter(tmp_path, n_lists=32).rebuild(_keys("doc", 2000), vectors)
+    ann = ShardVectorIndex(VectorShards.open(tmp_path), _keys("doc", 2000), nprobe=8)
+    exact = ExactIndex(vectors)
+
+    hits = 0
+    for query in normalize(_clustered(20, seed=2)):
+        hits += len(set(ann.search(query, 10)[0]) & set(exact.search(query, 10)[0]))
+
+    assert hits / 200 >= 0.9
+
+
+def test_incremental_add_replace_and_remove(tmp_path):
+    writer = VectorShardWriter(tmp_path, n_lists=4)
+    writer.add("doc-a", np.arange(50), _clustered(50, seed=3))
+    writer.add("doc-b", np.arange(30), _clustered(30, seed=4))
+    writer.add("doc-a", np.arange(20), _clustered(20, seed=5))  # Re-ingested
+    writer.remove("doc-b")
+
+    shards = VectorShards.open(tmp_path)
+
+    assert sorted(shards.live_keys()) == _keys("doc-a", 20)
+    keys = _keys("doc-a", 20) + _keys("doc-b", 30)
+    ann = ShardVectorIndex(shards, keys, nprobe=4)
+    assert ann.covered == 20
+    positions, _ = ann.search(normalize(_clustered(1, seed=6)[0]), 50)
+    assert set(positions.tolist()) <= set(range(20))
+
+
+def test_segments_are_compacted_and_tombstones_dropped(tmp_path):
+    writer = VectorShardWriter(tmp_path, n_lists=4)
+    writer.add("base", np.arange(200), _clustered(200))  # Too big to retrain
+    for i in range(MAX_SEGMENTS):
+        writer.add(f"doc-{i}", np.arange(10), _clustered(10, seed=i))
+        if i == 0:
+            writer.remove("doc-0")
+
+    shards = VectorShards.open(tmp_path)
+
+    assert len(shards.segments) == 1
+    assert not shards.deleted
+    assert len(shards) == 200 + 10 * (MAX_SEGMENTS - 1)
+    assert "doc-0" not in shards.documents
+    # Superseded files are removed once the manifest no longer references them.
+    assert len([p for p in tmp_path.iterdir() if p.name.startswith("seg-")]) == 1
+
+
+def test_open_retries_when_a_commit_removes_the_files_it_read(tmp_path, monkeypatch):
+    writer = VectorShardWriter(tmp_path, n_lists=4)
+    writer.add("base", np.arange(200), _clustered(200))
+    for i in range(MAX_SEGMENTS - 1):
+        writer.add(f"doc-{i}", np.arange(10), _clustered(10, seed=i))
+    from_manifest = VectorShards.from_manifest.__func__
+    calls = []
+
+    def racing(cls, path, manifest):
+        calls.append(len(manifest["segments"]))
+        if len(calls) == 1:  # Compacts the segments this manifest names
+            writer.add("late", np.arange(10), _clustered(10, seed=99))
+        return from_manifest(cls, path, manifest)
+
+    monkeypatch.setattr(VectorShards, "from_manifest", classmethod(racing))
+
+    shards = VectorShards.open(tmp_path)
+
+    # The stale manifest failed to load; the re-read one (compacted) did.
+    assert (calls[0], calls[-1]) == (MAX_SEGMENTS, 1)
+    assert "late" in shards.documents
+
+
+def test_growth_retrains_centroids(tmp_path):
+    writer = VectorShardWriter(tmp_path, n_lists=4)
+    writer.add("doc-0", np.arange(10), _clustered(10))
+    first = VectorShards.open(tmp_path).centroids.copy()
+
+    writer.add("doc-1", np.arange(40), _clustered(40, seed=1))
+
+    assert not np.array_equal(VectorShards.open(tmp_path).centroids, first)
+    assert len(VectorShards.open(tmp_path).segments) == 1
+
+
+def test_open_missing_index_returns_none(tmp_path):
+    assert VectorShards.open(tmp_path / "nobody") is None
+
+
+def test_train_centroids_are_unit_length():
+    centroids = train_centroids(normalize(_clustered(300)), 8)
+
+    assert centroids.shape == (8, DIM)
+    np.testing.assert_allclose(np.linalg.norm(centroids, axis=1), 1.0, rtol=1e-5)
+
+
+def test_user_shard_path_rejects_traversal(tmp_path):
+    assert user_shard_path(tmp_path, "user-1") == tmp_path / "user-1"
+    with pytest.raises(ValueError):
+        user_shard_path(tmp_path, "../etc")
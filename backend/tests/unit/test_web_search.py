@@ -0,0 +1,359 @@
+"""Unit tests for the cached, concurrent web search service."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.agent.prompts import build_generation_messages
+from app.services.web_search import (
+    BraveSearch,
+    SearchHit,
+    StubSearch,
+    WebSearchService,
+    build_search_provider,
+    build_web_client,
+    close_web_search,
+    extract_main_text,
+    get_web_search,
+    is_public_url,
+    resolve_host,
+)
+
+ARTICLE = (
+    "<html><head><title>T</title><script>track()</script></head><body>"
+    "<nav>Home | About</nav><article><h1>Heaps</h1>"
+    "<p>A binary heap is a complete binary tree stored in an array.</p>"
+    "<p>Insertion and removal take O(log n) time.</p></article>"
+    "<footer>Copyright</footer></body></html>"
+)
+
+
+class FakeRedis:
+    """The slice of redis.asyncio.Redis used by the web search caches."""
+
+    def __init__(self) -> None:
+        self.store: dict[str, bytes] = {}
+        self.ttls: dict[str, int] = {}
+        self.down = False
+
+    async def get(self, key):
+        self._check()
+        return self.store.get(key)
+
+    async def mget(self, keys):
+        self._check()
+        return [self.store.get(key) for key in keys]
+
+    async def set(self, key, value, ex=None):
+        self._check()
+        self.store[key] = value.encode()
+        self.ttls[key] = ex
+
+    def _check(self) -> None:
+        if self.down:
+            raise RedisConnectionError("down")
+
+
+class Pages:
+    """Mock web: serves pages, counting fetches and concurrency per host."""
+
+    def __init__(self, seconds: float = 0.0) -> None:
+        self.seconds = seconds
+        self.bodies: dict[str, tuple[str, str]] = {}
+        self.fetches: list[str] = []
+        self.in_flight: dict[str, int] = {}
+        self.peak: dict[str, int] = {}
+
+    def add(self, url: str, body: str = ARTICLE, content_type: str = "text/html"):
+        self.bodies[url] = (body, content_type)
+        return SearchHit(url, f"Title of {url}", f"Snippet of {url}")
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        url, host = str(request.url), request.url.host
+        self.fetches.append(url)
+        self.in_flight[host] = self.in_flight.get(host, 0) + 1
+        self.peak[host] = max(self.peak.get(host, 0), self.in_flight[host])
+        try:
+            await asyncio.sleep(self.seconds)
+        finally:
+            self.in_flight[host] -= 1
+        if url not in self.bodies:
+            return httpx.Response(404)
+        body, content_type = self.bodies[url]
+        return httpx.Response(200, text=body, headers={"content-type": content_type})
+
+
+@pytest.fixture
+def redis_client() -> FakeRedis:
+    return FakeRedis()
+
+
+def _service(hits, pages: Pages, redis_client: FakeRedis, **options):
+    return WebSearchService(
+        StubSearch(hits),
+        build_web_client(httpx.MockTransport(pages)),
+        lambda: redis_client,
+        **{"per_host": 2, "page_timeout": 2, **options},
+    )
+
+
+async def test_pages_are_fetched_concurrently_and_extracted(redis_client):
+    pages = Pages(seconds=0.2)
+    hits = [pages.add(f"https://site{i}.example/heaps") for i in range(5)]
+    service = _service({"binary heaps": hits}, pages, redis_client)
+
+    started = time.perf_counter()
+    results = await service.search("binary heaps")
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.6  # One page's latency, not five
+    assert [result["url"] for result in results] == [hit.url for hit in hits]
+    assert results[0]["title"] == "Title of https://site0.example/heaps"
+    assert results[0]["content"] == (
+        "Heaps\nA binary heap is a complete binary tree stored in an array.\n"
+        "Insertion and removal take O(log n) time."
+    )
+
+
+async def test_fetches_per_host_are_limited(redis_client):
+    pages = Pages(seconds=0.05)
+    hits = [pages.add(f"https://one.example/{i}") for i in range(5)]
+    hits.append(pages.add("https://other.example/"))
+    service = _service({"q": hits}, pages, redis_client, results=6)
+
+    await service.search("q")
+
+    assert pages.peak == {"one.example": 2, "other.example": 1}
+
+
+async def test_slow_or_failed_pages_fall_back_to_the_snippet(redis_client):
+    pages = Pages(seconds=0.3)
+    slow = pages.add("https://slow.example/")
+    missing = SearchHit("https://gone.example/", "Gone", "Gone snippet")
+    pdf = pages.add("https://paper.example/a.pdf", "%PDF", "application/pdf")
+    service = _service({"q": [slow, missing, pdf]}, pages, redis_client)
+    service.page_timeout = 0.1
+
+    started = time.perf_counter()
+    results = await service.search("q")
+
+    assert time.perf_counter() - started < 0.25  # Bounded by the page timeout
+    assert [result["content"] for result in results] == [
+        "Snippet of https://slow.example/",
+        "Gone snippet",
+        "Snippet of https://paper.example/a.pdf",
+    ]
+    # Failures are remembered briefly, so the next search does not wait again.
+    assert sorted(set(redis_client.ttls.values())) == [600, 3600]
+
+
+async def test_unknown_charset_is_read_as_utf8(redis_client):
+    pages = Pages()
+    hit = pages.add("https://a.example/", content_type="text/html; charset=bogus")
+    service = _service({"q": [hit]}, pages, redis_client)
+
+    results = await service.search("q")
+
+    assert results[0]["content"].startswith("Heaps\nA binary heap")
+
+
+async def test_hits_are_cached_by_normalized_query_and_pages_by_url(redis_client):
+    pages = Pages()
+    shared = pages.add("https://shared.example/page#intro")
+    other = pages.add("https://other.example/")
+    provider = StubSearch({"binary heaps": [shared], "heap sort": [other, shared]})
+    service = WebSearchService(
+        provider, build_web_client(httpx.MockTransport(pages)), lambda: redis_client
+    )
+
+    first = await service.search("binary heaps")
+    again = await service.search("  Binary   HEAPS ")
+    await service.search("heap sort")
+
+    assert again == first
+    assert provider.calls == 2
+    assert pages.fetches == [
+        "https://shared.example/page#intro",  # Once, for both queries
+        "https://other.example/",
+    ]
+
+
+async def test_search_works_without_redis(redis_client):
+    redis_client.down = True
+    pages = Pages()
+    service = _service({"q": [pages.add("https://a.example/")]}, pages, redis_client)
+
+    results = await service.search("q")
+
+    assert results[0]["content"].startswith("Heaps")
+
+
+async def test_provider_failure_returns_no_results(redis_client):
+    class Broken:
+        name = "broken"
+
+        async def search(self, query, limit):
+            raise httpx.ConnectError("unreachable")
+
+    service = WebSearchService(
+        Broken(), build_web_client(httpx.MockTransport(Pages())), lambda: redis_client
+    )
+
+    assert await service.search("q") == []
+    assert redis_client.store == {}  # Not cached: the next query retries
+
+
+async def test_private_hosts_are_never_fetched(redis_client):
+    pages = Pages()
+    local = pages.add("http://127.0.0.1:8000/admin")
+    pages.bodies["https://redirect.example/"] = ("", "text/html")
+    redirect = SearchHit("https://redirect.example/", "R", "Redirect snippet")
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "redirect.example":
+            return httpx.Response(302, headers={"location": "http://10.0.0.5/"})
+        return await pages(request)
+
+    service = WebSearchService(
+        StubSearch({"q": [local, redirect]}),
+        build_web_client(httpx.MockTransport(handler)),
+        lambda: redis_client,
+    )
+
+    results = await service.search("q")
+
+    assert [result["content"] for result in results] == [
+        "Snippet of http://127.0.0.1:8000/admin",
+        "Redirect snippet",
+    ]
+    assert pages.fetches == []
+
+
+async def test_names_resolving_to_private_addresses_are_never_fetched(redis_client):
+    pages = Pages()
+    hits = [
+        pages.add("https://rebound.example/"),
+        pages.add("https://mixed.example/"),
+        pages.add("https://unknown.example/"),
+        pages.add("https://public.example/"),
+    ]
+    addresses = {
+        "rebound.example": ["10.0.0.5"],
+        "mixed.example": ["93.184.216.34", "::1"],
+        "public.example": ["93.184.216.34"],
+    }
+
+    async def resolver(host: str) -> list[str]:
+        if host not in addresses:
+            raise OSError("Name or service not known")
+        return addresses[host]
+
+    service = WebSearchService(
+        StubSearch({"q": hits}),
+        build_web_client(httpx.MockTransport(pages), resolver),
+        lambda: redis_client,
+    )
+
+    results = await service.search("q")
+
+    assert [result["content"].startswith("Heaps") for result in results] == [
+        False,
+        False,
+        False,
+        True,
+    ]
+    assert pages.fetches == ["https://public.example/"]
+
+
+async def test_resolve_host_returns_every_address():
+    assert "127.0.0.1" in await resolve_host("localhost")
+
+
+@pytest.mark.parametrize(
+    ("url", "public"),
+    [
+        ("https://en.wikipedia.org/wiki/Heap", True),
+        ("http://93.184.216.34/", True),
+        ("ftp://example.com/file", False),
+        ("http://localhost:8000/", False),
+        ("http://192.168.1.10/", False),
+        ("http://[::1]/", False),
+        ("http://metadata.google.internal/", False),
+    ],
+)
+def test_is_public_url(url, public):
+    assert is_public_url(url) is public
+
+
+def test_extract_main_text_without_main_markup_keeps_the_body():
+    html = (
+        "<body><div class='menu'><nav><a>Home</a></nav></div>"
+        "<div><p>First   paragraph\n of text.</p><ul><li>one</li><li>two</li></ul>"
+        "<form><input value='q'><button>Go</button></form></div>"
+        "<style>p { color: red }</style></body>"
+    )
+
+    assert extract_main_text(html, 1000) == "First paragraph\nof text.\none\ntwo"
+    assert extract_main_text(html, 12) == "First …"
+
+
+async def test_brave_search_parses_results():
+    async def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.params["q"] == "heaps"
+        assert request.headers["X-Subscription-Token"] == "key"
+        return httpx.Response(
+            200,
+            json={
+                "web": {
+                    "results": [
+                        {
+                            "url": "https://a.example/",
+                            "title": "<strong>Heaps</strong> &amp; trees",
+                            "description": "All about <strong>heaps</strong>.",
+                        }
+                    ]
+                }
+            },
+        )
+
+    client = build_web_client(httpx.MockTransport(handler))
+    hits = await BraveSearch(client, "key").search("heaps", 5)
+
+    assert hits == [
+        SearchHit("https://a.example/", "Heaps & trees", "All about heaps.")
+    ]
+
+
+async def test_service_is_shared_within_the_event_loop():
+    service = get_web_search()
+
+    assert get_web_search() is service
+    assert service.provider.name == "stub"
+    await close_web_search()
+    assert get_web_search() is not service
+    await close_web_search()
+
+
+def test_unknown_provider_is_rejected():
+    with pytest.raises(ValueError, match="Unknown web search provider"):
+        build_search_provider("altavista", build_web_client())
+
+
+def test_generation_prompt_labels_web_results():
+    messages = build_generation_messages(
+        {
+            "query": "q",
+            "web_search_results": [
+                {"url": "https://a.example/", "title": "A", "content": "Text."}
+            ],
+        }
+    )
+
+    assert messages[0].content.endswith(
+        "Web results (cite as [W1], [W2], ...):\n[W1] A (https://a.example/)\nText."
+    )